@@ -21,6 +21,8 @@ if _project_root not in sys.path:
     sys.path.insert(0, _project_root)
 
 from src.platform_utils import IS_WINDOWS, IS_LINUX, IS_MACOS, is_frozen, ensure_user_overlay_layout
+# Imported first so its clock starts as close to the process as it can.
+from src.titan_core import startup_trace
 
 # Create the per-user overlay layout under %APPDATA%/titosoft/Titan/ (Windows),
 # ~/.config/titosoft/Titan/ (Linux) or ~/Library/Application Support/titosoft/
@@ -437,7 +439,8 @@ def signal_handler(signum, frame):
 def main(command_line_args=None):
     """Main initialization function with comprehensive error handling."""
     try:
-        settings = load_settings()
+        with startup_trace.span('settings'):
+            settings = load_settings()
         
         # Set the LANG environment variable for the entire application and subprocesses
         try:
@@ -455,9 +458,10 @@ def main(command_line_args=None):
 
         # Initialize sound system with error handling
         try:
-            initialize_sound()
-            theme = settings.get('sound', {}).get('theme', 'default')
-            set_theme(theme)
+            with startup_trace.span('sound.init'):
+                initialize_sound()
+                theme = settings.get('sound', {}).get('theme', 'default')
+                set_theme(theme)
         except Exception as e:
             print(f"Error initializing sound system: {e}")
 
@@ -866,6 +870,7 @@ def main(command_line_args=None):
                             print(f"[KLANGO] Warning: Failed to initialize components: {e}")
                             import traceback
                             traceback.print_exc()
+                    startup_trace.finish()
 
                 # Use CallAfter to initialize components after event loop starts
                 wx.CallAfter(init_klango_components_delayed)
@@ -1114,6 +1119,7 @@ def main(command_line_args=None):
                                     print(f"[LAUNCHER] Warning: Failed to initialize components: {e}")
                                     import traceback
                                     traceback.print_exc()
+                            startup_trace.finish()
 
                         wx.CallAfter(init_launcher_components_delayed)
 
@@ -1199,6 +1205,10 @@ if __name__ == "__main__":
     parser.add_argument('--profile', action='store_true',
                        help='Run under cProfile and write a .pstats dump on exit '
                             '(optimization profiling - see src/scripts/profile_hotpaths.py)')
+    parser.add_argument('--trace-startup', default=None, metavar='PATH',
+                       help='Write a Chrome trace-event JSON of the startup '
+                            'phases to PATH and print the per-phase budget '
+                            'table (see src/titan_core/startup_trace.py)')
     parser.add_argument('--install-package', default=None, metavar='PATH',
                        help='Install a .tca/.tcd package file into the user data '
                             'directory, then launch it (apps/games) or surface it '
@@ -1260,6 +1270,9 @@ if __name__ == "__main__":
         except Exception as _e:
             print(f"[PROFILE] Could not start profiler: {_e}")
 
+    if args.trace_startup:
+        startup_trace.set_output_path(args.trace_startup)
+
     # If another TCE instance is already running, announce the restart via
     # Titan TTS / ao3 and kill the old one before continuing.
     try:
@@ -1312,7 +1325,8 @@ if __name__ == "__main__":
 
     # Reload settings to ensure we have latest configuration
     try:
-        settings = load_settings()
+        with startup_trace.span('settings', reload=True):
+            settings = load_settings()
     except Exception as e:
         print(f"Error loading settings: {e}")
         settings = {}
@@ -1414,7 +1428,8 @@ if __name__ == "__main__":
 
     try:
         # Use should_start_minimized variable defined earlier
-        frame = TitanApp(None, title=_("Titan App Suite"), version=VERSION, settings=settings, component_manager=component_manager, start_minimized=should_start_minimized)
+        with startup_trace.span('gui.build'):
+            frame = TitanApp(None, title=_("Titan App Suite"), version=VERSION, settings=settings, component_manager=component_manager, start_minimized=should_start_minimized)
         print("TitanApp frame created successfully")
     except Exception as e:
         print(f"Failed to create main application frame: {e}")
@@ -1651,6 +1666,7 @@ if __name__ == "__main__":
             print("Starting minimized to tray")
         else:
             frame.Show()
+            startup_trace.mark('main window shown')
             print("Main frame shown")
     except Exception as e:
         print(f"Error showing frame: {e}")
@@ -1669,6 +1685,9 @@ if __name__ == "__main__":
                 print(f"[MAIN] Warning: Failed to initialize components: {e}")
                 import traceback
                 traceback.print_exc()
+        # The last phase of a startup: from here on the discovery functions
+        # are the menus' business, not the trace's.
+        startup_trace.finish()
 
     # In order: the Settings window first (the components register their
     # categories into it), then the components themselves.  Both after the
@@ -42,12 +42,14 @@ def get_shared_speaker():
     """
     global _shared
     if _shared is None:
-        try:
-            import accessible_output3.outputs.auto
-            _shared = accessible_output3.outputs.auto.Auto()
-        except Exception as e:
-            print(f"[LazySpeaker] Could not initialize accessible_output3 Auto: {e}")
-            _shared = _NullSpeaker()
+        from src.titan_core.startup_trace import span
+        with span('tts.init', engine='accessible_output3'):
+            try:
+                import accessible_output3.outputs.auto
+                _shared = accessible_output3.outputs.auto.Auto()
+            except Exception as e:
+                print(f"[LazySpeaker] Could not initialize accessible_output3 Auto: {e}")
+                _shared = _NullSpeaker()
     return _shared
 
 
@@ -214,6 +214,10 @@ def announce(nav):
                             _buffer_text)
         elif nav.level == "element":
             _announce_element(nav)
+        elif nav.level == "no_unread":
+            _ = _get_translator()
+            _play(SOUND_ELEMENT_BOUNDARY)
+            speak(_("No unread elements"))
         elif nav.level == "parameter":
             _announce_level(nav, SOUND_BUFFER, SOUND_LIST_BOUNDARY,
                             _parameter_text)
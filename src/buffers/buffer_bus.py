@@ -29,12 +29,19 @@ Design notes:
     environment so child processes inherit it. A process that did not call
     start_host() but sees that variable acts as a forwarding client. With no
     variable at all (standalone), push() simply writes locally.
+  * Forwarding is asynchronous: a child keeps one connection to the host and
+    sends its pushes in small batches, which the host acks (see the IPC
+    bridge section below). flush() waits for the acks; it runs at exit too.
 """
 
 import os
 import json
+import time
+import atexit
 import socket
+import selectors
 import threading
+from collections import OrderedDict
 
 from src.buffers.buffer_system import get_buffer_manager
 
@@ -212,6 +219,41 @@ def _push_local(category_id, buffer_id, text, author=None, kind=None, raw=None,
 # --------------------------------------------------------------------------- #
 #  IPC bridge (host server + forwarding client)
 # --------------------------------------------------------------------------- #
+# Wire format: one JSON object per line over a localhost TCP socket.
+#
+#   child -> host   {"_token": t, "_client": id, "_seq": n, "_batch": [push, ...]}
+#   host  -> child  {"ack": n, "applied": k}
+#
+# A line without "_batch" is a single push in the old one-connection-per-push
+# form; the host still applies it (without an ack) so a child started from an
+# older Titan keeps working.
+#
+# A child used to open a new connection for every push, and the host started
+# a thread for every connection - a busy Telegram chat paid a TCP handshake
+# plus a thread spawn per message.  Now each child keeps ONE connection, and
+# pushes made within BATCH_MAX_DELAY of each other travel as one line of up
+# to BATCH_MAX_ITEMS elements.  The host serves every child from a single
+# selector thread.  A batch stays queued in the child until the host acks
+# its sequence number; after a reconnect the unacked batches are sent again
+# and the host skips any sequence number it has already applied for that
+# client, so nothing is lost or shown twice when the connection drops.
+
+# A batch leaves as soon as it holds this many elements...
+BATCH_MAX_ITEMS = 64
+# ...or when its first element has waited this long (seconds).  Short enough
+# that a ping is not noticeably late, long enough to gather a burst.
+BATCH_MAX_DELAY = 0.01
+# Elements a child keeps while the host is unreachable; the oldest go first.
+MAX_PENDING = 5000
+# How long an exiting child waits for the host to ack what it still holds.
+EXIT_FLUSH_TIMEOUT = 2.0
+# A single line longer than this is not a push; the connection is dropped.
+_MAX_LINE = 16 * 1024 * 1024
+
+_channel = None
+_channel_lock = threading.Lock()
+
+
 def _is_forwarding_client():
     """True if this process should forward instead of writing locally."""
     return _role != 'host' and bool(os.environ.get(IPC_ENV))
@@ -237,72 +279,557 @@ def start_host():
         _host_server = None
 
 
-def _forward(payload):
+def _encode_push(payload):
+    """One push as a JSON string; `raw` is dropped if it cannot be sent."""
+    try:
+        return json.dumps(payload)
+    except (TypeError, ValueError):
+        # raw may be non-serialisable when sent from an app.
+        payload = dict(payload)
+        payload['raw'] = None
+        return json.dumps(payload)
+
+
+def _get_channel():
+    """The forwarding channel of this process, created on first use."""
+    global _channel
     info = os.environ.get(IPC_ENV)
     if not info:
-        return False
+        return None
+    with _channel_lock:
+        channel = _channel
+        if channel is None or channel.info != info or channel.pid != os.getpid():
+            if channel is not None and channel.pid == os.getpid():
+                channel.close(timeout=0)
+            port_s, token = info.split(':', 1)
+            channel = _ForwardChannel(int(port_s), token)
+            channel.info = info
+            _channel = channel
+        return channel
+
+
+def _forward(payload):
+    """Queue a push for the host. True if it was queued (not yet delivered)."""
     try:
-        port_s, token = info.split(':', 1)
-        payload = dict(payload)
-        payload['_token'] = token
-        # raw may be non-serialisable when sent from an app; drop it if so.
-        try:
-            data = json.dumps(payload)
-        except (TypeError, ValueError):
-            payload['raw'] = None
-            data = json.dumps(payload)
-        with socket.create_connection(('127.0.0.1', int(port_s)), timeout=1.0) as s:
-            s.sendall((data + '\n').encode('utf-8'))
-        return True
+        channel = _get_channel()
+        if channel is None:
+            return False
+        return channel.send(payload)
     except Exception as e:
         print(f"[BufferBus] forward error: {e}")
         return False
 
 
+def flush(timeout=EXIT_FLUSH_TIMEOUT):
+    """Wait until every push this process forwarded has been acked by the host.
+
+    Pushes from a child are delivered in the background, so an app that wants
+    to be sure its last message arrived before it does something drastic can
+    call this.  It also runs by itself when the process exits.  Returns True
+    when nothing is left unacknowledged; in the host (or standalone) there is
+    never anything to wait for.
+    """
+    channel = _channel
+    if channel is None or channel.pid != os.getpid():
+        return True
+    return channel.flush(timeout)
+
+
+def _flush_at_exit():
+    try:
+        if not flush(EXIT_FLUSH_TIMEOUT):
+            print("[BufferBus] exiting with buffer elements the host never acked")
+    except Exception:
+        pass
+
+
+atexit.register(_flush_at_exit)
+
+
+class _ForwardChannel:
+    """A child's persistent, reconnecting, batching connection to the host.
+
+    send() only appends to a queue and wakes the writer thread, so a producer
+    never waits on the socket.  The writer gathers a batch (BATCH_MAX_ITEMS or
+    BATCH_MAX_DELAY, whichever comes first), numbers it and sends it; a reader
+    thread per connection removes batches as the host acks them.
+    """
+
+    def __init__(self, port, token, max_items=None, max_delay=None,
+                 max_pending=None):
+        self.port = port
+        self.token = token
+        self.info = None
+        self.pid = os.getpid()
+        self.max_items = max_items or BATCH_MAX_ITEMS
+        self.max_delay = BATCH_MAX_DELAY if max_delay is None else max_delay
+        self.max_pending = max_pending or MAX_PENDING
+        self.client_id = os.urandom(8).hex()
+        self.dropped = 0
+        self.batches_sent = 0
+        self.reconnects = 0
+        self._cond = threading.Condition()
+        self._pending = []               # encoded pushes not yet in a batch
+        self._first_at = 0.0             # when the oldest pending one arrived
+        self._unacked = OrderedDict()    # seq -> encoded batch line
+        self._seq = 0
+        self._unacked_count = 0          # elements inside those batches
+        self._flush_now = False
+        self._resend = False             # a connection died holding unacked
+        self._closed = False
+        self._sock = None
+        self._sock_gen = 0
+        self._thread = None
+
+    # -- producer side -------------------------------------------------------
+    def send(self, payload):
+        item = _encode_push(payload)
+        with self._cond:
+            if self._closed:
+                return False
+            if not self._pending:
+                self._first_at = time.monotonic()
+            self._pending.append(item)
+            if len(self._pending) + self._unacked_count > self.max_pending:
+                del self._pending[0]
+                self.dropped += 1
+                if self.dropped == 1 or self.dropped % 1000 == 0:
+                    print(f"[BufferBus] host unreachable, dropped "
+                          f"{self.dropped} buffer element(s)")
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._writer_loop,
+                                                name='BufferBusForward',
+                                                daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+        return True
+
+    def flush(self, timeout=EXIT_FLUSH_TIMEOUT):
+        deadline = time.monotonic() + (timeout or 0)
+        with self._cond:
+            self._flush_now = True
+            self._cond.notify_all()
+            while self._pending or self._unacked:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def close(self, timeout=EXIT_FLUSH_TIMEOUT):
+        if timeout:
+            self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._drop_socket()
+
+    # -- writer thread -------------------------------------------------------
+    def _next_batch(self):
+        """Block until a batch is due; number it and return its seq.
+
+        0 means there is no new batch but unacked ones must go out again on a
+        new connection; None means the channel was closed.
+        """
+        with self._cond:
+            while not self._pending and not self._resend and not self._closed:
+                self._cond.wait()
+            if self._closed:
+                return None
+            if not self._pending:
+                return 0
+            while (len(self._pending) < self.max_items and not self._flush_now
+                   and not self._closed):
+                remaining = self._first_at + self.max_delay - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            items = self._pending[:self.max_items]
+            del self._pending[:self.max_items]
+            if self._pending:
+                self._first_at = time.monotonic()
+            else:
+                self._flush_now = False
+            self._seq += 1
+            line = '{"_token": %s, "_client": "%s", "_seq": %d, "_batch": [%s]}\n' % (
+                json.dumps(self.token), self.client_id, self._seq, ', '.join(items))
+            self._unacked[self._seq] = (len(items), line.encode('utf-8'))
+            self._unacked_count += len(items)
+            return self._seq
+
+    def _writer_loop(self):
+        backoff = 0.05
+        while True:
+            seq = self._next_batch()
+            if seq is None:
+                return
+            while True:
+                sock, fresh = self._connected_socket()
+                if sock is not None:
+                    with self._cond:
+                        # A new connection, or a wakeup because one died,
+                        # re-sends everything not acked yet, in order; the
+                        # host skips what it already applied.
+                        resend = fresh or seq == 0 or self._resend
+                        self._resend = False
+                        lines = [line for s, (_n, line) in self._unacked.items()
+                                 if resend or s == seq]
+                    if not lines:
+                        break
+                    try:
+                        sock.sendall(b''.join(lines))
+                        self.batches_sent += 1
+                        backoff = 0.05
+                        break
+                    except OSError as e:
+                        print(f"[BufferBus] forward error: {e}")
+                        self._drop_socket(sock)
+                with self._cond:
+                    if self._closed:
+                        return
+                    self._cond.wait(backoff)
+                backoff = min(backoff * 2, 1.0)
+
+    def _connected_socket(self):
+        """(socket, is_new) - connecting if needed; (None, False) on failure."""
+        if self._sock is not None:
+            return self._sock, False
+        try:
+            sock = socket.create_connection(('127.0.0.1', self.port), timeout=1.0)
+            sock.settimeout(None)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        except OSError:
+            return None, False
+        if self._sock_gen:
+            self.reconnects += 1
+        self._sock_gen += 1
+        self._sock = sock
+        threading.Thread(target=self._reader_loop, args=(sock,),
+                         name='BufferBusAck', daemon=True).start()
+        return sock, True
+
+    def _drop_socket(self, sock=None):
+        sock = sock or self._sock
+        if sock is None:
+            return
+        if self._sock is sock:
+            self._sock = None
+        try:
+            sock.close()
+        except OSError:
+            pass
+
+    # -- reader thread -------------------------------------------------------
+    def _reader_loop(self, sock):
+        buf = b''
+        try:
+            while True:
+                data = sock.recv(65536)
+                if not data:
+                    break
+                buf += data
+                while b'\n' in buf:
+                    line, buf = buf.split(b'\n', 1)
+                    try:
+                        acked = int(json.loads(line.decode('utf-8'))['ack'])
+                    except (ValueError, KeyError, TypeError):
+                        continue
+                    with self._cond:
+                        while self._unacked:
+                            seq = next(iter(self._unacked))
+                            if seq > acked:
+                                break
+                            self._unacked_count -= self._unacked.pop(seq)[0]
+                        self._cond.notify_all()
+        except OSError:
+            pass
+        # A connection the writer already replaced has nothing to re-send:
+        # the new one went out with everything unacked at the time.
+        current = self._sock is sock
+        self._drop_socket(sock)
+        with self._cond:
+            # Anything still unacked goes out again on the next connection.
+            if current and self._unacked and not self._closed:
+                self._resend = True
+                self._cond.notify_all()
+
+
+class _Connection:
+    """Per-socket state of the host's selector loop."""
+
+    __slots__ = ('sock', 'inbuf', 'outbuf')
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.inbuf = b''
+        self.outbuf = b''
+
+
 class _BufferIPCServer:
-    """Localhost line-delimited JSON server applying forwarded pushes."""
+    """Localhost line-delimited JSON server applying forwarded pushes.
+
+    One thread and one selector serve every child: a connection costs a
+    registration, not a thread.  `apply` is what a push is handed to
+    (`_push_local` in Titan; a counter in the benchmark).
+    """
+
+    # Clients whose last applied sequence number is remembered.
+    _MAX_CLIENTS = 1024
 
-    def __init__(self):
+    def __init__(self, apply=None):
         self.token = os.urandom(16).hex()
+        self._apply = apply or _push_local
         self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         self._sock.bind(('127.0.0.1', 0))
-        self._sock.listen(16)
+        self._sock.listen(64)
+        self._sock.setblocking(False)
         self.port = self._sock.getsockname()[1]
+        self._selector = selectors.DefaultSelector()
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._last_seq = OrderedDict()   # client id -> last applied seq
         self._running = True
+        self._thread = None
+        self.pushes = 0
+        self.batches = 0
+        self.duplicates = 0
+        self.rejected = 0
 
     def start(self):
-        threading.Thread(target=self._accept_loop, daemon=True).start()
+        self._selector.register(self._sock, selectors.EVENT_READ, 'accept')
+        self._selector.register(self._wake_r, selectors.EVENT_READ, 'wake')
+        self._thread = threading.Thread(target=self._serve, name='BufferBusHost',
+                                         daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        try:
+            self._wake_w.send(b'x')
+        except OSError:
+            pass
+        if self._thread is not None:
+            self._thread.join(2.0)
 
-    def _accept_loop(self):
-        while self._running:
-            try:
-                conn, _addr = self._sock.accept()
-            except Exception:
-                break
-            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+    @property
+    def connections(self):
+        return sum(1 for key in self._selector.get_map().values()
+                   if isinstance(key.data, _Connection))
 
-    def _handle(self, conn):
+    def _serve(self):
         try:
-            buf = b''
-            with conn:
-                conn.settimeout(5.0)
-                while True:
-                    data = conn.recv(65536)
-                    if not data:
-                        break
-                    buf += data
-                    while b'\n' in buf:
-                        line, buf = buf.split(b'\n', 1)
-                        line = line.strip()
-                        if not line:
-                            continue
+            while self._running:
+                for key, mask in self._selector.select(timeout=1.0):
+                    if key.data == 'accept':
+                        self._accept()
+                    elif key.data == 'wake':
                         try:
-                            payload = json.loads(line.decode('utf-8'))
-                            if payload.pop('_token', None) != self.token:
-                                continue  # reject unauthenticated payloads
-                            _push_local(**payload)
-                        except Exception as e:
-                            print(f"[BufferBus] bad IPC payload: {e}")
-        except Exception:
+                            self._wake_r.recv(64)
+                        except OSError:
+                            pass
+                    else:
+                        if mask & selectors.EVENT_READ:
+                            self._read(key.data)
+                        if mask & selectors.EVENT_WRITE:
+                            self._write(key.data)
+        except Exception as e:
+            print(f"[BufferBus] IPC host stopped: {e}")
+        finally:
+            for key in list(self._selector.get_map().values()):
+                try:
+                    key.fileobj.close()
+                except OSError:
+                    pass
+            self._selector.close()
+            self._wake_w.close()
+
+    def _accept(self):
+        while True:
+            try:
+                sock, _addr = self._sock.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                return
+            sock.setblocking(False)
+            self._selector.register(sock, selectors.EVENT_READ, _Connection(sock))
+
+    def _close(self, conn):
+        try:
+            self._selector.unregister(conn.sock)
+        except (KeyError, ValueError):
+            pass
+        try:
+            conn.sock.close()
+        except OSError:
+            pass
+
+    def _read(self, conn):
+        try:
+            data = conn.sock.recv(65536)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b''
+        if not data:
+            self._close(conn)
+            return
+        conn.inbuf += data
+        if b'\n' not in data:
+            if len(conn.inbuf) > _MAX_LINE:
+                print("[BufferBus] IPC line too long, dropping connection")
+                self._close(conn)
+            return
+        *lines, conn.inbuf = conn.inbuf.split(b'\n')
+        for line in lines:
+            line = line.strip()
+            if line:
+                reply = self._handle_line(line)
+                if reply:
+                    conn.outbuf += reply
+        if conn.outbuf:
+            self._write(conn)
+
+    def _write(self, conn):
+        try:
+            sent = conn.sock.send(conn.outbuf)
+        except (BlockingIOError, InterruptedError):
+            sent = 0
+        except OSError:
+            self._close(conn)
+            return
+        conn.outbuf = conn.outbuf[sent:]
+        events = selectors.EVENT_READ
+        if conn.outbuf:
+            events |= selectors.EVENT_WRITE
+        try:
+            self._selector.modify(conn.sock, events, conn)
+        except (KeyError, ValueError):
             pass
+
+    def _handle_line(self, line):
+        """Apply one line; return the ack to send back, if any."""
+        try:
+            payload = json.loads(line.decode('utf-8'))
+        except Exception as e:
+            print(f"[BufferBus] bad IPC payload: {e}")
+            return None
+        if not isinstance(payload, dict) or payload.pop('_token', None) != self.token:
+            self.rejected += 1
+            return None  # reject unauthenticated payloads
+        batch = payload.get('_batch')
+        if batch is None:
+            self._apply_one(payload)
+            return None
+        client = str(payload.get('_client', ''))
+        seq = int(payload.get('_seq', 0))
+        applied = 0
+        if seq <= self._last_seq.get(client, 0):
+            self.duplicates += 1
+        else:
+            for item in batch:
+                if isinstance(item, dict) and self._apply_one(item):
+                    applied += 1
+            self.batches += 1
+            self._last_seq[client] = seq
+            self._last_seq.move_to_end(client)
+            while len(self._last_seq) > self._MAX_CLIENTS:
+                self._last_seq.popitem(last=False)
+        return ('{"ack": %d, "applied": %d}\n' % (seq, applied)).encode('ascii')
+
+    def _apply_one(self, payload):
+        try:
+            self._apply(**payload)
+            self.pushes += 1
+            return True
+        except Exception as e:
+            print(f"[BufferBus] bad IPC payload: {e}")
+            return False
+
+
+# --------------------------------------------------------------------------- #
+#  Throughput benchmark
+# --------------------------------------------------------------------------- #
+def _forward_once(port, token, payload):
+    """The old transport: a fresh connection for one push (benchmark only)."""
+    payload = dict(payload)
+    payload['_token'] = token
+    with socket.create_connection(('127.0.0.1', port), timeout=1.0) as s:
+        s.sendall((_encode_push(payload) + '\n').encode('utf-8'))
+
+
+def benchmark(messages=5000, producers=4, batched=True, timeout=30.0):
+    """Push `messages` elements from `producers` threads through a private host.
+
+    The host applies pushes to a counter instead of the buffer manager, so
+    only the transport is measured.  `batched=False` measures the old
+    connection-per-push transport against the same host for comparison.
+    Returns a dict with the count delivered, the seconds taken and the rate;
+    `failed` counts old-style pushes whose connection was refused.
+
+        python -m src.buffers.buffer_bus --benchmark
+    """
+    delivered = [0]
+    failed = [0]
+    done = threading.Event()
+
+    def count(**_payload):
+        delivered[0] += 1
+        if delivered[0] >= messages:
+            done.set()
+
+    server = _BufferIPCServer(apply=count)
+    server.start()
+    per_producer = [messages // producers] * producers
+    per_producer[0] += messages - sum(per_producer)
+    payload = {"category_id": "bench", "buffer_id": "bench",
+               "text": "benchmark message", "author": "bench"}
+    channels = []
+
+    def produce(index, total):
+        if batched:
+            channel = _ForwardChannel(server.port, server.token,
+                                      max_pending=messages + 1)
+            channels.append(channel)
+            for _ in range(total):
+                channel.send(payload)
+            channel.flush(timeout)
+        else:
+            for _ in range(total):
+                try:
+                    _forward_once(server.port, server.token, payload)
+                except OSError:
+                    failed[0] += 1
+                    if failed[0] + delivered[0] >= messages:
+                        done.set()
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=produce, args=(i, n), daemon=True)
+               for i, n in enumerate(per_producer)]
+    for thread in threads:
+        thread.start()
+    done.wait(timeout)
+    seconds = time.perf_counter() - started
+    for channel in channels:
+        channel.close(timeout=0)
+    server.stop()
+    return {
+        "mode": "batched" if batched else "connection per push",
+        "messages": delivered[0],
+        "failed": failed[0],
+        "producers": producers,
+        "seconds": seconds,
+        "per_second": delivered[0] / seconds if seconds else 0.0,
+        "batches": server.batches,
+    }
+
+
+if __name__ == '__main__':
+    import sys
+    if '--benchmark' in sys.argv:
+        for mode in (False, True):
+            result = benchmark(batched=mode)
+            print(f"[BufferBus] {result['mode']:>20}: {result['messages']} pushes "
+                  f"in {result['seconds']:.3f}s = {result['per_second']:.0f}/s"
+                  f" ({result['failed']} failed)")
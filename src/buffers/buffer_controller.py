@@ -3,7 +3,7 @@
 Titan Buffer System - controller.
 
 Host-agnostic glue between key input and the model + announcer. Hosts (GUI,
-Klango, IUI/Titan UI) translate their key events into one of the 12 action
+Klango, IUI/Titan UI) translate their key events into one of the 13 action
 names below and call dispatch(); the controller mutates the shared
 BufferManager and hands the result to the announcer.
 
@@ -16,6 +16,7 @@ Action names:
     prev_category / next_category / first_category / last_category
     prev_buffer   / next_buffer   / first_buffer   / last_buffer
     prev_element  / next_element  / first_element  / last_element
+    first_unread  ( / - the oldest element not reviewed yet)
 """
 
 from src.settings.settings import get_setting
@@ -32,6 +33,7 @@ CHAR_ACTIONS = {
     '{': 'first_buffer',   '}': 'last_buffer',
     ',': 'prev_element',   '.': 'next_element',
     '<': 'first_element',  '>': 'last_element',
+    '/': 'first_unread',
 }
 
 ALL_ACTIONS = set(CHAR_ACTIONS.values())
@@ -0,0 +1,420 @@
+# -*- coding: utf-8 -*-
+"""
+Titan Buffer System - element storage.
+
+Each buffer used to be a ``deque(maxlen=500)``: everything was lost on
+restart, the oldest messages of a chatty source were simply dropped, the
+virtual "All" buffer copied and re-sorted every element on each key press,
+and there was no way to get back to where you stopped reading except by
+walking the list.
+
+Here a buffer's elements live in a ``BufferHistory``:
+
+* The newest ``maxlen`` elements sit in a fixed-size ring in memory, so
+  memory stays the same however much a source talks. Every element gets a
+  sequence number when it arrives; positions in the buffer are sequence
+  numbers counted from the oldest element still kept, so the review cursor
+  does not drift when old elements go.
+
+* With a ``BufferStore`` behind it, every element is also written to a
+  SQLite file (in small batches, by a short timer), and the buffer reaches
+  back ``keep_per_buffer`` elements - most of them on disk, read a page at
+  a time when review goes past the ring. The history, the review cursor
+  and the read marker of every buffer come back on the next start.
+
+* Each element also has a time key: its timestamp, never less than the one
+  before it, so the keys are sorted along the buffer and "the first element
+  at or after this time" is a binary search in the ring or an indexed query
+  on disk. The read marker is the sequence number of the newest element the
+  user has reviewed, so the first unread element is one subtraction away.
+
+The ``raw`` payload of an element is not written to disk (it is opaque and
+often not serialisable); elements read back from the store have none.
+"""
+
+import atexit
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+# Elements kept per buffer on disk (the ring in memory is the newest part).
+DEFAULT_KEEP_PER_BUFFER = 5000
+
+# Pending writes go to disk when this many are waiting, or this many
+# seconds after the first of them, whichever comes first.
+FLUSH_BATCH = 64
+FLUSH_DELAY = 2.0
+
+# Older elements are read from disk this many at a time; this many pages
+# are cached for all buffers together.
+PAGE_SIZE = 64
+PAGE_CACHE = 16
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS elements ("
+    " category TEXT NOT NULL, buffer TEXT NOT NULL, seq INTEGER NOT NULL,"
+    " ts REAL NOT NULL, ts_key REAL NOT NULL,"
+    " author TEXT, kind TEXT, text TEXT NOT NULL,"
+    " PRIMARY KEY (category, buffer, seq)) WITHOUT ROWID",
+    "CREATE INDEX IF NOT EXISTS elements_time"
+    " ON elements (category, buffer, ts_key)",
+    "CREATE TABLE IF NOT EXISTS buffers ("
+    " category TEXT NOT NULL, buffer TEXT NOT NULL,"
+    " read_seq INTEGER NOT NULL, cursor_seq INTEGER,"
+    " PRIMARY KEY (category, buffer)) WITHOUT ROWID",
+)
+
+
+def _element_class():
+    from src.buffers.buffer_system import BufferElement
+    return BufferElement
+
+
+def default_store_path():
+    from src.platform_utils import get_user_data_dir
+    return os.path.join(get_user_data_dir(), 'buffers', 'history.sqlite')
+
+
+class BufferStore:
+    """The SQLite file behind every buffer's history."""
+
+    def __init__(self, path, keep_per_buffer=DEFAULT_KEEP_PER_BUFFER,
+                 flush_delay=FLUSH_DELAY):
+        self.path = path
+        self.keep_per_buffer = keep_per_buffer
+        self.flush_delay = flush_delay
+        self._lock = threading.RLock()
+        self._pending = []               # element rows not written yet
+        self._state = {}                 # (category, buffer) -> (read_seq, cursor_seq)
+        self._pages = OrderedDict()      # (category, buffer, page) -> {seq: element}
+        self._timer = None
+        self.stats = {'written': 0, 'flushes': 0, 'page_reads': 0, 'page_hits': 0,
+                      'errors': 0}
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        try:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+        except sqlite3.Error:
+            pass
+        for statement in _SCHEMA:
+            self._db.execute(statement)
+        self._db.commit()
+
+    # ------------------------------------------------------------------ #
+    #  Reading
+    # ------------------------------------------------------------------ #
+    def load(self, key, tail):
+        """What is stored for a buffer: its sequence range, read marker,
+        cursor, last time key and its newest ``tail`` elements as
+        (seq, ts_key, element), oldest first."""
+        category, buffer = key
+        state = {'first': 0, 'next_seq': 0, 'read_seq': -1, 'cursor_seq': None,
+                 'last_key': None, 'tail': []}
+        with self._lock:
+            try:
+                first, last = self._db.execute(
+                    "SELECT MIN(seq), MAX(seq) FROM elements"
+                    " WHERE category=? AND buffer=?", key).fetchone()
+                row = self._db.execute(
+                    "SELECT read_seq, cursor_seq FROM buffers"
+                    " WHERE category=? AND buffer=?", key).fetchone()
+                if row is not None:
+                    state['read_seq'], state['cursor_seq'] = row
+                if last is None:
+                    return state
+                state['first'] = first
+                state['next_seq'] = last + 1
+                rows = self._db.execute(
+                    "SELECT seq, ts, ts_key, author, kind, text FROM elements"
+                    " WHERE category=? AND buffer=? AND seq>=?"
+                    " ORDER BY seq", (category, buffer, last + 1 - tail)).fetchall()
+            except sqlite3.Error as e:
+                self._error("load", e)
+                return state
+        element = _element_class()
+        state['tail'] = [(seq, ts_key, element(text, author=author, kind=kind, timestamp=ts))
+                         for seq, ts, ts_key, author, kind, text in rows]
+        if rows:
+            state['last_key'] = rows[-1][2]
+        return state
+
+    def element(self, key, seq):
+        """The element ``seq`` of a buffer, read with its page if needed."""
+        page_key = key + (seq // PAGE_SIZE,)
+        with self._lock:
+            page = self._pages.get(page_key)
+            if page is not None and seq in page:
+                self._pages.move_to_end(page_key)
+                self.stats['page_hits'] += 1
+            else:
+                # Not read yet, or read before this element was written.
+                page = self._read_page(key, seq // PAGE_SIZE)
+                self._pages[page_key] = page
+                while len(self._pages) > PAGE_CACHE:
+                    self._pages.popitem(last=False)
+        found = page.get(seq)
+        return found if found is not None else _element_class()("")
+
+    def _read_page(self, key, page):
+        self.flush()
+        self.stats['page_reads'] += 1
+        start = page * PAGE_SIZE
+        try:
+            rows = self._db.execute(
+                "SELECT seq, ts, author, kind, text FROM elements"
+                " WHERE category=? AND buffer=? AND seq>=? AND seq<?",
+                key + (start, start + PAGE_SIZE)).fetchall()
+        except sqlite3.Error as e:
+            self._error("read", e)
+            rows = []
+        element = _element_class()
+        return {seq: element(text, author=author, kind=kind, timestamp=ts)
+                for seq, ts, author, kind, text in rows}
+
+    def seq_at_time(self, key, timestamp, first, before):
+        """First sequence number in ``first:before`` whose time key is at or
+        after ``timestamp``, or None."""
+        with self._lock:
+            self.flush()
+            try:
+                row = self._db.execute(
+                    "SELECT seq FROM elements WHERE category=? AND buffer=?"
+                    " AND ts_key>=? AND seq>=? AND seq<? ORDER BY ts_key, seq LIMIT 1",
+                    key + (timestamp, first, before)).fetchone()
+            except sqlite3.Error as e:
+                self._error("time lookup", e)
+                return None
+        return row[0] if row else None
+
+    # ------------------------------------------------------------------ #
+    #  Writing
+    # ------------------------------------------------------------------ #
+    def append(self, key, seq, ts_key, element):
+        with self._lock:
+            self._pending.append(key + (seq, element.timestamp, ts_key, element.author,
+                                        element.kind, element.text))
+            if len(self._pending) >= FLUSH_BATCH:
+                self.flush()
+            else:
+                self._schedule()
+
+    def note_state(self, key, read_seq, cursor_seq):
+        """Remember a buffer's read marker and cursor (written with the next batch)."""
+        with self._lock:
+            self._state[key] = (read_seq, cursor_seq)
+            self._schedule()
+
+    def _schedule(self):
+        if self._timer is None and self.flush_delay is not None:
+            self._timer = threading.Timer(self.flush_delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        """Write everything pending in one transaction."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._pending and not self._state:
+                return
+            rows, self._pending = self._pending, []
+            state, self._state = self._state, {}
+            newest = {}
+            for row in rows:
+                newest[row[:2]] = max(newest.get(row[:2], -1), row[2])
+            try:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO elements"
+                    " (category, buffer, seq, ts, ts_key, author, kind, text)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO buffers (category, buffer, read_seq, cursor_seq)"
+                    " VALUES (?, ?, ?, ?)",
+                    [key + values for key, values in state.items()])
+                self._db.executemany(
+                    "DELETE FROM elements WHERE category=? AND buffer=? AND seq<?",
+                    [key + (last + 1 - self.keep_per_buffer,)
+                     for key, last in newest.items()])
+                self._db.commit()
+                self.stats['written'] += len(rows)
+                self.stats['flushes'] += 1
+            except sqlite3.Error as e:
+                self._error("write", e)
+
+    def close(self):
+        with self._lock:
+            self.flush()
+            try:
+                self._db.close()
+            except sqlite3.Error:
+                pass
+
+    def _error(self, what, error):
+        self.stats['errors'] += 1
+        print(f"[BufferStore] {what} failed: {error}")
+
+
+class BufferHistory:
+    """The elements of one buffer: a ring of the newest in memory, the rest
+    (when there is a store) on disk.
+
+    Indexes are positions from the oldest element still kept, like a list;
+    ``len()`` counts the disk part too.
+    """
+
+    def __init__(self, maxlen, store=None, key=('', '')):
+        self.maxlen = maxlen
+        self._store = store
+        self._key = tuple(key)
+        self._ring = [None] * maxlen
+        self._keys = [0.0] * maxlen      # time key of each ring slot
+        self.first = 0                   # oldest sequence number kept
+        self.next_seq = 0
+        self.read_seq = -1               # newest element the user reviewed
+        self.cursor_seq = None           # review cursor, None = not reviewed yet
+        self._last_key = None
+        if store is not None:
+            self._load()
+
+    def _load(self):
+        state = self._store.load(self._key, self.maxlen)
+        self.next_seq = state['next_seq']
+        self.first = max(state['first'], self.next_seq - self._keep())
+        self.read_seq = state['read_seq']
+        self.cursor_seq = state['cursor_seq']
+        self._last_key = state['last_key']
+        for seq, ts_key, element in state['tail']:
+            self._ring[seq % self.maxlen] = element
+            self._keys[seq % self.maxlen] = ts_key
+
+    def _keep(self):
+        if self._store is None:
+            return self.maxlen
+        return max(self.maxlen, self._store.keep_per_buffer)
+
+    @property
+    def ring_first(self):
+        """Sequence number of the oldest element held in memory."""
+        return max(self.first, self.next_seq - self.maxlen)
+
+    # ------------------------------------------------------------------ #
+    #  List-like access
+    # ------------------------------------------------------------------ #
+    def __len__(self):
+        return self.next_seq - self.first
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("buffer index out of range")
+        return self.at_seq(self.first + index)
+
+    def __iter__(self):
+        for seq in range(self.first, self.next_seq):
+            yield self.at_seq(seq)
+
+    def at_seq(self, seq):
+        if seq >= self.ring_first:
+            return self._ring[seq % self.maxlen]
+        return self._store.element(self._key, seq)
+
+    def window(self):
+        """(time key, seq, element) for every element in memory, oldest first."""
+        for seq in range(self.ring_first, self.next_seq):
+            slot = seq % self.maxlen
+            yield self._keys[slot], seq, self._ring[slot]
+
+    def append(self, element):
+        """Add the newest element; returns its sequence number."""
+        seq = self.next_seq
+        ts_key = element.timestamp
+        if self._last_key is not None and ts_key < self._last_key:
+            ts_key = self._last_key
+        self._last_key = ts_key
+        slot = seq % self.maxlen
+        self._ring[slot] = element
+        self._keys[slot] = ts_key
+        self.next_seq = seq + 1
+        self.first = max(self.first, self.next_seq - self._keep())
+        if self._store is not None:
+            self._store.append(self._key, seq, ts_key, element)
+        return seq
+
+    # ------------------------------------------------------------------ #
+    #  Jumps
+    # ------------------------------------------------------------------ #
+    def index_at_time(self, timestamp):
+        """Index of the first element at or after ``timestamp`` (the newest
+        when all are older), -1 when the buffer is empty."""
+        if not len(self):
+            return -1
+        lo, hi = self.ring_first, self.next_seq
+        if lo > self.first and self._keys[lo % self.maxlen] >= timestamp:
+            seq = self._store.seq_at_time(self._key, timestamp, self.first, lo)
+            return (lo if seq is None else seq) - self.first
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._keys[mid % self.maxlen] < timestamp:
+                lo = mid + 1
+            else:
+                hi = mid
+        return min(lo, self.next_seq - 1) - self.first
+
+    def first_unread_index(self):
+        """Index of the oldest element not reviewed yet, -1 if none."""
+        seq = max(self.read_seq + 1, self.first)
+        return seq - self.first if seq < self.next_seq else -1
+
+    def unread_count(self):
+        return self.next_seq - max(self.read_seq + 1, self.first)
+
+    # ------------------------------------------------------------------ #
+    #  Review state
+    # ------------------------------------------------------------------ #
+    @property
+    def cursor(self):
+        if self.cursor_seq is None:
+            return 0
+        return max(0, self.cursor_seq - self.first)
+
+    @cursor.setter
+    def cursor(self, index):
+        self.cursor_seq = self.first + index
+        self._save_state()
+
+    def mark_read(self, index):
+        """Everything up to ``index`` has been seen."""
+        seq = self.first + index
+        if seq > self.read_seq:
+            self.read_seq = seq
+            self._save_state()
+
+    def _save_state(self):
+        if self._store is not None:
+            self._store.note_state(self._key, self.read_seq, self.cursor_seq)
+
+
+def open_default_store():
+    """The store under the user data directory, or None when buffer history
+    is switched off or the file cannot be opened (buffers then live in
+    memory only, as before)."""
+    try:
+        from src.settings.settings import get_setting
+        if get_setting('buffer_history', 'True',
+                       section='invisible_interface').lower() not in ('true', '1'):
+            return None
+    except Exception:
+        pass
+    try:
+        store = BufferStore(default_store_path())
+        atexit.register(store.close)
+        return store
+    except Exception as e:
+        print(f"[BufferStore] history disabled, cannot open store: {e}")
+        return None
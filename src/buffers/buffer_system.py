@@ -13,17 +13,26 @@ Hierarchy:
            -> Element (one message / notification)
 
 The special virtual "All" buffer merges every real buffer in its category,
-sorted by timestamp. It is computed on demand and only exposed when a category
-has two or more real buffers.
-
-Storage is session-only (in-memory); nothing is persisted to disk.
+sorted by timestamp. It is merged from the buffers' in-memory windows when one
+of them changed (not on every key press) and only exposed when a category has
+two or more real buffers.
+
+Elements are kept by buffer_store.BufferHistory: the newest are in memory,
+and with the process-wide store (see get_buffer_manager) the history, review
+cursor and read marker of every buffer survive a restart. "/" jumps to the
+first element not reviewed yet.
 """
 
+import heapq
 import time
 import threading
-from collections import OrderedDict, deque
+from bisect import bisect_left
+from collections import OrderedDict
+
+from src.buffers.buffer_store import BufferHistory, open_default_store
 
-# Maximum number of elements kept per real buffer (oldest are evicted).
+# Number of elements per real buffer kept in memory (older ones are on disk
+# when there is a store, otherwise evicted).
 DEFAULT_MAX_ELEMENTS = 500
 
 # Reserved id/name of the virtual merged buffer.
@@ -46,12 +55,21 @@ class BufferElement:
 class Buffer:
     """An ordered, bounded list of elements with its own review cursor."""
 
-    def __init__(self, buffer_id, name, kind=None, maxlen=DEFAULT_MAX_ELEMENTS):
+    def __init__(self, buffer_id, name, kind=None, maxlen=DEFAULT_MAX_ELEMENTS,
+                 store=None, category_id=""):
         self.id = buffer_id
         self.name = name
         self.kind = kind
-        self.elements = deque(maxlen=maxlen)
-        self.cursor = 0               # index of the currently reviewed element
+        self.elements = BufferHistory(maxlen, store, (category_id, buffer_id))
+
+    @property
+    def cursor(self):
+        """Index of the currently reviewed element."""
+        return self.elements.cursor
+
+    @cursor.setter
+    def cursor(self, value):
+        self.elements.cursor = value
 
 
 class Category:
@@ -68,6 +86,7 @@ class Category:
         # element navigation adjusts the parameter value instead of reviewing
         # a list. See buffer_system docstring and tts_buffer.TTSParameterHandler.
         self.handler = None
+        self._merged = None           # cached "All" view, see _all_elements
 
 
 # A lightweight, host-agnostic result handed to the announcer.
@@ -79,7 +98,7 @@ class NavResult:
 
     def __init__(self, level, moved, at_boundary, name="", index=0, count=0,
                  author=None, text="", kind=None):
-        self.level = level            # "category" | "buffer" | "element"
+        self.level = level            # "category" | "buffer" | "element" | "no_unread"
         self.moved = moved            # True if the cursor actually changed
         self.at_boundary = at_boundary  # True if we were already at first/last edge
         self.name = name              # category / buffer name (for those levels)
@@ -100,10 +119,11 @@ class BufferManager:
     _instance = None
     _instance_lock = threading.Lock()
 
-    def __init__(self):
+    def __init__(self, store=None):
         self._lock = threading.RLock()
         self.categories = OrderedDict()   # category_id -> Category
         self.current_category_id = None
+        self.store = store                # buffer_store.BufferStore or None
 
     # ------------------------------------------------------------------ #
     #  Registration / ingestion
@@ -166,7 +186,8 @@ class BufferManager:
                 cat = self.register_category(category_id, category_id)
             buf = cat.buffers.get(buffer_id)
             if buf is None:
-                buf = Buffer(buffer_id, name, kind=kind)
+                buf = Buffer(buffer_id, name, kind=kind, store=self.store,
+                             category_id=category_id)
                 cat.buffers[buffer_id] = buf
                 if cat.current_buffer_id is None:
                     cat.current_buffer_id = buffer_id
@@ -263,17 +284,32 @@ class BufferManager:
         return ids
 
     def _all_elements(self, cat):
-        """Merged, timestamp-sorted snapshot of every real buffer's elements."""
-        merged = []
-        for b in cat.buffers.values():
-            merged.extend(b.elements)
-        merged.sort(key=lambda e: e.timestamp)
-        return merged
+        """Merged, time-ordered view of every real buffer's in-memory elements.
+
+        Each buffer's window is already in time order, so this is a k-way
+        merge, redone only when a buffer got a new element. Returns
+        (elements, time keys, [(buffer, seq), ...], {(buffer_id, seq): index}).
+        """
+        version = tuple((b.id, b.elements.next_seq) for b in cat.buffers.values())
+        if cat._merged is not None and cat._merged[0] == version:
+            return cat._merged[1]
+
+        def tagged(b):
+            for key, seq, element in b.elements.window():
+                yield key, b, seq, element
+
+        merged = list(heapq.merge(*(tagged(b) for b in cat.buffers.values()),
+                                  key=lambda entry: entry[0]))
+        view = ([entry[3] for entry in merged], [entry[0] for entry in merged],
+                [(entry[1], entry[2]) for entry in merged],
+                {(entry[1].id, entry[2]): i for i, entry in enumerate(merged)})
+        cat._merged = (version, view)
+        return view
 
     def _active_elements(self, cat):
-        """(elements_list, cursor_getter, cursor_setter) for the active buffer."""
+        """(elements, cursor_getter, cursor_setter) for the active buffer."""
         if cat.current_buffer_id == ALL_BUFFER_ID:
-            elements = self._all_elements(cat)
+            elements = self._all_elements(cat)[0]
 
             def get_cursor():
                 return cat._all_cursor
@@ -286,9 +322,48 @@ class BufferManager:
         buf = cat.buffers.get(cat.current_buffer_id)
         if buf is None:
             return [], (lambda: 0), (lambda v: None)
-        return list(buf.elements), (lambda: buf.cursor), \
+        return buf.elements, (lambda: buf.cursor), \
             (lambda v: setattr(buf, "cursor", v))
 
+    def _mark_read(self, cat, index):
+        """The element at `index` of the active buffer has been reviewed."""
+        if cat.current_buffer_id == ALL_BUFFER_ID:
+            buf, seq = self._all_elements(cat)[2][index]
+            buf.elements.mark_read(seq - buf.elements.first)
+        else:
+            buf = cat.buffers.get(cat.current_buffer_id)
+            if buf is not None:
+                buf.elements.mark_read(index)
+
+    def _first_unread(self, cat, n):
+        """Index of the oldest unreviewed element of the active buffer, or None."""
+        if cat.current_buffer_id != ALL_BUFFER_ID:
+            buf = cat.buffers.get(cat.current_buffer_id)
+            index = buf.elements.first_unread_index() if buf is not None else -1
+            return index if index >= 0 else None
+        positions = self._all_elements(cat)[3]
+        found = None
+        for buf in cat.buffers.values():
+            history = buf.elements
+            if history.first_unread_index() < 0:
+                continue
+            # Unread elements older than the window show from its start.
+            seq = max(history.read_seq + 1, history.ring_first)
+            index = positions.get((buf.id, seq))
+            if index is not None and (found is None or index < found):
+                found = index
+        return found
+
+    def _index_at_time(self, cat, timestamp):
+        if cat.current_buffer_id != ALL_BUFFER_ID:
+            buf = cat.buffers.get(cat.current_buffer_id)
+            index = buf.elements.index_at_time(timestamp) if buf is not None else -1
+            return index if index >= 0 else None
+        keys = self._all_elements(cat)[1]
+        if not keys:
+            return None
+        return min(bisect_left(keys, timestamp), len(keys) - 1)
+
     # ------------------------------------------------------------------ #
     #  Category navigation  ( -  =  and Shift _  + )
     # ------------------------------------------------------------------ #
@@ -382,9 +457,13 @@ class BufferManager:
             if n == 0:
                 return NavResult("element", False, True, count=0)
             cur = _clamp(get_cursor(), 0, n - 1)
-            new = _clamp(target_index_fn(cur, n), 0, n - 1)
+            target = target_index_fn(cur, n)
+            if target is None:
+                return NavResult("no_unread", False, True, count=n)
+            new = _clamp(target, 0, n - 1)
             moved = new != cur
             set_cursor(new)
+            self._mark_read(cat, new)
             el = elements[new]
             return NavResult("element", moved, not moved,
                              index=new + 1, count=n,
@@ -402,6 +481,37 @@ class BufferManager:
     def last_element(self):
         return self._move_element('last', lambda cur, n: n - 1)
 
+    def first_unread(self):
+        """Jump to the oldest element of the active buffer not reviewed yet."""
+        with self._lock:
+            cat = self.categories.get(self.current_category_id)
+            if cat is None or cat.handler:
+                return NavResult("no_unread", False, True)
+            return self._move_element('first_unread',
+                                      lambda cur, n: self._first_unread(cat, n))
+
+    def jump_to_time(self, timestamp):
+        """Jump to the first element of the active buffer at or after
+        `timestamp` (the newest if all are older). For hosts and modules;
+        there is no key for it."""
+        with self._lock:
+            cat = self.categories.get(self.current_category_id)
+            if cat is None or cat.handler:
+                return NavResult("element", False, True, count=0)
+            return self._move_element('jump',
+                                      lambda cur, n: self._index_at_time(cat, timestamp))
+
+    def unread_count(self, category_id, buffer_id=None):
+        """Unreviewed elements in one buffer, or in the whole category."""
+        with self._lock:
+            cat = self.categories.get(category_id)
+            if cat is None:
+                return 0
+            if buffer_id is None:
+                return sum(b.elements.unread_count() for b in cat.buffers.values())
+            buf = cat.buffers.get(buffer_id)
+            return buf.elements.unread_count() if buf is not None else 0
+
 
 # Resolved lazily so the translation system is initialised first.
 def _all_buffer_name():
@@ -419,5 +529,5 @@ def get_buffer_manager():
     if BufferManager._instance is None:
         with BufferManager._instance_lock:
             if BufferManager._instance is None:
-                BufferManager._instance = BufferManager()
+                BufferManager._instance = BufferManager(store=open_default_store())
     return BufferManager._instance
@@ -12,8 +12,22 @@ When nothing is playing the thread idles on an event instead of busy-spinning.
 
 The engine is intentionally defensive: if numpy/pygame are missing, or no
 controller is present, every entry point becomes a silent no-op.
+
+Envelopes of sound files come from an envelope store: an LRU in memory in
+front of one small .npy file per sound in the user cache directory, keyed by
+path, mtime and size (and the analysis parameters, so retuning them
+invalidates the lot). When the sound theme is loaded or changed the store
+precomputes the whole theme on a background thread, so a UI sound finds its
+envelope ready and the rumble starts with the sound. A sound the store has
+never seen does not hold up the caller any more: its voice is registered at
+once with the time the sound started, the envelope is computed on the
+store's worker, and the mixer joins it in at the right offset when it
+arrives.
 """
 
+import collections
+import hashlib
+import math
 import os
 import threading
 import time
@@ -36,55 +50,39 @@ _GAIN = 2.6                 # maps per-hop peak (relative to int16 full-scale) t
 _RELEASE_SECONDS = 0.09     # how fast rumble decays after a transient
 _INT16_FULL = 32768.0
 
-# Envelope cache keyed by (path, mtime); value = (envelope ndarray float32 [0..1], hop_seconds)
-_env_cache = {}
-_env_lock = threading.Lock()
 _MAX_ENV_FRAMES = 30000  # ~6 minutes at the hop above; longer audio is truncated
 
+# Envelope store
+_STORE_ENTRIES = 256         # envelopes kept in memory (least recently used go)
+_STORE_DISK_FILES = 4096     # .npy files kept on disk (oldest go)
+_PENDING_SECONDS = 2.0       # a voice waiting for its envelope gives up after this
+_SOUND_EXTENSIONS = ('.ogg', '.wav', '.mp3', '.flac')
+# Part of every disk key: changing how envelopes are computed retires the old files.
+_PARAMS = f"{_HOP_SECONDS}|{_NOISE_GATE}|{_GAIN}|{_RELEASE_SECONDS}|{_MAX_ENV_FRAMES}"
 
-def _compute_envelope(sound_path):
-    """Return (envelope[0..1], hop_seconds) for a sound file, or None on failure.
 
-    The envelope is the per-hop RMS of the (mono-summed) samples, scaled relative
-    to int16 full-scale so that loud sounds/music rumble harder than quiet blips.
-    """
-    if not _NUMPY_OK:
-        return None
+def _sound_key(sound_path):
+    """(path, mtime_ns, size) - what identifies one version of a file - or None."""
     try:
-        mtime = os.path.getmtime(sound_path)
+        st = os.stat(sound_path)
     except OSError:
         return None
+    return (sound_path, st.st_mtime_ns, st.st_size)
 
-    key = (sound_path, mtime)
-    with _env_lock:
-        cached = _env_cache.get(key)
-    if cached is not None:
-        return cached
 
+def _decode(sound_path):
+    """Decode a sound file through the pygame mixer: (int16 samples, freq) or None."""
     try:
         import pygame
-        if pygame.mixer.get_init() is None:
+        init = pygame.mixer.get_init()
+        if init is None:
             return None
         snd = pygame.mixer.Sound(sound_path)
         samples = pygame.sndarray.array(snd)  # int16, shape (n,) or (n, channels)
+        return samples, init[0] or 44100
     except Exception:
         return None
 
-    try:
-        freq = pygame.mixer.get_init()[0] or 44100
-        env = _envelope_from_samples(samples, freq)
-        if env is None:
-            return None
-    except Exception:
-        return None
-
-    result = (env, _HOP_SECONDS)
-    with _env_lock:
-        if len(_env_cache) > 256:
-            _env_cache.clear()
-        _env_cache[key] = result
-    return result
-
 
 def _envelope_from_samples(samples, freq):
     """Compute the [0..1] motor envelope from raw int16 samples at ``freq`` Hz.
@@ -111,18 +109,216 @@ def _envelope_from_samples(samples, freq):
 
         # Envelope follower: instant attack, exponential release, so transients
         # feel punchy and the rumble tails off smoothly instead of chattering.
-        decay = float(_np.exp(-_HOP_SECONDS / _RELEASE_SECONDS))
-        env = _np.empty_like(amp)
-        prev = 0.0
-        for i in range(len(amp)):
-            prev = amp[i] if amp[i] >= prev else prev * decay
-            env[i] = prev
+        env = _follow(amp, math.exp(-_HOP_SECONDS / _RELEASE_SECONDS))
         env[env < _NOISE_GATE] = 0.0
         return env.astype(_np.float32)
     except Exception:
         return None
 
 
+def _follow(amp, decay):
+    """env[i] = max(amp[i], env[i-1] * decay), without a Python loop.
+
+    Unrolled, env[i] is the largest amp[j] * decay**(i-j) over j <= i: decay**i
+    times the running maximum of amp[j] / decay**j. That is one cumulative
+    maximum, taken in the log domain so a six-minute sound cannot overflow.
+    (The loop this replaced only attacked on a new peak, so a hop that was
+    louder than the decayed level but quieter than the last one lagged by
+    one hop; here it is felt on time.)
+    """
+    n = len(amp)
+    if n == 0:
+        return _np.zeros(0, dtype=_np.float64)
+    steps = _np.arange(n, dtype=_np.float64) * math.log(decay)
+    with _np.errstate(divide='ignore'):
+        log_amp = _np.log(amp.astype(_np.float64))
+    return _np.exp(_np.maximum.accumulate(log_amp - steps) + steps)
+
+
+def _default_store_dir():
+    try:
+        from src import platform_utils
+        return os.path.join(platform_utils.get_user_data_dir(), 'cache', 'haptic_envelopes')
+    except Exception:
+        return None
+
+
+class _EnvelopeStore:
+    """Envelopes of sound files by (path, mtime, size).
+
+    Memory is an LRU of ``_STORE_ENTRIES``; behind it one .npy file per
+    envelope in ``directory`` (None keeps everything in memory). Lookups
+    never decode: a miss is queued for the worker thread, which decodes
+    urgent requests (a sound playing right now) before theme precomputation.
+    """
+
+    def __init__(self, directory=None, entries=_STORE_ENTRIES):
+        self.directory = directory
+        self.entries = entries
+        self._memory = collections.OrderedDict()   # key -> envelope
+        self._lock = threading.Lock()
+        self._queue = collections.deque()
+        self._queued = set()
+        self._wake = threading.Condition(self._lock)
+        self._worker = None
+        self.stats = {'hits': 0, 'disk_hits': 0, 'misses': 0, 'computed': 0, 'evicted': 0}
+
+    # -- lookups -----------------------------------------------------------
+    def _file(self, key):
+        if not self.directory:
+            return None
+        digest = hashlib.sha1(f"{key[0]}|{key[1]}|{key[2]}|{_PARAMS}".encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, digest + '.npy')
+
+    def _remember(self, key, env):
+        with self._lock:
+            self._memory[key] = env
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.entries:
+                self._memory.popitem(last=False)
+                self.stats['evicted'] += 1
+
+    def cached(self, key):
+        """The envelope for ``key`` from memory or disk, or None. Never decodes."""
+        with self._lock:
+            env = self._memory.get(key)
+            if env is not None:
+                self._memory.move_to_end(key)
+                self.stats['hits'] += 1
+                return env
+        path = self._file(key)
+        if path and os.path.exists(path):
+            try:
+                env = _np.load(path, allow_pickle=False)
+            except Exception:
+                env = None
+            if env is not None:
+                self.stats['disk_hits'] += 1
+                self._remember(key, env)
+                return env
+        return None
+
+    def get(self, sound_path):
+        """Envelope for a file, decoding it here if need be (blocking)."""
+        key = _sound_key(sound_path)
+        if key is None:
+            return None
+        env = self.cached(key)
+        if env is None:
+            env = self._compute(key)
+        return env
+
+    # -- computing ---------------------------------------------------------
+    def _compute(self, key):
+        decoded = _decode(key[0])
+        if decoded is None:
+            return None
+        env = _envelope_from_samples(*decoded)
+        if env is None:
+            return None
+        self.stats['computed'] += 1
+        self._remember(key, env)
+        path = self._file(key)
+        if path:
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                tmp = path + '.tmp'
+                with open(tmp, 'wb') as f:
+                    _np.save(f, env, allow_pickle=False)
+                os.replace(tmp, path)
+            except Exception as e:
+                print(f"[HapticSync] Could not save envelope for {key[0]}: {e}")
+        return env
+
+    def request(self, key, urgent=False):
+        """Compute ``key`` on the worker thread unless it is already queued."""
+        with self._lock:
+            if key in self._queued:
+                if urgent:
+                    try:
+                        self._queue.remove(key)
+                    except ValueError:
+                        return   # being computed right now
+                    self._queue.appendleft(key)
+                return
+            self._queued.add(key)
+            if urgent:
+                self.stats['misses'] += 1
+                self._queue.appendleft(key)
+            else:
+                self._queue.append(key)
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._work, daemon=True,
+                                                name="HapticEnvelopes")
+                self._worker.start()
+            self._wake.notify()
+
+    def _work(self):
+        while True:
+            with self._lock:
+                if not self._queue:
+                    self._wake.wait(timeout=5.0)
+                    if not self._queue:
+                        self._worker = None
+                        return
+                key = self._queue.popleft()
+            try:
+                if self.cached(key) is None:
+                    self._compute(key)
+            except Exception as e:
+                print(f"[HapticSync] Envelope for {key[0]} failed: {e}")
+            finally:
+                with self._lock:
+                    self._queued.discard(key)
+
+    def precompute(self, directory):
+        """Queue every sound under ``directory`` that has no envelope yet."""
+        queued = 0
+        for root, _dirs, files in os.walk(directory):
+            for name in files:
+                if not name.lower().endswith(_SOUND_EXTENSIONS):
+                    continue
+                key = _sound_key(os.path.join(root, name))
+                if key is not None and self.cached(key) is None:
+                    self.request(key)
+                    queued += 1
+        self._prune_disk()
+        return queued
+
+    def _prune_disk(self):
+        """Keep the disk store to ``_STORE_DISK_FILES`` files, newest first."""
+        if not self.directory or not os.path.isdir(self.directory):
+            return
+        try:
+            files = [os.path.join(self.directory, f) for f in os.listdir(self.directory)
+                     if f.endswith('.npy')]
+            if len(files) <= _STORE_DISK_FILES:
+                return
+            files.sort(key=os.path.getmtime)
+            for path in files[:len(files) - _STORE_DISK_FILES]:
+                os.remove(path)
+        except Exception:
+            pass
+
+
+_store = _EnvelopeStore(_default_store_dir())
+
+
+def _compute_envelope(sound_path):
+    """Return (envelope[0..1], hop_seconds) for a sound file, or None on failure.
+
+    The envelope is the per-hop peak of the (mono-summed) samples, scaled
+    relative to int16 full-scale so that loud sounds/music rumble harder than
+    quiet blips. Served from the envelope store; decodes on a miss.
+    """
+    if not _NUMPY_OK:
+        return None
+    env = _store.get(sound_path)
+    if env is None:
+        return None
+    return env, _HOP_SECONDS
+
+
 class _HapticSyncEngine:
     def __init__(self):
         self._voices = []          # list of dicts: {env, hop, t0, gain}
@@ -140,27 +336,43 @@ class _HapticSyncEngine:
         self._thread.start()
 
     def add_voice(self, sound_path, gain=1.0):
-        """Register a playing sound to drive the motors for its duration."""
-        data = _compute_envelope(sound_path)
-        if data is None:
+        """Register a playing sound to drive the motors for its duration.
+
+        The voice starts now, when the sound does. If its envelope is not in
+        the store yet the voice waits for it (the store's worker decodes the
+        file) and comes in at the offset the sound has reached by then.
+        """
+        if not _NUMPY_OK:
             return
-        env, hop = data
-        if env is None or len(env) == 0 or float(env.max()) <= 0.0:
+        t0 = time.time()
+        key = _sound_key(sound_path)
+        if key is None:
+            return
+        env = _store.cached(key)
+        if env is None:
+            _store.request(key, urgent=True)
+        elif len(env) == 0 or float(env.max()) <= 0.0:
             return  # silent / gated -> nothing to feel
-        with self._lock:
-            self._voices.append({'env': env, 'hop': hop, 't0': time.time(), 'gain': gain})
-            self._ensure_thread()
-        self._wake.set()
+        self._add({'env': env, 'key': key, 'hop': _HOP_SECONDS, 't0': t0, 'gain': gain})
+
+    def add_voice_from_samples(self, samples, freq, gain=1.0, t0=None):
+        """Register raw int16 samples (shape (n,) or (n, channels)) as a voice.
 
-    def add_voice_from_samples(self, samples, freq, gain=1.0):
-        """Register raw int16 samples (shape (n,) or (n, channels)) as a voice."""
+        ``t0`` is when the audio started (default: now), so the time spent
+        computing the envelope does not put the rumble behind the audio.
+        """
         if not _NUMPY_OK or samples is None:
             return
+        if t0 is None:
+            t0 = time.time()
         env = _envelope_from_samples(samples, freq)
         if env is None or len(env) == 0 or float(env.max()) <= 0.0:
             return
+        self._add({'env': env, 'hop': _HOP_SECONDS, 't0': t0, 'gain': gain})
+
+    def _add(self, voice):
         with self._lock:
-            self._voices.append({'env': env, 'hop': _HOP_SECONDS, 't0': time.time(), 'gain': gain})
+            self._voices.append(voice)
             self._ensure_thread()
         self._wake.set()
 
@@ -173,6 +385,7 @@ class _HapticSyncEngine:
         """
         if not _NUMPY_OK or snd is None:
             return
+        t0 = time.time()
         try:
             import pygame
             if pygame.mixer.get_init() is None:
@@ -181,7 +394,7 @@ class _HapticSyncEngine:
             freq = pygame.mixer.get_init()[0] or 22050
         except Exception:
             return
-        self.add_voice_from_samples(samples, freq, gain=gain)
+        self.add_voice_from_samples(samples, freq, gain=gain, t0=t0)
 
     def _set_motors(self, level):
         """Push a single combined level [0..1] to the active rumble backend."""
@@ -226,6 +439,13 @@ class _HapticSyncEngine:
             with self._lock:
                 alive = []
                 for v in self._voices:
+                    if v['env'] is None:
+                        # Still waiting for the store's worker.
+                        v['env'] = _store.cached(v['key'])
+                        if v['env'] is None:
+                            if now - v['t0'] < _PENDING_SECONDS:
+                                alive.append(v)
+                            continue
                     idx = int((now - v['t0']) / v['hop'])
                     if 0 <= idx < len(v['env']):
                         level = max(level, float(v['env'][idx]) * v['gain'])
@@ -344,12 +564,48 @@ def play_for_speech_segment(audio, volume=1.0):
             return
         if not _NUMPY_OK or audio is None:
             return
-        samples = _np.array(audio.get_array_of_samples())
+        t0 = time.time()
+        width = int(getattr(audio, 'sample_width', 0) or 0)
+        if width in (1, 2, 4) and getattr(audio, 'raw_data', None) is not None:
+            # A view of the segment's bytes instead of a Python array copy.
+            dtype = {1: _np.int8, 2: _np.int16, 4: _np.int32}[width]
+            samples = _np.frombuffer(audio.raw_data, dtype=dtype)
+            if width == 4:
+                samples = (samples >> 16).astype(_np.int16)
+            elif width == 1:
+                samples = samples.astype(_np.int16) << 8
+        else:
+            samples = _np.array(audio.get_array_of_samples())
         channels = int(getattr(audio, 'channels', 1) or 1)
         if channels > 1:
             samples = samples.reshape(-1, channels)
         freq = int(getattr(audio, 'frame_rate', 22050) or 22050)
-        _engine.add_voice_from_samples(samples, freq, gain=max(0.0, min(1.0, volume)))
+        _engine.add_voice_from_samples(samples, freq, gain=max(0.0, min(1.0, volume)), t0=t0)
+    except Exception:
+        pass
+
+
+def _haptics_in_sync_mode():
+    vc = _cv.vibration_controller
+    return (getattr(vc, 'vibration_enabled', True)
+            and getattr(vc, 'haptic_mode', 'sync') == 'sync'
+            and _titan_drives_the_gamepad())
+
+
+def precompute_theme(sfx_dir):
+    """Fill the envelope store for a sound theme in the background.
+
+    Called when the mixer comes up and whenever the theme changes. Does
+    nothing unless audio-synced haptics are on; files already in the store
+    (same path, mtime and size) are not decoded again.
+    """
+    try:
+        if not _NUMPY_OK or not sfx_dir or not os.path.isdir(sfx_dir):
+            return
+        if not _haptics_in_sync_mode():
+            return
+        threading.Thread(target=_store.precompute, args=(sfx_dir,), daemon=True,
+                         name="HapticPrecompute").start()
     except Exception:
         pass
 
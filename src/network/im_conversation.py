@@ -25,6 +25,7 @@ from src.network.im_web.base import (
     EV_MEDIA_READY, EV_MESSAGE_NEW, EV_MESSAGE_UPDATED, EV_TYPING,
     Chat, Message,
 )
+from src.network.im_history import ConversationHistory, HistoryWindow
 from src.network.im_ui_common import (
     TabbedListFrame, _, apply_skin_tree, format_time, show_message, sounds,
     speak_notification, speak_titannet,
@@ -39,6 +40,18 @@ TAB_PARTICIPANTS = 'participants'
 
 MEDIA_KINDS = ('image', 'video', 'audio', 'voice', 'sticker')
 
+# The tabs that are views of the message history, and what each keeps.
+HISTORY_FILTERS = {
+    TAB_MEDIA: lambda m: m.kind in MEDIA_KINDS,
+    TAB_FILES: lambda m: m.kind == 'document',
+    TAB_LINKS: lambda m: 'http://' in (m.text or '') or 'https://' in (m.text or ''),
+}
+HISTORY_TABS = (TAB_MESSAGES,) + tuple(HISTORY_FILTERS)
+
+# Rows a history tab keeps in the list at once; older ones come back with
+# Ctrl+Up (from memory first, then from the service).
+WINDOW_ROWS = 300
+
 # Reactions offered without asking the user to type an emoji.
 QUICK_REACTIONS = (
     ('\U0001F44D', lambda: _("Thumbs up")),
@@ -61,11 +74,15 @@ class ConversationFrame(TabbedListFrame):
     def __init__(self, parent, backend, chat: Chat):
         self.backend = backend
         self.chat = chat
-        self.messages: List[Message] = []
+        # Every loaded message, and the window of it the current tab shows
+        # (see src/network/im_history.py). New messages and edits change
+        # one row instead of rebuilding the list.
+        self.history = ConversationHistory(backend, chat.id, HISTORY_FILTERS,
+                                           page_size=60)
+        self.window: Optional[HistoryWindow] = None
+        self._history_loaded = False
         self._typing_timer: Optional[wx.Timer] = None
         self._typing_sent = False
-        self._oldest_id = ''
-        self._has_more = True
 
         super().__init__(parent, title=_("{name} - {service}").format(
             name=chat.name, service=backend.SERVICE_LABEL), size=(900, 700))
@@ -158,56 +175,70 @@ class ConversationFrame(TabbedListFrame):
         # wants when the first read caught the page mid-render. Switching tabs
         # still costs nothing, and a background poll never disturbs the list.
         if not background and self.current_tab == TAB_MESSAGES:
-            self.messages = []
+            self._history_loaded = False
         super().refresh(background=background)
 
     def load_items(self, tab_id: str, background: bool = False) -> None:
         if tab_id == TAB_PARTICIPANTS:
+            self._set_window(None)
             self.backend.list_participants(
                 self.chat.id,
                 lambda result: self._apply_participants(result, tab_id,
                                                         background))
             return
 
-        if tab_id == TAB_MESSAGES and not self.messages:
+        switched = self._set_window(tab_id)
+        if tab_id == TAB_MESSAGES and not self._history_loaded:
             if not background:
                 # Opening a conversation the page has not rendered takes a
                 # navigation and a couple of seconds - say so instead of
                 # leaving the user in front of an empty list.
                 speak_titannet(_("Loading the conversation..."))
-            self.backend.load_history(
-                self.chat.id, limit=60,
-                callback=lambda result: self._apply_history(result, tab_id))
+            self._history_loaded = True
+            self.history.load_latest(
+                lambda result: self._apply_history(result, tab_id))
             return
 
-        self.apply_items(self._filtered(tab_id), tab_id, background=background)
+        if background and not switched:
+            # The window already follows the history row by row.
+            self.SetStatusText(self.status_text())
+            return
+        self.window.show_latest()
+
+    def _set_window(self, tab_id: Optional[str]) -> bool:
+        """Make the history window show ``tab_id`` (None: no history tab).
+
+        Returns True when the window changed tabs.
+        """
+        if self.window is not None and self.window.tab == tab_id:
+            return False
+        if self.window is not None:
+            self.window.close()
+            self.window = None
+        if tab_id in HISTORY_TABS:
+            self.window = HistoryWindow(
+                self.history, self,
+                '' if tab_id == TAB_MESSAGES else tab_id,
+                self.format_row, size=WINDOW_ROWS)
+        return True
 
-    def _filtered(self, tab_id: str) -> List[Any]:
-        if tab_id == TAB_MEDIA:
-            return [m for m in self.messages if m.kind in MEDIA_KINDS]
-        if tab_id == TAB_FILES:
-            return [m for m in self.messages if m.kind == 'document']
-        if tab_id == TAB_LINKS:
-            return [m for m in self.messages
-                    if 'http://' in (m.text or '') or 'https://' in (m.text or '')]
-        return list(self.messages)
+    # The history window's view: a full render goes through apply_items so
+    # focus and the tab bar behave as everywhere else.
+    def reset_rows(self, items: List[Any], rows: List[str]) -> None:
+        self.apply_items(items, self.current_tab, rows=rows)
 
     def _apply_history(self, result: Dict, tab_id: str) -> None:
         if not result.get('success'):
+            self._history_loaded = False
             speak_notification(result.get('error') or _("Could not load the conversation"),
                                'error')
             self.apply_items([], tab_id)
             return
-        self.messages = list(result.get('messages') or [])
-        self._has_more = bool(result.get('has_more'))
-        if self.messages:
-            self._oldest_id = self.messages[0].id
-        self.apply_items(self._filtered(tab_id), tab_id)
         # Land on the newest message, not on the top of the history.
         if self.current_tab == TAB_MESSAGES and self.items:
             self.select_item_index(len(self.items) - 1)
 
-        if not self.messages:
+        if not len(self.history):
             # An empty list with no explanation is the worst outcome for a
             # screen reader user: it is indistinguishable from "still loading".
             if result.get('navigating'):
@@ -290,11 +321,13 @@ class ConversationFrame(TabbedListFrame):
                 pass
 
     def status_text(self) -> str:
+        count = len(self.items)
+        if self.window is not None:
+            count = self.history.view_len(self.window.tab)
         if self.current_tab == TAB_MESSAGES:
-            return _("{name}: {n} messages").format(name=self.chat.name,
-                                                    n=len(self.items))
+            return _("{name}: {n} messages").format(name=self.chat.name, n=count)
         return _("{tab}: {n} entries").format(tab=self.tab_label(self.current_tab),
-                                              n=len(self.items))
+                                              n=count)
 
     # ------------------------------------------------------------- activation
     def activate(self, item: Any) -> None:
@@ -328,6 +361,13 @@ class ConversationFrame(TabbedListFrame):
         if keycode == wx.WXK_UP and modifiers == wx.MOD_CONTROL:
             self._load_earlier()
             return True
+        # Down or End on the last row brings back newer rows that going back
+        # pushed out of the window.
+        if keycode in (wx.WXK_DOWN, wx.WXK_END) and modifiers == wx.MOD_NONE and \
+                self.listbox.GetSelection() == self.listbox.GetCount() - 1 and \
+                self.window is not None and not self.window.at_end:
+            self._load_newer(keycode == wx.WXK_END)
+            return True
         if keycode == wx.WXK_DELETE and item is not None and \
                 self.backend.has(CAP_DELETE) and self.FindFocus() is self.listbox:
             self._delete_selected()
@@ -343,6 +383,7 @@ class ConversationFrame(TabbedListFrame):
 
     def on_closed(self) -> None:
         self.backend.remove_listener(self._on_backend_event)
+        self._set_window(None)
         if self._typing_timer is not None:
             self._typing_timer.Stop()
             self._typing_timer = None
@@ -519,30 +560,47 @@ class ConversationFrame(TabbedListFrame):
                                'error')
 
     def _load_earlier(self) -> None:
-        if not self._has_more:
+        window = self.window
+        if window is None:
+            return
+        # Rows that scrolled out of the window are still in memory.
+        shown = window.show_older()
+        if shown:
+            self.select_item_index(shown)
+            speak_titannet(_("Loaded {n} earlier messages").format(n=shown))
+            return
+        if not self.history.has_more:
             speak_titannet(_("No earlier messages"))
             return
         speak_titannet(_("Loading earlier messages"))
+        first = window.items()[0].id if window.count else ''
 
-        def _done(result: Dict) -> None:
+        def _done(result: Dict, added: List[Message]) -> None:
             if not result.get('success'):
                 speak_notification(result.get('error') or _("Could not load history"),
                                    'error')
                 return
-            older = [m for m in (result.get('messages') or [])
-                     if m.id not in {x.id for x in self.messages}]
-            self._has_more = bool(result.get('has_more')) and bool(older)
-            if not older:
+            if not added:
                 speak_titannet(_("No earlier messages"))
                 return
-            self.messages = older + self.messages
-            self._oldest_id = self.messages[0].id
-            self.apply_items(self._filtered(self.current_tab), self.current_tab)
-            self.select_item_index(len(older))
-            speak_titannet(_("Loaded {n} earlier messages").format(n=len(older)))
-
-        self.backend.load_history(self.chat.id, before_id=self._oldest_id,
-                                  limit=50, callback=_done)
+            # The window put the older rows above the one that was first.
+            if window is self.window:
+                row = window.row_of(first) if first else -1
+                self.select_item_index(row if row >= 0 else 0)
+            speak_titannet(_("Loaded {n} earlier messages").format(n=len(added)))
+
+        self.history.load_older(_done, limit=50)
+
+    def _load_newer(self, latest: bool) -> None:
+        window = self.window
+        if latest:
+            window.show_latest()
+            self.select_item_index(window.count - 1)
+            return
+        # The rows follow their messages, so the selection is still on the
+        # one it was on; step onto the first of the newer rows.
+        if window.show_newer():
+            self.select_item_index(self.listbox.GetSelection())
 
     def _start_call(self, video: bool) -> None:
         def _done(result: Dict) -> None:
@@ -606,9 +664,12 @@ class ConversationFrame(TabbedListFrame):
     def _append_message(self, message: Message) -> None:
         if self._closing:
             return
-        if any(m.id == message.id for m in self.messages):
+        at_end = self.listbox.GetSelection() >= self.listbox.GetCount() - 1
+        if self.window is not None:
+            self.window.follow = at_end
+        # The window adds the row (and drops the oldest once it is full).
+        if not self.history.append(message):
             return
-        self.messages.append(message)
 
         if sounds and not message.outgoing:
             try:
@@ -621,12 +682,8 @@ class ConversationFrame(TabbedListFrame):
         if self.current_tab != TAB_MESSAGES:
             return
 
-        at_end = self.listbox.GetSelection() >= self.listbox.GetCount() - 1
-        self.items.append(message)
-        self.listbox.Append(self.format_row(message), message)
-        if at_end:
-            self.listbox.SetSelection(self.listbox.GetCount() - 1)
-            self._last_focus_idx = self.listbox.GetCount() - 1
+        if at_end and self.window is not None and self.window.row_of(message.id) >= 0:
+            self._move_selection(self.listbox.GetCount() - 1)
         self.SetStatusText(self.status_text())
 
         if not message.outgoing:
@@ -637,17 +694,8 @@ class ConversationFrame(TabbedListFrame):
     def _replace_message(self, message: Message) -> None:
         if self._closing:
             return
-        for index, existing in enumerate(self.messages):
-            if existing.id != message.id:
-                continue
-            self.messages[index] = message
-            for row in range(1, self.listbox.GetCount()):
-                data = self.listbox.GetClientData(row)
-                if isinstance(data, Message) and data.id == message.id:
-                    self.listbox.SetString(row, self.format_row(message))
-                    self.listbox.SetClientData(row, message)
-                    break
-            return
+        # The window rewrites the one row showing it, if any.
+        self.history.replace(message)
 
     def _announce_typing(self) -> None:
         if sounds:
@@ -0,0 +1,378 @@
+# -*- coding: utf-8 -*-
+"""The message history behind a Titan IM conversation window.
+
+The conversation window used to keep one flat list of messages and, for
+every change, rebuild it: a new message in a long group chat re-filtered
+the whole history for the current tab, cleared the list control and filled
+it again, and a history page loaded with Ctrl+Up did the same. Here the
+history is kept so that the common cases touch one row:
+
+* ``ConversationHistory`` holds every loaded message, oldest first. Each
+  message gets a sequence number when it arrives (newer ones count up,
+  older pages count down), so finding a message by id, appending a new one
+  and adding an older page never walk the list. The filtered tabs (media,
+  files, links) are kept as sorted sequence lists, updated as messages
+  arrive rather than recomputed on every tab switch.
+
+* ``HistoryWindow`` is what one tab shows: at most ``size`` consecutive
+  rows of that tab's view, normally the newest. It talks to the list
+  control only through four calls - ``reset_rows``, ``insert_rows``,
+  ``remove_rows`` and ``update_row`` - so an incoming message is one
+  ``insert_rows`` at the end (and one ``remove_rows`` at the top once the
+  window is full), an edit is one ``update_row``, and going back past the
+  top of the window shows older rows that are already loaded before the
+  service is asked for another page. Rendered row text is cached per
+  message and only redone when the message itself changes.
+
+Neither class touches wx or a service; the window in ``im_conversation``
+plugs the list control and the backend in, and the tests use a list and a
+fake backend.
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+ALL = ''    # the view id of the unfiltered history
+
+
+class ConversationHistory:
+    """Every loaded message of one chat, oldest first."""
+
+    def __init__(self, backend=None, chat_id: str = '',
+                 filters: Optional[Dict[str, Callable[[Any], bool]]] = None,
+                 page_size: int = 60):
+        self.backend = backend
+        self.chat_id = chat_id
+        self.page_size = page_size
+        self.filters = dict(filters or {})
+        self.has_more = True
+        self.listeners: List[Any] = []   # HistoryWindow-like, see _notify
+        self.clear()
+
+    # ------------------------------------------------------------- storage
+    def clear(self) -> None:
+        self._rows: List[Any] = []
+        self._first = 0                  # sequence number of _rows[0]
+        self._seq: Dict[str, int] = {}   # message id -> sequence number
+        self._views: Dict[str, List[int]] = {tab: [] for tab in self.filters}
+        self.has_more = True
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._rows)
+
+    def __contains__(self, message_id: str) -> bool:
+        return message_id in self._seq
+
+    @property
+    def oldest_id(self) -> str:
+        return self._rows[0].id if self._rows else ''
+
+    def get(self, message_id: str) -> Optional[Any]:
+        seq = self._seq.get(message_id)
+        return None if seq is None else self._rows[seq - self._first]
+
+    def _at(self, seq: int) -> Any:
+        return self._rows[seq - self._first]
+
+    def matches(self, view: str, message: Any) -> bool:
+        if view == ALL:
+            return True
+        check = self.filters.get(view)
+        return bool(check and check(message))
+
+    # --------------------------------------------------------------- views
+    def view_len(self, view: str = ALL) -> int:
+        return len(self._rows) if view == ALL else len(self._views.get(view, ()))
+
+    def view_slice(self, view: str, start: int, stop: int) -> List[Any]:
+        """Messages ``start:stop`` of a view, oldest first."""
+        if view == ALL:
+            return self._rows[start:stop]
+        return [self._at(seq) for seq in self._views.get(view, [])[start:stop]]
+
+    def view_items(self, view: str = ALL) -> List[Any]:
+        return self.view_slice(view, 0, self.view_len(view))
+
+    def view_index(self, view: str, message_id: str) -> int:
+        """Position of a message in a view, -1 when it is not in it."""
+        seq = self._seq.get(message_id)
+        if seq is None:
+            return -1
+        if view == ALL:
+            return seq - self._first
+        seqs = self._views.get(view, [])
+        index = bisect_left(seqs, seq)
+        return index if index < len(seqs) and seqs[index] == seq else -1
+
+    # ------------------------------------------------------------- changes
+    def reset(self, messages: Sequence[Any], has_more: bool = True) -> None:
+        """Replace everything with a freshly read history (oldest first)."""
+        self.clear()
+        self.has_more = has_more
+        self._add_older(messages)
+        self._notify('history_reset')
+
+    def append(self, message: Any) -> bool:
+        """Add a new message at the end. False if it is already here."""
+        if message.id in self._seq:
+            return False
+        seq = self._first + len(self._rows)
+        self._rows.append(message)
+        self._seq[message.id] = seq
+        for view, seqs in self._views.items():
+            if self.filters[view](message):
+                seqs.append(seq)
+        self._notify('history_appended', message)
+        return True
+
+    def prepend(self, messages: Sequence[Any], has_more: bool = True) -> List[Any]:
+        """Add an older page (oldest first); returns the messages that were new."""
+        added = self._add_older(messages)
+        self.has_more = bool(has_more) and bool(added)
+        if added:
+            self._notify('history_prepended', added)
+        return added
+
+    def replace(self, message: Any) -> bool:
+        """Put an updated copy of a message in place. False if unknown."""
+        seq = self._seq.get(message.id)
+        if seq is None:
+            return False
+        previous = self._at(seq)
+        self._rows[seq - self._first] = message
+        for view, seqs in self._views.items():
+            was_in = self.filters[view](previous)
+            now_in = self.filters[view](message)
+            if was_in == now_in:
+                continue
+            index = bisect_left(seqs, seq)
+            if now_in:
+                seqs.insert(index, seq)
+            else:
+                del seqs[index]
+        self._notify('history_replaced', previous, message)
+        return True
+
+    def _add_older(self, messages: Sequence[Any]) -> List[Any]:
+        fresh = []
+        seen = set()
+        for message in messages:
+            if message.id in self._seq or message.id in seen:
+                continue
+            seen.add(message.id)
+            fresh.append(message)
+        if not fresh:
+            return []
+        self._first -= len(fresh)
+        for offset, message in enumerate(fresh):
+            self._seq[message.id] = self._first + offset
+        self._rows[:0] = fresh
+        for view, seqs in self._views.items():
+            check = self.filters[view]
+            seqs[:0] = [self._first + offset for offset, message in enumerate(fresh)
+                        if check(message)]
+        return fresh
+
+    def _notify(self, event: str, *args) -> None:
+        for listener in list(self.listeners):
+            handler = getattr(listener, event, None)
+            if handler is not None:
+                handler(*args)
+
+    # -------------------------------------------------------------- paging
+    def load_latest(self, callback: Callable[[Dict], None]) -> None:
+        """Read the newest page from the service and start over with it."""
+        def _done(result: Dict) -> None:
+            if result.get('success'):
+                self.reset(list(result.get('messages') or []),
+                           bool(result.get('has_more')))
+            callback(result)
+        self.backend.load_history(self.chat_id, limit=self.page_size, callback=_done)
+
+    def load_older(self, callback: Callable[[Dict, List[Any]], None],
+                   limit: int = 50) -> None:
+        """Read the page before the oldest loaded message.
+
+        ``callback(result, added)`` gets the messages that were really new.
+        """
+        def _done(result: Dict) -> None:
+            added: List[Any] = []
+            if result.get('success'):
+                added = self.prepend(list(result.get('messages') or []),
+                                     bool(result.get('has_more')))
+            callback(result, added)
+        self.backend.load_history(self.chat_id, before_id=self.oldest_id,
+                                  limit=limit, callback=_done)
+
+
+class HistoryWindow:
+    """The rows one tab shows: a window of at most ``size`` messages.
+
+    ``view`` is the list control side: ``reset_rows(items, texts)``,
+    ``insert_rows(position, items, texts)``, ``remove_rows(position, count)``
+    and ``update_row(position, item, text)``, positions counted from the
+    first message row. ``follow`` (set by the caller) tells whether the
+    user is on the newest row: a new message then brings the window back to
+    the newest rows even after show_older() left them. Otherwise it waits
+    for show_newer() or show_latest().
+    """
+
+    def __init__(self, history: ConversationHistory, view, tab: str,
+                 format_row: Callable[[Any], str], size: int = 300):
+        self.history = history
+        self.view = view
+        self.tab = tab
+        self.format_row = format_row
+        self.size = size
+        self.start = 0          # view index of the first row shown
+        self.count = 0          # rows shown
+        self.follow = True
+        self._texts: Dict[str, tuple] = {}   # id -> (message, text)
+        self.stats = {'resets': 0, 'inserted': 0, 'removed': 0, 'updated': 0,
+                      'formatted': 0}
+        history.listeners.append(self)
+
+    def close(self) -> None:
+        if self in self.history.listeners:
+            self.history.listeners.remove(self)
+
+    # ------------------------------------------------------------- helpers
+    def text(self, message: Any) -> str:
+        cached = self._texts.get(message.id)
+        if cached is not None and cached[0] is message:
+            return cached[1]
+        text = self.format_row(message)
+        self.stats['formatted'] += 1
+        self._texts[message.id] = (message, text)
+        return text
+
+    def _texts_for(self, messages: Sequence[Any]) -> List[str]:
+        return [self.text(message) for message in messages]
+
+    @property
+    def at_end(self) -> bool:
+        """Whether the window reaches the newest message of the tab."""
+        return self.start + self.count >= self.history.view_len(self.tab)
+
+    def row_of(self, message_id: str) -> int:
+        """Row (0 = first message row) of a message, -1 if not shown."""
+        index = self.history.view_index(self.tab, message_id)
+        if index < self.start or index >= self.start + self.count:
+            return -1
+        return index - self.start
+
+    def items(self) -> List[Any]:
+        return self.history.view_slice(self.tab, self.start, self.start + self.count)
+
+    # ---------------------------------------------------------- rendering
+    def show_latest(self) -> None:
+        """Show the newest ``size`` messages of the tab (a full render)."""
+        total = self.history.view_len(self.tab)
+        self.start = max(0, total - self.size)
+        self.count = total - self.start
+        messages = self.items()
+        self.stats['resets'] += 1
+        self.view.reset_rows(messages, self._texts_for(messages))
+
+    def show_older(self, count: Optional[int] = None) -> int:
+        """Move the window back over messages that are already loaded.
+
+        Returns how many rows were added at the top (0 when the window
+        already starts at the oldest loaded message).
+        """
+        count = min(self.start, count or self.size // 2)
+        if count <= 0:
+            return 0
+        self.start -= count
+        messages = self.history.view_slice(self.tab, self.start, self.start + count)
+        self._insert(0, messages)
+        self._trim_bottom()
+        return count
+
+    def show_newer(self, count: Optional[int] = None) -> int:
+        """Move the window forward over newer messages (show_older's twin).
+
+        Returns how many rows were added at the bottom (0 when the window
+        already reaches the newest message).
+        """
+        end = self.start + self.count
+        count = min(self.history.view_len(self.tab) - end, count or self.size // 2)
+        if count <= 0:
+            return 0
+        self._insert(self.count, self.history.view_slice(self.tab, end, end + count))
+        self._trim_top()
+        return count
+
+    def _insert(self, position: int, messages: Sequence[Any]) -> None:
+        self.count += len(messages)
+        self.stats['inserted'] += len(messages)
+        self.view.insert_rows(position, list(messages), self._texts_for(messages))
+
+    def _trim_top(self) -> None:
+        extra = self.count - self.size
+        if extra > 0:
+            for message in self.history.view_slice(self.tab, self.start, self.start + extra):
+                self._texts.pop(message.id, None)
+            self.start += extra
+            self.count -= extra
+            self.stats['removed'] += extra
+            self.view.remove_rows(0, extra)
+
+    def _trim_bottom(self) -> None:
+        extra = self.count - self.size
+        if extra > 0:
+            self.count -= extra
+            self.stats['removed'] += extra
+            self.view.remove_rows(self.count, extra)
+
+    # ----------------------------------------------------- history events
+    def history_reset(self) -> None:
+        self._texts.clear()
+        self.show_latest()
+
+    def history_appended(self, message: Any) -> None:
+        if not self.history.matches(self.tab, message):
+            return
+        # The window reached the newest row before this message came in.
+        if self.start + self.count == self.history.view_len(self.tab) - 1:
+            self._insert(self.count, [message])
+            self._trim_top()
+        elif self.follow:
+            # Paged back with show_older(), but the user is on the last row:
+            # come back to the newest messages rather than miss this one.
+            self.show_latest()
+
+    def history_prepended(self, added: Sequence[Any]) -> None:
+        # Older messages go before everything: the window's rows keep their
+        # messages but their view indexes move up by what joined the tab.
+        joined = [m for m in added if self.history.matches(self.tab, m)]
+        if not joined:
+            return
+        if self.start == 0:
+            # Show the newest of them above the old first row, which stays
+            # on screen; the rest waits for the next show_older().
+            shown = joined[-max(1, self.size // 2):]
+            self.start = len(joined) - len(shown)
+            self._insert(0, shown)
+            self._trim_bottom()
+        else:
+            self.start += len(joined)
+
+    def history_replaced(self, previous: Any, message: Any) -> None:
+        was_in = self.history.matches(self.tab, previous)
+        now_in = self.history.matches(self.tab, message)
+        self._texts.pop(message.id, None)
+        if was_in and now_in:
+            row = self.row_of(message.id)
+            if row >= 0:
+                self.stats['updated'] += 1
+                self.view.update_row(row, message, self.text(message))
+        elif was_in or now_in:
+            # It joined or left this tab (an edit added a link, say): rare
+            # enough to simply render the tab again.
+            self.show_latest()
@@ -313,9 +313,14 @@ class TabbedListFrame(wx.Frame):
         self.load_items(self.current_tab, background=background)
 
     def apply_items(self, items: Sequence[Any], tab_id: str = '',
-                    keep_focus: bool = False, background: bool = False) -> None:
+                    keep_focus: bool = False, background: bool = False,
+                    rows: Optional[Sequence[str]] = None) -> None:
         """Replace the rows. Row 0 is always the tab bar.
 
+        ``rows`` are the already rendered texts of ``items``, for a caller
+        that keeps them (the conversation window does); otherwise every row
+        goes through ``format_row``.
+
         A ``background`` refresh is data arriving by itself. It rewrites the
         rows underneath the user: the row they are on keeps the focus (matched
         by identity, so a reordered list does not move them), focus is never
@@ -328,7 +333,7 @@ class TabbedListFrame(wx.Frame):
             return  # the user switched tabs while the request was in flight
 
         items = list(items)
-        rows = [self.format_row(item) for item in items]
+        rows = list(rows) if rows is not None else [self.format_row(item) for item in items]
 
         if background and not self._rows_changed(rows):
             # Same list as on screen: rebuilding it would only make the screen
@@ -372,6 +377,47 @@ class TabbedListFrame(wx.Frame):
             self.listbox.SetFocus()
         self.SetStatusText(self.status_text())
 
+    # Row-level changes, for views that know exactly what changed (a new
+    # message, an edit). Positions count real rows: 0 is the row under the
+    # tab bar. The row the user is on keeps the focus and is not re-read.
+    def insert_rows(self, position: int, items: Sequence[Any],
+                    rows: Sequence[str]) -> None:
+        if self._closing or not items:
+            return
+        selection = self.listbox.GetSelection()
+        self.items[position:position] = list(items)
+        for offset, (item, text) in enumerate(zip(items, rows)):
+            self.listbox.Insert(text, position + 1 + offset, item)
+        if selection > position:
+            self._move_selection(selection + len(items))
+        self.SetStatusText(self.status_text())
+
+    def remove_rows(self, position: int, count: int) -> None:
+        if self._closing or count <= 0:
+            return
+        selection = self.listbox.GetSelection()
+        del self.items[position:position + count]
+        for _index in range(count):
+            self.listbox.Delete(position + 1)
+        if selection > position + count:
+            self._move_selection(selection - count)
+        elif selection > position:
+            self._move_selection(min(position + 1, self.listbox.GetCount() - 1))
+        self.SetStatusText(self.status_text())
+
+    def update_row(self, position: int, item: Any, text: str) -> None:
+        if self._closing or not 0 <= position < len(self.items):
+            return
+        self.items[position] = item
+        self.listbox.SetString(position + 1, text)
+        self.listbox.SetClientData(position + 1, item)
+
+    def _move_selection(self, index: int) -> None:
+        """Follow the focused row after rows moved above it, silently."""
+        if 0 <= index < self.listbox.GetCount():
+            self.listbox.SetSelection(index)
+            self._last_focus_idx = index
+
     def _rows_changed(self, rows: Sequence[str]) -> bool:
         """True when the rendered rows differ from what is on screen."""
         if self.listbox.GetCount() != len(rows) + 1:
@@ -19,6 +19,42 @@ from src.settings.settings import get_setting
 _ = set_language(get_setting('language', 'pl'))
 
 
+# ---------------------------------------------------------------------------
+# Compression
+# ---------------------------------------------------------------------------
+# A server running WS_COMPRESSION=selective deflates its large text messages
+# (histories, directory snapshots, screens) and nothing else. We offer
+# permessage-deflate so it can, but never compress what we send: voice is
+# Opus and does not shrink, and everything else we send is small, so it
+# would only add latency. Uncompressed messages are allowed on a deflate
+# connection, so this needs nothing from the server. A server with
+# compression off simply declines the offer.
+try:
+    from websockets.extensions.permessage_deflate import (
+        ClientPerMessageDeflateFactory, PerMessageDeflate)
+
+    class _InflateOnly(PerMessageDeflate):
+        def encode(self, frame):
+            return frame
+
+    class _InflateOnlyFactory(ClientPerMessageDeflateFactory):
+        def process_response_params(self, params, accepted_extensions):
+            ext = super().process_response_params(params, accepted_extensions)
+            # local_no_context_takeover=True: no compressor is kept around
+            # for a direction we never compress.
+            return _InflateOnly(ext.remote_no_context_takeover, True,
+                                ext.remote_max_window_bits, ext.local_max_window_bits,
+                                ext.compress_settings)
+
+    def _ws_extensions():
+        return [_InflateOnlyFactory(client_max_window_bits=True)]
+except Exception as _deflate_err:
+    print(f"[TITAN-NET] permessage-deflate unavailable: {_deflate_err}")
+
+    def _ws_extensions():
+        return None
+
+
 # ---------------------------------------------------------------------------
 # Shared active-client registry
 # ---------------------------------------------------------------------------
@@ -84,6 +120,9 @@ def is_active_titan_logged_in() -> bool:
 class TitanNetClient:
     """Client for Titan-Net server communication"""
 
+    HISTORY_CACHE_TTL = 600       # seconds a cached conversation is trusted
+    HISTORY_CACHE_SIZE = 500      # newest messages kept per conversation
+
     def __init__(self, server_host: str = "titosofttitan.com", server_port: int = 8001, http_port: int = 8000):
         """
         Initialize Titan-Net client
@@ -126,6 +165,8 @@ class TitanNetClient:
         self.on_room_deleted: Optional[Callable] = None
         self.on_user_joined_room: Optional[Callable] = None
         self.on_user_left_room: Optional[Callable] = None
+        # Online users / rooms changed (op, delta) - see get_online_users()
+        self.on_directory_changed: Optional[Callable] = None
 
         # Voice chat callbacks
         self.on_voice_started: Optional[Callable] = None    # User started speaking
@@ -138,6 +179,17 @@ class TitanNetClient:
         # Voice sequence counter
         self._voice_seq = 0
 
+        # Game voice goes out as binary frames when the server says it takes
+        # them (login_response ``binary_game_voice``), as base64 JSON
+        # otherwise. ``_game_voice_paused`` holds the game sessions whose AI
+        # worker is backed up and asked the mics to pause.
+        self._binary_game_voice = False
+        # Room voice packets may carry the VAD verdict in the header's type
+        # byte, but only servers announcing ``voice_flags`` accept it.
+        self._voice_flags = False
+        self._game_voice_seq = 0
+        self._game_voice_paused = set()
+
         # Broadcast callback (moderator messages)
         self.on_broadcast_received: Optional[Callable] = None  # Moderation broadcast received
 
@@ -174,6 +226,7 @@ class TitanNetClient:
         self.on_game_state_changed: Optional[Callable] = None        # Server pushed new state JSON
         self.on_game_token_warning: Optional[Callable] = None        # Approaching token cap
         self.on_game_menu: Optional[Callable] = None                 # AI presented a list of choices (gamebook / dialogue tree)
+        self.on_game_voice_backpressure: Optional[Callable] = None   # AI worker paused / resumed the mics
 
         # Remote UI / server sounds
         self.on_remote_screen_push: Optional[Callable] = None         # Server opened a screen on us
@@ -198,6 +251,27 @@ class TitanNetClient:
         self._request_counter = 0  # Counter for unique request IDs
         self._request_lock = threading.Lock()  # Lock for request counter
 
+        # Message history already downloaded, per conversation
+        # ({('room'|'private', id): {'messages', 'has_more', 'fetched'}}).
+        # Reopening a chat asks the server only for messages newer than the
+        # newest one held here. Deleted messages are not announced, so an
+        # entry is trusted for HISTORY_CACHE_TTL seconds, then refetched.
+        self._history_cache: Dict[tuple, Dict] = {}
+        self._history_lock = threading.Lock()
+
+        # Mirror of the server's online-user and room lists. Filled by one
+        # ``get_directory`` snapshot and then kept current by the server's
+        # ``directory_delta`` broadcasts, so get_rooms() / get_online_users()
+        # answer from memory instead of asking the server every time.
+        # Deltas that arrive while a snapshot is on its way are held in
+        # ``_directory_pending`` and replayed on top of it. A server without
+        # ``get_directory`` sets ``_directory_supported`` False and the old
+        # request-per-call path is used.
+        self._directory: Optional[Dict] = None
+        self._directory_pending: Optional[List[Dict]] = None
+        self._directory_supported = True
+        self._directory_lock = threading.Lock()
+
         # Start persistent event loop thread
         self._start_event_loop()
 
@@ -260,7 +334,8 @@ class TitanNetClient:
                     max_size=50 * 1024 * 1024,   # 50MB for many users with voice
                     max_queue=1024,              # Large queue for voice packets
                     write_limit=2 * 1024 * 1024, # 2MB write buffer
-                    compression=None             # No compression for low latency
+                    compression=None,            # We never compress what we send ...
+                    extensions=_ws_extensions()  # ... but accept the server's (see above)
                 ),
                 timeout=3.0  # 3 second timeout
             )
@@ -527,6 +602,9 @@ class TitanNetClient:
                         self.user_role = user_data.get('role', 'user')
                         self.is_connected = True
                         self.has_custom_sounds = response.get('has_custom_sounds', False)
+                        self._binary_game_voice = bool(response.get('binary_game_voice'))
+                        self._voice_flags = bool(response.get('voice_flags'))
+                        self._game_voice_paused.clear()
 
                         # Start message listener
                         self._start_listener()
@@ -624,6 +702,8 @@ class TitanNetClient:
                     pass  # Ignore errors during websocket close
 
             # Clear session data
+            self._clear_history_cache()
+            self._clear_directory()
             self.session_id = None
             self._http_token = None
             self.username = None
@@ -639,6 +719,8 @@ class TitanNetClient:
 
         except Exception as e:
             # Even if logout fails, clear local session
+            self._clear_history_cache()
+            self._clear_directory()
             self.session_id = None
             self._http_token = None
             self.username = None
@@ -942,6 +1024,14 @@ class TitanNetClient:
                 'rooms': []
             }
 
+        rooms = self._directory_list('rooms')
+        if rooms is not None:
+            return {
+                'success': True,
+                'rooms': rooms,
+                'message': _('Rooms retrieved')
+            }
+
         try:
             async def _get_rooms():
                 request = {"type": "get_rooms"}
@@ -983,6 +1073,14 @@ class TitanNetClient:
                 'users': []
             }
 
+        users = self._directory_list('users')
+        if users is not None:
+            return {
+                'success': True,
+                'users': users,
+                'message': _('Users retrieved')
+            }
+
         try:
             async def _get_online_users():
                 request = {"type": "get_online_users"}
@@ -1080,16 +1178,133 @@ class TitanNetClient:
                 "users": []
             }
 
-    def get_room_messages(self, room_id: int, limit: int = 100) -> Dict:
-        """
-        Get message history from a chat room
+    # ==================== Presence Directory ====================
 
-        Args:
-            room_id: ID of the room
-            limit: Maximum number of messages to retrieve
+    def _clear_directory(self):
+        with self._directory_lock:
+            self._directory = None
+            self._directory_pending = None
+            self._directory_supported = True
 
-        Returns:
-            Dict with 'success' (bool), 'messages' (list), and 'message' (str)
+    def directory_is_live(self) -> bool:
+        """True while the online-user and room lists are kept current by
+        the server's pushes, i.e. there is no need to poll for them."""
+        return self._directory is not None
+
+    def _directory_list(self, kind: str) -> Optional[List[Dict]]:
+        """``'users'`` or ``'rooms'`` from the mirror, taking a snapshot
+        first if there is none yet. None when the server cannot provide one."""
+        if self._directory is None:
+            if not self._directory_supported or not self._sync_directory():
+                return None
+        with self._directory_lock:
+            if self._directory is None:
+                return None
+            return list(self._directory[kind].values())
+
+    def _sync_directory(self) -> bool:
+        """Take a ``get_directory`` snapshot and install it."""
+        with self._directory_lock:
+            if self._directory_pending is None:
+                self._directory_pending = []
+
+        async def _request():
+            return await self._send_and_wait({"type": "get_directory"}, "directory")
+
+        try:
+            response = self._run_async(_request())
+        except Exception as e:
+            print(f"[TITAN-NET] Directory sync failed: {e}")
+            response = None
+        if not response or response.get('type') != 'directory':
+            with self._directory_lock:
+                self._directory_pending = None
+                # Older server: keep asking for the lists one by one.
+                self._directory_supported = False
+            return False
+        self._install_directory(response)
+        return True
+
+    def _install_directory(self, snapshot: Dict):
+        with self._directory_lock:
+            directory = {
+                'version': snapshot.get('version', 0),
+                'users': {u['id']: u for u in snapshot.get('users', [])},
+                'rooms': {r['id']: r for r in snapshot.get('rooms', [])},
+            }
+            pending = self._directory_pending or []
+            self._directory_pending = None
+            self._directory = directory
+            for delta in pending:
+                if delta.get('op') == 'resync':
+                    # The snapshot may predate a block: take another.
+                    self._directory = None
+                    break
+                self._apply_delta_locked(delta)
+
+    def _apply_directory_delta(self, delta: Dict):
+        """Listener side of ``directory_delta``."""
+        with self._directory_lock:
+            if delta.get('op') == 'resync' and self._directory is not None:
+                # What we may see changed (a block or unblock): start over.
+                self._directory = None
+                applied = True
+            elif self._directory is None:
+                if self._directory_pending is not None:
+                    self._directory_pending.append(delta)
+                return
+            else:
+                applied = self._apply_delta_locked(delta)
+        if applied and self.on_directory_changed:
+            self.on_directory_changed(delta.get('op'), delta)
+
+    def _apply_delta_locked(self, delta: Dict) -> bool:
+        directory = self._directory
+        version = delta.get('version', 0)
+        if version <= directory['version']:
+            return False            # already part of the snapshot
+        directory['version'] = version
+        op = delta.get('op')
+        if op == 'user_online':
+            user = delta.get('user') or {}
+            directory['users'][user.get('id')] = user
+        elif op == 'user_offline':
+            directory['users'].pop(delta.get('user_id'), None)
+        elif op in ('room_added', 'room_updated'):
+            room = delta.get('room') or {}
+            directory['rooms'][room.get('id')] = room
+        elif op == 'room_removed':
+            directory['rooms'].pop(delta.get('room_id'), None)
+        elif op == 'room_members':
+            room = directory['rooms'].get(delta.get('room_id'))
+            if room is not None:
+                room['member_count'] = delta.get('member_count', 0)
+        return True
+
+    # ==================== Message History ====================
+
+    def _clear_history_cache(self):
+        with self._history_lock:
+            self._history_cache.clear()
+
+    def _request_history_page(self, request: Dict, response_type: str) -> Optional[Dict]:
+        """Send one history request; the server's page, or None on no answer."""
+        async def _request():
+            response = await self._send_and_wait(request, response_type)
+            if response and response.get('type') == response_type:
+                return response
+            return None
+        return self._run_async(_request())
+
+    def _get_history(self, key: tuple, request: Dict, response_type: str,
+                     limit: int, before_id: Optional[int],
+                     after_id: Optional[int]) -> Dict:
+        """Shared body of get_room_messages / get_private_messages.
+
+        With a cursor this is a plain page request. Without one, the result
+        is the newest ``limit`` messages as before, but a conversation seen
+        recently is completed with an ``after_id`` request instead of being
+        downloaded again.
         """
         if not self.is_connected or not self.websocket:
             return {
@@ -1099,28 +1314,59 @@ class TitanNetClient:
             }
 
         try:
-            async def _get_room_messages():
-                request = {
-                    "type": "get_room_messages",
-                    "room_id": room_id,
-                    "limit": limit
-                }
-
-                response = await self._send_and_wait(request, "room_messages")
+            cached = None
+            if before_id is None and after_id is None:
+                with self._history_lock:
+                    entry = self._history_cache.get(key)
+                if (entry and time.time() - entry['fetched'] < self.HISTORY_CACHE_TTL
+                        and (not entry['has_more'] or len(entry['messages']) >= limit)):
+                    cached = entry
+                    after_id = entry['messages'][0]['id'] if entry['messages'] else None
 
-                if response and response.get('type') == 'room_messages':
-                    return {
-                        'success': True,
-                        'messages': response.get('messages', []),
-                        'message': _('Messages retrieved')
-                    }
+            page = self._request_history_page(
+                dict(request, limit=limit, before_id=before_id, after_id=after_id),
+                response_type)
+            if page is None:
                 return {
                     'success': False,
                     'messages': [],
                     'message': _('No response from server')
                 }
 
-            return self._run_async(_get_room_messages())
+            new_messages = page.get('messages', [])
+            has_more = bool(page.get('has_more'))
+            fetched = time.time()
+            if cached is not None and not has_more:
+                # Everything since the cached newest message arrived in
+                # this page, so the two join without a gap. The older part
+                # is as old as it was: the TTL keeps counting from the full
+                # fetch, or a chat reopened often would never be refetched.
+                messages = new_messages + cached['messages']
+                has_more = cached['has_more'] or len(messages) > self.HISTORY_CACHE_SIZE
+                messages = messages[:self.HISTORY_CACHE_SIZE]
+                fetched = cached['fetched']
+            else:
+                messages = new_messages
+
+            if before_id is None and (after_id is None or cached is not None):
+                with self._history_lock:
+                    self._history_cache[key] = {
+                        'messages': messages,
+                        'has_more': has_more,
+                        'fetched': fetched,
+                    }
+
+            if len(messages) > limit:
+                messages, has_more = messages[:limit], True
+            return {
+                'success': True,
+                'messages': messages,
+                'has_more': has_more,
+                'oldest_id': messages[-1]['id'] if messages else None,
+                'newest_id': messages[0]['id'] if messages else None,
+                'fetched_count': len(new_messages),
+                'message': _('Messages retrieved')
+            }
 
         except Exception as e:
             return {
@@ -1129,6 +1375,34 @@ class TitanNetClient:
                 'message': _('Error getting messages: {error}').format(error=str(e))
             }
 
+    def get_room_messages(self, room_id: int, limit: int = 100,
+                          before_id: Optional[int] = None,
+                          after_id: Optional[int] = None) -> Dict:
+        """
+        Get message history from a chat room
+
+        Args:
+            room_id: ID of the room
+            limit: Maximum number of messages to retrieve
+            before_id: Only messages older than this id (scroll back; pass
+                the 'oldest_id' of the page already shown)
+            after_id: Only messages newer than this id (what arrived since
+                the last one seen)
+
+        Without a cursor, the newest messages are returned - from the local
+        history cache plus whatever is new on the server when the room was
+        opened recently.
+
+        Returns:
+            Dict with 'success' (bool), 'messages' (list, newest first),
+            'has_more' (bool: older messages remain), 'oldest_id',
+            'newest_id', 'fetched_count' (messages actually downloaded)
+            and 'message' (str)
+        """
+        return self._get_history(
+            ('room', room_id), {"type": "get_room_messages", "room_id": room_id},
+            "room_messages", limit, before_id, after_id)
+
     # ==================== Voice Chat Methods ====================
 
     def start_voice_transmission(self, room_id: int) -> Dict:
@@ -1163,7 +1437,8 @@ class TitanNetClient:
         except Exception as e:
             return {"success": False, "message": str(e)}
 
-    def send_voice_audio(self, room_id: int, audio_data: bytes, self_monitor: bool = False) -> bool:
+    def send_voice_audio(self, room_id: int, audio_data: bytes, self_monitor: bool = False,
+                         speech: Optional[bool] = None) -> bool:
         """
         Send audio chunk to room (non-blocking fire-and-forget)
 
@@ -1171,6 +1446,8 @@ class TitanNetClient:
             room_id: Room ID
             audio_data: Raw audio bytes (PCM 16-bit or Opus-encoded)
             self_monitor: If True, sender will receive audio back for testing
+            speech: VAD verdict for this chunk (None if VAD did not run);
+                goes in the header when the server announced voice_flags
 
         Returns:
             True if queued successfully
@@ -1198,7 +1475,8 @@ class TitanNetClient:
                 from src.network.voice_codec import pack_voice_packet
                 self._voice_seq = (self._voice_seq + 1) & 0xFFFFFFFF
                 user_id = self.user_id or 0
-                packet = pack_voice_packet(room_id, user_id, self._voice_seq, audio_data)
+                packet = pack_voice_packet(room_id, user_id, self._voice_seq, audio_data,
+                                           speech if self._voice_flags else None)
                 async def _send_binary():
                     await self.websocket.send(packet)  # bytes = binary WebSocket frame
                 asyncio.run_coroutine_threadsafe(_send_binary(), self.loop)
@@ -1355,54 +1633,24 @@ class TitanNetClient:
         except Exception as e:
             return {"success": False, "message": str(e)}
 
-    def get_private_messages(self, user_id: int, limit: int = 100) -> Dict:
+    def get_private_messages(self, user_id: int, limit: int = 100,
+                             before_id: Optional[int] = None,
+                             after_id: Optional[int] = None) -> Dict:
         """
         Get private message history with a user
 
         Args:
             user_id: ID of the other user
             limit: Maximum number of messages to retrieve
+            before_id: Only messages older than this id
+            after_id: Only messages newer than this id
 
         Returns:
-            Dict with 'success' (bool), 'messages' (list), and 'message' (str)
+            Same as get_room_messages
         """
-        if not self.is_connected or not self.websocket:
-            return {
-                'success': False,
-                'message': _('Not logged in'),
-                'messages': []
-            }
-
-        try:
-            async def _get_private_messages():
-                request = {
-                    "type": "get_messages",
-                    "user_id": user_id,
-                    "limit": limit
-                }
-
-                response = await self._send_and_wait(request, "private_messages")
-
-                if response and response.get('type') == 'private_messages':
-                    return {
-                        'success': True,
-                        'messages': response.get('messages', []),
-                        'message': _('Messages retrieved')
-                    }
-                return {
-                    'success': False,
-                    'messages': [],
-                    'message': _('No response from server')
-                }
-
-            return self._run_async(_get_private_messages())
-
-        except Exception as e:
-            return {
-                'success': False,
-                'messages': [],
-                'message': _('Error getting messages: {error}').format(error=str(e))
-            }
+        return self._get_history(
+            ('private', user_id), {"type": "get_messages", "user_id": user_id},
+            "private_messages", limit, before_id, after_id)
 
     def mark_private_messages_as_read(self, sender_user_id: int) -> Dict:
         """
@@ -1587,6 +1835,8 @@ class TitanNetClient:
                             elif msg_type == 'room_removed':
                                 if self.on_room_deleted:
                                     self.on_room_deleted(message.get('room_id'))
+                            elif msg_type == 'directory_delta':
+                                self._apply_directory_delta(message)
                             elif msg_type == 'user_joined_room':
                                 if self.on_user_joined_room:
                                     self.on_user_joined_room(message)
@@ -1719,6 +1969,8 @@ class TitanNetClient:
                             elif msg_type == 'game_menu':
                                 if self.on_game_menu:
                                     self.on_game_menu(message)
+                            elif msg_type == 'game_voice_backpressure':
+                                self._on_game_voice_backpressure(message)
 
                             # --- Remote UI / server sounds ---
                             elif msg_type == 'remote_screen_push':
@@ -4299,14 +4551,24 @@ class TitanNetClient:
         making each one a request/response with a 10 s timeout swamps the
         ``_send_and_wait`` correlation table and produces "No response
         from server" errors that have nothing to do with the actual
-        AI session. We just push the JSON onto the websocket and let
+        AI session. We just push the frame onto the websocket and let
         the server queue it on the worker. Actual VAD / end-of-turn
         detection happens server-side via Gemini Live.
+
+        Servers that announce ``binary_game_voice`` get the raw bytes in a
+        binary frame (13-byte header, see voice_codec) instead of base64
+        inside JSON. While the worker has asked the session to pause
+        (``game_voice_backpressure``) chunks are dropped here rather than
+        sent only to be dropped by the server.
         """
         if not self.is_connected or not self.websocket:
             return {"success": False, "error": _('Not logged in')}
         if not audio_bytes:
             return {"success": False, "error": _('Empty chunk')}
+        if session_id in self._game_voice_paused:
+            return {"success": True, "session_id": session_id, "queued": False, "paused": True}
+        if self._binary_game_voice:
+            return self._send_game_voice_binary(session_id, audio_bytes)
         try:
             audio_b64 = base64.b64encode(audio_bytes).decode('ascii')
 
@@ -4322,6 +4584,35 @@ class TitanNetClient:
         except Exception as e:
             return {"success": False, "error": str(e)}
 
+    def _send_game_voice_binary(self, session_id: int, audio_bytes: bytes) -> Dict:
+        try:
+            if self.loop is None or not self.loop.is_running():
+                return {"success": False, "error": _('Not logged in')}
+            from src.network.voice_codec import pack_game_voice_packet
+            self._game_voice_seq = (self._game_voice_seq + 1) & 0xFFFFFFFF
+            packet = pack_game_voice_packet(int(session_id), self.user_id or 0,
+                                            self._game_voice_seq, audio_bytes)
+
+            async def _send_binary():
+                await self.websocket.send(packet)  # bytes = binary WebSocket frame
+            asyncio.run_coroutine_threadsafe(_send_binary(), self.loop)
+            return {"success": True, "session_id": session_id, "queued": True}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    def _on_game_voice_backpressure(self, message: Dict):
+        """The session's AI worker is backed up (paused) or has caught up."""
+        try:
+            gs_id = int(message.get('session_id') or 0)
+        except (TypeError, ValueError):
+            return
+        if message.get('paused'):
+            self._game_voice_paused.add(gs_id)
+        else:
+            self._game_voice_paused.discard(gs_id)
+        if self.on_game_voice_backpressure:
+            self.on_game_voice_backpressure(message)
+
     def game_advance_turn(self, session_id: int) -> Dict:
         """Manually advance the turn (host-only on the server side)."""
         if not self.is_connected or not self.websocket:
@@ -2138,6 +2138,7 @@ class TitanNetMainWindow(wx.Frame):
         self.titan_client.on_message_received = self.on_private_message
         self.titan_client.on_user_online = self.on_user_online
         self.titan_client.on_user_offline = self.on_user_offline
+        self.titan_client.on_directory_changed = self._on_directory_changed
 
         # Voice chat callbacks
         self.titan_client.on_voice_started = self.on_voice_started
@@ -3698,11 +3699,17 @@ class TitanNetMainWindow(wx.Frame):
             self.last_gain = 1.0
             self._agc_log_counter = 0
 
-            # Jitter buffer for smooth voice playback
-            self.voice_jitter_buffers = {}  # user_id -> queue.Queue of raw audio chunks
-            self.voice_buffer_threads = {}  # unused, kept for compat
-            self.voice_buffer_stopping = {}  # user_id -> stop flag
+            # Jitter buffer for smooth voice playback. The queues, decoders
+            # and the mix itself live in voice_playback.VoiceMixer; the
+            # attributes below are the same dicts, for the code that
+            # clears them when leaving the room.
+            from src.network.voice_playback import StreamSink, VoiceMixer
             self.jitter_buffer_size = 3  # Buffer 3 chunks (60ms) before mixing user in — good balance of latency vs smoothness
+            self._voice_mixer = VoiceMixer(jitter_frames=self.jitter_buffer_size)
+            self.voice_jitter_buffers = self._voice_mixer.buffers  # user_id -> deque of raw audio chunks
+            self.voice_buffer_threads = {}  # unused, kept for compat
+            self.voice_buffer_stopping = self._voice_mixer.stopping  # user_id -> stop flag
+            self._opus_decoders = self._voice_mixer.decoder.decoders
 
             # Continuous voice output stream (sounddevice) — truly gapless, no pygame
             # Match input rate (16kHz) to eliminate resampling entirely
@@ -3715,10 +3722,11 @@ class TitanNetMainWindow(wx.Frame):
                 latency='low',
             )
             self._voice_output_stream.start()
+            self._voice_mixer.sink = StreamSink(self._voice_output_stream)
 
             # Start single mixer thread (replaces per-user playback threads)
             self._mixer_running = True
-            self._user_started = {}  # user_id -> True when jitter buffer filled
+            self._user_started = self._voice_mixer.started  # user_id -> True when jitter buffer filled
             self._mixer_thread = threading.Thread(target=self._voice_mixer_thread, daemon=True)
             self._mixer_thread.start()
 
@@ -3795,29 +3803,8 @@ class TitanNetMainWindow(wx.Frame):
             return
 
         # Apply fast automatic gain control (AGC) to boost audio
-        import numpy as np
-        audio_array = np.frombuffer(audio_data, dtype=np.int16).copy()
-
-        # Calculate current level (RMS for better quality)
-        rms_level = np.sqrt(np.mean(audio_array.astype(np.float32) ** 2))
-
-        # Always apply AGC in continuous mode (even for quiet audio) to maintain stream continuity
-        if rms_level > 10:  # Apply gain boost for audible audio
-            # Target RMS level: 4000 (good audible level, not too aggressive)
-            target_rms = 4000
-            desired_gain = target_rms / rms_level
-
-            # Fast gain changes (30% of desired change per chunk - much more responsive)
-            gain = self.last_gain * 0.7 + desired_gain * 0.3
-            gain = np.clip(gain, 0.5, 3.0)  # Limit gain range (reduced max from 4.0 to 3.0)
-
-            # Apply gain with clipping protection
-            audio_float = audio_array.astype(np.float32) * gain
-            audio_float = np.clip(audio_float, -32768, 32767)
-            audio_array = audio_float.astype(np.int16)
-            audio_data = audio_array.tobytes()
-
-            self.last_gain = gain  # Remember for next chunk
+        from src.network.voice_capture import fast_agc
+        audio_data, self.last_gain = fast_agc(audio_data, self.last_gain)
 
         # Encode with Opus if available (massive bandwidth reduction)
         if hasattr(self, '_use_opus') and self._use_opus:
@@ -3843,7 +3830,9 @@ class TitanNetMainWindow(wx.Frame):
             should_send = True
 
         if should_send:
-            self.titan_client.send_voice_audio(room_id, audio_data, self_monitor=False)
+            speech = self.voice_capture.last_frame_speech if self.voice_capture else None
+            self.titan_client.send_voice_audio(room_id, audio_data, self_monitor=False,
+                                               speech=speech)
 
     def _on_vad_speech_stop(self, room_id):
         """Called when VAD detects speech stop (VAD mode only)"""
@@ -5077,14 +5066,31 @@ class TitanNetMainWindow(wx.Frame):
         self.PopupMenu(menu)
         menu.Destroy()
 
+    def _on_directory_changed(self, op, delta):
+        """The server pushed a change to the online-user or room list (listener
+        thread). Redraw the list if it is the one on screen; the client's
+        mirror is already current, so this does not touch the network."""
+        def _redraw():
+            if op in ('user_online', 'user_offline', 'resync'):
+                if self.current_view in ["users", "private_messages_select"]:
+                    self.refresh_users()
+            elif self.current_view == "rooms":
+                self.refresh_rooms()
+        wx.CallAfter(_redraw)
+
     def OnAutoRefresh(self, event):
         """Auto-refresh timer - update data in background"""
         try:
-            # Only refresh if not in chat view (to avoid interrupting conversation)
+            # Only refresh if not in chat view (to avoid interrupting conversation).
+            # Rooms and users are pushed by the server once the client holds
+            # its directory snapshot, so those two only poll on old servers.
+            live = self.titan_client.directory_is_live()
             if self.current_view == "rooms":
-                self.refresh_rooms()
+                if not live:
+                    self.refresh_rooms()
             elif self.current_view in ["users", "private_messages_select"]:
-                self.refresh_users()
+                if not live:
+                    self.refresh_users()
             elif self.current_view == "forum":
                 self.refresh_forum_topics()
             elif self.current_view == "repository":
@@ -5629,11 +5635,7 @@ class TitanNetMainWindow(wx.Frame):
         """Add audio chunk directly to jitter buffer (thread-safe).
         The single mixer thread reads from all buffers — no per-user threads needed."""
         try:
-            if user_id not in self.voice_jitter_buffers:
-                self.voice_jitter_buffers[user_id] = queue.Queue()
-                self.voice_buffer_stopping[user_id] = False
-
-            self.voice_jitter_buffers[user_id].put(audio_data)
+            self._voice_mixer.add(user_id, audio_data)
 
         except Exception as e:
             print(f"[VOICE] Error adding to jitter buffer: {e}")
@@ -5654,16 +5656,9 @@ class TitanNetMainWindow(wx.Frame):
                 wx.CallAfter(self._update_speakers_list)
 
             # Mark user as stopped and clear buffer so mixer skips them
-            if user_id in self.voice_buffer_stopping:
-                self.voice_buffer_stopping[user_id] = True
-            if user_id in self._user_started:
-                del self._user_started[user_id]
-            if user_id in self.voice_jitter_buffers:
-                while not self.voice_jitter_buffers[user_id].empty():
-                    try:
-                        self.voice_jitter_buffers[user_id].get_nowait()
-                    except:
-                        break
+            mixer = getattr(self, '_voice_mixer', None)
+            if mixer is not None:
+                mixer.stop_user(user_id)
 
         except Exception as e:
             print(f"Error handling voice_stopped: {e}")
@@ -5814,65 +5809,19 @@ class TitanNetMainWindow(wx.Frame):
         """Single mixer thread: reads from all users' jitter buffers, mixes, writes to
         sounddevice OutputStream.  Truly gapless — the audio hardware pulls samples at a
         fixed rate, so there are zero gaps between chunks.
-        Uses Opus PLC on buffer underrun to conceal packet loss instead of silence."""
-        import numpy as np
+        Uses Opus PLC on buffer underrun to conceal packet loss instead of silence.
+        One tick (mix all speakers, write to the stream) is voice_playback.VoiceMixer.tick()."""
         import time
 
-        CHUNK_SAMPLES = 320  # 20ms at 16000Hz (matches input — no resampling needed)
-
-        # Track consecutive underruns per user for PLC
-        user_underruns = {}  # user_id -> consecutive underrun count
-        MAX_PLC_FRAMES = 5  # Max consecutive PLC frames before giving up (100ms)
-
+        mixer = self._voice_mixer
         try:
             while self._mixer_running:
-                mixed = np.zeros(CHUNK_SAMPLES, dtype=np.float32)
-                has_audio = False
-
-                for user_id in list(self.voice_jitter_buffers.keys()):
-                    if self.voice_buffer_stopping.get(user_id, False):
-                        continue
-
-                    buf = self.voice_jitter_buffers[user_id]
-
-                    # Wait for initial jitter buffer fill before reading this user
-                    if user_id not in self._user_started:
-                        if buf.qsize() >= self.jitter_buffer_size:
-                            self._user_started[user_id] = True
-                        else:
-                            continue
-
-                    try:
-                        raw_chunk = buf.get_nowait()
-                        user_underruns[user_id] = 0  # Reset underrun counter
-                        resampled = self._decode_and_resample_chunk(raw_chunk, user_id=user_id)
-                        if resampled is not None:
-                            n = min(len(resampled), CHUNK_SAMPLES)
-                            mixed[:n] += resampled[:n].astype(np.float32)
-                            has_audio = True
-                    except queue.Empty:
-                        # Buffer underrun — use Opus PLC if available
-                        underruns = user_underruns.get(user_id, 0) + 1
-                        user_underruns[user_id] = underruns
-                        if underruns <= MAX_PLC_FRAMES and hasattr(self, '_use_opus') and self._use_opus:
-                            plc_audio = self._opus_plc(user_id)
-                            if plc_audio is not None:
-                                n = min(len(plc_audio), CHUNK_SAMPLES)
-                                mixed[:n] += plc_audio[:n].astype(np.float32)
-                                has_audio = True
-
-                # Apply volume
-                volume = self._cached_volume
-                if volume < 1.0:
-                    mixed *= volume
-
-                # Clip to int16 range
-                np.clip(mixed, -32768, 32767, out=mixed)
-
-                # Write to output stream — blocks until hardware consumes (~20ms)
-                # This provides natural pacing with zero gaps
+                # Mix and write to the output stream — the write blocks until
+                # the hardware consumes (~20ms), which provides natural pacing
+                # with zero gaps
                 try:
-                    self._voice_output_stream.write(mixed.astype(np.int16).reshape(-1, 1))
+                    mixer.tick(self._cached_volume,
+                               plc=bool(getattr(self, '_use_opus', False)))
                 except Exception:
                     if not self._mixer_running:
                         break
@@ -5884,79 +5833,17 @@ class TitanNetMainWindow(wx.Frame):
             traceback.print_exc()
 
     def _opus_plc(self, user_id):
-        """Generate Opus Packet Loss Concealment audio for a missing chunk.
-        Opus decoder generates a plausible continuation of the previous audio."""
-        import numpy as np
-        try:
-            decoder = self._opus_decoders.get(user_id)
-            if decoder:
-                # Opus PLC: decode with None input — decoder extrapolates from previous state
-                plc_pcm = decoder.decode(None)
-                return np.frombuffer(plc_pcm, dtype=np.int16)
-        except Exception:
-            pass
-        return None
-
-    # A 20ms mono frame at 16kHz is 640 bytes of raw PCM; an Opus frame at
-    # 24kbps is roughly 60. The size is therefore what tells the two apart on
-    # the wire, and it is the ONLY thing that may decide - a listener must not
-    # judge an incoming frame by whether its own Opus support happens to be
-    # installed. Doing that meant a listener without opuslib fed a compressed
-    # frame straight into int16 PCM playback, which is a burst of noise instead
-    # of the sender's voice.
-    _OPUS_FRAME_MAX_BYTES = 500
+        """Opus Packet Loss Concealment audio for a missing chunk (see voice_playback)."""
+        mixer = getattr(self, '_voice_mixer', None)
+        return mixer.decoder.plc(user_id) if mixer is not None else None
 
     def _decode_and_resample_chunk(self, audio_data: bytes, user_id=None):
         """Decode one voice frame. Returns mono int16 numpy array at 16kHz."""
-        import numpy as np
-
-        if not audio_data:
-            return None
-
-        try:
-            if len(audio_data) < self._OPUS_FRAME_MAX_BYTES:
-                # Compressed frame - it can only be played through Opus.
-                decoded = None
-                try:
-                    from src.network.voice_codec import OpusVoiceCodec, OPUS_AVAILABLE
-                    if OPUS_AVAILABLE:
-                        if not hasattr(self, '_opus_decoders'):
-                            self._opus_decoders = {}
-                        if user_id not in self._opus_decoders:
-                            self._opus_decoders[user_id] = OpusVoiceCodec(
-                                sample_rate=16000, channels=1, bitrate=24000, frame_duration_ms=20
-                            )
-                        decoded = self._opus_decoders[user_id].decode(audio_data)
-                except Exception as decode_err:
-                    decoded = None
-                    if not getattr(self, '_opus_decode_error_logged', False):
-                        self._opus_decode_error_logged = True
-                        print(f"[VOICE PLAYBACK] Opus decode failed: {decode_err}")
-
-                if not decoded:
-                    # Drop the frame rather than play compressed bytes as PCM.
-                    if not getattr(self, '_opus_missing_logged', False):
-                        self._opus_missing_logged = True
-                        print("[VOICE PLAYBACK] Opus frames received but Opus is "
-                              "unavailable - dropping them. Install opuslib to "
-                              "hear this speaker.")
-                    return None
-                audio_data = decoded
-
-            # Raw PCM path: an odd trailing byte would break int16 framing.
-            if len(audio_data) % 2:
-                audio_data = audio_data[:-1]
-
-            audio_array = np.frombuffer(audio_data, dtype=np.int16)
-            if len(audio_array) == 0:
-                return None
-
-            # Output stream runs at 16kHz — same as input, no resampling needed
-            return audio_array
-
-        except Exception as e:
-            print(f"[VOICE PLAYBACK] Error processing chunk: {e}")
-            return None
+        mixer = getattr(self, '_voice_mixer', None)
+        if mixer is None:
+            from src.network.voice_playback import VoiceMixer
+            mixer = self._voice_mixer = VoiceMixer()
+        return mixer.decoder.decode(audio_data, user_id=user_id)
 
     def _update_voice_volume_cache(self):
         """Update cached voice volume from GUI slider (must be called from GUI thread)"""
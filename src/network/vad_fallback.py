@@ -16,31 +16,56 @@ same surface Titan already used, so it drops straight into
 
     vad = Vad(aggressiveness)          # 0..3, same meaning as webrtcvad
     vad.is_speech(pcm_bytes, sample_rate) -> bool
+    vad.is_speech_frames([pcm_bytes, ...], sample_rate) -> [bool, ...]
+
+``Vad`` is a thin webrtcvad-shaped front for :class:`VadEngine`, which analyses
+whole blocks of frames at once and can look ahead (see below).
 
 How it decides
 --------------
-Two cheap features per frame, both robust for 16-bit mono PCM:
+Features per frame, computed for a whole block in one vectorised pass (one
+FFT call for every frame of the block):
 
 * **Short-term energy (RMS)** compared against an adaptively tracked noise
   floor. The floor follows the quietest recent frames, so it survives a noisy
   room, a fan, or a hissy USB microphone without needing calibration.
 * **Zero-crossing rate (ZCR)** to keep unvoiced consonants (s, f, sh) which
-  carry little energy but cross zero often, and to reject the low-frequency
-  rumble of desk bumps.
-
-A short hangover keeps ``is_speech`` true across the natural gaps inside a word,
-so the caller's own speech-start/stop counters behave like they did with
-webrtcvad.
+  carry little energy but cross zero often.
+* **Band energies** - the share of the frame's energy in the voice band
+  (200 Hz - 4 kHz) and above it. Desk bumps, fans and mains hum put theirs
+  below 200 Hz, so a loud frame with almost nothing above that is rumble;
+  a hissing consonant puts most of its energy above 4 kHz, which is what
+  tells it from a fan that happens to cross zero often.
+* **Spectral flux** - how much the band energies rose since the previous
+  frame. Speech is a string of onsets; a syllable starting softly is caught
+  by its flux before its energy clears the gate.
+
+The noise floor is state carried from frame to frame and block to block. On
+top of the slow tracker (which only learns from non-speech frames, so speech
+cannot drag it up) sits a minimum-statistics check: the quietest frame of the
+last three seconds. When even that is above the floor, the room got louder
+(a fan came on) and the floor jumps up to meet it - before this a VAD whose
+floor was learned in a quiet room treated a noisy one as endless speech.
+
+A short hangover keeps ``is_speech`` true across the natural gaps inside a
+word, so the caller's own speech-start/stop counters behave like they did
+with webrtcvad. ``VadEngine(lookahead=n)`` additionally holds decisions back
+``n`` frames: a burst must last ``n + 1`` frames (at most three) to count -
+a key click does not - and the lookahead left over beyond that (``n - 2``
+frames) reaches back before the burst, so the soft start of the first
+syllable is sent too.
 
 ``numpy`` is used when present (it is a hard Titan dependency) and there is a
-pure-``array`` fallback, so this module works even in a stripped environment.
+pure-``array`` fallback with only the energy and zero-crossing features, so
+this module works even in a stripped environment.
 """
 
 from __future__ import annotations
 
 import math
 from array import array
-from typing import Optional
+from collections import deque
+from typing import List, Optional
 
 try:
     import numpy as _np
@@ -60,6 +85,26 @@ _PROFILES = {
     3: {'snr_db': 11.0, 'abs_floor': 300.0, 'hangover': 4},
 }
 
+# Feature columns of VadEngine.features() / block_features().
+FEATURES = ('rms', 'zcr', 'voice_band', 'high_band', 'flux')
+
+# Band edges for the flux, and the voice band for the energy shares (the
+# high band is everything above it, or above a quarter of the sample rate).
+_BAND_EDGES_HZ = (80, 250, 500, 1000, 2000, 3000, 4000, 6000, 8000)
+_VOICE_BAND_HZ = (200, 4000)
+# A frame with less of its energy above 200 Hz than this is rumble.
+_MIN_ABOVE_RUMBLE = 0.3
+# A fricative has at least this share of its energy in the high band.
+_MIN_FRICATIVE_HIGH = 0.3
+# Mean rise of the log band energies (nepers) that marks an onset.
+_ONSET_FLUX = 1.0
+# Minimum statistics: the quietest frame over _MIN_WINDOWS windows of
+# _MIN_WINDOW_SECONDS each (three seconds in all, longer than a talk spurt).
+_MIN_WINDOW_SECONDS = 0.25
+_MIN_WINDOWS = 12
+# Frames a burst must last to count when there is lookahead to see it.
+_MIN_BURST_FRAMES = 3
+
 
 def _frame_features(pcm_bytes: bytes):
     """Return ``(rms, zero_crossing_rate)`` for 16-bit little-endian mono PCM."""
@@ -98,20 +143,158 @@ def _frame_features(pcm_bytes: bytes):
     return rms, zcr
 
 
-class Vad:
-    """Energy + zero-crossing VAD with an adaptive noise floor.
+# Blocks up to this many frames take the DFT as one matrix product: numpy's
+# FFT costs more per call than a whole 320-sample frame's worth of maths.
+_DFT_MATRIX_FRAMES = 4
+
+_spectral_tables_cache = {}
 
-    API-compatible with ``webrtcvad.Vad`` for the single call Titan makes.
+
+def _spectral_tables(frame_len: int, sample_rate: int):
+    """Window, windowed DFT matrix and band matrix for one frame size (cached).
+
+    The band matrix sums the power spectrum into the flux bands, plus two
+    last columns: the voice band, the high band and the whole spectrum.
+    """
+    key = (frame_len, sample_rate)
+    tables = _spectral_tables_cache.get(key)
+    if tables is None:
+        freqs = _np.fft.rfftfreq(frame_len, 1.0 / sample_rate)
+        edges = [edge for edge in _BAND_EDGES_HZ if edge < sample_rate / 2] + [sample_rate / 2 + 1]
+        bands = _np.zeros((len(freqs), len(edges) - 1), dtype=_np.float32)
+        for band in range(len(edges) - 1):
+            bands[(freqs >= edges[band]) & (freqs < edges[band + 1]), band] = 1.0
+        high_edge = min(_VOICE_BAND_HZ[1], sample_rate / 4)
+        voice = ((freqs >= _VOICE_BAND_HZ[0]) & (freqs < high_edge)).astype(_np.float32)
+        high = (freqs >= high_edge).astype(_np.float32)
+        window = _np.hanning(frame_len)
+        angle = 2.0 * _np.pi * _np.outer(_np.arange(frame_len), _np.arange(len(freqs))) / frame_len
+        dft = _np.hstack([_np.cos(angle), _np.sin(angle)]) * window[:, None]
+        # A white frame of unit RMS puts sum(window^2) into every bin: what a
+        # frame too quiet to analyse is taken to have in each band.
+        flat = (window * window).sum() * bands.sum(axis=0)
+        tables = _spectral_tables_cache[key] = (
+            window.astype(_np.float32), dft.astype(_np.float32),
+            _np.column_stack([bands, voice, high, _np.ones(len(freqs), dtype=_np.float32)]),
+            flat.astype(_np.float32))
+    return tables
+
+
+def block_features(samples, frame_len: int, sample_rate: int, previous_bands=None,
+                   min_rms: float = 0.0):
+    """Features of every whole frame in ``samples`` (int16), in one pass.
+
+    Returns ``(features, last_bands)``: a float32 array, one row per frame
+    and one column per name in FEATURES, and the log band energies of the
+    last frame - pass them back in with the next block so the flux of its
+    first frame is measured against this block's last.
+
+    Frames quieter than ``min_rms`` skip the spectrum: their band shares are
+    0 and their band energies are those of white noise at their RMS (all
+    the next frame's flux needs to see is that it was quiet).
+    """
+    count = len(samples) // frame_len
+    if count == 1:
+        return _one_frame_features(samples[:frame_len], frame_len, sample_rate,
+                                   previous_bands, min_rms)
+    features = _np.empty((count, len(FEATURES)), dtype=_np.float32)
+    if not count:
+        return features, previous_bands
+    frames = samples[:count * frame_len].reshape(count, frame_len)
+
+    # Few numpy calls per block rather than cheap ones per frame: a block of
+    # one frame (is_speech) pays this overhead once per frame.
+    floats = frames.astype(_np.float32)
+    _np.sqrt(_np.einsum('ij,ij->i', floats, floats) / frame_len, out=features[:, 0])
+    # Neighbours differ in sign exactly when their XOR is negative.
+    features[:, 1] = ((frames[:, 1:] ^ frames[:, :-1]) < 0).sum(axis=1)
+    features[:, 1] /= frame_len - 1
+
+    window, dft, bands, flat = _spectral_tables(frame_len, sample_rate)
+    rms = features[:, 0]
+    log_bands = _np.log1p((rms * rms)[:, None] * flat)
+    features[:, 2:4] = 0.0
+    loud = _np.flatnonzero(rms >= min_rms) if min_rms > 0 else _np.arange(count)
+    if len(loud):
+        loud_frames = floats[loud] if len(loud) < count else floats
+        if len(loud) <= _DFT_MATRIX_FRAMES:
+            parts = loud_frames @ dft                   # re | im
+            parts *= parts
+            half = dft.shape[1] // 2
+            power = parts[:, :half] + parts[:, half:]
+        else:
+            power = _np.abs(_np.fft.rfft(loud_frames * window, axis=1)).astype(_np.float32)
+            power *= power
+        energies = power @ bands              # frames x (flux bands, voice, high, all)
+        features[loud, 2:4] = energies[:, -3:-1] / _np.maximum(energies[:, -1:], 1e-3)
+        log_bands[loud] = _np.log1p(energies[:, :-3])
+
+    before = _np.concatenate((log_bands[:1] if previous_bands is None else previous_bands[None, :],
+                              log_bands[:-1]))
+    before -= log_bands
+    _np.minimum(before, 0.0, out=before)
+    features[:, 4] = before.mean(axis=1)
+    features[:, 4] *= -1.0
+    return features, log_bands[-1]
+
+
+def _one_frame_features(samples, frame_len, sample_rate, previous_bands, min_rms):
+    """block_features for a single frame, in 1-D operations.
+
+    The same maths without the per-axis bookkeeping, which for one frame
+    costs more than the maths: this is the path of every real-time
+    ``is_speech`` call.
+    """
+    window, dft, bands, flat = _spectral_tables(frame_len, sample_rate)
+    floats = samples.astype(_np.float32)
+    rms = math.sqrt(float(floats.dot(floats)) / frame_len)
+    zcr = _np.count_nonzero((samples[1:] ^ samples[:-1]) < 0) / float(frame_len - 1)
+    voice_band = high_band = 0.0
+    if rms >= min_rms:
+        parts = floats @ dft
+        parts *= parts
+        half = dft.shape[1] // 2
+        energies = (parts[:half] + parts[half:]) @ bands
+        total = max(float(energies[-1]), 1e-3)
+        voice_band = float(energies[-3]) / total
+        high_band = float(energies[-2]) / total
+        log_bands = _np.log1p(energies[:-3])
+    else:
+        log_bands = _np.log1p(flat * (rms * rms))
+    if previous_bands is None:
+        flux = 0.0
+    else:
+        rise = log_bands - previous_bands
+        _np.maximum(rise, 0.0, out=rise)
+        flux = float(rise.sum()) / len(rise)
+    return _np.array([[rms, zcr, voice_band, high_band, flux]], dtype=_np.float32), log_bands
+
+
+class VadEngine:
+    """Block VAD: vectorised features, incremental noise floor, lookahead.
+
+    ``push(pcm)`` takes any number of whole frames (bytes or an int16 array)
+    and returns the decisions that became final - with ``lookahead`` of n
+    they trail the audio by n frames; ``flush()`` decides the rest. The
+    features and decisions of the last ``cache_frames`` frames stay in a ring
+    (``features()``, ``raw_decisions()``) for meters and diagnostics, so
+    nothing needs computing twice.
     """
 
-    def __init__(self, aggressiveness: int = 0):
+    def __init__(self, aggressiveness: int = 0, sample_rate: int = 16000,
+                 frame_ms: float = 20, lookahead: int = 0, cache_frames: int = 500):
+        if sample_rate not in VALID_SAMPLE_RATES:
+            raise ValueError(f"unsupported sample rate: {sample_rate}")
+        self.sample_rate = sample_rate
+        self.frame_len = max(2, int(round(sample_rate * frame_ms / 1000.0)))
+        self.lookahead = max(0, int(lookahead))
         self.set_mode(aggressiveness)
-        # Noise floor starts pessimistically low and rises to meet the room.
-        self._noise_floor: Optional[float] = None
-        self._hangover_left = 0
-        self._frames_seen = 0
+        window_frames = max(1, int(round(_MIN_WINDOW_SECONDS * 1000.0 / frame_ms)))
+        self._min_window_frames = window_frames
+        self._cache = _np.zeros((max(1, cache_frames), len(FEATURES)), dtype=_np.float32)
+        self._cache_raw = _np.zeros(max(1, cache_frames), dtype=bool)
+        self.reset()
 
-    # webrtcvad spells it set_mode(); keep the same name.
     def set_mode(self, aggressiveness: int) -> None:
         if aggressiveness not in _PROFILES:
             raise ValueError("aggressiveness must be 0, 1, 2 or 3")
@@ -122,30 +305,63 @@ class Vad:
         self._hangover_frames = profile['hangover']
 
     def reset(self) -> None:
-        """Forget the learned noise floor (use when the device changes)."""
-        self._noise_floor = None
+        """Forget the learned noise floor and every pending frame."""
+        self._noise_floor: Optional[float] = None
+        self._window_min = math.inf
+        self._window_left = self._min_window_frames
+        self._minima = deque(maxlen=_MIN_WINDOWS)
+        self._last_bands = None
+        self._pending = deque()       # [speech flag] of frames not yet final
+        self._burst = 0               # length of the raw burst ending now
         self._hangover_left = 0
-        self._frames_seen = 0
+        self.frames_seen = 0
+        self.frames_decided = 0
 
     @property
     def noise_floor(self) -> float:
         return float(self._noise_floor or 0.0)
 
-    def is_speech(self, buf: bytes, sample_rate: int) -> bool:
-        """Return True when the frame plausibly contains speech.
+    # -- analysis ------------------------------------------------------------
 
-        ``sample_rate`` is validated the way webrtcvad validated it so a caller
-        passing an unsupported rate fails loudly instead of silently mis-gating.
-        """
-        if sample_rate not in VALID_SAMPLE_RATES:
-            raise ValueError(f"unsupported sample rate: {sample_rate}")
-
-        rms, zcr = _frame_features(buf)
-        self._frames_seen += 1
+    def analyze(self, pcm):
+        """Raw (pre-hangover) speech flags for every whole frame of ``pcm``.
 
+        Advances the noise floor and the feature cache; ``push`` is this plus
+        hangover and lookahead.
+        """
+        if isinstance(pcm, (bytes, bytearray, memoryview)):
+            usable = len(pcm) - len(pcm) % 2
+            samples = _np.frombuffer(pcm[:usable], dtype='<i2')
+        else:
+            samples = _np.asarray(pcm, dtype=_np.int16)
+        # Below 0.45 of the absolute gate no rule can call a frame speech,
+        # so its spectrum is not needed - most frames of a quiet room.
+        features, self._last_bands = block_features(
+            samples, self.frame_len, self.sample_rate, self._last_bands,
+            min_rms=self._abs_floor * 0.45)
+        raw = [self._decide(*row) for row in features.tolist()]
+        self._remember(features, raw)
+        return raw
+
+    def _decide(self, rms, zcr, voice_band=None, high_band=None, flux=None):
+        """One frame's raw verdict; updates the noise floor."""
         if self._noise_floor is None:
             self._noise_floor = max(rms, 1.0)
 
+        # Minimum statistics: a floor below even the quietest recent frame
+        # is stale - the room got louder - so it comes up to meet it.
+        if rms < self._window_min:
+            self._window_min = rms
+        self._window_left -= 1
+        if not self._window_left:
+            self._minima.append(self._window_min)
+            self._window_min = math.inf
+            self._window_left = self._min_window_frames
+            if len(self._minima) == self._minima.maxlen:
+                quietest = min(self._minima)
+                if quietest > self._noise_floor:
+                    self._noise_floor = quietest
+
         floor = max(self._noise_floor, 1.0)
         snr_db = 20.0 * math.log10(rms / floor) if rms > 0 else -60.0
 
@@ -161,26 +377,181 @@ class Vad:
             and snr_db >= self._snr_db * 0.55
         )
 
-        # Very low ZCR with high energy is a thump/handling noise, not voice.
-        rumble = zcr < 0.015 and snr_db < self._snr_db * 2.0
-
-        voiced = (loud_enough or fricative) and not rumble
-
-        if voiced:
-            self._hangover_left = self._hangover_frames
+        if voice_band is None:
+            # Very low ZCR with high energy is a thump/handling noise, not voice.
+            rumble = zcr < 0.015 and snr_db < self._snr_db * 2.0
+            onset = False
         else:
+            # Nearly all the energy below the voice band: a thump, a fan, hum.
+            rumble = voice_band + high_band < _MIN_ABOVE_RUMBLE
+            # Zero crossings alone are not a consonant - the energy must be high.
+            fricative = fricative and high_band >= _MIN_FRICATIVE_HIGH
+            # A soft syllable start: the spectrum jumps before the energy does.
+            onset = (flux >= _ONSET_FLUX and rms >= self._abs_floor * 0.45
+                     and snr_db >= self._snr_db * 0.5)
+
+        voiced = (loud_enough or fricative or onset) and not rumble
+        if not voiced:
             # Track the floor only on non-speech frames so speech cannot drag
             # it upward. Rise slowly, fall quickly (adapts when noise stops).
             if rms < floor:
                 self._noise_floor = floor + (rms - floor) * 0.35
             else:
                 self._noise_floor = floor + (rms - floor) * 0.02
+        return voiced
+
+    def _remember(self, features, raw):
+        size = len(self._cache)
+        count = len(raw)
+        if count == 1:
+            row = self.frames_seen % size
+            self._cache[row] = features[0]
+            self._cache_raw[row] = raw[0]
+        elif count:
+            if count > size:
+                features, raw = features[-size:], raw[-size:]
+            rows = (self.frames_seen + count - len(raw) + _np.arange(len(raw))) % size
+            self._cache[rows] = features
+            self._cache_raw[rows] = raw
+        self.frames_seen += count
+
+    def features(self, count: Optional[int] = None):
+        """Features (rows of FEATURES) of the last ``count`` analysed frames."""
+        size = len(self._cache)
+        available = min(self.frames_seen, size)
+        count = available if count is None else min(count, available)
+        rows = (self.frames_seen - count + _np.arange(count)) % size
+        return self._cache[rows]
+
+    def raw_decisions(self, count: Optional[int] = None):
+        size = len(self._cache)
+        available = min(self.frames_seen, size)
+        count = available if count is None else min(count, available)
+        rows = (self.frames_seen - count + _np.arange(count)) % size
+        return self._cache_raw[rows]
+
+    # -- decisions -----------------------------------------------------------
+
+    def push(self, pcm) -> List[bool]:
+        """Analyse ``pcm`` and return the decisions that are now final."""
+        decided = []
+        lookahead = self.lookahead
+        min_burst = min(_MIN_BURST_FRAMES, lookahead + 1)
+        pending = self._pending
+        for raw in self.analyze(pcm):
+            self._burst = self._burst + 1 if raw else 0
+            pending.append(False)
+            if self._burst >= min_burst:
+                # A confirmed burst: it, and the frames before it that are
+                # still undecided (the pre-roll), are speech.
+                reach = min(len(pending), self._burst + lookahead)
+                for back in range(1, reach + 1):
+                    pending[-back] = True
+            if len(pending) > lookahead:
+                decided.append(self._finish(pending.popleft()))
+        return decided
+
+    def flush(self) -> List[bool]:
+        """Decide every pending frame (the audio ended)."""
+        decided = [self._finish(flag) for flag in self._pending]
+        self._pending.clear()
+        return decided
+
+    def _finish(self, speech):
+        self.frames_decided += 1
+        if speech:
+            self._hangover_left = self._hangover_frames
+            return True
+        if self._hangover_left > 0:
+            self._hangover_left -= 1
+            return True
+        return False
 
-            if self._hangover_left > 0:
-                self._hangover_left -= 1
-                return True
 
-        return bool(voiced)
+class Vad:
+    """Energy + zero-crossing + spectral VAD with an adaptive noise floor.
+
+    API-compatible with ``webrtcvad.Vad`` for the single call Titan makes;
+    ``is_speech_frames`` judges a run of frames in one pass. Decisions are
+    immediate (no lookahead), as webrtcvad's were.
+    """
+
+    def __init__(self, aggressiveness: int = 0):
+        self.set_mode(aggressiveness)
+        # A VadEngine, or a _ScalarEngine when numpy is missing.
+        self._engine: Optional[VadEngine] = None
+
+    # webrtcvad spells it set_mode(); keep the same name.
+    def set_mode(self, aggressiveness: int) -> None:
+        if aggressiveness not in _PROFILES:
+            raise ValueError("aggressiveness must be 0, 1, 2 or 3")
+        self.aggressiveness = int(aggressiveness)
+        if getattr(self, '_engine', None) is not None:
+            self._engine.set_mode(aggressiveness)
+
+    def reset(self) -> None:
+        """Forget the learned noise floor (use when the device changes)."""
+        self._engine = None
+
+    @property
+    def noise_floor(self) -> float:
+        return self._engine.noise_floor if self._engine is not None else 0.0
+
+    def _engine_for(self, frame_bytes: int, sample_rate: int) -> VadEngine:
+        """The engine for this frame size; a new size (or rate) starts over."""
+        if sample_rate not in VALID_SAMPLE_RATES:
+            raise ValueError(f"unsupported sample rate: {sample_rate}")
+        engine = self._engine
+        frame_len = frame_bytes // 2
+        if engine is None or engine.frame_len != frame_len or engine.sample_rate != sample_rate:
+            engine = self._engine = VadEngine(self.aggressiveness, sample_rate,
+                                              frame_ms=frame_len * 1000.0 / sample_rate)
+        return engine
+
+    def is_speech(self, buf: bytes, sample_rate: int) -> bool:
+        """Return True when the frame plausibly contains speech.
+
+        ``sample_rate`` is validated the way webrtcvad validated it so a caller
+        passing an unsupported rate fails loudly instead of silently mis-gating.
+        """
+        if sample_rate not in VALID_SAMPLE_RATES:
+            raise ValueError(f"unsupported sample rate: {sample_rate}")
+        if _np is None:
+            return self._is_speech_scalar(buf)
+        if len(buf) < 4:
+            return False
+        engine = self._engine_for(len(buf), sample_rate)
+        decided = engine.push(buf)
+        return bool(decided[0]) if decided else False
+
+    def is_speech_frames(self, frames, sample_rate: int) -> List[bool]:
+        """``is_speech`` for each of a run of equal-sized frames, in one pass."""
+        if sample_rate not in VALID_SAMPLE_RATES:
+            raise ValueError(f"unsupported sample rate: {sample_rate}")
+        if _np is None or not frames:
+            return [self.is_speech(frame, sample_rate) for frame in frames]
+        engine = self._engine_for(len(frames[0]), sample_rate)
+        return [bool(flag) for flag in engine.push(b''.join(frames))]
+
+    def _is_speech_scalar(self, buf: bytes) -> bool:
+        rms, zcr = _frame_features(buf)
+        if self._engine is None:
+            # The engine's floor logic, fed scalar features, with no numpy.
+            self._engine = _ScalarEngine(self.aggressiveness)
+        voiced = self._engine._decide(rms, zcr)
+        return self._engine._finish(voiced)
+
+
+class _ScalarEngine(VadEngine):
+    """VadEngine's decision state without the numpy feature cache."""
+
+    def __init__(self, aggressiveness: int = 0, frame_ms: int = 20):
+        self.sample_rate = 16000
+        self.frame_len = 0
+        self.lookahead = 0
+        self.set_mode(aggressiveness)
+        self._min_window_frames = max(1, int(round(_MIN_WINDOW_SECONDS * 1000.0 / frame_ms)))
+        self.reset()
 
 
 def get_vad(aggressiveness: int = 0):
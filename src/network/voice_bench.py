@@ -0,0 +1,565 @@
+"""
+Offline benchmark of the Titan-Net voice pipeline.
+
+Feeds recorded or synthetic PCM through the same code a voice room runs -
+capture (VoiceCaptureManager.process_chunk), VAD, AGC, Opus encode,
+packetize, a simulated network, the jitter queues, decode and the mix -
+without a microphone, a sound card or a window, so a slowdown in the hot
+voice path shows up on any Linux box:
+
+    python -m src.network.voice_bench                   # 10 s, 4 speakers
+    python -m src.network.voice_bench --wav talk.wav --speakers 12 --loss 0.05
+    python -m src.network.voice_bench --json
+    python -m src.network.voice_bench --vad             # VAD accuracy and cost
+
+Time is virtual. The sender produces a frame every 20 ms of virtual time,
+the network delays (and may drop or reorder) each packet on that clock,
+and the receiver mixes one frame per 20 ms tick, so the end-to-end latency
+is the same on a fast and a slow machine - except that the measured
+processing time of each frame is added to its send time, as it would be in
+a real room.
+
+Reported per stage (capture, vad, agc, encode, packetize, jitter, decode,
+convert, mix): CPU time per 20 ms frame, wall time per call (mean, p95,
+max) and, in a second pass under tracemalloc, the bytes each call
+allocates. The sender stages run once per captured frame; the receiver
+stages once per tick for every speaker in the room (each remote speaker
+replays the sender's frames from a different point), except convert,
+which turns the tick's raw PCM frames into one block in a single call.
+
+``--vad`` instead scores the voice-activity detector on a labelled corpus
+(synthetic speech over a quiet room, a noisy room, a fan, mains hum that
+switches on part-way and keyboard clicks): accuracy, the share of speech
+frames caught and the share of non-speech frames let through, per scene,
+plus the CPU time per second of audio frame by frame and block by block.
+"""
+
+import argparse
+import heapq
+import json
+import random
+import time
+import tracemalloc
+import wave
+from collections import deque
+
+import numpy as np
+
+from src.network.vad_fallback import Vad, VadEngine
+from src.network.voice_capture import VoiceCaptureManager, fast_agc
+from src.network.voice_codec import OPUS_AVAILABLE, pack_voice_packet, unpack_voice_packet
+from src.network.voice_playback import CHUNK_SAMPLES, VoiceMixer
+
+SAMPLE_RATE = 16000
+FRAME_MS = 20
+FRAME_SECONDS = FRAME_MS / 1000.0
+
+SENDER_STAGES = ('capture', 'vad', 'agc', 'encode', 'packetize')
+RECEIVER_STAGES = ('jitter', 'decode', 'convert', 'mix')
+STAGES = SENDER_STAGES + RECEIVER_STAGES
+
+
+# --------------------------------------------------------------------------- #
+#  Input
+# --------------------------------------------------------------------------- #
+def synthetic_speech(seconds, sample_rate=SAMPLE_RATE, seed=0):
+    """Talk spurts and pauses over a quiet noise floor.
+
+    Returns ``(samples, speech)``: int16 mono samples and a boolean array,
+    True for every sample inside a talk spurt. Spurts are voiced syllables
+    (a 90-240 Hz fundamental with harmonics under a syllable envelope) with
+    the odd fricative (loud high-passed noise), so energy, zero crossings
+    and spectrum all move the way they do in real speech.
+    """
+    rng = np.random.default_rng(seed)
+    total = int(seconds * sample_rate)
+    out = rng.normal(0.0, 60.0, total)          # room noise
+    speech = np.zeros(total, dtype=bool)
+    t = int(rng.uniform(0.2, 0.6) * sample_rate)
+    while t < total:
+        spurt = int(rng.uniform(0.8, 2.5) * sample_rate)
+        end = min(total, t + spurt)
+        speech[t:end] = True
+        pos = t
+        while pos < end:
+            length = min(end - pos, int(rng.uniform(0.12, 0.3) * sample_rate))
+            n = np.arange(length)
+            if rng.random() < 0.2:
+                noise = rng.normal(0.0, 1.0, length)
+                sound = np.diff(noise, prepend=0.0) * rng.uniform(1500, 3000)
+            else:
+                f0 = rng.uniform(90, 240) * (1 + 0.08 * np.sin(2 * np.pi * 3 * n / sample_rate))
+                phase = 2 * np.pi * np.cumsum(f0) / sample_rate
+                sound = sum(np.sin(k * phase) / k for k in range(1, 8))
+                sound *= rng.uniform(2500, 6000)
+            envelope = np.sin(np.pi * (n + 0.5) / length) ** 0.7
+            out[pos:pos + length] += sound * envelope
+            pos += length
+        t = end + int(rng.uniform(0.4, 1.8) * sample_rate)
+    return np.clip(out, -32768, 32767).astype(np.int16), speech
+
+
+def load_wav(path, sample_rate=SAMPLE_RATE):
+    """16-bit PCM WAV as int16 mono at ``sample_rate`` (channels averaged,
+    other rates linearly resampled)."""
+    with wave.open(path, 'rb') as w:
+        if w.getsampwidth() != 2:
+            raise ValueError("only 16-bit PCM WAV files are supported")
+        channels = w.getnchannels()
+        rate = w.getframerate()
+        data = np.frombuffer(w.readframes(w.getnframes()), dtype='<i2')
+    samples = data.reshape(-1, channels).mean(axis=1) if channels > 1 else data.astype(np.float64)
+    if rate != sample_rate:
+        target = int(len(samples) * sample_rate / rate)
+        samples = np.interp(np.linspace(0, len(samples) - 1, target),
+                            np.arange(len(samples)), samples)
+    return np.clip(samples, -32768, 32767).astype(np.int16)
+
+
+VAD_SCENES = ('quiet', 'room', 'fan', 'hum', 'keys')
+
+
+def vad_corpus(seconds_per_scene=20.0, seed=0):
+    """Synthetic speech over each of VAD_SCENES in turn, labelled per frame.
+
+    Returns ``(samples, labels, scenes)``: int16 mono samples, one boolean
+    per 20 ms frame (True when most of the frame is inside a talk spurt) and
+    the scene name of every frame. Quiet is synthetic_speech as it comes;
+    room adds loud white noise, fan brown noise (all rumble), hum a 50 Hz
+    mains buzz with harmonics that switches on a quarter of the way in and
+    keys short bright clicks, four a second.
+    """
+    rng = np.random.default_rng(seed)
+    parts, masks, scenes = [], [], []
+    for index, scene in enumerate(VAD_SCENES):
+        samples, speech = synthetic_speech(seconds_per_scene, seed=seed * 10 + index)
+        out = samples.astype(np.float64)
+        total = len(out)
+        if scene == 'room':
+            out += rng.normal(0.0, 250.0, total)
+        elif scene == 'fan':
+            brown = np.cumsum(rng.normal(0.0, 40.0, total))
+            out += brown - np.convolve(brown, np.ones(200) / 200, 'same')
+        elif scene == 'hum':
+            t = np.arange(total) / SAMPLE_RATE
+            hum = sum(np.sin(2 * np.pi * 50 * k * t + k) / k for k in range(1, 8)) * 900
+            hum[:total // 4] = 0.0
+            out += hum
+        elif scene == 'keys':
+            for pos in rng.integers(0, total - 400, int(seconds_per_scene * 4)):
+                length = int(rng.integers(60, 200))
+                click = rng.normal(0.0, 1.0, length) * np.exp(-np.arange(length) / 30.0)
+                out[pos:pos + length] += click * rng.uniform(2000, 8000)
+        frames = total // CHUNK_SAMPLES
+        parts.append(np.clip(out[:frames * CHUNK_SAMPLES], -32768, 32767).astype(np.int16))
+        masks.append(speech[:frames * CHUNK_SAMPLES].reshape(frames, CHUNK_SAMPLES).mean(axis=1) >= 0.5)
+        scenes.extend([scene] * frames)
+    return np.concatenate(parts), np.concatenate(masks), scenes
+
+
+# --------------------------------------------------------------------------- #
+#  Measurement
+# --------------------------------------------------------------------------- #
+class VirtualClock:
+    """Seconds of simulated time, moved only by the benchmark."""
+
+    def __init__(self, start=0.0):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+    def advance_to(self, when):
+        self.now = max(self.now, when)
+
+
+class StageTimer:
+    """Wall and CPU time per stage, exclusive of nested stages.
+
+    With ``allocations`` every call is also traced: the peak bytes it
+    allocated above what was live before it, and what it left allocated.
+    (Capture calls VAD, AGC and encode from inside; their allocations are
+    theirs, and capture's peak is what it allocated after the last of them.)
+    """
+
+    def __init__(self, allocations=False):
+        self.allocations = allocations
+        self.wall = {stage: [] for stage in STAGES}
+        self.cpu = {stage: 0 for stage in STAGES}
+        self.peak = {stage: [] for stage in STAGES}
+        self.retained = {stage: 0 for stage in STAGES}
+        self._stack = []
+
+    def run(self, stage, fn, *args, **kwargs):
+        # [stage, wall of children, cpu of children]
+        self._stack.append([stage, 0, 0])
+        if self.allocations:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+        cpu0 = time.thread_time_ns()
+        wall0 = time.perf_counter_ns()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            wall = time.perf_counter_ns() - wall0
+            cpu = time.thread_time_ns() - cpu0
+            _stage, child_wall, child_cpu = self._stack.pop()
+            self.wall[stage].append(wall - child_wall)
+            self.cpu[stage] += cpu - child_cpu
+            if self._stack:
+                self._stack[-1][1] += wall
+                self._stack[-1][2] += cpu
+            if self.allocations:
+                current, peak = tracemalloc.get_traced_memory()
+                self.peak[stage].append(max(0, peak - before))
+                self.retained[stage] += current - before
+
+    def wrap(self, stage, fn):
+        def timed(*args, **kwargs):
+            return self.run(stage, fn, *args, **kwargs)
+        return timed
+
+
+def _percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return float(ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))])
+
+
+# --------------------------------------------------------------------------- #
+#  Pipeline
+# --------------------------------------------------------------------------- #
+class _Sender:
+    """The local user's side: capture -> VAD -> AGC -> encode -> packetize."""
+
+    def __init__(self, timer, use_vad, codec):
+        self.timer = timer
+        self.codec = codec
+        self.manager = VoiceCaptureManager(sample_rate=SAMPLE_RATE,
+                                           chunk_duration_ms=FRAME_MS, use_vad=False)
+        if use_vad:
+            self.manager.vad, self.manager.vad_backend = Vad(0), 'builtin'
+            self.manager.vad.is_speech = timer.wrap('vad', self.manager.vad.is_speech)
+            self.manager._use_vad = True
+        self.manager.is_recording = True
+        self.manager.on_audio_chunk = self._on_chunk
+        self.last_gain = 1.0
+        self.payload = None
+
+    def _on_chunk(self, audio_data):
+        timer = self.timer
+        audio_data, self.last_gain = timer.run('agc', fast_agc, audio_data, self.last_gain)
+        if self.codec is not None:
+            frames = timer.run('encode', self.codec.encode_chunk, audio_data)
+            audio_data = frames[0] if frames else None
+        self.payload = audio_data
+
+    def _capture(self, frame):
+        # What the sounddevice callback and the processing thread do.
+        self.manager._audio_callback(frame.reshape(-1, 1), len(frame), None, None)
+        self.manager.process_chunk(self.manager.audio_queue.get_nowait())
+
+    def frame(self, frame, seq):
+        """Run one captured frame through; returns (packet or None, speech flag)."""
+        self.payload = None
+        self.timer.run('capture', self._capture, frame)
+        if self.payload is None:
+            return None, self.manager.last_frame_speech
+        speech = self.manager.last_frame_speech
+
+        def packetize():
+            packet = pack_voice_packet(1, 1, seq, self.payload, speech=speech)
+            return unpack_voice_packet(packet)['audio_data']
+        return self.timer.run('packetize', packetize), speech
+
+
+def _default_codec():
+    if not OPUS_AVAILABLE:
+        return None
+    from src.network.voice_codec import OpusVoiceCodec
+    return OpusVoiceCodec(sample_rate=SAMPLE_RATE, channels=1, bitrate=24000,
+                          frame_duration_ms=FRAME_MS)
+
+
+def _run_pipeline(samples, timer, speakers, use_vad, codec, net_delay_ms,
+                  jitter_ms, loss, jitter_frames, seed, include_cpu, stereo=False):
+    frames = len(samples) // CHUNK_SAMPLES
+    sender = _Sender(timer, use_vad, codec)
+
+    # Sender: every captured frame, with the time it is on the wire.
+    sent = []             # (captured_at, sent_at, payload) - payload None when not sent
+    speech_frames = 0
+    for i in range(frames):
+        frame = samples[i * CHUNK_SAMPLES:(i + 1) * CHUNK_SAMPLES]
+        started = time.perf_counter()
+        payload, speech = sender.frame(frame, i)
+        cpu = time.perf_counter() - started
+        speech_frames += bool(speech)
+        captured_at = i * FRAME_SECONDS
+        sent.append((captured_at, captured_at + FRAME_SECONDS + (cpu if include_cpu else 0.0),
+                     payload))
+
+    # Network: speaker k replays the sender's frames from a different point.
+    rng = random.Random(seed)
+    arrivals = []         # heap of (arrival, order, user_id, captured_at, payload)
+    lost = 0
+    offset = max(1, frames // max(1, speakers))
+    order = 0
+    for k in range(speakers):
+        user_id = k + 1
+        for i in range(frames):
+            source_captured, source_sent, payload = sent[(i + k * offset) % frames]
+            if payload is None:
+                continue
+            if rng.random() < loss:
+                lost += 1
+                continue
+            captured_at = i * FRAME_SECONDS
+            sent_at = captured_at + (source_sent - source_captured)
+            delay = (net_delay_ms + rng.uniform(0.0, jitter_ms)) / 1000.0
+            heapq.heappush(arrivals, (sent_at + delay, order, user_id, captured_at, payload))
+            order += 1
+
+    # Receiver: one mix per tick, half a frame off the capture grid so
+    # arrivals never tie with ticks.
+    clock = VirtualClock()
+    mixer = VoiceMixer(jitter_frames=jitter_frames, channels=2 if stereo else 1)
+    if stereo:
+        # Speakers spread across the stereo field, left to right.
+        for k in range(speakers):
+            mixer.set_pan(k + 1, (k + 0.5) / speakers)
+    mixer.decoder.decode = timer.wrap('decode', mixer.decoder.decode)
+    # Raw PCM frames skip the decoder: the mixer converts the whole block
+    # in one call per tick, which is timed on its own.
+    mixer._convert = timer.wrap('convert', mixer._convert)
+    waiting = {}          # user_id -> deque of captured_at, in queue order
+    latencies = []
+    played = audible = plc_ticks = 0
+    tick_time = FRAME_SECONDS / 2
+    last_arrival = arrivals[-1][0] if arrivals else 0.0
+    while tick_time <= last_arrival + (jitter_frames + 2) * FRAME_SECONDS:
+        clock.advance_to(tick_time)
+        while arrivals and arrivals[0][0] <= clock.now:
+            _arrival, _order, user_id, captured_at, payload = heapq.heappop(arrivals)
+            timer.run('jitter', mixer.add, user_id, payload)
+            waiting.setdefault(user_id, deque()).append(captured_at)
+        before = {user_id: len(buf) for user_id, buf in mixer.buffers.items()}
+        out = timer.run('mix', mixer.mix, 1.0, plc=codec is not None)
+        for user_id, buf in mixer.buffers.items():
+            if len(buf) < before.get(user_id, 0):
+                latencies.append(clock.now + FRAME_SECONDS - waiting[user_id].popleft())
+                played += 1
+            elif mixer.underruns.get(user_id):
+                plc_ticks += 1
+        audible += bool(np.any(out))
+        tick_time += FRAME_SECONDS
+
+    ticks = int(round(tick_time / FRAME_SECONDS))
+    return {'frames': frames, 'ticks': ticks, 'speech_frames': speech_frames,
+            'sent': sum(payload is not None for _c, _s, payload in sent) * speakers,
+            'lost': lost, 'played': played, 'audible_ticks': audible,
+            'underrun_ticks': plc_ticks, 'latencies': latencies}
+
+
+def run_benchmark(seconds=10.0, speakers=4, samples=None, use_vad=True, codec='auto',
+                  net_delay_ms=40.0, jitter_ms=15.0, loss=0.0, jitter_frames=3,
+                  allocations=True, include_cpu=True, seed=1, stereo=False):
+    """Run the pipeline and return a report dict (see format_report).
+
+    ``samples`` is int16 mono PCM at 16 kHz (default: ``seconds`` of
+    synthetic_speech). ``codec`` is 'auto' (Opus when opuslib is installed,
+    else raw PCM, as the client falls back), None for raw PCM, or an object
+    with ``encode_chunk``/``decode`` like OpusVoiceCodec.
+    """
+    if samples is None:
+        samples, _speech = synthetic_speech(seconds, seed=seed)
+    if codec == 'auto':
+        codec = _default_codec()
+    codec_name = 'pcm' if codec is None else type(codec).__name__
+    options = dict(speakers=speakers, use_vad=use_vad, codec=codec,
+                   net_delay_ms=net_delay_ms, jitter_ms=jitter_ms, loss=loss,
+                   jitter_frames=jitter_frames, seed=seed, include_cpu=include_cpu,
+                   stereo=stereo)
+
+    timer = StageTimer()
+    result = _run_pipeline(samples, timer, **options)
+
+    alloc_timer = None
+    if allocations:
+        # A second pass: tracemalloc slows every call down, so its times are
+        # not used. The codec keeps state, so it gets a fresh one.
+        if codec is not None and codec_name == 'OpusVoiceCodec':
+            options['codec'] = _default_codec()
+        alloc_timer = StageTimer(allocations=True)
+        tracemalloc.start()
+        try:
+            _run_pipeline(samples, alloc_timer, **options)
+        finally:
+            tracemalloc.stop()
+
+    frames = max(1, result['frames'])
+    stages = {}
+    for stage in STAGES:
+        calls = timer.wall[stage]
+        entry = {
+            'calls': len(calls),
+            'cpu_us_per_frame': timer.cpu[stage] / 1000.0 / frames,
+            'wall_us_mean': (sum(calls) / len(calls) / 1000.0) if calls else 0.0,
+            'wall_us_p95': _percentile(calls, 0.95) / 1000.0,
+            'wall_us_max': (max(calls) / 1000.0) if calls else 0.0,
+        }
+        if alloc_timer is not None:
+            peaks = alloc_timer.peak[stage]
+            entry['alloc_bytes_per_call'] = (sum(peaks) / len(peaks)) if peaks else 0.0
+            entry['retained_bytes'] = alloc_timer.retained[stage]
+        stages[stage] = entry
+
+    latencies = [value * 1000.0 for value in result.pop('latencies')]
+    total_cpu = sum(entry['cpu_us_per_frame'] for entry in stages.values())
+    result.update({
+        'seconds': result['frames'] * FRAME_SECONDS,
+        'speakers': speakers,
+        'codec': codec_name,
+        'vad': bool(use_vad),
+        'channels': 2 if stereo else 1,
+        'network': {'delay_ms': net_delay_ms, 'jitter_ms': jitter_ms, 'loss': loss},
+        'stages': stages,
+        'cpu_us_per_frame': total_cpu,
+        'budget_used': total_cpu / (FRAME_MS * 1000.0),
+        'latency_ms': {
+            'p50': _percentile(latencies, 0.5),
+            'p95': _percentile(latencies, 0.95),
+            'max': max(latencies) if latencies else 0.0,
+        },
+    })
+    return result
+
+
+def format_report(report):
+    """The report as a small text table."""
+    lines = [
+        f"{report['seconds']:.1f} s of audio, {report['speakers']} speaker(s), "
+        f"codec {report['codec']}, VAD {'on' if report['vad'] else 'off'}, "
+        f"{'stereo' if report['channels'] == 2 else 'mono'} mix",
+        f"{'stage':<10} {'calls':>7} {'cpu us/frame':>13} {'mean us':>9} "
+        f"{'p95 us':>9} {'max us':>9} {'alloc B/call':>13}",
+    ]
+    for stage, entry in report['stages'].items():
+        alloc = entry.get('alloc_bytes_per_call')
+        lines.append(
+            f"{stage:<10} {entry['calls']:>7} {entry['cpu_us_per_frame']:>13.1f} "
+            f"{entry['wall_us_mean']:>9.1f} {entry['wall_us_p95']:>9.1f} "
+            f"{entry['wall_us_max']:>9.1f} {'-' if alloc is None else f'{alloc:.0f}':>13}")
+    latency = report['latency_ms']
+    lines.append(f"total {report['cpu_us_per_frame']:.1f} us CPU per 20 ms frame "
+                 f"({report['budget_used'] * 100:.2f}% of the frame)")
+    lines.append(f"end-to-end latency p50 {latency['p50']:.1f} ms, p95 {latency['p95']:.1f} ms, "
+                 f"max {latency['max']:.1f} ms; {report['played']} frames played, "
+                 f"{report['lost']} lost, {report['underrun_ticks']} underruns")
+    return "\n".join(lines)
+
+
+def _score_vad(decisions, labels, scenes):
+    decisions = np.asarray(decisions, dtype=bool)
+    scenes = np.asarray(scenes)
+    scores = {}
+    for scene in ('all',) + tuple(dict.fromkeys(scenes.tolist())):
+        chosen = np.ones(len(labels), dtype=bool) if scene == 'all' else scenes == scene
+        said, truth = decisions[chosen], labels[chosen]
+        scores[scene] = {
+            'accuracy': float((said == truth).mean()),
+            'recall': float(said[truth].mean()) if truth.any() else 1.0,
+            'false_alarm': float(said[~truth].mean()) if (~truth).any() else 0.0,
+        }
+    return scores
+
+
+def run_vad_benchmark(seconds_per_scene=20.0, aggressiveness=0, lookaheads=(0, 2),
+                      block_frames=50, seed=0):
+    """Score the builtin VAD on vad_corpus and time it.
+
+    ``frame`` is Vad.is_speech called once per 20 ms frame, as the capture
+    thread does when it keeps up; ``block L<n>`` is a VadEngine with
+    lookahead n fed ``block_frames`` frames per push. CPU time is per second
+    of audio.
+    """
+    samples, labels, scenes = vad_corpus(seconds_per_scene, seed)
+    frames = len(labels)
+    audio_seconds = frames * FRAME_SECONDS
+    chunks = [samples[i * CHUNK_SAMPLES:(i + 1) * CHUNK_SAMPLES].tobytes() for i in range(frames)]
+    runs = {}
+
+    vad = Vad(aggressiveness)
+    started = time.process_time()
+    decisions = [vad.is_speech(chunk, SAMPLE_RATE) for chunk in chunks]
+    runs['frame'] = (decisions, time.process_time() - started)
+
+    block = block_frames * CHUNK_SAMPLES
+    for lookahead in lookaheads:
+        engine = VadEngine(aggressiveness, SAMPLE_RATE, FRAME_MS, lookahead=lookahead)
+        started = time.process_time()
+        decisions = []
+        for start in range(0, frames * CHUNK_SAMPLES, block):
+            decisions.extend(engine.push(samples[start:start + block]))
+        decisions.extend(engine.flush())
+        runs[f'block L{lookahead}'] = (decisions, time.process_time() - started)
+
+    return {
+        'seconds': audio_seconds,
+        'aggressiveness': aggressiveness,
+        'block_frames': block_frames,
+        'runs': {
+            name: {
+                'cpu_us_per_second': cpu / audio_seconds * 1e6,
+                'scores': _score_vad(decisions, labels, scenes),
+            }
+            for name, (decisions, cpu) in runs.items()
+        },
+    }
+
+
+def format_vad_report(report):
+    """The VAD report as a small text table: accuracy/recall/false alarms."""
+    runs = report['runs']
+    scenes = list(next(iter(runs.values()))['scores'])
+    lines = [
+        f"{report['seconds']:.1f} s of labelled audio, aggressiveness "
+        f"{report['aggressiveness']}, {report['block_frames']} frames per block",
+        f"{'run':<10} {'cpu us/s':>9} " + " ".join(f"{scene:>16}" for scene in scenes),
+    ]
+    for name, run in runs.items():
+        cells = " ".join(
+            f"{s['accuracy']:.2f}/{s['recall']:.2f}/{s['false_alarm']:.2f}".rjust(16)
+            for s in run['scores'].values())
+        lines.append(f"{name:<10} {run['cpu_us_per_second']:>9.0f} {cells}")
+    lines.append("cells are accuracy / speech caught / non-speech let through")
+    return "\n".join(lines)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the Titan-Net voice pipeline offline.")
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--speakers', type=int, default=4)
+    parser.add_argument('--wav', help="16-bit PCM WAV to use instead of synthetic speech")
+    parser.add_argument('--no-vad', action='store_true', help="continuous transmission")
+    parser.add_argument('--pcm', action='store_true', help="raw PCM even if Opus is available")
+    parser.add_argument('--delay', type=float, default=40.0, help="network delay, ms")
+    parser.add_argument('--jitter', type=float, default=15.0, help="network jitter, ms")
+    parser.add_argument('--loss', type=float, default=0.0, help="packet loss, 0..1")
+    parser.add_argument('--stereo', action='store_true', help="mix in stereo, speakers panned")
+    parser.add_argument('--no-alloc', action='store_true', help="skip the tracemalloc pass")
+    parser.add_argument('--vad', action='store_true',
+                        help="score the VAD on a labelled corpus instead")
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+    if args.vad:
+        report = run_vad_benchmark(seconds_per_scene=args.seconds)
+        print(json.dumps(report, indent=2) if args.json else format_vad_report(report))
+    else:
+        report = run_benchmark(seconds=args.seconds, speakers=args.speakers,
+                               samples=load_wav(args.wav) if args.wav else None,
+                               use_vad=not args.no_vad, codec=None if args.pcm else 'auto',
+                               net_delay_ms=args.delay, jitter_ms=args.jitter, loss=args.loss,
+                               allocations=not args.no_alloc, stereo=args.stereo)
+        print(json.dumps(report, indent=2) if args.json else format_report(report))
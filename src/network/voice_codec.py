@@ -3,11 +3,14 @@ Voice Codec Module for Titan-Net
 Handles Opus encoding/decoding and binary voice packet format.
 
 Binary packet format:
-  [1 byte]  packet_type (0x01 = voice_audio)
-  [4 bytes] room_id (uint32 big-endian)
+  [1 byte]  packet_type (0x01 = voice_audio, 0x02 = game_voice); the two
+            top bits may carry the sender's VAD verdict (0x80 = VAD ran,
+            0x40 = speech), sent only to servers announcing voice_flags
+  [4 bytes] room_id (uint32 big-endian; game session id for game_voice)
   [4 bytes] user_id (uint32 big-endian)
   [4 bytes] sequence_number (uint32 big-endian)
-  [N bytes] audio_data (Opus frame or raw PCM fallback)
+  [N bytes] audio_data (Opus frame or raw PCM fallback; game_voice is
+            always 16 kHz PCM, the AI game master takes nothing else)
   Total header: 13 bytes
 """
 
@@ -18,6 +21,10 @@ import sys
 import time
 
 VOICE_AUDIO_TYPE = 0x01
+GAME_VOICE_TYPE = 0x02
+VOICE_TYPE_MASK = 0x3F
+VOICE_FLAG_VAD = 0x80
+VOICE_FLAG_SPEECH = 0x40
 HEADER_SIZE = 13
 
 # Try to load Opus codec
@@ -57,9 +64,23 @@ except (ImportError, OSError, Exception):
     OPUS_AVAILABLE = False
 
 
-def pack_voice_packet(room_id: int, user_id: int, seq: int, audio_data: bytes) -> bytes:
-    """Pack voice audio into a binary packet"""
-    header = struct.pack('>BIII', VOICE_AUDIO_TYPE, room_id, user_id, seq)
+def pack_voice_packet(room_id: int, user_id: int, seq: int, audio_data: bytes,
+                      speech=None) -> bytes:
+    """Pack voice audio into a binary packet.
+
+    ``speech`` is the VAD verdict for this frame (None when VAD did not run);
+    the server relays the most active speakers and weighs frames by it.
+    """
+    packet_type = VOICE_AUDIO_TYPE
+    if speech is not None:
+        packet_type |= VOICE_FLAG_VAD | (VOICE_FLAG_SPEECH if speech else 0)
+    header = struct.pack('>BIII', packet_type, room_id, user_id, seq)
+    return header + audio_data
+
+
+def pack_game_voice_packet(game_session_id: int, user_id: int, seq: int, audio_data: bytes) -> bytes:
+    """Pack a game-session mic chunk into a binary packet"""
+    header = struct.pack('>BIII', GAME_VOICE_TYPE, game_session_id, user_id, seq)
     return header + audio_data
 
 
@@ -68,7 +89,7 @@ def unpack_voice_header(data: bytes):
     if len(data) < HEADER_SIZE:
         return None
     packet_type, room_id, user_id, seq = struct.unpack('>BIII', data[:HEADER_SIZE])
-    if packet_type != VOICE_AUDIO_TYPE:
+    if packet_type & VOICE_TYPE_MASK != VOICE_AUDIO_TYPE:
         return None
     return room_id, user_id, seq
 
@@ -0,0 +1,428 @@
+"""
+Voice Playback for Titan-Net voice chat
+Decodes received voice frames and mixes every speaker into one output frame.
+
+The receive path used to live inside the Titan-Net window (wx), which meant
+nothing could run it without a GUI and a sound card. The window still owns
+the sounddevice output stream and the mixer thread; what happens to a frame
+between the socket and that stream is here:
+
+  * ``VoiceFrameDecoder`` turns one received frame into 16 kHz int16 samples
+    (Opus or raw PCM, told apart by size) and conceals a missing frame with
+    Opus PLC, keeping one Opus decoder per sender.
+  * ``VoiceMixer`` holds a jitter queue per sender and, once per 20 ms tick,
+    takes one frame from each started sender, decodes it into one row of a
+    (speakers x 320) block and mixes the whole block at once: per-speaker
+    gain, stereo pan and ducking are one weight matrix, the sum is a single
+    matrix product, and the result is soft-clipped and handed to a sink.
+  * Sinks take the finished frames: ``StreamSink`` writes them to the
+    sounddevice output stream (its blocking write paces the mixer thread),
+    ``NullSink`` and ``MemorySink`` let the mixer run with no sound card.
+
+Only the queue pops and the decode are per speaker; everything that
+touches samples is done for all speakers in a handful of numpy calls, so a
+room of thirty costs little more than a room of three.
+"""
+
+import time
+from collections import deque
+
+import numpy as np
+
+CHUNK_SAMPLES = 320      # 20ms at 16000Hz (matches input - no resampling needed)
+CHUNK_BYTES = CHUNK_SAMPLES * 2
+MAX_PLC_FRAMES = 5       # Max consecutive PLC frames before giving up (100ms)
+
+# A 20ms mono frame at 16kHz is 640 bytes of raw PCM; an Opus frame at
+# 24kbps is roughly 60. The size is therefore what tells the two apart on
+# the wire, and it is the ONLY thing that may decide - a listener must not
+# judge an incoming frame by whether its own Opus support happens to be
+# installed. Doing that meant a listener without opuslib fed a compressed
+# frame straight into int16 PCM playback, which is a burst of noise instead
+# of the sender's voice.
+OPUS_FRAME_MAX_BYTES = 500
+
+# The mix is soft-clipped above this share of full scale: two loud speakers
+# at once are rounded off instead of squared off into a buzz.
+SOFT_CLIP_KNEE = 0.7
+# While a priority speaker (a moderator, an announcement) is talking every
+# other speaker is turned down to this gain (about -10 dB), and stays down
+# DUCK_HOLD_FRAMES after they last spoke so the pauses between their words
+# do not pump the room up and down.
+DUCK_GAIN = 0.3
+DUCK_HOLD_FRAMES = 10
+# Frames that trickle in after voice_stopped are not the start of the next
+# talk spurt: a queue that has sat this long without a new frame is dropped
+# when the sender starts talking again.
+STALE_FRAME_SECONDS = 0.3
+
+
+def _default_codec_factory():
+    """One Opus decoder for a sender, or None when Opus is unavailable."""
+    from src.network.voice_codec import OpusVoiceCodec, OPUS_AVAILABLE
+    if not OPUS_AVAILABLE:
+        return None
+    return OpusVoiceCodec(sample_rate=16000, channels=1, bitrate=24000, frame_duration_ms=20)
+
+
+class VoiceFrameDecoder:
+    """Decodes received voice frames, one Opus decoder per sender."""
+
+    def __init__(self, codec_factory=None):
+        self.codec_factory = codec_factory or _default_codec_factory
+        self.decoders = {}  # user_id -> OpusVoiceCodec (one decoder per sender)
+        self._opus_decode_error_logged = False
+        self._opus_missing_logged = False
+
+    def _decoder_for(self, user_id):
+        decoder = self.decoders.get(user_id)
+        if decoder is None:
+            decoder = self.codec_factory()
+            if decoder is not None:
+                self.decoders[user_id] = decoder
+        return decoder
+
+    def decode(self, audio_data: bytes, user_id=None):
+        """Decode one voice frame. Returns mono int16 numpy array at 16kHz."""
+        if not audio_data:
+            return None
+
+        try:
+            if len(audio_data) < OPUS_FRAME_MAX_BYTES:
+                # Compressed frame - it can only be played through Opus.
+                decoded = None
+                try:
+                    decoder = self._decoder_for(user_id)
+                    if decoder is not None:
+                        decoded = decoder.decode(audio_data)
+                except Exception as decode_err:
+                    decoded = None
+                    if not self._opus_decode_error_logged:
+                        self._opus_decode_error_logged = True
+                        print(f"[VOICE PLAYBACK] Opus decode failed: {decode_err}")
+
+                if not decoded:
+                    # Drop the frame rather than play compressed bytes as PCM.
+                    if not self._opus_missing_logged:
+                        self._opus_missing_logged = True
+                        print("[VOICE PLAYBACK] Opus frames received but Opus is "
+                              "unavailable - dropping them. Install opuslib to "
+                              "hear this speaker.")
+                    return None
+                audio_data = decoded
+
+            # Raw PCM path: an odd trailing byte would break int16 framing.
+            if len(audio_data) % 2:
+                audio_data = audio_data[:-1]
+
+            audio_array = np.frombuffer(audio_data, dtype=np.int16)
+            if len(audio_array) == 0:
+                return None
+
+            # Output stream runs at 16kHz - same as input, no resampling needed
+            return audio_array
+
+        except Exception as e:
+            print(f"[VOICE PLAYBACK] Error processing chunk: {e}")
+            return None
+
+    def plc(self, user_id):
+        """Generate Opus Packet Loss Concealment audio for a missing chunk.
+        Opus decoder generates a plausible continuation of the previous audio."""
+        try:
+            decoder = self.decoders.get(user_id)
+            if decoder:
+                # Opus PLC: decode with None input - decoder extrapolates from previous state
+                plc_pcm = decoder.decode(None)
+                return np.frombuffer(plc_pcm, dtype=np.int16)
+        except Exception:
+            pass
+        return None
+
+    def clear(self):
+        self.decoders.clear()
+
+
+class VoiceMixer:
+    """Jitter queues for every sender and the per-tick mix of them.
+
+    ``channels`` is 1 (the frame is 320 int16 samples) or 2 (320 x 2,
+    panned). Per speaker, ``set_gain`` scales them, ``set_pan`` places them
+    from 0.0 (left) through 0.5 (centre) to 1.0 (right) - the convention of
+    ``play_sound`` - and ``set_priority`` makes them duck everyone else.
+    Changes of gain, pan, ducking or volume are ramped across one frame so
+    they never click.
+    """
+
+    def __init__(self, decoder=None, jitter_frames=3, channels=1, sink=None,
+                 duck_gain=DUCK_GAIN, soft_clip=True):
+        self.decoder = decoder or VoiceFrameDecoder()
+        # Buffer 3 chunks (60ms) before mixing user in - good balance of latency vs smoothness
+        self.jitter_frames = jitter_frames
+        self.channels = 2 if channels == 2 else 1
+        self.sink = sink
+        self.duck_gain = duck_gain
+        self.soft_clip = soft_clip
+        # Deques rather than queue.Queue: append and popleft are atomic, so
+        # the receive thread and the mixer thread need no lock between them.
+        self.buffers = {}    # user_id -> deque of raw audio chunks
+        self.stopping = {}   # user_id -> stop flag
+        self.started = {}    # user_id -> True when jitter buffer filled
+        self.underruns = {}  # user_id -> consecutive underrun count
+        self.arrived = {}    # user_id -> time.monotonic() of the last frame
+        # Per-speaker settings; they outlive clear() and stop_user().
+        self.gains = {}      # user_id -> linear gain
+        self.pans = {}       # user_id -> 0.0 left .. 1.0 right
+        self.priority = set()
+        self.stats = {'ticks': 0, 'mixed_rows': 0, 'most_rows': 0,
+                      'soft_clipped': 0, 'ducked': 0}
+        self._block = np.zeros((8, CHUNK_SAMPLES), dtype=np.float32)
+        # Ends exactly on the new weights, where the next frame carries on.
+        self._ramp = np.arange(1, CHUNK_SAMPLES + 1, dtype=np.float32) / CHUNK_SAMPLES
+        self._last_rows = ()
+        self._last_weights = None
+        self._duck_hold = 0
+
+    # -- speakers ----------------------------------------------------------
+
+    def add(self, user_id, audio_data: bytes):
+        """Queue one received frame (thread-safe).
+
+        A sender that was stopped and sends again is talking again: they
+        rejoin once their jitter buffer has refilled. Late frames of their
+        last talk spurt still waiting in it then are dropped first.
+        """
+        now = time.monotonic()
+        buf = self.buffers.get(user_id)
+        if buf is None:
+            buf = self.buffers[user_id] = deque()
+        elif (buf and user_id not in self.started
+              and now - self.arrived.get(user_id, now) > STALE_FRAME_SECONDS):
+            buf.clear()
+        self.arrived[user_id] = now
+        if self.stopping.get(user_id, True):
+            self.stopping[user_id] = False
+        buf.append(audio_data)
+
+    def stop_user(self, user_id):
+        """The sender stopped talking: skip them and drop what is queued."""
+        if user_id in self.stopping:
+            self.stopping[user_id] = True
+        self.started.pop(user_id, None)
+        buf = self.buffers.get(user_id)
+        if buf is not None:
+            buf.clear()
+
+    def set_gain(self, user_id, gain):
+        self.gains[user_id] = max(0.0, float(gain))
+
+    def set_pan(self, user_id, pan):
+        self.pans[user_id] = max(0.0, min(1.0, float(pan)))
+
+    def set_priority(self, user_id, priority=True):
+        if priority:
+            self.priority.add(user_id)
+        else:
+            self.priority.discard(user_id)
+
+    def clear(self):
+        """Forget every queue and decoder (leaving the room); settings stay."""
+        self.buffers.clear()
+        self.stopping.clear()
+        self.started.clear()
+        self.underruns.clear()
+        self.arrived.clear()
+        self.decoder.clear()
+        self._last_rows = ()
+        self._last_weights = None
+        self._duck_hold = 0
+
+    # -- mixing ------------------------------------------------------------
+
+    def _gather(self, plc):
+        """This tick's frame of every speaker, as 640 bytes of PCM each.
+
+        Returns ``(rows, chunks)``: the user ids and their frames, in row
+        order. A raw PCM frame is taken as it arrived - the whole block is
+        converted in one call afterwards - so only Opus frames and PLC go
+        through the decoder one at a time.
+        """
+        rows = []
+        chunks = []
+        for user_id, buf in list(self.buffers.items()):
+            if self.stopping.get(user_id, False):
+                continue
+
+            # Wait for initial jitter buffer fill before reading this user
+            if user_id not in self.started:
+                if len(buf) >= self.jitter_frames:
+                    self.started[user_id] = True
+                else:
+                    continue
+
+            try:
+                raw_chunk = buf.popleft()
+            except IndexError:
+                # Buffer underrun - use Opus PLC if available
+                underruns = self.underruns.get(user_id, 0) + 1
+                self.underruns[user_id] = underruns
+                if not plc or underruns > MAX_PLC_FRAMES:
+                    continue
+                audio = self.decoder.plc(user_id)
+            else:
+                self.underruns[user_id] = 0  # Reset underrun counter
+                if len(raw_chunk) == CHUNK_BYTES:
+                    rows.append(user_id)
+                    chunks.append(raw_chunk)
+                    continue
+                audio = self.decoder.decode(raw_chunk, user_id=user_id)
+            if audio is None:
+                continue
+
+            pcm = audio[:CHUNK_SAMPLES].tobytes()
+            if len(pcm) < CHUNK_BYTES:
+                pcm += bytes(CHUNK_BYTES - len(pcm))
+            rows.append(user_id)
+            chunks.append(pcm)
+        return rows, chunks
+
+    def _weights(self, rows, volume):
+        """(speakers x channels) weights: gain, ducking, pan and volume."""
+        count = len(rows)
+        gains = np.fromiter((self.gains.get(u, 1.0) for u in rows), np.float32, count)
+        if self.priority:
+            priority = np.fromiter((u in self.priority for u in rows), bool, count)
+            if priority.any():
+                self._duck_hold = DUCK_HOLD_FRAMES
+            elif self._duck_hold:
+                self._duck_hold -= 1
+            if self._duck_hold:
+                gains[~priority] *= self.duck_gain
+                self.stats['ducked'] += 1
+        gains *= volume
+        if self.channels == 1:
+            return gains[:, None]
+        # Balance law: centre is full level on both sides (a mono voice is
+        # not quieter for being centred), hard left silences the right.
+        pans = np.fromiter((self.pans.get(u, 0.5) for u in rows), np.float32, count)
+        weights = np.empty((count, 2), dtype=np.float32)
+        np.minimum(2.0 - 2.0 * pans, 1.0, out=weights[:, 0])
+        np.minimum(2.0 * pans, 1.0, out=weights[:, 1])
+        weights *= gains[:, None]
+        return weights
+
+    def _previous_weights(self, rows, weights):
+        """Last tick's weights for the same speakers (the start of the ramp)."""
+        if rows == self._last_rows:
+            return self._last_weights
+        last = dict(zip(self._last_rows, self._last_weights)) if self._last_rows else {}
+        previous = weights.copy()
+        for row, user_id in enumerate(rows):
+            if user_id in last:
+                previous[row] = last[user_id]
+        return previous
+
+    def _limit(self, out):
+        """Soft-clip (or clip) the float mix in place."""
+        if not self.soft_clip:
+            np.clip(out, -32768, 32767, out=out)
+            return
+        knee = SOFT_CLIP_KNEE * 32767.0
+        if out.max() <= knee and out.min() >= -knee:
+            return
+        self.stats['soft_clipped'] += 1
+        magnitude = np.abs(out)
+        over = magnitude > knee
+        # Linear up to the knee, then a tanh curve that meets it with the
+        # same slope and approaches (never reaches) full scale.
+        span = 32767.0 - knee
+        out[over] = np.copysign(knee + span * np.tanh((magnitude[over] - knee) / span), out[over])
+
+    def _convert(self, chunks, block):
+        """Every row's 640 bytes of PCM into ``block``, in one call."""
+        block[...] = np.frombuffer(b''.join(chunks), dtype=np.int16).reshape(len(chunks), CHUNK_SAMPLES)
+        return block
+
+    def mix(self, volume=1.0, plc=False):
+        """One 20 ms output frame (int16) from every started sender: 320
+        samples, or 320 x 2 for a stereo mixer.
+
+        ``plc`` conceals a sender's missing frame with Opus PLC (at most
+        MAX_PLC_FRAMES in a row) instead of leaving them silent.
+        """
+        stats = self.stats
+        stats['ticks'] += 1
+        rows, chunks = self._gather(plc)
+        rows = tuple(rows)
+        count = len(rows)
+        if not count:
+            self._last_rows = ()
+            self._last_weights = None
+            if self._duck_hold:
+                self._duck_hold -= 1
+            shape = CHUNK_SAMPLES if self.channels == 1 else (CHUNK_SAMPLES, 2)
+            return np.zeros(shape, dtype=np.int16)
+        stats['mixed_rows'] += count
+        if count > stats['most_rows']:
+            stats['most_rows'] = count
+
+        if count > len(self._block):
+            self._block = np.zeros((2 * count, CHUNK_SAMPLES), dtype=np.float32)
+        block = self._convert(chunks, self._block[:count])
+        weights = self._weights(rows, volume)
+        previous = self._previous_weights(rows, weights)
+        out = weights.T @ block                          # channels x samples
+        if previous is not weights and previous.tobytes() != weights.tobytes():
+            out *= self._ramp
+            out += (previous.T @ block) * (1.0 - self._ramp)
+        self._last_rows = rows
+        self._last_weights = weights
+
+        self._limit(out)
+        if self.channels == 1:
+            return out[0].astype(np.int16)
+        return out.T.astype(np.int16)
+
+    def tick(self, volume=1.0, plc=False):
+        """Mix one frame and write it to the sink. Returns the frame."""
+        frame = self.mix(volume, plc)
+        if self.sink is not None:
+            self.sink.write(frame)
+        return frame
+
+
+class StreamSink:
+    """Frames to a sounddevice OutputStream. The write blocks until the
+    device has taken the previous block, which is what paces the mixer."""
+
+    def __init__(self, stream, channels=1):
+        self.stream = stream
+        self.channels = channels
+
+    def write(self, frame):
+        self.stream.write(frame.reshape(-1, self.channels))
+
+
+class NullSink:
+    """Discards frames (a mixer with no sound card); counts them."""
+
+    def __init__(self):
+        self.frames = 0
+
+    def write(self, frame):
+        self.frames += 1
+
+
+class MemorySink:
+    """Keeps the last ``maxlen`` frames, for tests and offline runs."""
+
+    def __init__(self, maxlen=None):
+        self.frames = deque(maxlen=maxlen)
+
+    def write(self, frame):
+        self.frames.append(frame)
+
+    def samples(self):
+        if not self.frames:
+            return np.zeros(0, dtype=np.int16)
+        return np.concatenate(list(self.frames))
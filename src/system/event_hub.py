@@ -0,0 +1,446 @@
+"""
+System event hub - the one place Titan's system monitors get events from.
+
+The charger, volume and network monitors (system_monitor.py), the process
+and window sounds (tsounds.py) and the notification center's network watch
+each used to run a thread that slept and polled: 10 wakeups a second for
+the window sounds, 5 for the volume, one a second each for the battery and
+the network. An idle laptop running Titan woke up nearly 20 times a second
+to find that nothing had changed.
+
+Now a monitor *watches a topic*:
+
+    unwatch = hub.watch('audio.volume', read_volume, on_volume,
+                        interval=0.2, max_interval=1.0)
+
+and its callback gets ``(topic, old, new)`` when the value changes. How the
+value is obtained is up to the platform backend. Topics a backend can
+deliver as real events (the foreground window on Windows, through
+SetWinEventHook) are pushed by it and never polled. Everything else is
+polled from one shared timer thread that sleeps until the next source is
+due. The polling is adaptive: each poll that sees no change stretches that
+source's interval (times ``backoff``, up to ``max_interval``), and a change
+snaps it back to ``interval``, so a quiet system is polled at the slow end
+and a changing value is followed closely.
+
+The first value of a source is taken as the starting point and not
+reported, as the monitors always did; ``watch()`` returns before it is
+read, so a monitor that must act on the current state reads it itself. A
+poll returning None means "could not tell" and is not a change.
+
+A poll that can block - one that runs netsh, pactl or osascript - is
+watched with ``blocking=True``: it runs on a thread of its own, which the
+timer only wakes, so a slow read never holds up the other sources.
+
+``stats()`` counts timer wakeups, polls and events per source; it is what
+to look at before and after touching any of this. ``FakeBackend`` stands in
+for the platform in tests: values are set by hand and ``run_due()`` steps
+the timer without a thread.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+
+from src.platform_utils import IS_WINDOWS
+
+
+class _Source:
+    """A polled topic."""
+
+    def __init__(self, topic, poll, interval, max_interval, backoff, blocking=False):
+        self.topic = topic
+        self.poll = poll
+        self.blocking = blocking
+        self.worker = None           # the blocking source's own thread
+        self.wake = threading.Event()
+        self.base = float(interval)
+        self.max_interval = max(self.base, float(max_interval or interval))
+        self.backoff = max(1.0, float(backoff))
+        self.interval = self.base
+        self.value = None
+        self.primed = False
+        self.seq = 0
+        self.polls = 0
+        self.errors = 0
+
+
+class PollingBackend:
+    """Polls everything; the fallback on every platform."""
+
+    name = 'polling'
+    topics = frozenset()      # topics this backend pushes itself
+
+    def start(self, hub):
+        self.hub = hub
+
+    def stop(self):
+        pass
+
+    def provides(self, topic):
+        return topic in self.topics
+
+
+class WindowsBackend(PollingBackend):
+    """Pushes ``window.foreground`` from a WinEvent hook instead of polling.
+
+    The hook needs a thread with a message loop; it is started with the
+    backend (on the hub's first watch) and quits on stop. If the hook
+    cannot be set, the topic falls back to polling.
+    """
+
+    name = 'windows'
+    EVENT_SYSTEM_FOREGROUND = 0x0003
+    WINEVENT_OUTOFCONTEXT = 0x0000
+    WM_QUIT = 0x0012
+
+    def __init__(self):
+        self.topics = frozenset()
+        self._thread = None
+        self._thread_id = None
+        self._ready = threading.Event()
+        self._last = None
+
+    def start(self, hub):
+        super().start(hub)
+        self._thread = threading.Thread(target=self._hook_loop, daemon=True,
+                                        name="SystemEventHook")
+        self._thread.start()
+        self._ready.wait(2.0)
+
+    def _hook_loop(self):
+        try:
+            import ctypes
+            from ctypes import wintypes
+            user32 = ctypes.windll.user32
+            kernel32 = ctypes.windll.kernel32
+            proc_type = ctypes.WINFUNCTYPE(
+                None, wintypes.HANDLE, wintypes.DWORD, wintypes.HWND,
+                wintypes.LONG, wintypes.LONG, wintypes.DWORD, wintypes.DWORD)
+
+            def on_event(_hook, _event, hwnd, _obj, _child, _thread, _time):
+                hwnd = int(hwnd or 0)
+                if hwnd and hwnd != self._last:
+                    old, self._last = self._last, hwnd
+                    self.hub.publish('window.foreground', old, hwnd)
+
+            self._proc = proc_type(on_event)   # keep the callback alive
+            hook = user32.SetWinEventHook(
+                self.EVENT_SYSTEM_FOREGROUND, self.EVENT_SYSTEM_FOREGROUND,
+                0, self._proc, 0, 0, self.WINEVENT_OUTOFCONTEXT)
+            if not hook:
+                raise OSError("SetWinEventHook failed")
+            self._last = int(user32.GetForegroundWindow() or 0) or None
+            self._thread_id = kernel32.GetCurrentThreadId()
+            self.topics = frozenset({'window.foreground'})
+        except Exception as e:
+            print(f"[EventHub] Foreground hook unavailable, polling instead: {e}")
+            self._ready.set()
+            return
+        self._ready.set()
+        msg = wintypes.MSG()
+        while user32.GetMessageW(ctypes.byref(msg), 0, 0, 0) > 0:
+            user32.TranslateMessage(ctypes.byref(msg))
+            user32.DispatchMessageW(ctypes.byref(msg))
+        user32.UnhookWinEvent(hook)
+
+    def current(self, topic):
+        return self._last if topic == 'window.foreground' else None
+
+    def stop(self):
+        if self._thread_id:
+            try:
+                import ctypes
+                ctypes.windll.user32.PostThreadMessageW(self._thread_id, self.WM_QUIT, 0, 0)
+            except Exception:
+                pass
+        self.topics = frozenset()
+        self._thread_id = None
+
+
+class FakeBackend(PollingBackend):
+    """A platform made of a dict, for tests.
+
+    ``poller(topic)`` is a poll function reading ``values[topic]``; ``push``
+    publishes an event as a push backend would for ``pushed`` topics.
+    """
+
+    name = 'fake'
+
+    def __init__(self, pushed=()):
+        self.topics = frozenset(pushed)
+        self.values = {}
+        self.reads = {}
+
+    def poller(self, topic):
+        def poll():
+            self.reads[topic] = self.reads.get(topic, 0) + 1
+            return self.values.get(topic)
+        return poll
+
+    def set(self, topic, value):
+        self.values[topic] = value
+
+    def push(self, topic, old, new):
+        self.hub.publish(topic, old, new)
+
+
+def default_backend():
+    return WindowsBackend() if IS_WINDOWS else PollingBackend()
+
+
+class SystemEventHub:
+    """Subscribers, polled sources and the shared timer that drives them."""
+
+    def __init__(self, backend=None, clock=time.monotonic):
+        self.backend = backend if backend is not None else default_backend()
+        self.clock = clock
+        self._lock = threading.Condition()
+        self._subscribers = {}          # topic -> [callback]
+        self._sources = {}              # topic -> _Source
+        self._heap = []                 # (due, n, topic, seq)
+        self._counter = itertools.count()
+        self._thread = None
+        self._running = False
+        self._backend_started = False
+        self.wakeups = 0
+        self.events = {}
+
+    # ------------------------------------------------------------------
+    # Subscribing
+    # ------------------------------------------------------------------
+
+    def subscribe(self, topic, callback):
+        """Call ``callback(topic, old, new)`` for every change of ``topic``.
+
+        Returns a function that undoes the subscription.
+        """
+        with self._lock:
+            self._subscribers.setdefault(topic, []).append(callback)
+
+        def unsubscribe():
+            with self._lock:
+                callbacks = self._subscribers.get(topic, [])
+                if callback in callbacks:
+                    callbacks.remove(callback)
+                if not callbacks:
+                    self._subscribers.pop(topic, None)
+                    source = self._sources.pop(topic, None)
+                    if source is not None:
+                        source.wake.set()    # lets its worker thread end
+        return unsubscribe
+
+    def watch(self, topic, poll, callback, interval, max_interval=None,
+              backoff=2.0, initial_delay=0.0, blocking=False):
+        """Subscribe to ``topic``, polling it with ``poll`` unless the
+        backend pushes it. The first watcher's poll settings win.
+
+        ``blocking`` polls run on their own thread, not the shared timer's.
+        """
+        self._ensure_backend()
+        unsubscribe = self.subscribe(topic, callback)
+        if not self.backend.provides(topic):
+            with self._lock:
+                if topic not in self._sources:
+                    source = _Source(topic, poll, interval, max_interval, backoff,
+                                     blocking)
+                    self._sources[topic] = source
+                    self._schedule(source, self.clock() + initial_delay)
+        return unsubscribe
+
+    def publish(self, topic, old, new):
+        """Deliver a change to the subscribers of ``topic`` (any thread)."""
+        with self._lock:
+            callbacks = list(self._subscribers.get(topic, ()))
+            self.events[topic] = self.events.get(topic, 0) + 1
+        for callback in callbacks:
+            try:
+                callback(topic, old, new)
+            except Exception as e:
+                print(f"[EventHub] Subscriber of '{topic}' failed: {e}")
+
+    def value(self, topic):
+        """The last value seen for a topic (None if unknown)."""
+        with self._lock:
+            source = self._sources.get(topic)
+        if source is not None:
+            return source.value
+        current = getattr(self.backend, 'current', None)
+        return current(topic) if current else None
+
+    def poke(self, topic):
+        """Poll ``topic`` now at its base rate (something suggests it changed)."""
+        with self._lock:
+            source = self._sources.get(topic)
+            if source is not None:
+                source.interval = source.base
+                self._schedule(source, self.clock())
+
+    # ------------------------------------------------------------------
+    # The shared timer
+    # ------------------------------------------------------------------
+
+    def _schedule(self, source, due):
+        """Queue the next poll of ``source`` (caller holds the lock)."""
+        source.seq += 1
+        n = next(self._counter)
+        heapq.heappush(self._heap, (due, n, source.topic, source.seq))
+        if self._heap[0][1] == n:
+            # Only a new earliest entry changes how long the timer sleeps.
+            self._lock.notify()
+
+    def _ensure_backend(self):
+        with self._lock:
+            if self._backend_started:
+                return
+            self._backend_started = True
+        try:
+            self.backend.start(self)
+        except Exception as e:
+            print(f"[EventHub] Backend '{self.backend.name}' failed to start: {e}")
+
+    def run_due(self, now=None):
+        """Poll every source that is due at ``now``; return how many were.
+
+        With the timer thread running, blocking sources are only woken here
+        and poll on their own threads; without it (tests stepping the hub by
+        hand) everything is polled inline.
+        """
+        now = self.clock() if now is None else now
+        due = []
+        with self._lock:
+            running = self._running
+            while self._heap and self._heap[0][0] <= now:
+                _when, _n, topic, seq = heapq.heappop(self._heap)
+                source = self._sources.get(topic)
+                if source is not None and source.seq == seq:
+                    due.append(source)
+        for source in due:
+            if source.blocking and running:
+                self._wake_worker(source)
+            else:
+                self._poll(source, now)
+        return len(due)
+
+    def _wake_worker(self, source):
+        if source.worker is None or not source.worker.is_alive():
+            source.worker = threading.Thread(target=self._worker_loop, args=(source,),
+                                             daemon=True,
+                                             name=f"SystemEventHub:{source.topic}")
+            source.worker.start()
+        source.wake.set()
+
+    def _worker_loop(self, source):
+        while True:
+            source.wake.wait()
+            source.wake.clear()
+            with self._lock:
+                if not self._running or self._sources.get(source.topic) is not source:
+                    return
+            # The next poll is scheduled from when this one finished.
+            self._poll(source, None)
+
+    def _poll(self, source, now):
+        changed = False
+        old = source.value
+        try:
+            value = source.poll()
+        except Exception as e:
+            source.errors += 1
+            if source.errors in (1, 10, 100):
+                print(f"[EventHub] Polling '{source.topic}' failed ({source.errors}x): {e}")
+            value = None
+        if now is None:
+            now = self.clock()
+        source.polls += 1
+        if value is not None:
+            if not source.primed:
+                source.primed = True
+                source.value = value
+            elif value != old:
+                source.value = value
+                changed = True
+        with self._lock:
+            if self._sources.get(source.topic) is not source:
+                return                       # unwatched while polling
+            if changed:
+                source.interval = source.base
+            else:
+                source.interval = min(source.max_interval, source.interval * source.backoff)
+            self._schedule(source, now + source.interval)
+        if changed:
+            self.publish(source.topic, old, value)
+
+    def start(self):
+        """Run the shared timer thread."""
+        self._ensure_backend()
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._timer_loop, daemon=True,
+                                        name="SystemEventHub")
+        self._thread.start()
+
+    def _timer_loop(self):
+        while True:
+            with self._lock:
+                if not self._running:
+                    return
+                if self._heap:
+                    delay = self._heap[0][0] - self.clock()
+                    if delay > 0:
+                        self._lock.wait(delay)
+                else:
+                    self._lock.wait()
+                if not self._running:
+                    return
+                self.wakeups += 1
+            self.run_due()
+
+    def stop(self):
+        with self._lock:
+            self._running = False
+            self._lock.notify_all()
+            for source in self._sources.values():
+                source.wake.set()
+        try:
+            self.backend.stop()
+        except Exception:
+            pass
+        with self._lock:
+            self._backend_started = False
+
+    def stats(self):
+        """Wakeups of the timer, and polls / events / interval per topic."""
+        with self._lock:
+            topics = set(self._sources) | set(self._subscribers) | set(self.events)
+            return {
+                'backend': self.backend.name,
+                'wakeups': self.wakeups,
+                'topics': {
+                    topic: {
+                        'polled': topic in self._sources,
+                        'polls': self._sources[topic].polls if topic in self._sources else 0,
+                        'errors': self._sources[topic].errors if topic in self._sources else 0,
+                        'interval': self._sources[topic].interval if topic in self._sources else None,
+                        'events': self.events.get(topic, 0),
+                        'subscribers': len(self._subscribers.get(topic, ())),
+                    } for topic in sorted(topics)
+                },
+            }
+
+
+_hub = None
+_hub_lock = threading.Lock()
+
+
+def get_hub():
+    """The hub all of Titan's monitors share, started on first use."""
+    global _hub
+    with _hub_lock:
+        if _hub is None:
+            _hub = SystemEventHub()
+            _hub.start()
+        return _hub
@@ -32,7 +32,7 @@ except ImportError:
 
 # Import stereo speech functionality
 try:
-    from src.titan_core.stereo_speech import speak_stereo
+    from src.titan_core.stereo_speech import speak_stereo, prefetch_stereo
     STEREO_SPEECH_AVAILABLE = True
 except ImportError:
     STEREO_SPEECH_AVAILABLE = False
@@ -120,6 +120,37 @@ def speak_klango(text, position=0.0, pitch_offset=0, interrupt=True, elevation=0
         except:
             pass
 
+
+def prefetch_menu_speech(menu, index, menu_stack=()):
+    """
+    Render in the background what one more key press would speak.
+
+    Previous and next item, the first item of a submenu (announced with
+    pitch +30, or level pitch in 3D) and the parent item going back (pitch
+    -30). Only the stereo speech path renders to memory, so with the plain
+    screen-reader output there is nothing to prepare.
+    """
+    try:
+        if not STEREO_SPEECH_AVAILABLE or not menu or not (0 <= index < len(menu)):
+            return
+        if get_setting('stereo_speech', 'False', section='invisible_interface').lower() != 'true':
+            return
+        expand_pitch, collapse_pitch = (0, 0) if is_3d_enabled() else (30, -30)
+        items = []
+        for neighbour in (index + 1, index - 1):
+            if 0 <= neighbour < len(menu):
+                items.append((menu[neighbour].get("name"), 0))
+        current = menu[index]
+        if current.get("type") == "submenu" and current.get("items"):
+            items.append((current["items"][0].get("name"), expand_pitch))
+        if menu_stack:
+            parent = menu_stack[-1]
+            if 0 <= parent["item"] < len(parent["menu"]):
+                items.append((parent["menu"][parent["item"]].get("name"), collapse_pitch))
+        prefetch_stereo(items)
+    except Exception as e:
+        print(f"Error prefetching menu speech: {e}")
+
 class KlangoMode:
     def __init__(self, version):
         """Initialize Klango Mode interface."""
@@ -597,6 +628,7 @@ class KlangoMode:
             else:
                 stereo_position = 0.0
             speak_klango(self.current_menu[self.current_item]["name"], position=stereo_position, pitch_offset=0, interrupt=True)
+            prefetch_menu_speech(self.current_menu, self.current_item, self.menu_stack)
     
     def navigate_left(self):
         """Navigate left (previous item) in the menu."""
@@ -622,6 +654,7 @@ class KlangoMode:
                     speak_klango(item_name, position=stereo_position, pitch_offset=0, interrupt=True)
                 else:
                     speak_klango(item_name, position=0.0, pitch_offset=0, interrupt=True)
+                prefetch_menu_speech(self.current_menu, self.current_item, self.menu_stack)
             else:
                 # At beginning - play boundary sound
                 play_sound("ui/endoflist.ogg")
@@ -651,6 +684,7 @@ class KlangoMode:
                     speak_klango(item_name, position=stereo_position, pitch_offset=0, interrupt=True)
                 else:
                     speak_klango(item_name, position=0.0, pitch_offset=0, interrupt=True)
+                prefetch_menu_speech(self.current_menu, self.current_item, self.menu_stack)
             else:
                 # At end - play boundary sound
                 play_sound("ui/endoflist.ogg")
@@ -741,6 +775,7 @@ class KlangoMode:
             speak_klango(first_item_name, position=stereo_position, pitch_offset=0, interrupt=True, elevation=0.6)
         else:
             speak_klango(first_item_name, position=stereo_position, pitch_offset=30, interrupt=True)
+        prefetch_menu_speech(self.current_menu, self.current_item, self.menu_stack)
     
     def close_menu(self):
         """Close current menu or submenu."""
@@ -763,6 +798,7 @@ class KlangoMode:
                 speak_klango(self.current_menu[self.current_item]["name"], position=stereo_position, pitch_offset=0, interrupt=True, elevation=-0.6)
             else:
                 speak_klango(self.current_menu[self.current_item]["name"], position=stereo_position, pitch_offset=-30, interrupt=True)
+            prefetch_menu_speech(self.current_menu, self.current_item, self.menu_stack)
         else:
             # Close main menu
             self.menu_open = False
@@ -1209,6 +1245,7 @@ class KlangoMode:
             else:
                 stereo_position = 0.0
             speak_klango(self.current_menu[self.current_item]["name"], position=stereo_position, pitch_offset=0, interrupt=True)
+            prefetch_menu_speech(self.current_menu, self.current_item, self.menu_stack)
     
     def announce_time(self):
         """Announce current time."""
@@ -1775,6 +1812,7 @@ class KlangoFrame(wx.Frame):
             else:
                 stereo_position = 0.0
             speak_klango(self.current_menu[self.current_item]["name"], position=stereo_position, pitch_offset=0, interrupt=True)
+            prefetch_menu_speech(self.current_menu, self.current_item, self.menu_stack)
     
     def navigate_left(self):
         """Navigate left (previous item) in the menu."""
@@ -1800,6 +1838,7 @@ class KlangoFrame(wx.Frame):
                     speak_klango(item_name, position=stereo_position, pitch_offset=0, interrupt=True)
                 else:
                     speak_klango(item_name, position=0.0, pitch_offset=0, interrupt=True)
+                prefetch_menu_speech(self.current_menu, self.current_item, self.menu_stack)
             else:
                 # At beginning - play boundary sound
                 play_sound("ui/endoflist.ogg")
@@ -1829,6 +1868,7 @@ class KlangoFrame(wx.Frame):
                     speak_klango(item_name, position=stereo_position, pitch_offset=0, interrupt=True)
                 else:
                     speak_klango(item_name, position=0.0, pitch_offset=0, interrupt=True)
+                prefetch_menu_speech(self.current_menu, self.current_item, self.menu_stack)
             else:
                 # At end - play boundary sound
                 play_sound("ui/endoflist.ogg")
@@ -1910,6 +1950,7 @@ class KlangoFrame(wx.Frame):
             speak_klango(first_item_name, position=stereo_position, pitch_offset=0, interrupt=True, elevation=0.6)
         else:
             speak_klango(first_item_name, position=stereo_position, pitch_offset=30, interrupt=True)
+        prefetch_menu_speech(self.current_menu, self.current_item, self.menu_stack)
     
     def close_menu(self):
         """Close current menu or submenu."""
@@ -1932,6 +1973,7 @@ class KlangoFrame(wx.Frame):
                 speak_klango(self.current_menu[self.current_item]["name"], position=stereo_position, pitch_offset=0, interrupt=True, elevation=-0.6)
             else:
                 speak_klango(self.current_menu[self.current_item]["name"], position=stereo_position, pitch_offset=-30, interrupt=True)
+            prefetch_menu_speech(self.current_menu, self.current_item, self.menu_stack)
         else:
             # Close main menu
             self.menu_open = False
@@ -2378,6 +2420,7 @@ class KlangoFrame(wx.Frame):
             else:
                 stereo_position = 0.0
             speak_klango(self.current_menu[self.current_item]["name"], position=stereo_position, pitch_offset=0, interrupt=True)
+            prefetch_menu_speech(self.current_menu, self.current_item, self.menu_stack)
     
     def announce_time(self):
         """Announce current time."""
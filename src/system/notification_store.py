@@ -0,0 +1,396 @@
+"""
+Notification store - the history behind the notification center.
+
+Notifications used to be appended to ``bg5notifications.tno`` as INI-like
+blocks, and opening the notification center parsed the whole file and
+reversed it. That is years of entries for someone who keeps Titan running,
+read in full every time Windows+N is pressed.
+
+The store keeps two files in ``<user data>/notifications/``:
+
+    log.jsonl   one JSON object per line: date, time, appname, content
+    log.idx     one 16-byte record per line: offset, length, crc32 of appname
+
+Both are append-only. The newest N notifications are the last N index
+records, so a page costs one small read of the index and one read of the
+log, whatever the size of the history. Filtering by application compares
+the crc32 in the index and reads only the lines that match.
+
+Appends are crash-safe: the line goes to the log in one write (and is
+flushed to disk) before its index record. On open, a half-written last
+line is cut off, index records missing after a crash are rebuilt from the
+log tail, and an index that does not fit the log is rebuilt from scratch.
+
+Retention: at most ``keep_entries`` notifications (and, if set, none older
+than ``keep_days``). The oldest are dropped by rewriting both files once
+the history is a tenth over the limit, so trimming is rare and never costs
+more than one pass over what is kept.
+
+``bg5notifications.tno`` is still read. The first open imports it
+(migration), and the store remembers how many bytes it has taken, so
+anything another program appends there later (tDownloader writes it
+directly) is picked up on the next read without re-reading the rest.
+"""
+
+import json
+import os
+import struct
+import threading
+import zlib
+from datetime import datetime, timedelta
+
+_RECORD = struct.Struct('<QII')      # offset, length, crc32(appname)
+_CHUNK = 4096                        # index records read at once when filtering
+DEFAULT_KEEP_ENTRIES = 10000
+
+
+def _app_hash(appname):
+    return zlib.crc32((appname or '').encode('utf-8'))
+
+
+def parse_legacy(text):
+    """Entries of a bg5notifications.tno fragment, oldest first."""
+    entries = []
+    current = None
+    for line in text.split('\n'):
+        if line.strip() == 'notification':
+            current = {'date': '', 'time': '', 'appname': '', 'content': ''}
+            entries.append(current)
+        elif current is not None and '=' in line:
+            key, value = line.split('=', 1)
+            key = key.strip()
+            if key in current:
+                current[key] = value
+    return entries
+
+
+class NotificationStore:
+    """Append-only notification log with an offset index."""
+
+    def __init__(self, directory, legacy_path=None,
+                 keep_entries=DEFAULT_KEEP_ENTRIES, keep_days=None):
+        self.directory = directory
+        self.legacy_path = legacy_path
+        self.keep_entries = keep_entries
+        self.keep_days = keep_days
+        self.log_path = os.path.join(directory, 'log.jsonl')
+        self.index_path = os.path.join(directory, 'log.idx')
+        self.state_path = os.path.join(directory, 'state.json')
+        self._lock = threading.RLock()
+        self._opened = False
+        self._count = 0
+        self._log_end = 0
+        self._legacy_offset = 0
+
+    # ------------------------------------------------------------------
+    # Opening and recovery
+    # ------------------------------------------------------------------
+
+    def _open(self):
+        if self._opened:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        for path in (self.log_path, self.index_path):
+            if not os.path.exists(path):
+                open(path, 'ab').close()
+        self._load_state()
+        self._recover()
+        self._opened = True
+        self._enforce_retention(force_age_check=True)
+
+    def _load_state(self):
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                self._legacy_offset = int(json.load(f).get('legacy_offset', 0))
+        except (OSError, ValueError, AttributeError):
+            self._legacy_offset = 0
+
+    def _save_state(self):
+        tmp = self.state_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'legacy_offset': self._legacy_offset}, f)
+        os.replace(tmp, self.state_path)
+
+    def _recover(self):
+        """Make the index describe every complete line of the log."""
+        log_size = os.path.getsize(self.log_path)
+        index_size = os.path.getsize(self.index_path)
+        if index_size % _RECORD.size:
+            index_size -= index_size % _RECORD.size
+            with open(self.index_path, 'r+b') as f:
+                f.truncate(index_size)
+        count = index_size // _RECORD.size
+        indexed_end = 0
+        if count:
+            with open(self.index_path, 'rb') as f:
+                f.seek(index_size - _RECORD.size)
+                offset, length, _crc = _RECORD.unpack(f.read(_RECORD.size))
+            indexed_end = offset + length
+            if indexed_end > log_size or not self._line_ok(offset, length):
+                print("[NotificationStore] Index does not match the log; rebuilding")
+                with open(self.index_path, 'wb'):
+                    pass
+                count, indexed_end = 0, 0
+        self._count = count
+        self._log_end = indexed_end
+        if indexed_end < log_size:
+            self._index_tail(indexed_end, log_size)
+
+    def _line_ok(self, offset, length):
+        try:
+            with open(self.log_path, 'rb') as f:
+                f.seek(offset)
+                line = f.read(length)
+            return line.endswith(b'\n') and isinstance(json.loads(line), dict)
+        except (OSError, ValueError):
+            return False
+
+    def _index_tail(self, start, end):
+        """Index the complete lines in log[start:end]; cut off a torn last line."""
+        records = []
+        pos = start
+        with open(self.log_path, 'rb') as f:
+            f.seek(start)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break
+                records.append(_RECORD.pack(pos, len(line), _app_hash(entry.get('appname'))))
+                pos += len(line)
+        if pos < end:
+            print(f"[NotificationStore] Dropping {end - pos} bytes of a torn write")
+            with open(self.log_path, 'r+b') as f:
+                f.truncate(pos)
+        if records:
+            with open(self.index_path, 'ab') as f:
+                f.write(b''.join(records))
+        self._count += len(records)
+        self._log_end = pos
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+
+    def append(self, date, time, appname, content):
+        with self._lock:
+            self._open()
+            self._append_entries([{'date': date, 'time': time,
+                                   'appname': appname, 'content': content}])
+            self._enforce_retention()
+
+    def extend(self, entries):
+        """Append several notifications (dicts like the ones page() returns)."""
+        with self._lock:
+            self._open()
+            self._append_entries(list(entries))
+            self._enforce_retention()
+
+    def _append_entries(self, entries):
+        lines = [(json.dumps({'date': str(e.get('date', '')), 'time': str(e.get('time', '')),
+                              'appname': str(e.get('appname', '')),
+                              'content': str(e.get('content', ''))},
+                             ensure_ascii=False) + '\n').encode('utf-8')
+                 for e in entries]
+        if not lines:
+            return
+        records = []
+        pos = self._log_end
+        for line, entry in zip(lines, entries):
+            records.append(_RECORD.pack(pos, len(line), _app_hash(str(entry.get('appname', '')))))
+            pos += len(line)
+        with open(self.log_path, 'ab') as f:
+            f.write(b''.join(lines))
+            f.flush()
+            os.fsync(f.fileno())
+        with open(self.index_path, 'ab') as f:
+            f.write(b''.join(records))
+        self._count += len(records)
+        self._log_end = pos
+
+    def clear(self):
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            for path in (self.log_path, self.index_path):
+                with open(path, 'wb'):
+                    pass
+            self._count = 0
+            self._log_end = 0
+            if self.legacy_path and os.path.exists(self.legacy_path):
+                with open(self.legacy_path, 'w', encoding='utf-8'):
+                    pass
+            self._legacy_offset = 0
+            self._save_state()
+            self._opened = True
+
+    # ------------------------------------------------------------------
+    # The legacy file
+    # ------------------------------------------------------------------
+
+    def _ingest_legacy(self):
+        """Import what was appended to bg5notifications.tno since last time."""
+        if not self.legacy_path:
+            return
+        try:
+            size = os.path.getsize(self.legacy_path)
+        except OSError:
+            return
+        if size < self._legacy_offset:
+            self._legacy_offset = 0          # cleared or replaced by someone else
+        if size == self._legacy_offset:
+            return
+        with open(self.legacy_path, 'rb') as f:
+            f.seek(self._legacy_offset)
+            data = f.read(size - self._legacy_offset)
+        # Blocks end with a blank line; one still being written is left for later.
+        complete = data.rfind(b'\n\n')
+        if complete < 0:
+            return
+        entries = parse_legacy(data[:complete + 2].decode('utf-8', errors='replace'))
+        self._append_entries(entries)
+        self._legacy_offset += complete + 2
+        self._save_state()
+        if entries:
+            print(f"[NotificationStore] Imported {len(entries)} notification(s) "
+                  f"from {os.path.basename(self.legacy_path)}")
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+
+    def _refresh(self):
+        self._open()
+        self._ingest_legacy()
+        self._enforce_retention()
+
+    def count(self):
+        with self._lock:
+            self._refresh()
+            return self._count
+
+    def page(self, start=0, limit=100, appname=None):
+        """Notifications newest first: ``limit`` of them, skipping ``start``.
+
+        With ``appname`` only that application's notifications are counted
+        and returned.
+        """
+        with self._lock:
+            self._refresh()
+            if appname is None:
+                last = self._count - start
+                first = max(0, last - limit)
+                if last <= 0 or limit <= 0:
+                    return []
+                records = self._records(first, last)
+                records.reverse()
+            else:
+                records = self._matching(start, limit, appname)
+            return self._read_lines(records, appname)
+
+    def _records(self, first, last):
+        with open(self.index_path, 'rb') as f:
+            f.seek(first * _RECORD.size)
+            data = f.read((last - first) * _RECORD.size)
+        return [_RECORD.unpack_from(data, i) for i in range(0, len(data), _RECORD.size)]
+
+    def _matching(self, start, limit, appname):
+        """Index records of ``appname``, newest first, walking back in chunks."""
+        wanted = _app_hash(appname)
+        found = []
+        skipped = 0
+        last = self._count
+        while last > 0 and len(found) < limit:
+            first = max(0, last - _CHUNK)
+            for record in reversed(self._records(first, last)):
+                if record[2] != wanted:
+                    continue
+                if skipped < start:
+                    skipped += 1
+                    continue
+                found.append(record)
+                if len(found) == limit:
+                    break
+            last = first
+        return found
+
+    def _read_lines(self, records, appname=None):
+        if not records:
+            return []
+        entries = []
+        lo = min(r[0] for r in records)
+        hi = max(r[0] + r[1] for r in records)
+        with open(self.log_path, 'rb') as f:
+            if hi - lo <= 64 * 1024 + 256 * len(records):
+                # A contiguous page: one read.
+                f.seek(lo)
+                block = f.read(hi - lo)
+                lines = [block[o - lo:o - lo + n] for o, n, _c in records]
+            else:
+                lines = []
+                for offset, length, _crc in records:
+                    f.seek(offset)
+                    lines.append(f.read(length))
+        for line in lines:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if appname is not None and entry.get('appname') != appname:
+                continue                     # a crc32 collision
+            entries.append(entry)
+        return entries
+
+    # ------------------------------------------------------------------
+    # Retention
+    # ------------------------------------------------------------------
+
+    def _enforce_retention(self, force_age_check=False):
+        keep = self.keep_entries
+        over_count = keep and self._count > keep + max(100, keep // 10)
+        too_old = False
+        if self.keep_days and self._count and force_age_check:
+            oldest = self._read_lines(self._records(0, 1))
+            too_old = bool(oldest) and oldest[0].get('date', '') < self._cutoff()
+        if over_count or too_old:
+            self._compact()
+
+    def _cutoff(self):
+        return (datetime.now() - timedelta(days=self.keep_days)).strftime('%Y-%m-%d')
+
+    def _compact(self):
+        """Rewrite both files with only what the retention policy keeps."""
+        first = max(0, self._count - self.keep_entries) if self.keep_entries else 0
+        records = self._records(first, self._count)
+        cutoff = self._cutoff() if self.keep_days else None
+        lines = []
+        index = []
+        pos = 0
+        with open(self.log_path, 'rb') as f:
+            f.seek(records[0][0] if records else 0)
+            for _offset, length, crc in records:
+                line = f.read(length)
+                if cutoff is not None:
+                    try:
+                        if json.loads(line).get('date', '') < cutoff:
+                            continue
+                    except ValueError:
+                        continue
+                lines.append(line)
+                index.append(_RECORD.pack(pos, len(line), crc))
+                pos += len(line)
+        dropped = self._count - len(lines)
+        # Log first: if we stop between the two replaces, the old index no
+        # longer fits the new log and the next open rebuilds it.
+        for path, data in ((self.log_path, b''.join(lines)),
+                           (self.index_path, b''.join(index))):
+            tmp = path + '.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, path)
+        self._count = len(lines)
+        self._log_end = pos
+        print(f"[NotificationStore] Retention dropped {dropped} old notification(s)")
@@ -17,6 +17,7 @@ from src.titan_core.translation import set_language
 from src.system.com_fix import com_safe, init_com_safe
 from src.titan_core.stereo_speech import get_stereo_speech
 from src.platform_utils import get_subprocess_kwargs, IS_WINDOWS
+from src.system.event_hub import get_hub
 
 # Get the translation function
 _ = set_language(get_setting('language', 'pl'))
@@ -246,13 +247,28 @@ class SystemMonitor:
             monitor.stop()
         self.monitors.clear()
 
-class ChargerMonitor(threading.Thread):
-    """Monitor battery charging status and announce changes"""
+def _read_battery():
+    """Value of the 'power.battery' topic: (plugged, percent, power saving)."""
+    battery = psutil.sensors_battery()
+    if not battery:
+        return None
+    return (battery.power_plugged, battery.percent, is_power_saving_active())
 
-    def __init__(self):
+
+class ChargerMonitor:
+    """Monitor battery charging status and announce changes.
+
+    Watches 'power.battery' on the system event hub (event_hub.py): polled
+    every second while it changes, relaxing to every four while it does not.
+    The hub reports only changes, so start() checks the first reading itself
+    (a battery already low, or already full, is announced at startup), and
+    a poll that finds no battery stops the watch.
+    """
+
+    def __init__(self, hub=None):
+        self.hub = hub
+        self._unwatch = None
         try:
-            super().__init__()
-            self.daemon = True
             self.running = True
             self.charged_notification_sent = False
             self.low_battery_notified = False
@@ -269,7 +285,6 @@ class ChargerMonitor(threading.Thread):
             print(f"Error in ChargerMonitor.__init__: {e}")
             import traceback
             traceback.print_exc()
-            self.daemon = True
             self.running = False  # Don't run if initialization failed
             self.charged_notification_sent = False
             self.low_battery_notified = False
@@ -278,61 +293,80 @@ class ChargerMonitor(threading.Thread):
             self.previous_status = None
             self.previous_percentage = None
 
-    def run(self):
-        while self.running:
-            try:
-                battery = psutil.sensors_battery()
-                if battery:
-                    current_status = battery.power_plugged
-                    current_percentage = battery.percent
-                    charger_alerts = _get_bool_setting('monitor_charger', True)
-
-                    # Check for charger connection/disconnection
-                    if self.previous_status is not None and current_status != self.previous_status:
-                        if charger_alerts:
-                            if current_status:
-                                self.on_charger_connect(current_percentage)
-                            else:
-                                self.on_charger_disconnect(current_percentage)
-                        self.previous_status = current_status
-
-                    # Check for battery level changes during charging
-                    battery_announce_interval = get_setting('battery_announce_interval', '10%', section='system_monitor')
-                    if (charger_alerts and current_status and current_percentage != self.previous_percentage and
-                        battery_announce_interval != 'never'):
-
-                        # Parse interval setting
-                        interval = 10  # default
-                        if battery_announce_interval == '1%':
-                            interval = 1
-                        elif battery_announce_interval == '10%':
-                            interval = 10
-                        elif battery_announce_interval == '15%':
-                            interval = 15
-                        elif battery_announce_interval == '25%':
-                            interval = 25
-
-                        if current_percentage % interval == 0:
-                            self.on_battery_charging(current_percentage)
-
-                    # Check for fully charged battery
-                    if charger_alerts and current_status and current_percentage == 100 and not self.charged_notification_sent:
-                        self.on_battery_charged()
-                        self.charged_notification_sent = True
-                    elif not current_status:
-                        self.charged_notification_sent = False
-
-                    # Check for low / critical battery levels
-                    self.check_battery_alerts(current_status, current_percentage)
-
-                    self.previous_percentage = current_percentage
-                else:
-                    # No battery detected, stop the thread
-                    self.running = False
-            except Exception as e:
-                print(f"Error in ChargerMonitor: {e}")
-                self.running = False  # Stop thread on error
-            time.sleep(1)
+    def start(self):
+        if not self.running:
+            return
+        try:
+            reading = _read_battery()
+        except Exception as e:
+            print(f"Error reading battery: {e}")
+            reading = None
+        if reading is None:
+            self.running = False
+            return
+        self.check(reading[0], reading[1])
+        hub = self.hub or get_hub()
+        self._unwatch = hub.watch('power.battery', self._read_battery, self._on_battery,
+                                  interval=1.0, max_interval=4.0)
+
+    def _read_battery(self):
+        """Poll function of 'power.battery'; no battery any more ends the watch."""
+        reading = _read_battery()
+        if reading is None:
+            self.stop()
+        return reading
+
+    def _on_battery(self, topic, old, new):
+        if not self.running:
+            return
+        self.check(new[0], new[1])
+
+    def check(self, current_status, current_percentage):
+        """React to a battery reading that differs from the last one."""
+        try:
+            charger_alerts = _get_bool_setting('monitor_charger', True)
+
+            # Check for charger connection/disconnection
+            if self.previous_status is not None and current_status != self.previous_status:
+                if charger_alerts:
+                    if current_status:
+                        self.on_charger_connect(current_percentage)
+                    else:
+                        self.on_charger_disconnect(current_percentage)
+            self.previous_status = current_status
+
+            # Check for battery level changes during charging
+            battery_announce_interval = get_setting('battery_announce_interval', '10%', section='system_monitor')
+            if (charger_alerts and current_status and current_percentage != self.previous_percentage and
+                battery_announce_interval != 'never'):
+
+                # Parse interval setting
+                interval = 10  # default
+                if battery_announce_interval == '1%':
+                    interval = 1
+                elif battery_announce_interval == '10%':
+                    interval = 10
+                elif battery_announce_interval == '15%':
+                    interval = 15
+                elif battery_announce_interval == '25%':
+                    interval = 25
+
+                if current_percentage % interval == 0:
+                    self.on_battery_charging(current_percentage)
+
+            # Check for fully charged battery
+            if charger_alerts and current_status and current_percentage == 100 and not self.charged_notification_sent:
+                self.on_battery_charged()
+                self.charged_notification_sent = True
+            elif not current_status:
+                self.charged_notification_sent = False
+
+            # Check for low / critical battery levels
+            self.check_battery_alerts(current_status, current_percentage)
+
+            self.previous_percentage = current_percentage
+        except Exception as e:
+            print(f"Error in ChargerMonitor: {e}")
 
     def on_charger_connect(self, percentage):
         play_sound('system/charger_connect.ogg')
@@ -420,14 +454,23 @@ class ChargerMonitor(threading.Thread):
 
     def stop(self):
         self.running = False
+        if self._unwatch:
+            self._unwatch()
+            self._unwatch = None
 
-class AudioMonitor(threading.Thread):
-    """Monitor system volume changes and announce them"""
+class AudioMonitor:
+    """Monitor system volume changes and announce them.
+
+    Watches 'audio.volume' on the system event hub: read five times a second
+    right after a change (someone is turning the knob), relaxing to no
+    slower than 0.4 s while the volume stays put, so the first volume-key
+    press after a quiet spell is still announced at once.
+    """
 
-    def __init__(self, announce_mode='sound'):
+    def __init__(self, announce_mode='sound', hub=None):
+        self.hub = hub
+        self._unwatch = None
         try:
-            super().__init__()
-            self.daemon = True
             self.running = True
             self.announce_mode = announce_mode  # 'none', 'sound', 'speech', 'both'
             self.com_initialized = False
@@ -441,7 +484,6 @@ class AudioMonitor(threading.Thread):
             print(f"Error in AudioMonitor.__init__: {e}")
             import traceback
             traceback.print_exc()
-            self.daemon = True
             self.running = False  # Don't run if initialization failed
             self.announce_mode = announce_mode
             self.com_initialized = False
@@ -452,58 +494,61 @@ class AudioMonitor(threading.Thread):
             self.previous_volume = -1
             self.last_error_message = None
 
-    def run(self):
-        if platform.system() == 'Windows':
+    def start(self):
+        if not self.running:
+            return
+        hub = self.hub or get_hub()
+        # Outside Windows the volume is read by running pactl, amixer or
+        # osascript: off the hub's shared timer.
+        self._unwatch = hub.watch('audio.volume', self._read_volume, self._on_volume,
+                                  interval=0.2, max_interval=0.4, backoff=1.5,
+                                  blocking=not IS_WINDOWS)
+
+    def _read_volume(self):
+        """Poll function of 'audio.volume' (always runs on the same hub thread)."""
+        if platform.system() == 'Windows' and not self.com_initialized:
             try:
-                # Use safe COM initialization
+                # Use safe COM initialization; once per thread
                 init_com_safe()
                 self.com_initialized = True
             except Exception as e:
                 print(f"Failed to initialize COM library: {e}")
-                return  # Cannot run without COM
-
-        try:
-            while self.running and self.consecutive_errors < self.max_consecutive_errors:
-                self.check_count += 1
-                current_volume = self.get_volume_percentage_safe()
-
-                if current_volume != -1:
-                    self.consecutive_errors = 0  # Reset error counter on success
-                    if self.previous_volume == -1:
-                        # First successful read, just set it without announcing
-                        self.previous_volume = current_volume
-                    elif current_volume != self.previous_volume:
-                        self.announce_volume_change(current_volume)
-                        self.previous_volume = current_volume
+                self.stop()  # Cannot run without COM
+                return None
+
+        self.check_count += 1
+        current_volume = self.get_volume_percentage_safe()
+        if current_volume != -1:
+            self.consecutive_errors = 0  # Reset error counter on success
+            return current_volume
+
+        # Only count errors after grace period
+        if self.check_count > self.startup_grace_period:
+            self.consecutive_errors += 1
+            if self.consecutive_errors >= self.max_consecutive_errors:
+                error_msg = "AudioMonitor: Too many consecutive errors, stopping monitor."
+                if not PYCAW_AVAILABLE:
+                    error_msg += " (pycaw library not available)"
+                elif not self.com_initialized:
+                    error_msg += " (COM initialization failed)"
                 else:
-                    # Only count errors after grace period
-                    if self.check_count > self.startup_grace_period:
-                        self.consecutive_errors += 1
-                        if self.consecutive_errors >= self.max_consecutive_errors:
-                            error_msg = "AudioMonitor: Too many consecutive errors, stopping monitor."
-                            if not PYCAW_AVAILABLE:
-                                error_msg += " (pycaw library not available)"
-                            elif not self.com_initialized:
-                                error_msg += " (COM initialization failed)"
-                            else:
-                                error_msg += " (Unable to access audio devices)"
-                            print(error_msg)
-                            break
-                    elif self.check_count == 1:
-                        # Log once during startup if there are issues
-                        if not PYCAW_AVAILABLE:
-                            print("AudioMonitor: pycaw not available, volume monitoring will not work")
-                        elif not self.com_initialized:
-                            print("AudioMonitor: COM not initialized, volume monitoring will not work")
-
-                time.sleep(0.2)  # Increased sleep time to reduce CPU usage
-        except Exception as e:
-            print(f"Error in AudioMonitor: {e}")
-            import traceback
-            traceback.print_exc()
-        finally:
-            # COM cleanup is handled automatically by com_fix module
-            pass
+                    error_msg += " (Unable to access audio devices)"
+                print(error_msg)
+                self.stop()
+        elif self.check_count == 1:
+            # Log once during startup if there are issues
+            if not PYCAW_AVAILABLE:
+                print("AudioMonitor: pycaw not available, volume monitoring will not work")
+            elif not self.com_initialized:
+                print("AudioMonitor: COM not initialized, volume monitoring will not work")
+        return None
+
+    def _on_volume(self, topic, old, new):
+        # The hub keeps the first reading as the starting point, so this is
+        # always a real change.
+        if self.running:
+            self.previous_volume = new
+            self.announce_volume_change(new)
 
     def announce_volume_change(self, volume):
         """Announce volume change based on current settings"""
@@ -653,17 +698,25 @@ class AudioMonitor(threading.Thread):
 
     def stop(self):
         self.running = False
-        
+        if getattr(self, '_unwatch', None):
+            self._unwatch()
+            self._unwatch = None
+
     def __del__(self):
         """Ensure cleanup on object destruction"""
         self.stop()
 
-class NetworkMonitor(threading.Thread):
-    """Monitor network connections on Windows and announce when connected to a new network"""
+class NetworkMonitor:
+    """Monitor network connections on Windows and announce when connected to a new network.
 
-    def __init__(self):
-        super().__init__()
-        self.daemon = True
+    Watches 'network.connections' on the system event hub, first read 15
+    seconds after start; every second while it changes, relaxing to every
+    eight. Each read runs netsh, so the relaxed rate matters most here.
+    """
+
+    def __init__(self, hub=None):
+        self.hub = hub
+        self._unwatch = None
         self.running = True
         self.previous_ssid = None
         self.previous_wifi_state = None
@@ -721,42 +774,46 @@ class NetworkMonitor(threading.Thread):
             pass
         return active
 
-    def _init_state(self):
-        self.previous_wifi_state, self.previous_ssid = self._get_wifi_status()
-        self.previous_interfaces = self._get_active_ethernet()
-
     WIFI_CONNECTING_STATES = {'connecting', 'associating', 'authenticating'}
 
-    def run(self):
+    def _read_connections(self):
+        """Poll function of 'network.connections': (wifi state, ssid, wired set)."""
+        state, ssid = self._get_wifi_status()
+        return (state, ssid, frozenset(self._get_active_ethernet()))
+
+    def start(self):
+        hub = self.hub or get_hub()
         # Wait for system to settle before monitoring
-        time.sleep(15)
-        self._init_state()
-        while self.running:
-            try:
-                # --- WiFi ---
-                current_wifi_state, current_ssid = self._get_wifi_status()
-                if current_wifi_state in self.WIFI_CONNECTING_STATES and self.previous_wifi_state not in self.WIFI_CONNECTING_STATES:
-                    self.on_connecting()
-                self.previous_wifi_state = current_wifi_state
-
-                if current_ssid != self.previous_ssid:
-                    if current_ssid:
-                        self.on_connected(current_ssid)
-                    elif self.previous_ssid:
-                        self.on_disconnected(self.previous_ssid)
-                self.previous_ssid = current_ssid
-
-                # --- Ethernet / other interfaces ---
-                current_interfaces = self._get_active_ethernet()
-                for iface in current_interfaces - self.previous_interfaces:
-                    self.on_connected(iface)
-                for iface in self.previous_interfaces - current_interfaces:
-                    self.on_disconnected(iface)
-                self.previous_interfaces = current_interfaces
+        self._unwatch = hub.watch('network.connections', self._read_connections,
+                                  self._on_connections, interval=1.0, max_interval=8.0,
+                                  initial_delay=15.0, blocking=True)
 
-            except Exception as e:
-                print(f"NetworkMonitor error: {e}")
-            time.sleep(1)
+    def _on_connections(self, topic, old, new):
+        if not self.running:
+            return
+        try:
+            previous_wifi_state, previous_ssid, previous_interfaces = old
+            current_wifi_state, current_ssid, current_interfaces = new
+            # --- WiFi ---
+            if current_wifi_state in self.WIFI_CONNECTING_STATES and previous_wifi_state not in self.WIFI_CONNECTING_STATES:
+                self.on_connecting()
+
+            if current_ssid != previous_ssid:
+                if current_ssid:
+                    self.on_connected(current_ssid)
+                elif previous_ssid:
+                    self.on_disconnected(previous_ssid)
+
+            # --- Ethernet / other interfaces ---
+            for iface in current_interfaces - previous_interfaces:
+                self.on_connected(iface)
+            for iface in previous_interfaces - current_interfaces:
+                self.on_disconnected(iface)
+
+            self.previous_wifi_state, self.previous_ssid = current_wifi_state, current_ssid
+            self.previous_interfaces = set(current_interfaces)
+        except Exception as e:
+            print(f"NetworkMonitor error: {e}")
 
     def on_connecting(self):
         play_sound('system/network_connecting.ogg')
@@ -771,6 +828,9 @@ class NetworkMonitor(threading.Thread):
 
     def stop(self):
         self.running = False
+        if self._unwatch:
+            self._unwatch()
+            self._unwatch = None
 
 
 # Global system monitor instance
@@ -19,6 +19,17 @@ Wire format: UTF-8, newline-delimited JSON, one object per line.
     app -> Titan   {"type":"result","id":7,"ok":true,"result":"Opened notes.txt"}
     app -> Titan   {"type":"event","name":"...","data":{...}}   (optional)
 
+Requests are multiplexed: Titan may have any number of invocations in flight
+on one connection, each answered by its ``id`` in whatever order the add-on
+finishes them (``submit()`` returns at once; ``invoke()`` waits for one).
+Both ends announce ``features`` in hello/welcome and use only those both have:
+
+    "chunks"  app -> Titan {"type":"chunk","id":7,"seq":0,"data":"1 of 3"}
+              before the result, from a handler that is a generator
+    "binary"  a message may be a length-prefixed frame instead of a line -
+              ``%<json bytes> <blob bytes>`` then the JSON, then raw bytes -
+              so a large document is not one 4 MB line, and bytes stay bytes
+
 The pipe is machine-wide, as all named pipes are, so a hello carrying the wrong
 token is dropped: the token file lives in the user's own profile and only
 processes that can read it can join the bus.
@@ -28,15 +39,17 @@ must import cleanly into a wx app, a Tk launcher or a console script, none of
 which can be assumed to have pywin32.
 """
 
+import collections
 import json
 import os
+import socket
 import sys
 import threading
 import time
 
 PIPE_NAME = r'\\.\pipe\TitanActions'
 TOKEN_FILENAME = 'bus.token'
-PROTOCOL_VERSION = 1
+PROTOCOL_VERSION = 2
 
 _MAX_LINE = 4 * 1024 * 1024      # a result may carry a document; still bounded
 _DEFAULT_TIMEOUT = 20.0
@@ -96,6 +109,78 @@ def ensure_token():
 # --------------------------------------------------------------------------- #
 # One connected application
 # --------------------------------------------------------------------------- #
+class _Call:
+    """One invocation in flight on a peer.
+
+    Many may be outstanding on the same connection at once; the add-on answers
+    each by id, in whatever order it finishes them.
+    """
+
+    def __init__(self, peer, request_id, action, on_chunk=None):
+        self.peer = peer
+        self.id = request_id
+        self.action = action
+        self.on_chunk = on_chunk
+        self.chunks = []
+        self.response = None
+        self.last_activity = time.monotonic()
+        self._done = threading.Event()
+
+    def done(self):
+        return self._done.is_set()
+
+    def _finish(self, response):
+        self.response = response
+        self._done.set()
+
+    def _chunk(self, data):
+        self.last_activity = time.monotonic()
+        self.chunks.append(data)
+        if self.on_chunk is not None:
+            try:
+                self.on_chunk(data)
+            except Exception as e:
+                _log(f"chunk handler for '{self.action}' failed: {e}")
+
+    def wait(self, timeout=_DEFAULT_TIMEOUT):
+        """(ok, result) with the result as the add-on sent it - bytes stay
+        bytes. ``timeout`` runs from the last sign of life, so a streaming
+        action that keeps sending chunks is never cut off half way."""
+        while not self._done.wait(
+                max(0.0, self.last_activity + timeout - time.monotonic())):
+            if time.monotonic() - self.last_activity >= timeout:
+                self.peer._forget(self.id)
+                return False, (f"the application did not answer within "
+                               f"{int(timeout)} seconds")
+        response = self.response or {}
+        if not response.get('ok', False):
+            return False, str(response.get('error') or "the action failed")
+        result = response.get('result')
+        if result is None and self.chunks:
+            result = _join_chunks(self.chunks)
+        return True, result
+
+
+def _as_text(action, result):
+    """What invoke() hands the dispatcher: text, or a question/failure dict."""
+    if result is None:
+        return f"Done ({action})."
+    if isinstance(result, dict) and (result.get('__titan_question__')
+                                     or result.get('__titan_failed__')):
+        # A question or a stated failure, not an answer: the dispatcher
+        # turns it into the right kind of result, so it must arrive
+        # unflattened.
+        return result
+    if isinstance(result, (bytes, bytearray)):
+        return bytes(result).decode('utf-8', errors='replace')
+    if not isinstance(result, str):
+        try:
+            return json.dumps(result, ensure_ascii=False)
+        except Exception:
+            return str(result)
+    return result
+
+
 class _Peer:
     """A running add-on process that has joined the bus."""
 
@@ -108,61 +193,67 @@ class _Peer:
         self.pid = hello.get('pid') or 0
         self.actions = hello.get('actions') or []
         self.path = hello.get('path') or ''
+        self.features = set(hello.get('features') or ()) & set(FEATURES)
         self.joined_at = time.time()
         self.alive = True
 
         self._next_id = 1
-        self._pending = {}         # request id -> [event, response]
+        self._pending = {}         # request id -> _Call
         self._lock = threading.Lock()
 
     # ----------------------------------------------------------------- calling
-    def invoke(self, action, args, timeout=_DEFAULT_TIMEOUT):
-        """Run one action in the peer process. Returns (ok, result)."""
-        if not self.alive:
-            return False, "the application is no longer connected"
+    def submit(self, action, args=None, on_chunk=None):
+        """Send one invocation and return its _Call without waiting.
+
+        ``on_chunk(data)`` is called, on the bus thread, for each partial
+        result a streaming action sends before its final one.
+        """
         with self._lock:
             request_id = self._next_id
             self._next_id += 1
-            waiter = [threading.Event(), None]
-            self._pending[request_id] = waiter
+            call = _Call(self, request_id, action, on_chunk)
+            if self.alive:
+                self._pending[request_id] = call
+        if not self.alive:
+            call._finish({'ok': False,
+                          'error': "the application is no longer connected"})
+            return call
         payload = {'type': 'invoke', 'id': request_id, 'action': action,
                    'args': args or {}}
-        if not self.io.write_line(payload):
-            with self._lock:
-                self._pending.pop(request_id, None)
+        if not self.io.write_message(payload):
+            self._forget(request_id)
             self.close()
-            return False, "the connection to the application was lost"
-        if not waiter[0].wait(timeout):
-            with self._lock:
-                self._pending.pop(request_id, None)
-            return False, (f"the application did not answer within "
-                           f"{int(timeout)} seconds")
-        response = waiter[1] or {}
-        if not response.get('ok', False):
-            return False, str(response.get('error') or "the action failed")
-        result = response.get('result')
-        if result is None:
-            result = f"Done ({action})."
-        elif isinstance(result, dict) and (result.get('__titan_question__')
-                                           or result.get('__titan_failed__')):
-            # A question or a stated failure, not an answer: the dispatcher
-            # turns it into the right kind of result, so it must arrive
-            # unflattened.
-            return True, result
-        elif not isinstance(result, str):
-            try:
-                result = json.dumps(result, ensure_ascii=False)
-            except Exception:
-                result = str(result)
-        return True, result
+            call._finish({'ok': False,
+                          'error': "the connection to the application was lost"})
+        return call
+
+    def invoke(self, action, args, timeout=_DEFAULT_TIMEOUT, on_chunk=None):
+        """Run one action in the peer process. Returns (ok, result)."""
+        ok, result = self.submit(action, args, on_chunk).wait(timeout)
+        if not ok:
+            return False, result
+        return True, _as_text(action, result)
+
+    def _forget(self, request_id):
+        with self._lock:
+            self._pending.pop(request_id, None)
 
     def _resolve(self, message):
-        request_id = message.get('id')
         with self._lock:
-            waiter = self._pending.pop(request_id, None)
-        if waiter is not None:
-            waiter[1] = message
-            waiter[0].set()
+            call = self._pending.pop(message.get('id'), None)
+        if call is not None:
+            call._finish(message)
+
+    def _chunk(self, message):
+        with self._lock:
+            call = self._pending.get(message.get('id'))
+        if call is not None:
+            call._chunk(message.get('data'))
+
+    @property
+    def in_flight(self):
+        with self._lock:
+            return len(self._pending)
 
     def close(self):
         if not self.alive:
@@ -170,11 +261,10 @@ class _Peer:
         self.alive = False
         self.io.close()
         with self._lock:
-            waiters = list(self._pending.values())
+            calls = list(self._pending.values())
             self._pending.clear()
-        for waiter in waiters:
-            waiter[1] = {'ok': False, 'error': "the application disconnected"}
-            waiter[0].set()
+        for call in calls:
+            call._finish({'ok': False, 'error': "the application disconnected"})
         with _peers_lock:
             if _peers.get(self.addon_id) is self:
                 del _peers[self.addon_id]
@@ -188,8 +278,8 @@ class _Peer:
 # never drift apart. That module deliberately imports nothing from Titan, which
 # is why the dependency points this way round.
 from src.titan_core.titan_actions import (      # noqa: E402
-    PipeChannel, FILE_FLAG_OVERLAPPED, ERROR_PIPE_CONNECTED, INFINITE,
-    _overlapped_type,
+    PipeChannel, SocketChannel, FEATURES, FILE_FLAG_OVERLAPPED,
+    ERROR_PIPE_CONNECTED, INFINITE, _overlapped_type, _join_chunks,
 )
 
 
@@ -205,7 +295,7 @@ def _serve_request(peer, message):
         from src.titan_core.actions import dispatch
         kind = message.get('type')
         if kind == 'list':
-            peer.io.write_line({'type': 'list_result', 'id': request_id,
+            peer.io.write_message({'type': 'list_result', 'id': request_id,
                                 'ok': True, 'addons': dispatch.list_addons()})
             return
         if kind == 'sequence':
@@ -218,7 +308,7 @@ def _serve_request(peer, message):
                        'error': '' if outcome.ok else outcome.text}
             if outcome.pending and outcome.question is not None:
                 payload['question'] = outcome.question.to_dict()
-            peer.io.write_line(payload)
+            peer.io.write_message(payload)
             return
         result = dispatch.run(message.get('addon') or '',
                               message.get('action') or '',
@@ -230,24 +320,24 @@ def _serve_request(peer, message):
         # can ask its own user and try again.
         if result.pending and result.question is not None:
             payload['question'] = result.question.to_dict()
-        peer.io.write_line(payload)
+        peer.io.write_message(payload)
     except Exception as e:
-        peer.io.write_line({'type': 'call_result', 'id': request_id,
+        peer.io.write_message({'type': 'call_result', 'id': request_id,
                             'ok': False, 'error': f'{type(e).__name__}: {e}'})
 
 
 def _serve_connection(handle):
     """Own one connected application until it disconnects."""
-    io = PipeChannel(handle)
+    _serve_channel(PipeChannel(handle), handle)
+
+
+def _serve_channel(io, handle=None):
+    """The protocol itself, over any channel - a pipe in Titan, a socketpair
+    in the tests and the benchmark."""
     peer = None
     try:
-        line = io.read_line()
-        if line is None:
-            io.close()
-            return
-        try:
-            hello = json.loads(line.decode('utf-8', errors='replace'))
-        except Exception:
+        hello = io.read_message()
+        if hello is None:
             io.close()
             return
         if hello.get('type') != 'hello':
@@ -256,33 +346,37 @@ def _serve_connection(handle):
         expected = read_token()
         if expected and hello.get('token') != expected:
             _log(f"rejected a join with a bad token from pid {hello.get('pid')}")
-            io.write_line({'type': 'welcome', 'ok': False,
-                           'error': 'bad token'})
+            io.write_message({'type': 'welcome', 'ok': False,
+                              'error': 'bad token'})
             io.close()
             return
 
         peer = _Peer(handle, io, hello)
+        io.write_message({'type': 'welcome', 'ok': True,
+                          'version': PROTOCOL_VERSION,
+                          'features': sorted(peer.features)})
+        # Only after the welcome, which any add-on must be able to read. The
+        # peer is published after it too: an invoke sent before the welcome
+        # would be taken for the welcome.
+        io.binary = 'binary' in peer.features
+        io.streams = 'chunks' in peer.features
         with _peers_lock:
             previous = _peers.get(peer.addon_id)
             if previous is not None and previous is not peer:
                 previous.close()
             _peers[peer.addon_id] = peer
-        io.write_line({'type': 'welcome', 'ok': True,
-                       'version': PROTOCOL_VERSION})
         _log(f"'{peer.addon_id}' joined (pid {peer.pid}, "
              f"{len(peer.actions)} actions)")
 
         while True:
-            line = io.read_line()
-            if line is None:
+            message = io.read_message()
+            if message is None:
                 break
-            try:
-                message = json.loads(line.decode('utf-8', errors='replace'))
-            except Exception:
-                continue
             kind = message.get('type')
             if kind == 'result':
                 peer._resolve(message)
+            elif kind == 'chunk':
+                peer._chunk(message)
             elif kind in ('call', 'list'):
                 # The add-on is asking Titan to reach somebody else. Answered
                 # on its own thread: dispatching here would block this peer's
@@ -296,7 +390,7 @@ def _serve_connection(handle):
                 if isinstance(message.get('actions'), list):
                     peer.actions = message['actions']
             elif kind == 'ping':
-                io.write_line({'type': 'pong'})
+                io.write_message({'type': 'pong'})
             elif kind == 'bye':
                 break
     except Exception as e:
@@ -420,9 +514,119 @@ def list_peers():
         return list(_peers.values())
 
 
-def invoke(addon_id, action, args=None, timeout=_DEFAULT_TIMEOUT):
-    """Run an action in a running add-on. Returns (ok, result_or_error)."""
+def invoke(addon_id, action, args=None, timeout=_DEFAULT_TIMEOUT,
+           on_chunk=None):
+    """Run an action in a running add-on. Returns (ok, result_or_error).
+
+    ``on_chunk(data)`` receives the partial results of a streaming action.
+    """
     peer = get_peer(addon_id)
     if peer is None:
         return False, f"'{addon_id}' is not running (or has not joined the bus)"
-    return peer.invoke(action, args or {}, timeout=timeout)
+    return peer.invoke(action, args or {}, timeout=timeout, on_chunk=on_chunk)
+
+
+def submit(addon_id, action, args=None, on_chunk=None):
+    """Start an action without waiting for it; None when the add-on is not on
+    the bus. ``.wait(timeout)`` on what comes back gives (ok, result), with
+    the result exactly as the add-on sent it."""
+    peer = get_peer(addon_id)
+    if peer is None:
+        return None
+    return peer.submit(action, args or {}, on_chunk=on_chunk)
+
+
+# --------------------------------------------------------------------------- #
+# Loopback and benchmark
+# --------------------------------------------------------------------------- #
+def loopback(handlers, addon_id='loopback', marshal=None, features=None,
+             timeout=5.0):
+    """Join ``handlers`` to the bus over a socketpair, inside this process.
+
+    Both real ends run - the add-on's session from titan_actions and Titan's
+    ``_serve_channel`` - so everything but the named pipe itself is exercised,
+    on any platform. ``features`` replaces what the add-on announces (``[]``
+    is an add-on from before they existed).
+
+    Returns (peer, add-on channel, close); peer is None if the join failed.
+    """
+    from src.titan_core import titan_actions
+    host_sock, addon_sock = socket.socketpair()
+    host_io, addon_io = SocketChannel(host_sock), SocketChannel(addon_sock)
+    hello = titan_actions._build_hello(handlers, id=addon_id, label=addon_id)
+    hello['token'] = read_token()
+    addon_id = hello['id']
+    if features is not None:
+        hello['features'] = list(features)
+    threading.Thread(target=_serve_channel, args=(host_io,),
+                     name='TitanActionBusPeer', daemon=True).start()
+    threading.Thread(target=titan_actions._session,
+                     args=(addon_io, dict(handlers), hello, marshal),
+                     name='TitanActionBusClient', daemon=True).start()
+
+    deadline = time.monotonic() + timeout
+    peer = get_peer(addon_id)
+    while (peer is None or peer.io is not host_io) and time.monotonic() < deadline:
+        time.sleep(0.002)
+        peer = get_peer(addon_id)
+    if peer is not None and peer.io is not host_io:
+        peer = None
+
+    def close():
+        if peer is not None:
+            peer.close()
+        host_io.close()
+        addon_io.close()
+
+    return peer, addon_io, close
+
+
+def benchmark(calls=2000, in_flight=32, payload_bytes=2 * 1024 * 1024):
+    """Latency and throughput of the bus protocol, over a socketpair.
+
+        python -c "from src.titan_core.actions import bus; print(bus.benchmark())"
+
+    ``sequential`` is one call at a time, the shape every caller had before;
+    ``pipelined`` keeps up to ``in_flight`` calls outstanding on the same
+    connection. The large result is sent once as a JSON line and once as a
+    binary frame. Returns a dict of the timings (empty if the join failed).
+    """
+    handlers = {'echo': lambda text='': text,
+                'blob': lambda size=0: 'x' * int(size)}
+    peer, addon_io, close = loopback(handlers, addon_id='bus_benchmark')
+    if peer is None:
+        return {}
+    try:
+        started = time.perf_counter()
+        for index in range(calls):
+            peer.invoke('echo', {'text': str(index)})
+        sequential = time.perf_counter() - started
+
+        started = time.perf_counter()
+        window = collections.deque()
+        for index in range(calls):
+            if len(window) >= in_flight:
+                window.popleft().wait()
+            window.append(peer.submit('echo', {'text': str(index)}))
+        while window:
+            window.popleft().wait()
+        pipelined = time.perf_counter() - started
+
+        large = {}
+        for mode, binary in (('lines', False), ('frames', True)):
+            addon_io.binary = binary
+            started = time.perf_counter()
+            ok, _result = peer.submit('blob', {'size': payload_bytes}).wait()
+            large[mode] = (time.perf_counter() - started) * 1000.0 if ok else None
+        return {
+            'calls': calls,
+            'in_flight': in_flight,
+            'sequential_ms_per_call': sequential * 1000.0 / calls,
+            'sequential_per_second': calls / sequential,
+            'pipelined_per_second': calls / pipelined,
+            'payload_bytes': payload_bytes,
+            'large_as_line_ms': large['lines'],
+            'large_as_frame_ms': large['frames'],
+        }
+    finally:
+        close()
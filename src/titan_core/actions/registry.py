@@ -11,9 +11,11 @@ Three sources are merged, in this order of authority:
    shipping a manifest at all still becomes controllable, because the client
    library derives a declaration from the handler table itself.
 
-The disk scan is cached (it walks nine directories across two roots); the bus
-is merged fresh on every lookup, because which applications are open changes by
-the second.
+The disk side comes from the add-on catalog (``src/titan_core/addon_catalog``),
+which parses each manifest once and notices changes with ``stat``; a change it
+finds drops the registry at once, and the thirty-second rebuild that remains
+only re-merges what is already in memory. The bus is merged fresh on every
+lookup, because which applications are open changes by the second.
 """
 
 import configparser
@@ -22,6 +24,7 @@ import os
 import threading
 import time
 
+from src.titan_core import addon_catalog
 from src.titan_core.actions import bus
 from src.titan_core.actions.kinds import (
     ACTIONABLE_KINDS, default_transport, discover_kind, kind_label,
@@ -189,15 +192,90 @@ def _merge_kind_standard(addon):
         addon.actions.append(action)
 
 
+def _catalog_label(kind, entry, name):
+    """`_friendly_label`, answered from what the catalog already parsed."""
+    try:
+        from src.titan_core.translation import language_code as lang
+    except Exception:
+        lang = 'en'
+
+    def ini(filename, section):
+        data = entry.file(filename) or {}
+        return (data.get(section) or {}).get('name', '') if '__error__' not in data else ''
+
+    def js(*filenames):
+        for filename in filenames:
+            data = entry.file(filename)
+            if isinstance(data, dict) and '__error__' not in data:
+                value = data.get('name') or data.get('label')
+                if value:
+                    return str(value)
+        return ''
+
+    if kind in ('app', 'game'):
+        values = entry.key_values()
+        for key in (f'name_{lang}', 'name_en', 'name'):
+            if values.get(key):
+                return values[key]
+        return name
+    if kind == 'component':
+        return ini('__component__.TCE', 'component') or name
+    if kind in ('widget', 'statusbar_applet'):
+        return js('applet.json', 'statusbar_applet.json') or name
+    if kind == 'im_module':
+        return js('module.json') or name
+    if kind == 'tts_engine':
+        return js('engine.json') or name
+    if kind == 'shell_addon':
+        return ini('__shell_addon__.TCE', 'shell addon') or name
+    if kind == 'settings_interface':
+        return ini('__settings_ui__.TCE', 'settings interface') or name
+    return name
+
+
+def _catalog_manifest(kind, entry, label):
+    """`read_manifest`, from the catalog's parsed copy of the manifest."""
+    filename = entry.action_manifest_name()
+    if not filename:
+        return None
+    data = entry.file(filename)
+    if isinstance(data, dict) and '__error__' in data:
+        addon = AddonActions(kind=kind, addon_id=slug(entry.name, 'addon'),
+                             name=entry.name, path=entry.path,
+                             label=label or entry.name,
+                             transport=default_transport(kind))
+        addon.warnings.append(f"could not read {filename}: {data['__error__']}")
+        return addon
+    return parse_manifest(data, kind, entry.name, entry.path,
+                          default_transport=default_transport(kind),
+                          fallback_label=label)
+
+
+def _scan_entries(kind):
+    """(name, path, label, addon-or-None) for every add-on of one kind.
+
+    The catalog has every actionable kind, so this is normally a walk over
+    manifests parsed once and re-checked with `stat`; the direct read is for
+    a kind added to ADDON_KINDS and not (yet) to the catalog.
+    """
+    catalog = addon_catalog.get_catalog()
+    if kind in catalog.kinds:
+        for entry in catalog.entries(kind):
+            label = _catalog_label(kind, entry, entry.name)
+            yield entry.name, entry.path, label, lambda e=entry, l=label: _catalog_manifest(kind, e, l)
+        return
+    for name, path in discover_kind(kind).items():
+        label = _friendly_label(kind, path, name)
+        yield name, path, label, lambda p=path, n=name, l=label: read_manifest(
+            p, kind, n, default_transport=default_transport(kind), fallback_label=l)
+
+
 def _scan_disk():
     addons = []
     for kind in ACTIONABLE_KINDS:
-        for name, path in discover_kind(kind).items():
+        for name, path, label, manifest in _scan_entries(kind):
             try:
-                label = _friendly_label(kind, path, name)
-                addon = read_manifest(path, kind, name,
-                                      default_transport=default_transport(kind),
-                                      fallback_label=label)
+                addon = manifest()
                 if addon is None:
                     # No manifest. In-process add-ons may still declare actions
                     # in Python, so give them a shell to be discovered through;
@@ -301,6 +379,13 @@ def get_registry(force=False):
     """The current registry. The disk scan is cached; the bus is always live."""
     global _cache, _cache_built_at
     with _lock:
+        # A stat pass over the catalog; a change found calls invalidate()
+        # through the subscription below, so `_cache` is None by the time it
+        # is looked at.
+        catalog = addon_catalog.get_catalog()
+        for kind in ACTIONABLE_KINDS:
+            if kind in catalog.kinds:
+                catalog.revalidate(kind)
         stale = (_cache is None or force
                  or time.time() - _cache_built_at > _CACHE_TTL)
         if stale:
@@ -324,6 +409,14 @@ def invalidate():
         _cache_built_at = 0.0
 
 
+def _on_catalog_change(kind, added, changed, removed):
+    if kind in ACTIONABLE_KINDS:
+        invalidate()
+
+
+addon_catalog.subscribe(_on_catalog_change)
+
+
 def find_addon(addon_id):
     return get_registry().by_id(addon_id)
 
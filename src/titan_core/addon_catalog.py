@@ -0,0 +1,431 @@
+# -*- coding: utf-8 -*-
+"""
+One index of the installed add-ons, kept warm and checked with `stat`.
+
+Before this, every question about the add-ons on disk was answered by reading
+them all again: `app_manager.get_applications()` and
+`get_hidden_applications()` re-read every `__app.tce` on each call (the main
+window, the Invisible UI, Klango mode and the start menu all call them), and
+`find_application_by_shortname()` did both of those to find ONE application.
+The action registry parsed every add-on's manifests across all eleven kinds
+whenever its thirty-second cache ran out, whether or not anything had changed.
+
+The catalog reads each add-on's manifests once and remembers, per add-on, the
+size and modification time of every file it read - and, per kind, the
+modification times of the `data/<kind>` roots themselves.  Asking again costs
+a `stat` per root and per manifest file: a root whose time has not moved has
+had nothing added, removed or renamed in it, and a manifest whose size and
+time are the same has not been rewritten.  A file that was touched but not
+changed (a copy over itself, a restored backup) is recognised by its SHA-1 and
+does not count as a change.  Even the stat pass happens at most once per
+`_REVALIDATE_INTERVAL`, because a single keypress in a menu can ask for the
+application list three times over.
+
+The index is written to `<user data>/cache/addon_catalog.json`, so the first
+lookup after a restart reads one JSON file instead of every manifest - and
+then confirms it with the same stats.
+
+Lookups by id (the folder name) and by `shortname` are dictionary reads.
+`subscribe(callback)` is told `(kind, added, changed, removed)` whenever a
+revalidation finds that something did change, which is how the action
+registry now knows to rebuild instead of guessing with a timer.
+
+**What it does not notice:** a packaged `.tca`/`.tcd` add-on rewritten in
+place (same name, no rename) changes neither its root's time nor the files of
+its extracted copy.  Installing through Titan replaces the file, which does
+move the root; anything else is caught by `invalidate()`.
+"""
+
+import configparser
+import hashlib
+import json
+import os
+import stat
+import threading
+import time
+
+from src import platform_utils
+
+
+# kind -> (subdir under data/, the files worth reading in each add-on folder).
+# The action manifests are listed for every kind because the action registry
+# reads them through here; the rest are what each kind already uses for its
+# name and settings.
+_ACTION_FILES = ('__actions.json', '__actions.TCE')
+CATALOG_KINDS = {
+    'app': ('applications', ('__app.tce', '__app.TCE') + _ACTION_FILES),
+    'game': ('games', ('__game.tce', '__game.TCE') + _ACTION_FILES),
+    'component': ('components', ('__component__.TCE',) + _ACTION_FILES),
+    'launcher': ('launchers', _ACTION_FILES),
+    'im_module': ('titanIM_modules', ('module.json',) + _ACTION_FILES),
+    'gamepad_mode': ('gamepad/modes', _ACTION_FILES),
+    'tts_engine': ('titantts engines', ('engine.json',) + _ACTION_FILES),
+    'widget': ('applets', ('applet.json', 'statusbar_applet.json') + _ACTION_FILES),
+    'statusbar_applet': ('statusbar_applets',
+                         ('applet.json', 'statusbar_applet.json') + _ACTION_FILES),
+    'shell_addon': ('shell addons', ('__shell_addon__.TCE',) + _ACTION_FILES),
+    'settings_interface': ('settings interfaces',
+                           ('__settings_ui__.TCE',) + _ACTION_FILES),
+}
+
+_CACHE_VERSION = 1
+_REVALIDATE_INTERVAL = 1.0
+
+
+def _parse_key_values(text):
+    """The `key=value` format of `__app.tce` / `__game.tce`."""
+    values = {}
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or '=' not in line:
+            continue
+        key, value = line.split('=', 1)
+        values[key.strip()] = value.strip().strip('"')
+    return values
+
+
+def _parse_ini(text):
+    parser = configparser.ConfigParser()
+    parser.read_string(text)
+    return {section: dict(parser.items(section)) for section in parser.sections()}
+
+
+def parse_manifest_file(filename, raw):
+    """Decode one manifest file the way the code that owns it reads it.
+
+    JSON for `.json` files and for the action manifests (`__actions.TCE` is
+    JSON under another name), `key=value` lines for the app and game files,
+    and INI sections - as a dict of dicts - for everything else.  A file that
+    does not parse becomes `{'__error__': message}` rather than an exception,
+    so one broken add-on cannot hide the others.
+    """
+    try:
+        text = raw.decode('utf-8-sig')
+        lower = filename.lower()
+        if lower.endswith('.json') or lower == '__actions.tce':
+            return json.loads(text)
+        if lower in ('__app.tce', '__game.tce'):
+            return _parse_key_values(text)
+        return _parse_ini(text)
+    except Exception as e:
+        return {'__error__': str(e)}
+
+
+class CatalogEntry:
+    """One add-on: where it is, what its manifests said, and when."""
+
+    __slots__ = ('kind', 'name', 'path', 'files', 'stamp', 'digest')
+
+    def __init__(self, kind, name, path, files, stamp, digest):
+        self.kind = kind
+        self.name = name
+        self.path = path
+        self.files = files      # filename -> parsed content
+        self.stamp = stamp      # ((filename, mtime_ns, size), ...)
+        self.digest = digest    # SHA-1 over every file read
+
+    def file(self, *names):
+        """The parsed content of the first of `names` this add-on has."""
+        for name in names:
+            if name in self.files:
+                return self.files[name]
+        return None
+
+    def key_values(self):
+        """`__app.tce` / `__game.tce` content, whichever this add-on has."""
+        return self.file('__app.tce', '__app.TCE', '__game.tce', '__game.TCE') or {}
+
+    def action_manifest(self):
+        return self.file(*_ACTION_FILES)
+
+    def action_manifest_name(self):
+        for name in _ACTION_FILES:
+            if name in self.files:
+                return name
+        return ''
+
+    def to_json(self):
+        return {'name': self.name, 'path': self.path, 'files': self.files,
+                'stamp': [list(s) for s in self.stamp], 'digest': self.digest}
+
+    @classmethod
+    def from_json(cls, kind, data):
+        return cls(kind, data['name'], data['path'], data.get('files') or {},
+                   tuple(tuple(s) for s in data.get('stamp') or ()),
+                   data.get('digest', ''))
+
+    def __repr__(self):
+        return f"<CatalogEntry {self.kind}:{self.name}>"
+
+
+class AddonCatalog:
+    """The index itself.  Most code wants the shared one, `get_catalog()`."""
+
+    def __init__(self, cache_path=None, kinds=None,
+                 revalidate_interval=_REVALIDATE_INTERVAL,
+                 discover=None, roots=None):
+        self.cache_path = cache_path
+        self.kinds = dict(CATALOG_KINDS if kinds is None else kinds)
+        self.revalidate_interval = revalidate_interval
+        self._discover = discover or platform_utils.discover_data_entries
+        self._roots_of = roots or platform_utils.iter_data_roots
+        self._lock = threading.RLock()
+        self._entries = {}        # kind -> {name: CatalogEntry}, discovery order
+        self._roots = {}          # kind -> ((root, mtime_ns), ...)
+        self._checked = {}        # kind -> monotonic time of the last check
+        self._by_shortname = {}   # kind -> {shortname: CatalogEntry}
+        self._persisted = None    # what the cache file held, until used
+        self._listeners = []
+        self.generation = 0       # bumped by every change found
+
+    # ------------------------------------------------------------------ #
+    # Reading
+    # ------------------------------------------------------------------ #
+    def entries(self, kind):
+        """Every add-on of `kind`, in discovery order (user copies win)."""
+        self.revalidate(kind)
+        with self._lock:
+            return list(self._entries.get(kind, {}).values())
+
+    def get(self, kind, name):
+        """The add-on in folder `name`, or None."""
+        self.revalidate(kind)
+        with self._lock:
+            return self._entries.get(kind, {}).get(name)
+
+    def find_by_shortname(self, kind, shortname):
+        """The add-on whose manifest says `shortname=<shortname>`, or None."""
+        self.revalidate(kind)
+        with self._lock:
+            return self._by_shortname.get(kind, {}).get(shortname)
+
+    # ------------------------------------------------------------------ #
+    # Keeping it true
+    # ------------------------------------------------------------------ #
+    def subscribe(self, listener):
+        """Call `listener(kind, added, changed, removed)` on every change.
+
+        The three are lists of folder names.  Returns a function that
+        unsubscribes.  Listeners run on whichever thread noticed the change,
+        outside the catalog's lock, and an exception in one is printed and
+        otherwise ignored.
+        """
+        with self._lock:
+            self._listeners.append(listener)
+
+        def unsubscribe():
+            with self._lock:
+                if listener in self._listeners:
+                    self._listeners.remove(listener)
+        return unsubscribe
+
+    def invalidate(self, kind=None):
+        """Check again on the next read, whatever the clock says.
+
+        Nothing is thrown away: the next check still keeps every add-on whose
+        files have not changed.  Call after installing or removing an add-on.
+        """
+        with self._lock:
+            if kind is None:
+                self._checked.clear()
+                self._roots.clear()
+            else:
+                self._checked.pop(kind, None)
+                self._roots.pop(kind, None)
+
+    def revalidate(self, kind, force=False):
+        """Bring `kind` up to date with the disk.  Returns True if it changed."""
+        if kind not in self.kinds:
+            raise KeyError(f"unknown add-on kind: {kind}")
+        with self._lock:
+            now = time.monotonic()
+            last = self._checked.get(kind)
+            if (not force and last is not None
+                    and now - last < self.revalidate_interval):
+                return False
+            self._checked[kind] = now
+            added, changed, removed = self._revalidate_locked(kind)
+            if not (added or changed or removed):
+                return False
+            self.generation += 1
+            listeners = list(self._listeners)
+        self.save()
+        for listener in listeners:
+            try:
+                listener(kind, added, changed, removed)
+            except Exception as e:
+                print(f"[addon_catalog] Change listener failed: {e}")
+        return True
+
+    def _revalidate_locked(self, kind):
+        subdir, filenames = self.kinds[kind]
+        old = self._entries.get(kind)
+        if old is None:
+            old = self._from_persisted(kind)
+        roots = self._stat_roots(subdir)
+        if old is not None and roots == self._roots.get(kind):
+            # Nothing was added to or removed from any root.
+            folders = [(name, entry.path) for name, entry in old.items()]
+        else:
+            folders = list(self._discover(subdir).items())
+        self._roots[kind] = roots
+
+        old = old or {}
+        fresh = {}
+        added, changed = [], []
+        for name, path in folders:
+            previous = old.get(name)
+            entry = self._check_entry(kind, name, path, filenames, previous)
+            if entry is None:
+                continue
+            fresh[name] = entry
+            if previous is None:
+                added.append(name)
+            elif entry is not previous and entry.digest != previous.digest:
+                changed.append(name)
+        removed = [name for name in old if name not in fresh]
+        self._entries[kind] = fresh
+        self._by_shortname[kind] = {
+            entry.key_values().get('shortname'): entry
+            for entry in reversed(list(fresh.values()))
+            if entry.key_values().get('shortname')}
+        return added, changed, removed
+
+    def _stat_roots(self, subdir):
+        roots = []
+        for root in self._roots_of(subdir):
+            try:
+                roots.append((root, os.stat(root).st_mtime_ns))
+            except OSError:
+                continue
+        return tuple(roots)
+
+    def _stamp(self, path, filenames):
+        stamp = []
+        seen = set()
+        for filename in filenames:
+            # '__app.tce' and '__app.TCE' are one file where case does not
+            # matter, two where it does.
+            folded = os.path.normcase(filename)
+            if folded in seen:
+                continue
+            try:
+                st = os.stat(os.path.join(path, filename))
+            except OSError:
+                continue
+            if stat.S_ISREG(st.st_mode):
+                seen.add(folded)
+                stamp.append((filename, st.st_mtime_ns, st.st_size))
+        return tuple(stamp)
+
+    def _check_entry(self, kind, name, path, filenames, previous):
+        if not os.path.isdir(path):
+            return None
+        stamp = self._stamp(path, filenames)
+        if previous is not None and previous.path == path and previous.stamp == stamp:
+            return previous
+        files, digest = self._read_files(path, stamp)
+        if previous is not None and previous.path == path and previous.digest == digest:
+            # Touched, not changed: keep what was parsed, remember the time.
+            previous.stamp = stamp
+            return previous
+        return CatalogEntry(kind, name, path, files, stamp, digest)
+
+    def _read_files(self, path, stamp):
+        files = {}
+        hasher = hashlib.sha1()
+        for filename, _mtime, _size in stamp:
+            try:
+                with open(os.path.join(path, filename), 'rb') as handle:
+                    raw = handle.read()
+            except OSError as e:
+                files[filename] = {'__error__': str(e)}
+                continue
+            hasher.update(filename.encode('utf-8'))
+            hasher.update(raw)
+            files[filename] = parse_manifest_file(filename, raw)
+        return files, hasher.hexdigest()
+
+    # ------------------------------------------------------------------ #
+    # Persistence
+    # ------------------------------------------------------------------ #
+    def _load_persisted(self):
+        if self._persisted is not None:
+            return self._persisted
+        self._persisted = {}
+        if not self.cache_path or not os.path.isfile(self.cache_path):
+            return self._persisted
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as handle:
+                data = json.load(handle)
+            if data.get('version') == _CACHE_VERSION:
+                self._persisted = data.get('kinds') or {}
+        except Exception as e:
+            print(f"[addon_catalog] Ignoring unreadable cache {self.cache_path}: {e}")
+        return self._persisted
+
+    def _from_persisted(self, kind):
+        stored = self._load_persisted().get(kind)
+        if not stored:
+            return None
+        try:
+            entries = {item['name']: CatalogEntry.from_json(kind, item)
+                       for item in stored.get('entries', [])}
+            # The roots as they were when the cache was written: if they have
+            # not moved since, the cached list of folders is still the list.
+            self._roots[kind] = tuple(tuple(r) for r in stored.get('roots', ()))
+            return entries
+        except Exception as e:
+            print(f"[addon_catalog] Ignoring cached {kind} entries: {e}")
+            return None
+
+    def save(self):
+        """Write the index to the cache file (atomically).  Never raises."""
+        if not self.cache_path:
+            return
+        with self._lock:
+            kinds = dict(self._load_persisted())
+            for kind, entries in self._entries.items():
+                kinds[kind] = {
+                    'roots': [list(r) for r in self._roots.get(kind, ())],
+                    'entries': [e.to_json() for e in entries.values()],
+                }
+            payload = {'version': _CACHE_VERSION, 'kinds': kinds}
+            self._persisted = kinds
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            tmp = f"{self.cache_path}.{os.getpid()}.tmp"
+            with open(tmp, 'w', encoding='utf-8') as handle:
+                json.dump(payload, handle, ensure_ascii=False)
+            os.replace(tmp, self.cache_path)
+        except Exception as e:
+            print(f"[addon_catalog] Could not write {self.cache_path}: {e}")
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def default_cache_path():
+    return os.path.join(platform_utils.get_user_data_dir(), 'cache',
+                        'addon_catalog.json')
+
+
+def get_catalog():
+    """The catalog the whole program shares."""
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = AddonCatalog(cache_path=default_cache_path())
+    return _catalog
+
+
+def subscribe(listener):
+    """`get_catalog().subscribe(listener)`."""
+    return get_catalog().subscribe(listener)
+
+
+def invalidate(kind=None):
+    """`get_catalog().invalidate(kind)`."""
+    get_catalog().invalidate(kind)
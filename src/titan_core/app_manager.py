@@ -7,7 +7,9 @@ import importlib.util
 from src.settings import settings
 from src.titan_core.sound import play_sound, play_error_sound, play_dialog_sound, play_dialogclose_sound, resource_path
 from src.titan_core.translation import language_code, _
-from src.platform_utils import is_frozen, IS_WINDOWS, discover_data_entries
+from src.platform_utils import is_frozen, IS_WINDOWS
+from src.titan_core.startup_trace import traced
+from src.titan_core import addon_catalog
 
 
 APP_DIR = resource_path(os.path.join('data', 'applications'))
@@ -18,39 +20,40 @@ if not os.path.exists(SITEPACKAGES_DIR):
     os.makedirs(SITEPACKAGES_DIR)
 
 
-def _iter_app_folders():
-    """Yield (folder_name, abs_path) for every application folder in the
-    bundled data/applications/ and the user overlay under
-    %APPDATA%/titosoft/Titan/data/applications/. User entries override bundled
-    entries with the same folder name.
+def _app_info_from_entry(entry, lang):
+    """What read_app_info would return for a catalog entry, without the read.
+
+    A fresh dict every time: callers add keys to what they are given.
     """
-    entries = discover_data_entries('applications')
-    for name, path in entries.items():
-        yield name, path
+    values = entry.key_values()
+    if not values or '__error__' in values:
+        return None
+    app_info = dict(values)
+    app_info['name'] = app_info.get(f'name_{lang}', app_info.get('name_en', app_info.get('name', '')))
+    app_info['path'] = entry.path
+    return app_info
 
 
-def get_applications():
-    """Get list of all visible applications."""
+def _catalog_applications(hidden):
     lang = language_code
     applications = []
-
-    for app_folder, app_path in _iter_app_folders():
-        app_info = read_app_info(app_path, lang)
-        if app_info and not app_info.get('hidden', 'false').lower() == 'true':
+    for entry in addon_catalog.get_catalog().entries('app'):
+        app_info = _app_info_from_entry(entry, lang)
+        if app_info and (app_info.get('hidden', 'false').lower() == 'true') == hidden:
             applications.append(app_info)
     return applications
 
 
+@traced('apps.discover')
+def get_applications():
+    """Get list of all visible applications."""
+    return _catalog_applications(hidden=False)
+
+
+@traced('apps.discover')
 def get_hidden_applications():
     """Get list of hidden applications."""
-    lang = language_code
-    hidden_applications = []
-
-    for app_folder, app_path in _iter_app_folders():
-        app_info = read_app_info(app_path, lang)
-        if app_info and app_info.get('hidden', 'false').lower() == 'true':
-            hidden_applications.append(app_info)
-    return hidden_applications
+    return _catalog_applications(hidden=True)
 
 
 def read_app_info(app_path, lang='pl'):
@@ -83,10 +86,10 @@ def read_app_info(app_path, lang='pl'):
 
 def find_application_by_shortname(shortname):
     """Search for applications by shortname including hidden ones."""
-    for app in get_applications() + get_hidden_applications():
-        if app.get('shortname') == shortname:
-            return app
-    return None
+    entry = addon_catalog.get_catalog().find_by_shortname('app', shortname)
+    if entry is None:
+        return None
+    return _app_info_from_entry(entry, language_code)
 
 
 def _debug_log(message):
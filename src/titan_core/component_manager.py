@@ -6,11 +6,15 @@ import py_compile
 import shutil
 import platform
 import configparser
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from src.platform_utils import (
     get_base_path as _get_base_path,
     is_frozen as _is_frozen,
     discover_data_entries as _discover_data_entries,
 )
+from src.titan_core.startup_trace import traced as _traced
 
 
 def _log_to_file(message):
@@ -23,6 +27,79 @@ def _log_to_file(message):
         pass
 
 
+# How a component is loaded is declared in its __component__.TCE, next to
+# `status`, so a heavy component can be kept off the way to the first speech
+# without a line of its code changing:
+#
+#   load = startup      imported before the main window (the default)
+#   load = deferred     imported in the background once the window is up and
+#                       the other components are initialised
+#   load = on_demand    imported the first time it is used - its `menu` entry
+#                       is pressed, or something asks ensure_component_loaded()
+#   depends = a, b      folder names of components to import before this one
+#   parallel = false    import on the loading thread, never on a worker (for a
+#                       component whose init.py builds windows at import time)
+#   menu = Label        the Components menu entry an on_demand component
+#                       shows until it is loaded
+#
+# Components with no dependency between them are imported side by side on
+# worker threads.  Only the import runs there; the menu, the settings and the
+# UI hooks are registered afterwards on the loading thread, in the order the
+# components were discovered, so nothing a component registers can depend on
+# which worker happened to finish first.
+
+LOAD_STARTUP = 'startup'
+LOAD_DEFERRED = 'deferred'
+LOAD_ON_DEMAND = 'on_demand'
+_LOAD_MODES = (LOAD_STARTUP, LOAD_DEFERRED, LOAD_ON_DEMAND)
+
+# Worker threads for component imports.  The imports share the GIL, so the
+# gain is the file system and the native libraries they load, which a handful
+# of threads already covers.
+_MAX_IMPORT_WORKERS = 4
+
+
+def plan_load_levels(depends):
+    """Order components so each comes after what it depends on.
+
+    `depends` maps a folder name to the folder names it needs, in discovery
+    order.  Returns a list of levels: every component in a level has all of
+    its dependencies in earlier levels, so the members of one level can be
+    imported at the same time.  A dependency that is not in `depends` at all
+    (disabled, or not installed) is ignored; components caught in a cycle are
+    loaded one at a time in discovery order after everything else, which is
+    what Titan did for all of them before there were dependencies.
+    """
+    remaining = {name: [d for d in needs if d in depends and d != name]
+                 for name, needs in depends.items()}
+    placed = set()
+    levels = []
+    while remaining:
+        level = [name for name, needs in remaining.items()
+                 if all(d in placed for d in needs)]
+        if not level:
+            print(f"[ComponentManager] Dependency cycle between: {', '.join(remaining)}")
+            levels.extend([name] for name in remaining)
+            break
+        levels.append(level)
+        placed.update(level)
+        for name in level:
+            del remaining[name]
+    return levels
+
+
+def _call_on_gui(function, *args):
+    """Run `function` on the wx main thread, or right here when there is none."""
+    try:
+        import wx
+        if wx.GetApp() is not None and not wx.IsMainThread():
+            wx.CallAfter(function, *args)
+            return
+    except Exception:
+        pass
+    function(*args)
+
+
 class ComponentManager:
     def __init__(self, settings_frame=None, gui_app=None):
         self.components = []
@@ -37,6 +114,15 @@ class ComponentManager:
         self.component_launcher_hooks = {}  # Hooks for custom launcher modifications
         self.component_paths = {}  # folder_name -> absolute path the component was loaded from
         self.components_loaded = False  # Track if components have been loaded
+        self.component_modules = {}  # folder_name -> module, once registered
+        self.component_load_times = {}  # folder_name -> timings, see format_load_time_table
+        self._deferred_components = {}  # folder_name -> (init_path, options), load = deferred
+        self._on_demand_components = {}  # folder_name -> (init_path, options), load = on_demand
+        self._menu_placeholders = {}  # folder_name -> menu label standing in for it
+        self._menu_owners = {}  # folder_name -> menu labels it registered
+        self._imported_modules = {}  # folder_name -> module imported, not yet registered
+        self._load_lock = threading.RLock()
+        self._app = None  # what initialize_components was given, for late loads
         self.load_components()
 
     def get_component_display_name(self, component_path, folder_name):
@@ -48,6 +134,7 @@ class ComponentManager:
         except Exception:
             return folder_name
 
+    @_traced('components.load')
     def load_components(self):
         """Loads all components from the bundled data/components directory and
         the per-user overlay under %APPDATA%/titosoft/Titan/data/components/.
@@ -102,6 +189,9 @@ class ComponentManager:
                         sys.path.insert(0, meipass)
                         print(f"[ComponentManager] Added _MEIPASS to sys.path: {meipass}")
 
+            # Read every manifest first, import afterwards: the order and the
+            # parallelism of the imports depend on what ALL of them declare.
+            plan = {}
             for component_folder, component_path in entries.items():
                 try:
                     _log_to_file(f"Checking folder: {component_folder} ({component_path})")
@@ -122,9 +212,9 @@ class ComponentManager:
                                 init_path = self.find_init_file(component_path)
                                 _log_to_file(f"  Init path: {init_path}")
                                 if init_path:
-                                    _log_to_file(f"  Calling load_component...")
-                                    self.load_component(init_path, component_folder)
-                                    _log_to_file(f"  load_component returned")
+                                    options = self.get_component_load_options(component_path)
+                                    _log_to_file(f"  Load options: {options}")
+                                    plan[component_folder] = (init_path, options)
                                 else:
                                     print(f"No init file found in component: {component_folder}")
                                     _log_to_file(f"  ERROR: No init file found")
@@ -143,6 +233,9 @@ class ComponentManager:
                     _log_to_file(f"ERROR accessing folder: {e}")
                     continue
 
+            self._load_plan(plan)
+            print(self.format_load_time_table())
+
             _log_to_file(f"=== Component Loading Finished ===")
             _log_to_file(f"Total components loaded: {len(self.components)}")
             _log_to_file(f"Component states: {self.component_states}")
@@ -173,6 +266,236 @@ class ComponentManager:
         except (KeyError, ValueError):
             return 1  # Default to disabled if error
 
+    def get_component_load_options(self, component_path):
+        """How the manifest asks for the component to be loaded.
+
+        Returns a dict with `load` (one of LOAD_STARTUP, LOAD_DEFERRED,
+        LOAD_ON_DEMAND), `depends` (a list of folder names), `parallel` and
+        `menu`.  Anything missing or unreadable means what Titan has always
+        done: load at startup, in no particular company.
+        """
+        options = {'load': LOAD_STARTUP, 'depends': [], 'parallel': True, 'menu': ''}
+        config = configparser.ConfigParser()
+        try:
+            config.read(os.path.join(component_path, '__component__.TCE'), encoding='utf-8')
+            section = config['component']
+        except Exception:
+            return options
+        load = section.get('load', LOAD_STARTUP).strip().lower().replace('-', '_')
+        if load in ('lazy', 'on_first_use'):
+            load = LOAD_ON_DEMAND
+        if load not in _LOAD_MODES:
+            print(f"[ComponentManager] Unknown load mode '{load}' in {component_path}, loading at startup")
+            load = LOAD_STARTUP
+        options['load'] = load
+        options['depends'] = [d.strip() for d in section.get('depends', '').split(',') if d.strip()]
+        options['parallel'] = section.get('parallel', 'true').strip().lower() not in ('false', '0', 'no')
+        options['menu'] = section.get('menu', '').strip()
+        return options
+
+    def _load_plan(self, plan):
+        """Import the startup components of `plan` and set the rest aside.
+
+        `plan` maps folder names to (init_path, options) in discovery order.
+        A startup component that depends on a deferred or on-demand one pulls
+        it forward to startup: a dependency is needed when its dependant is
+        imported, not when the dependency would have liked to be.
+        """
+        startup = [name for name, (_p, o) in plan.items() if o['load'] == LOAD_STARTUP]
+        pending = list(startup)
+        while pending:
+            for dependency in plan[pending.pop()][1]['depends']:
+                if dependency in plan and plan[dependency][1]['load'] != LOAD_STARTUP:
+                    print(f"[ComponentManager] {dependency} is needed at startup, loading it now")
+                    plan[dependency][1]['load'] = LOAD_STARTUP
+                    pending.append(dependency)
+
+        for name, (init_path, options) in plan.items():
+            if options['load'] == LOAD_DEFERRED:
+                self._deferred_components[name] = (init_path, options)
+                self.component_load_times[name] = {'mode': LOAD_DEFERRED}
+            elif options['load'] == LOAD_ON_DEMAND:
+                self._on_demand_components[name] = (init_path, options)
+                self.component_load_times[name] = {'mode': LOAD_ON_DEMAND}
+                if options['menu']:
+                    self._add_menu_placeholder(name, options['menu'])
+
+        depends = {name: plan[name][1]['depends'] for name in plan
+                   if plan[name][1]['load'] == LOAD_STARTUP}
+        for level in plan_load_levels(depends):
+            self._import_level(level, plan)
+            # Registered in discovery order, not in the order the workers
+            # finished.
+            for name in level:
+                module = self._imported_modules.pop(name, None)
+                if module is not None:
+                    self._timed_register(module, name)
+
+    def _import_level(self, level, plan):
+        """Import one level of the plan, the parallel-safe ones side by side."""
+        together = [name for name in level if plan[name][1]['parallel']]
+        alone = [name for name in level if not plan[name][1]['parallel']]
+        if len(together) > 1:
+            workers = min(_MAX_IMPORT_WORKERS, len(together))
+            with ThreadPoolExecutor(max_workers=workers,
+                                    thread_name_prefix='ComponentImport') as pool:
+                for name in together:
+                    pool.submit(self._timed_import, plan[name][0], name, LOAD_STARTUP)
+        else:
+            alone = together + alone
+        for name in alone:
+            self._timed_import(plan[name][0], name, LOAD_STARTUP)
+
+    def _timed_import(self, init_path, component_name, mode):
+        """`_import_component`, with its time written into the load table."""
+        from src.titan_core.startup_trace import span
+        started = time.perf_counter()
+        with span('component.import', component=component_name):
+            module = self._import_component(init_path, component_name)
+        entry = self.component_load_times.setdefault(component_name, {})
+        entry.update({
+            'mode': mode,
+            'import_ms': (time.perf_counter() - started) * 1000.0,
+            'thread': threading.current_thread().name,
+            'failed': module is None,
+        })
+        if module is not None:
+            self._imported_modules[component_name] = module
+        return module
+
+    def _timed_register(self, module, component_name):
+        started = time.perf_counter()
+        self._register_component(module, component_name)
+        self.component_load_times.setdefault(component_name, {})['register_ms'] = (
+            time.perf_counter() - started) * 1000.0
+
+    def get_load_time_table(self):
+        """One row per component: (folder, mode, import, register, initialize).
+
+        Times are milliseconds, None for a step that has not happened (yet) -
+        an on-demand component nobody has used has no times at all.
+        """
+        rows = []
+        for name, entry in self.component_load_times.items():
+            rows.append((name, entry.get('mode', LOAD_STARTUP),
+                         entry.get('import_ms'), entry.get('register_ms'),
+                         entry.get('initialize_ms')))
+        return rows
+
+    def format_load_time_table(self):
+        """The load table as text, slowest import first."""
+        def ms(value):
+            return '-' if value is None else f"{value:.1f}"
+        rows = sorted(self.get_load_time_table(),
+                      key=lambda row: -(row[2] or 0.0))
+        lines = ["[ComponentManager] Component load times (ms)",
+                 f"{'component':<24} {'mode':<10} {'import':>9} {'register':>9} {'init':>9}"]
+        for name, mode, imported, registered, initialized in rows:
+            lines.append(f"{name[:24]:<24} {mode:<10} {ms(imported):>9} "
+                         f"{ms(registered):>9} {ms(initialized):>9}")
+        return '\n'.join(lines)
+
+    def ensure_component_loaded(self, component_folder):
+        """The module of a component, loading it now if it was put off.
+
+        This is "first use" for a `load = on_demand` component, and it also
+        brings a deferred one in early if it is needed before its turn.
+        Returns None for a component that is not enabled or failed to load.
+        Call it from the GUI thread: a component's menu and hooks are
+        registered by the thread that loads it.
+        """
+        with self._load_lock:
+            module = self.component_modules.get(component_folder)
+            if module is not None:
+                return module
+            planned = (self._on_demand_components.pop(component_folder, None)
+                       or self._deferred_components.pop(component_folder, None))
+            module = self._imported_modules.pop(component_folder, None)
+            if module is None and planned is None:
+                return None
+            if module is None:
+                init_path, options = planned
+                for dependency in options['depends']:
+                    self.ensure_component_loaded(dependency)
+                mode = self.component_load_times.get(component_folder, {}).get('mode', LOAD_ON_DEMAND)
+                module = self._timed_import(init_path, component_folder, mode)
+                self._imported_modules.pop(component_folder, None)
+                if module is None:
+                    return None
+            self._finish_late_component(module, component_folder)
+            return module
+
+    def _finish_late_component(self, module, component_folder):
+        """Everything startup would have done for a component that came later."""
+        self._timed_register(module, component_folder)
+        hooks = self.component_gui_hooks.get(component_folder)
+        if hooks and self.gui_app is not None and callable(hooks.get('on_gui_init')):
+            try:
+                hooks['on_gui_init'](self.gui_app)
+            except Exception as e:
+                print(f"Error applying GUI hooks from component {component_folder}: {e}")
+        if self.settings_frame is not None and hasattr(module, 'add_settings_category'):
+            try:
+                module.add_settings_category(self)
+            except Exception as e:
+                print(f"Error registering settings category for component {component_folder}: {e}")
+        if self._app is not None:
+            self._initialize_component(module, self._app)
+        try:
+            from src.titan_core import actions as titan_actions_api
+            titan_actions_api.invalidate()
+        except Exception as e:
+            print(f"[ComponentManager] Could not refresh the action registry: {e}")
+
+    def _add_menu_placeholder(self, component_folder, label):
+        """A Components menu entry that loads the component when pressed."""
+        def open_component(*args, **kwargs):
+            module = self.ensure_component_loaded(component_folder)
+            if module is None:
+                print(f"[ComponentManager] Component {component_folder} could not be loaded")
+                return None
+            target = self.component_menu_functions.get(label)
+            if target is None or target is open_component:
+                owned = self._menu_owners.get(component_folder, [])
+                target = self.component_menu_functions.get(owned[0]) if owned else None
+            if target is None or target is open_component:
+                return None
+            return target(*args, **kwargs)
+
+        self._menu_placeholders[component_folder] = label
+        self.component_menu_functions[label] = open_component
+
+    def _retire_menu_placeholder(self, component_folder, menu_before):
+        """Once the component has registered its own entries, drop the stand-in."""
+        owned = [name for name, function in self.component_menu_functions.items()
+                 if menu_before.get(name) is not function]
+        self._menu_owners[component_folder] = owned
+        label = self._menu_placeholders.pop(component_folder, None)
+        if label and label not in owned:
+            self.component_menu_functions.pop(label, None)
+
+    def _start_deferred_loading(self):
+        """Import the `load = deferred` components off the GUI thread."""
+        if not self._deferred_components:
+            return
+
+        depends = {name: options['depends']
+                   for name, (_p, options) in self._deferred_components.items()}
+        order = [name for level in plan_load_levels(depends) for name in level]
+
+        def worker():
+            for name in order:
+                with self._load_lock:
+                    planned = self._deferred_components.pop(name, None)
+                    if planned is None:
+                        continue  # somebody needed it first
+                    init_path, options = planned
+                    module = self._timed_import(init_path, name, LOAD_DEFERRED)
+                if module is not None:
+                    _call_on_gui(self.ensure_component_loaded, name)
+
+        threading.Thread(target=worker, name='ComponentDeferredLoad', daemon=True).start()
+
     def toggle_component_status(self, component_folder):
         # Prefer the path the component was actually loaded from so that
         # user-overlay components write their config to the user dir rather
@@ -222,6 +545,19 @@ class ComponentManager:
 
     def load_component(self, init_path, component_name):
         """Loads a component from the given init file."""
+        module = self._import_component(init_path, component_name)
+        if module is not None:
+            self._register_component(module, component_name)
+        return module
+
+    def _import_component(self, init_path, component_name):
+        """Runs a component's init file and returns its module, or None.
+
+        Only the import: nothing here touches the GUI or this manager's
+        registries, which is what lets `_load_plan` run it on a worker
+        thread.  Everything else a component does on load is
+        `_register_component`, on the GUI thread.
+        """
         try:
             # For frozen apps, use exec() to load .py files directly
             # This allows access to bundled modules in sys.modules
@@ -280,14 +616,13 @@ class ComponentManager:
                         _log_to_file(f"  Code executed successfully")
 
                         sys.modules[component_name] = module
-                        self.components.append(module)
                     except Exception as e:
                         print(f"Failed to load component {component_name} via exec(): {e}")
                         _log_to_file(f"  FAILED to load: {e}")
                         import traceback
                         traceback.print_exc()
                         _log_to_file(f"  Traceback: {traceback.format_exc()}")
-                        return
+                        return None
                 else:
                     # Load .pyc file via importlib in frozen mode
                     print(f"[ComponentManager] Loading component via importlib (frozen): {component_name}")
@@ -297,7 +632,7 @@ class ComponentManager:
                         if spec is None:
                             print(f"Could not create spec for component: {component_name}")
                             _log_to_file(f"  ERROR: Could not create spec")
-                            return
+                            return None
 
                         module = importlib.util.module_from_spec(spec)
                         sys.modules[component_name] = module
@@ -307,7 +642,6 @@ class ComponentManager:
                         except Exception as _be:
                             print(f"[Component] buffer API injection failed: {_be}")
                         spec.loader.exec_module(module)
-                        self.components.append(module)
                         _log_to_file(f"  Loaded successfully via importlib")
                     except Exception as e:
                         print(f"Failed to load component {component_name} via importlib: {e}")
@@ -315,7 +649,7 @@ class ComponentManager:
                         import traceback
                         traceback.print_exc()
                         _log_to_file(f"  Traceback: {traceback.format_exc()}")
-                        return
+                        return None
             else:
                 # Development mode - use importlib
                 if init_path.endswith('.py'):
@@ -326,7 +660,7 @@ class ComponentManager:
                             pyc_path = self.compile_to_pyc(init_path)
                             if not pyc_path:
                                 print(f"Failed to compile file: {init_path}")
-                                return
+                                return None
                         init_path = pyc_path
                     except Exception as e:
                         print(f"Error compiling component {component_name}: {e}")
@@ -336,7 +670,7 @@ class ComponentManager:
                 spec = importlib.util.spec_from_file_location(component_name, init_path)
                 if spec is None:
                     print(f"Could not create spec for component: {component_name}")
-                    return
+                    return None
 
                 module = importlib.util.module_from_spec(spec)
                 sys.modules[component_name] = module
@@ -346,9 +680,26 @@ class ComponentManager:
                 except Exception as _be:
                     print(f"[Component] buffer API injection failed: {_be}")
                 spec.loader.exec_module(module)
-                self.components.append(module)
+            return module
+        except Exception as e:
+            print(f"Failed to load component {component_name}: {e}")
+            import traceback
+            traceback.print_exc()
+            return None
 
+    def _register_component(self, module, component_name):
+        """Hooks an imported component into Titan: menu, settings, UI hooks.
+
+        Called on the GUI thread, in load order, so the Components menu and
+        the hook dictionaries read the same from one start to the next no
+        matter which worker finished importing first.
+        """
+        try:
+            self.components.append(module)
+            self.component_modules[component_name] = module
             print(f"Successfully loaded component: {component_name}")
+            menu_before = dict(self.component_menu_functions)
+
 
             try:
                 if hasattr(module, 'add_menu'):
@@ -426,8 +777,10 @@ class ComponentManager:
             except Exception as e:
                 print(f"Error getting launcher hooks for component {component_name}: {e}")
 
+            self._retire_menu_placeholder(component_name, menu_before)
+
         except Exception as e:
-            print(f"Failed to load component {component_name}: {e}")
+            print(f"Failed to register component {component_name}: {e}")
             import traceback
             traceback.print_exc()
 
@@ -612,31 +965,13 @@ class ComponentManager:
 
     
 
+    @_traced('components.initialize')
     def initialize_components(self, app):
         """Initializes all loaded components."""
         print(f"[ComponentManager] initialize_components called with {len(self.components)} components")
-        for component in self.components:
-            try:
-                component_name = getattr(component, '__name__', 'Unknown')
-                print(f"[ComponentManager] Checking component: {component_name}")
-                if hasattr(component, 'initialize'):
-                    try:
-                        print(f"[ComponentManager] Calling initialize() for {component_name}")
-                        component.initialize(app)
-                        print(f"[ComponentManager] Successfully initialized component: {component_name}")
-                    except Exception as e:
-                        print(f"[ComponentManager] Failed to initialize component {component_name}: {e}")
-                        import traceback
-                        traceback.print_exc()
-                        # Continue with next component
-                else:
-                    print(f"[ComponentManager] No initialize function in component: {component_name}")
-            except Exception as e:
-                print(f"[ComponentManager] Critical error in initialize_components for component: {e}")
-                import traceback
-                traceback.print_exc()
-                # Continue with next component
-                continue
+        self._app = app
+        for component in list(self.components):
+            self._initialize_component(component, app)
         print(f"[ComponentManager] Finished initializing components")
         # A component may declare TITAN_ACTIONS, and Titan finds those on the
         # module it has loaded - which has only just happened. Without this the
@@ -656,6 +991,34 @@ class ComponentManager:
             script_launch.run_pending()
         except Exception as e:
             print(f"[ComponentManager] Could not run the requested script: {e}")
+        # Last, so the deferred components really are behind everything the
+        # user is waiting for.
+        self._start_deferred_loading()
+
+    def _initialize_component(self, component, app):
+        """Call one component's initialize(app), timed, never raising."""
+        try:
+            component_name = getattr(component, '__name__', 'Unknown')
+            print(f"[ComponentManager] Checking component: {component_name}")
+            if hasattr(component, 'initialize'):
+                started = time.perf_counter()
+                try:
+                    print(f"[ComponentManager] Calling initialize() for {component_name}")
+                    component.initialize(app)
+                    print(f"[ComponentManager] Successfully initialized component: {component_name}")
+                except Exception as e:
+                    print(f"[ComponentManager] Failed to initialize component {component_name}: {e}")
+                    import traceback
+                    traceback.print_exc()
+                    # Continue with next component
+                self.component_load_times.setdefault(component_name, {})['initialize_ms'] = (
+                    time.perf_counter() - started) * 1000.0
+            else:
+                print(f"[ComponentManager] No initialize function in component: {component_name}")
+        except Exception as e:
+            print(f"[ComponentManager] Critical error in initialize_components for component: {e}")
+            import traceback
+            traceback.print_exc()
 
     def shutdown_components(self):
         """Shuts down all loaded components."""
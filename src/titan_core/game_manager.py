@@ -12,6 +12,8 @@ from src.platform_utils import (
     IS_MACOS,
     discover_data_entries,
 )
+from src.titan_core.startup_trace import traced
+from src.titan_core import addon_catalog
 
 # Windows-only imports
 if IS_WINDOWS:
@@ -23,6 +25,7 @@ PROJECT_ROOT = get_base_path()
 GAME_DIR = os.path.join(PROJECT_ROOT, 'data', 'games')
 
 
+@traced('games.discover')
 def get_games():
     """Get all games: from data/games/ (Titan-Games) + Steam + Battle.net.
 
@@ -32,12 +35,16 @@ def get_games():
     """
     games = []
 
-    # 1. Titan-Games from bundled data/games/ + user overlay
-    for game_folder, game_path in discover_data_entries('games').items():
-        game_info = read_game_info(game_path)
-        if game_info:
-            game_info['platform'] = game_info.get('platform', 'Titan-Games')
-            games.append(game_info)
+    # 1. Titan-Games from bundled data/games/ + user overlay, as the add-on
+    # catalog has them (see addon_catalog: read once, re-checked with stat)
+    for entry in addon_catalog.get_catalog().entries('game'):
+        values = entry.key_values()
+        if not values or '__error__' in values:
+            continue
+        game_info = dict(values)
+        game_info['path'] = entry.path
+        game_info['platform'] = game_info.get('platform', 'Titan-Games')
+        games.append(game_info)
 
     # 2. Steam games (from registry)
     try:
@@ -313,6 +320,7 @@ def get_battlenet_games():
     return battlenet_games
 
 
+@traced('games.discover')
 def get_games_by_platform():
     """Returns dict: {'Steam': [games...], 'Battle.net': [games...], 'Titan-Games': [games...]}"""
     all_games = get_games()
@@ -281,6 +281,7 @@ def initialize_sound():
         
         _mixer_initialized = True
         print(f"Audio system initialized on {platform.system()}")
+        _precompute_haptics()
         
         try:
             available_systems = get_available_audio_systems()
@@ -296,6 +297,17 @@ def initialize_sound():
         return False
 
 
+def _precompute_haptics():
+    """Have the haptic envelopes of the current theme computed in the background,
+    so the first play of each sound rumbles in step with it. Guarded like
+    _fire_haptics."""
+    try:
+        from src.controller import haptic_sync
+        haptic_sync.precompute_theme(get_sfx_directory())
+    except Exception:
+        pass
+
+
 def _fire_haptics(sound_path):
     """Drive audio-synced controller haptics for a sound that just started.
 
@@ -828,6 +840,7 @@ def set_theme(theme):
     global current_theme
     current_theme = theme
     stop_loop_sound()
+    _precompute_haptics()
     # play_loop_sound()
 
 
@@ -0,0 +1,151 @@
+"""
+Speculative speech prefetch for menu navigation.
+
+In the Klango menus, the invisible interface and the start menu an item is
+spoken only when it gets focus, so with a voice that has to be rendered to
+memory first (eSpeak EXE, SAPI5, macOS say, ElevenLabs, ...) every arrow
+press waits for a fresh synthesis before anything is heard: 100-500 ms per
+hop, more with network voices.
+
+When an item gets focus, the places the user can go next are already known:
+the next and previous items, the first item of a submenu, the parent item
+when going back. ``SpeechPrefetcher`` renders those in the background at
+idle priority and keeps the results, so the next hop's speech is usually
+waiting when the key is pressed and goes straight to playback.
+
+Every ``prefetch()`` call replaces whatever is still queued, so jumping
+around never leaves a backlog of stale items; an item already being
+rendered is finished (the engines cannot be interrupted halfway) and kept.
+A foreground ``take()`` for an item that is being rendered right now waits
+for it instead of starting a second synthesis of the same text.
+
+The prefetcher knows nothing about engines: it is given a ``synthesize``
+function returning rendered audio (or None) and a ``signature`` - the voice
+settings the audio was made with - so a change of engine, voice or rate
+never plays audio made with the old settings.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+def _lower_thread_priority():
+    """Run the calling thread (and, on Linux, what it spawns) at idle priority."""
+    try:
+        import sys
+        if sys.platform == 'win32':
+            import ctypes
+            THREAD_PRIORITY_IDLE = -15
+            kernel32 = ctypes.windll.kernel32
+            kernel32.SetThreadPriority(kernel32.GetCurrentThread(), THREAD_PRIORITY_IDLE)
+        else:
+            import os
+            # On Linux the nice value is per thread and inherited by children.
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+    except Exception:
+        pass
+
+
+class SpeechPrefetcher:
+    """Background renderer and cache of speech for the items around the focus."""
+
+    def __init__(self, synthesize, entries=64, idle_priority=True):
+        self._synthesize = synthesize
+        self._entries = entries
+        self._idle_priority = idle_priority
+        self._cond = threading.Condition()
+        self._cache = OrderedDict()      # (signature, text, pitch) -> audio
+        self._queue = []                 # keys waiting, in order
+        self._in_flight = None           # key being rendered
+        self._epoch = 0                  # bumped when the cache is cleared
+        self._thread = None
+        self.stats = {'requested': 0, 'rendered': 0, 'hits': 0, 'misses': 0,
+                      'waited': 0, 'dropped': 0, 'failed': 0}
+
+    def prefetch(self, items, signature):
+        """Render ``items`` - (text, pitch_offset) pairs, most likely first -
+        in the background, replacing anything still queued."""
+        with self._cond:
+            self.stats['dropped'] += len(self._queue)
+            self._queue = []
+            for text, pitch_offset in items:
+                if not text:
+                    continue
+                key = (signature, text, pitch_offset)
+                if key in self._cache or key == self._in_flight or key in self._queue:
+                    continue
+                self._queue.append(key)
+            self.stats['requested'] += len(self._queue)
+            if self._queue:
+                self._ensure_thread()
+                self._cond.notify()
+
+    def take(self, text, pitch_offset, signature, wait=1.0):
+        """The rendered audio for an item, or None to synthesize it as usual.
+
+        If the item is being rendered right now, wait up to ``wait`` seconds
+        for it rather than rendering it twice.
+        """
+        key = (signature, text, pitch_offset)
+        with self._cond:
+            if self._in_flight == key and wait > 0:
+                self.stats['waited'] += 1
+                deadline = time.monotonic() + wait
+                while self._in_flight == key:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+            audio = self._cache.get(key)
+            if audio is None:
+                self.stats['misses'] += 1
+                if key in self._queue:
+                    self._queue.remove(key)     # the caller renders it now
+                return None
+            self._cache.move_to_end(key)
+            self.stats['hits'] += 1
+            return audio
+
+    def clear(self):
+        """Forget everything (the voice settings changed)."""
+        with self._cond:
+            self._epoch += 1
+            self._queue = []
+            self._cache.clear()
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, daemon=True,
+                                            name="SpeechPrefetch")
+            self._thread.start()
+
+    def _run(self):
+        if self._idle_priority:
+            _lower_thread_priority()
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                key = self._queue.pop(0)
+                self._in_flight = key
+                epoch = self._epoch
+            _signature, text, pitch_offset = key
+            audio = None
+            try:
+                audio = self._synthesize(text, pitch_offset)
+            except Exception as e:
+                print(f"[SpeechPrefetch] Rendering '{text[:30]}' failed: {e}")
+            with self._cond:
+                self._in_flight = None
+                if audio is None:
+                    self.stats['failed'] += 1
+                elif epoch == self._epoch:
+                    # Kept even if the user has moved on: it is already paid
+                    # for, and menus are walked back and forth.
+                    self._cache[key] = audio
+                    self._cache.move_to_end(key)
+                    while len(self._cache) > self._entries:
+                        self._cache.popitem(last=False)
+                    self.stats['rendered'] += 1
+                self._cond.notify_all()
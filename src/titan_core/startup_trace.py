@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+"""
+Where Titan's startup goes, phase by phase, written down while it happens.
+
+`src/lazy_import.py` and `tests/test_startup.py` carry the numbers that
+shaped the startup work - `import main` at 2.83 s, the Settings window at
+2.1 s - and `src/scripts/profile_hotpaths.py` ranks the functions of a
+cProfile dump.  Neither answers the question asked after every change: did
+the component loading get slower, did the window take longer to build, and
+by how much.  A profile is too fine for it (thousands of frames, most of them
+library internals) and a number in a docstring is from the day it was
+written.
+
+So the phases that make up a startup are SPANS: `with span('settings'):`
+around the code that loads the settings, `@traced('components.load')` on
+`ComponentManager.load_components`, and so on for the app and game
+discovery, the sound system, the speech engine and the main window.  A span
+costs two `perf_counter()` calls and an append, which is why it is always on
+rather than behind a flag - the trace of a startup nobody meant to measure is
+the one that shows the regression.
+
+What is recorded can be read back two ways:
+
+* `export_chrome_trace(path)` writes Chrome trace-event JSON.  Open it in
+  `chrome://tracing` or https://ui.perfetto.dev and the startup is a
+  timeline, one row per thread, phases nested inside each other.
+* `budget_report()` adds the time each phase took and sets it against
+  `PHASE_BUDGETS_MS`.  `tests/test_startup_trace.py` fails when a phase that
+  can run headless goes over its budget, so the regression is a red test and
+  not a feeling that Titan "seems slower lately".
+
+**Recording stops with `finish()`.**  The discovery functions are traced
+where they are defined, and the menus call them again for as long as Titan
+runs; a trace that kept growing after startup would be a slow leak.  So
+`main.py` calls `finish()` once the components are initialised, and from then
+on a span is a check of one boolean.  `_MAX_EVENTS` is the second line of
+defence for a startup that never reaches that point.
+
+Run with `--trace-startup PATH` (or `TITAN_TRACE_STARTUP=PATH` in the
+environment, which also covers the imports before argument parsing) to have
+the trace written and the budget table printed when startup is finished.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+
+# What each phase may cost, in milliseconds, on a developer machine.  These
+# are ceilings with room in them, not targets: a phase that crosses one has
+# become measurably slower than it has ever been, which is worth a look
+# before it ships.
+PHASE_BUDGETS_MS = {
+    'settings': 250,
+    'sound.init': 1500,
+    'tts.init': 1500,
+    'components.load': 3000,
+    'component.import': 3000,
+    'components.initialize': 3000,
+    'apps.discover': 500,
+    'games.discover': 1500,
+    'gui.build': 2500,
+}
+
+# A ceiling on the events kept, for a startup that never calls `finish()`.
+_MAX_EVENTS = 5000
+
+_lock = threading.Lock()
+_events = []
+_origin = time.perf_counter()
+_recording = True
+# Per thread: the names of the spans currently open, so a phase that calls
+# itself (`get_games_by_platform` -> `get_games`) is counted once.
+_local = threading.local()
+_output_path = os.environ.get('TITAN_TRACE_STARTUP') or None
+
+
+def _now_us():
+    return (time.perf_counter() - _origin) * 1_000_000.0
+
+
+def _open_spans():
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def _record(event):
+    with _lock:
+        if not _recording or len(_events) >= _MAX_EVENTS:
+            return
+        _events.append(event)
+
+
+def is_recording():
+    """Is a startup still being traced."""
+    return _recording
+
+
+@contextmanager
+def span(name, **args):
+    """Time the block inside as the phase `name`.
+
+    Extra keyword arguments are kept with the event and shown by the trace
+    viewer (`span('tts.init', engine='sapi5')`).  An exception inside the block
+    is not swallowed; the span still ends and is marked as failed.
+    """
+    if not _recording:
+        yield
+        return
+    stack = _open_spans()
+    outermost = name not in stack
+    stack.append(name)
+    start = _now_us()
+    failed = False
+    try:
+        yield
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        duration = _now_us() - start
+        stack.pop()
+        event = {
+            'name': name,
+            'cat': 'startup',
+            'ph': 'X',
+            'ts': start,
+            'dur': duration,
+            'pid': os.getpid(),
+            'tid': threading.get_ident(),
+            'args': dict(args),
+        }
+        if failed:
+            event['args']['failed'] = True
+        # Only the outermost of a nested span of the same name counts towards
+        # the phase total; the inner one is still on the timeline.
+        event['args']['nested'] = not outermost
+        _record(event)
+
+
+def traced(name):
+    """`span(name)` around every call of the decorated function."""
+    def decorate(function):
+        @wraps(function)
+        def wrapper(*a, **kw):
+            if not _recording:
+                return function(*a, **kw)
+            with span(name):
+                return function(*a, **kw)
+        return wrapper
+    return decorate
+
+
+def mark(name, **args):
+    """A moment rather than a span - "the window is on the screen"."""
+    if not _recording:
+        return
+    _record({
+        'name': name,
+        'cat': 'startup',
+        'ph': 'i',
+        's': 'p',
+        'ts': _now_us(),
+        'pid': os.getpid(),
+        'tid': threading.get_ident(),
+        'args': dict(args),
+    })
+
+
+def events():
+    """A copy of everything recorded so far."""
+    with _lock:
+        return [dict(event) for event in _events]
+
+
+def reset():
+    """Forget the trace and start recording again (for tests)."""
+    global _recording, _origin
+    with _lock:
+        del _events[:]
+        _recording = True
+        _origin = time.perf_counter()
+
+
+def phase_totals(recorded=None):
+    """Milliseconds spent in each phase, across every thread it ran on."""
+    totals = {}
+    for event in (events() if recorded is None else recorded):
+        if event.get('ph') != 'X' or event.get('args', {}).get('nested'):
+            continue
+        name = event['name']
+        totals[name] = totals.get(name, 0.0) + event['dur'] / 1000.0
+    return totals
+
+
+def budget_report(budgets=None, totals=None):
+    """One row per phase: (phase, milliseconds, budget, over budget).
+
+    A phase that has a budget but did not run this time is reported with
+    `None` milliseconds and is never over; a phase that ran without a budget
+    is reported with a `None` budget, so it is visible in the table without
+    failing anything.
+    """
+    budgets = PHASE_BUDGETS_MS if budgets is None else budgets
+    totals = phase_totals() if totals is None else totals
+    rows = []
+    for name in list(budgets) + sorted(n for n in totals if n not in budgets):
+        spent = totals.get(name)
+        budget = budgets.get(name)
+        over = spent is not None and budget is not None and spent > budget
+        rows.append((name, spent, budget, over))
+    return rows
+
+
+def over_budget(budgets=None, totals=None):
+    """The rows of `budget_report` whose phase went over its budget."""
+    return [row for row in budget_report(budgets, totals) if row[3]]
+
+
+def format_budget_table(rows=None):
+    """`budget_report` as text, for the console and for a failing test."""
+    rows = budget_report() if rows is None else rows
+    lines = [f"{'phase':<24} {'ms':>9} {'budget':>9}",
+             '-' * 44]
+    for name, spent, budget, over in rows:
+        spent_text = '-' if spent is None else f"{spent:.1f}"
+        budget_text = '-' if budget is None else str(budget)
+        flag = '  OVER' if over else ''
+        lines.append(f"{name:<24} {spent_text:>9} {budget_text:>9}{flag}")
+    return '\n'.join(lines)
+
+
+def export_chrome_trace(path, recorded=None):
+    """Write the trace as Chrome trace-event JSON and return the path."""
+    recorded = events() if recorded is None else recorded
+    payload = {
+        'traceEvents': recorded,
+        'displayTimeUnit': 'ms',
+        'otherData': {'budgets_ms': PHASE_BUDGETS_MS},
+    }
+    folder = os.path.dirname(os.path.abspath(path))
+    os.makedirs(folder, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as handle:
+        json.dump(payload, handle)
+    return path
+
+
+def set_output_path(path):
+    """Where `finish()` writes the trace (`--trace-startup PATH`)."""
+    global _output_path
+    _output_path = path or None
+
+
+def finish():
+    """Startup is over: stop recording, and write the trace if asked to.
+
+    Safe to call more than once; only the first call writes anything.
+    """
+    global _recording
+    with _lock:
+        if not _recording:
+            return
+        _recording = False
+    recorded = events()
+    if not _output_path:
+        return
+    try:
+        export_chrome_trace(_output_path, recorded)
+        print(f"[STARTUP] Trace written to: {_output_path}")
+        print(format_budget_table(budget_report(totals=phase_totals(recorded))))
+    except Exception as e:
+        print(f"[STARTUP] Could not write the startup trace: {e}")
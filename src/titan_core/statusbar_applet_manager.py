@@ -4,13 +4,27 @@ StatusbarAppletManager - manages statusbar applets
 This module provides functionality to load and manage statusbar applets from the
 data/statusbar_applets/ directory. Applets can provide dynamic status information
 that appears in the status bar across all interface modes (GUI, IUI, Klango).
+
+Refreshing: every applet (and the built-in clock/battery/volume/network
+group) has a next-due time on a heap. One scheduler thread sleeps until the
+earliest of them, so an idle Titan wakes up at the cadence the applets ask
+for instead of once a second. Due refreshes run on a small worker pool.
+An applet is refreshed by at most one call at a time: a refresh asked for
+while one is running (by the scheduler or by a UI wanting fresh text) waits
+for that call instead of starting another. A call that overruns its timeout
+shows "Error: Timeout" and is counted; Python cannot kill it, but it keeps
+its worker to itself and the applet gets no new call until it returns, so
+a hung applet costs one thread, not one per refresh. Per-applet timings are
+available from get_refresh_stats().
 """
 
 import os
 import sys
 import json
 import gettext as _gettext
+import heapq
 import importlib.util
+import itertools
 import threading
 import time
 from typing import Dict, List, Optional, Any
@@ -21,6 +35,109 @@ from src.platform_utils import (
 )
 
 
+BUILTIN_KEY = '<builtin>'     # refresh-state key of the built-in items
+DEFAULT_TIMEOUT = 2.0
+MIN_INTERVAL = 1.0            # the old loop's granularity; applets cannot go faster
+TIMEOUT_TEXT = "Error: Timeout"
+
+
+class _RefreshState:
+    """One refreshable thing: an applet, or the built-in items."""
+
+    def __init__(self, name, func, interval, timeout):
+        self.name = name
+        self.func = func
+        self.interval = max(MIN_INTERVAL, float(interval))
+        self.timeout = float(timeout)
+        self.call = None        # the _Call in flight, if any
+        self.pending = False    # a refresh was asked for while one ran
+        self.seq = 0            # heap entries with an older seq are stale
+        self.stats = {'runs': 0, 'errors': 0, 'timeouts': 0, 'late': 0,
+                      'coalesced': 0, 'last_ms': 0.0, 'max_ms': 0.0, 'total_ms': 0.0}
+
+
+class _Call:
+    __slots__ = ('state', 'started', 'done', 'timed_out')
+
+    def __init__(self, state):
+        self.state = state
+        self.started = time.monotonic()
+        self.done = threading.Event()
+        self.timed_out = False
+
+
+class _WorkerPool:
+    """A few long-lived threads running refresh calls.
+
+    Threads are started on demand up to ``size``. A call that overran its
+    timeout still holds its thread, so the pool may add one more in its
+    place, never beyond ``size + spare``; when the late call returns the
+    extra thread is retired.
+    """
+
+    def __init__(self, size=3, spare=3):
+        self.size = size
+        self.spare = spare
+        self._cond = threading.Condition()
+        self._jobs = []
+        self._threads = 0
+        self._idle = 0
+        self._stuck = 0
+        self._closed = False
+
+    def submit(self, call, fn):
+        with self._cond:
+            if self._closed:
+                return False
+            self._jobs.append((call, fn))
+            if self._idle == 0 and self._threads - self._stuck < self.size:
+                self._spawn()
+            self._cond.notify()
+            return True
+
+    def mark_stuck(self):
+        with self._cond:
+            self._stuck += 1
+            if (self._jobs and self._idle == 0
+                    and self._threads < self.size + self.spare):
+                self._spawn()
+
+    def _spawn(self):
+        self._threads += 1
+        threading.Thread(target=self._work, daemon=True,
+                         name=f"StatusbarApplet-{self._threads}").start()
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while not self._jobs and not self._closed:
+                    self._idle += 1
+                    self._cond.wait()
+                    self._idle -= 1
+                if self._closed:
+                    self._threads -= 1
+                    return
+                call, fn = self._jobs.pop(0)
+            try:
+                fn(call)
+            finally:
+                with self._cond:
+                    if call.timed_out:
+                        self._stuck -= 1
+                    if self._threads - self._stuck > self.size:
+                        self._threads -= 1
+                        return
+
+    def counts(self):
+        with self._cond:
+            return {'workers': self._threads, 'stuck': self._stuck, 'queued': len(self._jobs)}
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
 class StatusbarAppletManager:
     """
     Manager for statusbar applets.
@@ -38,6 +155,15 @@ class StatusbarAppletManager:
         self.cache_lock = threading.Lock()
         self._auto_update_running = False
         self._auto_update_thread = None
+        # Refresh scheduling (see the module docstring)
+        self._refresh: Dict[str, _RefreshState] = {}
+        self._sched_cond = threading.Condition()
+        self._heap: list = []              # (due, seq, key, kind) kind: 'due' | 'deadline'
+        self._heap_seq = itertools.count()
+        self._pool: Optional[_WorkerPool] = None
+        self._wakeups = 0
+        self._refresh[BUILTIN_KEY] = _RefreshState(
+            BUILTIN_KEY, self._update_builtin_cache, 5, DEFAULT_TIMEOUT)
         # Built-in status cache (Clock, Battery, Volume, Network)
         self._builtin_cache: Dict[str, str] = {
             'time': '',
@@ -189,8 +315,13 @@ class StatusbarAppletManager:
             language = get_setting('language', 'pl')
             display_name = metadata.get(f'name_{language}', metadata.get('name', applet_name))
 
-        # Get update interval (default 5 seconds)
+        # Get update interval (default 5 seconds) and refresh timeout
         update_interval = applet_info.get('update_interval', metadata.get('update_interval', 5))
+        timeout = applet_info.get('timeout', metadata.get('timeout', DEFAULT_TIMEOUT))
+        try:
+            timeout = float(timeout)
+        except (TypeError, ValueError):
+            timeout = DEFAULT_TIMEOUT
 
         # Store applet data
         self.applets[applet_name] = {
@@ -205,6 +336,13 @@ class StatusbarAppletManager:
                 'error': False
             }
         }
+        try:
+            interval = float(update_interval)
+        except (TypeError, ValueError):
+            interval = 5
+        with self._sched_cond:
+            self._refresh[applet_name] = _RefreshState(
+                applet_name, lambda: self._refresh_applet_text(applet_name), interval, timeout)
 
         # Initialize cache with first text
         self.update_applet_cache(applet_name)
@@ -240,35 +378,154 @@ class StatusbarAppletManager:
         """
         Update cached text for an applet by calling its get_statusbar_item_text().
 
-        This method is thread-safe and includes timeout protection.
+        Blocks until the text is in the cache or the applet's timeout passes.
+        If the applet is already being refreshed (by the auto-update scheduler
+        or another caller) this waits for that call instead of starting a
+        second one.
 
         Args:
             name: Applet name
         """
         if name not in self.applets:
             return
+        state = self._refresh.get(name)
+        if state is None:
+            return
+        call = self._start_call(state, coalesce=True)
+        if not call.done.wait(state.timeout):
+            self._call_timed_out(call)
 
-        applet = self.applets[name]
-        module = applet['module']
+    def request_refresh(self, name: str):
+        """Refresh an applet soon, without waiting for it.
 
+        A refresh already running absorbs the request and is followed by one
+        more, so a burst of requests costs at most two calls.
+        """
+        state = self._refresh.get(name)
+        if state is None:
+            return
+        with self._sched_cond:
+            if state.call is not None:
+                state.pending = True
+                state.stats['coalesced'] += 1
+                return
+            if self._pool is not None:
+                self._push(time.monotonic(), state, 'due')
+                return
+        self._start_call(state)
+
+    def _refresh_applet_text(self, name: str):
+        """Body of one applet refresh; runs on a worker thread."""
+        applet = self.applets[name]
         try:
-            # Call get_statusbar_item_text() with timeout protection
-            text = self._call_with_timeout(
-                module.get_statusbar_item_text,
-                timeout=2.0,
-                default="Error: Timeout"
-            )
-
-            # Update cache
+            text = applet['module'].get_statusbar_item_text()
             with self.cache_lock:
                 applet['cache']['text'] = text
                 applet['cache']['error'] = False
-
         except Exception as e:
             print(f"Error updating cache for applet '{name}': {e}")
             with self.cache_lock:
                 applet['cache']['text'] = f"{applet['info']['name']}: Error"
                 applet['cache']['error'] = True
+            raise
+
+    # ------------------------------------------------------------------
+    # Refresh calls: at most one in flight per applet
+    # ------------------------------------------------------------------
+
+    def _start_call(self, state: _RefreshState, coalesce: bool = False) -> _Call:
+        """Start a refresh of ``state`` or, if one is running, return it."""
+        with self._sched_cond:
+            if state.call is not None:
+                if coalesce:
+                    state.stats['coalesced'] += 1
+                return state.call
+            call = state.call = _Call(state)
+            pool = self._pool
+        if pool is None or not pool.submit(call, self._run_call):
+            # No auto-update pool (the UI drives refreshes itself): one thread
+            # for this call, and never a second one while it is stuck.
+            threading.Thread(target=self._run_call, args=(call,), daemon=True).start()
+        return call
+
+    def _run_call(self, call: _Call):
+        state = call.state
+        failed = False
+        try:
+            state.func()
+        except Exception:
+            failed = True
+        finished = time.monotonic()
+        elapsed_ms = (finished - call.started) * 1000.0
+        with self._sched_cond:
+            stats = state.stats
+            stats['runs'] += 1
+            stats['errors'] += failed
+            stats['late'] += call.timed_out
+            stats['last_ms'] = elapsed_ms
+            stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+            stats['total_ms'] += elapsed_ms
+            state.call = None
+            if self._pool is not None:
+                if state.pending:
+                    state.pending = False
+                    due = finished
+                else:
+                    due = max(finished, call.started + state.interval)
+                self._push(due, state, 'due')
+        call.done.set()
+        if call.timed_out:
+            print(f"[StatusbarAppletManager] '{state.name}' returned after "
+                  f"{elapsed_ms / 1000.0:.1f}s (timeout {state.timeout:.1f}s)")
+
+    def _call_timed_out(self, call: _Call):
+        """Mark an overrunning call once: timeout text, stats, a spare worker."""
+        with self._sched_cond:
+            if call.timed_out or call.done.is_set():
+                return
+            call.timed_out = True
+            call.state.stats['timeouts'] += 1
+            pool = self._pool
+        name = call.state.name
+        print(f"Warning: statusbar applet '{name}' timed out after {call.state.timeout}s")
+        if name in self.applets:
+            with self.cache_lock:
+                self.applets[name]['cache']['text'] = TIMEOUT_TEXT
+                self.applets[name]['cache']['error'] = False
+        if pool is not None:
+            pool.mark_stuck()
+
+    def _push(self, when: float, state: _RefreshState, kind: str):
+        """Queue a heap entry (caller holds _sched_cond)."""
+        if kind == 'due':
+            state.seq += 1
+            heapq.heappush(self._heap, (when, next(self._heap_seq), state.name, kind, state.seq))
+        else:
+            heapq.heappush(self._heap, (when, next(self._heap_seq), state.name, kind, state.call))
+        if self._heap[0][0] == when:
+            # Only an entry earlier than everything else changes when to wake.
+            self._sched_cond.notify()
+
+    def get_refresh_stats(self) -> Dict[str, Any]:
+        """Timing of every refresh target, for finding a misbehaving applet.
+
+        Returns ``{'wakeups', 'workers', 'stuck', 'queued', 'items': {name:
+        {'runs', 'errors', 'timeouts', 'late', 'coalesced', 'last_ms',
+        'max_ms', 'avg_ms', 'interval', 'timeout', 'in_flight'}}}``; the
+        built-in items are listed under ``'<builtin>'``.
+        """
+        with self._sched_cond:
+            items = {}
+            for name, state in self._refresh.items():
+                entry = dict(state.stats)
+                entry['avg_ms'] = entry.pop('total_ms') / entry['runs'] if entry['runs'] else 0.0
+                entry.update(interval=state.interval, timeout=state.timeout,
+                             in_flight=state.call is not None)
+                items[name] = entry
+            result = {'wakeups': self._wakeups, 'items': items}
+            pool = self._pool
+        result.update(pool.counts() if pool else {'workers': 0, 'stuck': 0, 'queued': 0})
+        return result
 
     def activate_applet(self, name: str, parent_frame=None):
         """
@@ -369,80 +626,73 @@ class StatusbarAppletManager:
         """
         return {name: self.get_applet_text(name) for name in self.get_applet_names()}
 
-    def start_auto_update(self):
-        """Start background thread to auto-update applet caches.
+    def start_auto_update(self, workers: int = 3):
+        """Start the refresh scheduler and its worker pool.
         Useful for launchers that don't have their own update loop."""
-        if self._auto_update_running:
-            return
-        self._auto_update_running = True
-        self._auto_update_thread = threading.Thread(target=self._auto_update_loop, daemon=True)
+        with self._sched_cond:
+            if self._auto_update_running:
+                return
+            self._auto_update_running = True
+            self._pool = _WorkerPool(size=workers)
+            self._heap = []
+            # Everything was refreshed at load; first refreshes are one interval out.
+            now = time.monotonic()
+            for state in self._refresh.values():
+                self._push(now if state.name == BUILTIN_KEY else now + state.interval,
+                           state, 'due')
+        self._auto_update_thread = threading.Thread(
+            target=self._auto_update_loop, daemon=True, name="StatusbarScheduler")
         self._auto_update_thread.start()
         print("[StatusbarAppletManager] Auto-update started")
 
     def stop_auto_update(self):
-        """Stop the auto-update background thread."""
-        self._auto_update_running = False
+        """Stop the refresh scheduler; calls still running finish on their own."""
+        with self._sched_cond:
+            self._auto_update_running = False
+            pool, self._pool = self._pool, None
+            self._heap = []
+            self._sched_cond.notify_all()
+        if pool is not None:
+            pool.close()
         if self._auto_update_thread:
             self._auto_update_thread = None
         print("[StatusbarAppletManager] Auto-update stopped")
 
     def _auto_update_loop(self):
-        """Background loop updating built-in items and applets at configured intervals."""
-        last_update: Dict[str, float] = {}
-        last_builtin_update = 0.0
-        while self._auto_update_running:
-            now = time.time()
-
-            # Update built-in items every 5 seconds
-            if now - last_builtin_update >= 5:
-                try:
-                    self._update_builtin_cache()
-                except Exception as e:
-                    print(f"[StatusbarAppletManager] Built-in update error: {e}")
-                last_builtin_update = now
-
-            # Update applets at their own intervals
-            for name in self.get_applet_names():
-                interval = self.get_applet_update_interval(name)
-                last = last_update.get(name, 0)
-                if now - last >= interval:
-                    try:
-                        self.update_applet_cache(name)
-                    except Exception as e:
-                        print(f"[StatusbarAppletManager] Auto-update error for '{name}': {e}")
-                    last_update[name] = now
-            time.sleep(1)
-
-    def _call_with_timeout(self, func, timeout: float = 2.0, default: str = "Timeout"):
-        """
-        Call a function with timeout protection.
-
-        Args:
-            func: Function to call
-            timeout: Timeout in seconds
-            default: Default return value on timeout
-
-        Returns:
-            Function result or default on timeout
-        """
-        result = [default]
-        exception = [None]
-
-        def target():
-            try:
-                result[0] = func()
-            except Exception as e:
-                exception[0] = e
-
-        thread = threading.Thread(target=target, daemon=True)
-        thread.start()
-        thread.join(timeout)
-
-        if thread.is_alive():
-            print(f"Warning: Function call timed out after {timeout}s")
-            return default
-
-        if exception[0]:
-            raise exception[0]
-
-        return result[0]
+        """Scheduler thread: sleep until the next due refresh or call deadline."""
+        while True:
+            expired = []
+            with self._sched_cond:
+                if not self._auto_update_running:
+                    return
+                now = time.monotonic()
+                if self._heap and self._heap[0][0] > now:
+                    self._sched_cond.wait(self._heap[0][0] - now)
+                elif not self._heap:
+                    self._sched_cond.wait()
+                if not self._auto_update_running:
+                    return
+                self._wakeups += 1
+                now = time.monotonic()
+                due = []
+                while self._heap and self._heap[0][0] <= now:
+                    _when, _n, name, kind, tag = heapq.heappop(self._heap)
+                    state = self._refresh.get(name)
+                    if state is None:
+                        continue
+                    if kind == 'deadline':
+                        if state.call is tag and not tag.done.is_set():
+                            expired.append(tag)
+                    elif tag == state.seq:
+                        if state.call is not None:
+                            state.pending = True
+                            state.stats['coalesced'] += 1
+                        else:
+                            due.append(state)
+            for call in expired:
+                self._call_timed_out(call)
+            for state in due:
+                call = self._start_call(state)
+                with self._sched_cond:
+                    if not call.done.is_set():
+                        self._push(call.started + state.timeout, state, 'deadline')
@@ -1662,6 +1662,13 @@ class StereoSpeech:
         self._speak_seq = 0
         self._seq_lock = threading.Lock()
 
+        # Speculative rendering of the menu items around the focus (see
+        # src/titan_core/speech_prefetch.py). The epoch is bumped by every
+        # voice setter so audio made with old settings is never played.
+        from src.titan_core.speech_prefetch import SpeechPrefetcher
+        self._voice_epoch = 0
+        self._prefetcher = SpeechPrefetcher(self._render_for_prefetch)
+
         # eSpeak parameters (shared by espeak_dll and espeak subprocess)
         self.espeak_rate = 175  # Words per minute (default)
         self.espeak_pitch = 50  # Pitch 0-99 (default: 50)
@@ -1895,7 +1902,7 @@ class StereoSpeech:
         except (ValueError, TypeError):
             return -50.0
 
-    def _generate_espeak_dll_to_memory(self, text, pitch_offset=0):
+    def _generate_espeak_dll_to_memory(self, text, pitch_offset=0, track=True):
         """
         Generate TTS using bundled eSpeak executable (optimized, faster than standard subprocess).
         Uses Popen so the process can be killed by stop() if interrupted.
@@ -1903,6 +1910,9 @@ class StereoSpeech:
         Args:
             text (str): Text to speak
             pitch_offset (int): Pitch offset -10 to +10
+            track (bool): Register the process for stop() to kill. The
+                prefetcher renders untracked, so it neither replaces the
+                foreground process nor dies when speech is interrupted.
 
         Returns:
             AudioSegment or None
@@ -1954,7 +1964,8 @@ class StereoSpeech:
                     stderr=subprocess.DEVNULL,
                     creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0),
                 )
-                self._espeak_process = proc
+                if track:
+                    self._espeak_process = proc
 
                 try:
                     stdout, _ = proc.communicate(timeout=3)
@@ -1983,13 +1994,14 @@ class StereoSpeech:
             return None
 
 
-    def _generate_espeak_to_memory(self, text, pitch_offset=0):
+    def _generate_espeak_to_memory(self, text, pitch_offset=0, track=True):
         """
         Generuje TTS bezpośrednio do pamięci używając eSpeak (szybkie, bez pliku).
 
         Args:
             text (str): Tekst do wypowiedzenia
             pitch_offset (int): Przesunięcie wysokości głosu -10 do +10
+            track (bool): Czy stop() może zabić proces (jak wyżej)
 
         Returns:
             AudioSegment: Audio segment lub None w przypadku błędu
@@ -2035,7 +2047,8 @@ class StereoSpeech:
                     encoding=None,  # Binary mode for stdout
                     creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0),
                 )
-                self._espeak_process = process
+                if track:
+                    self._espeak_process = process
 
                 # Send text through stdin with proper UTF-8 encoding
                 # Add a period and space at the end to prevent eSpeak from cutting last letter
@@ -2323,6 +2336,7 @@ class StereoSpeech:
             key (str): Config key (e.g. 'api_key')
             value: Value to set
         """
+        self._invalidate_prefetch()
         registry = _get_engine_registry()
         if registry:
             engine = registry.get_titantts_engine(engine_id)
@@ -2490,7 +2504,15 @@ class StereoSpeech:
                 audio = None
                 temp_file = None
 
-                if self.engine in ('espeak_dll', 'espeak'):
+                # Rendered ahead by prefetch() while the user was on a
+                # neighbouring menu item: already trimmed, straight to playback.
+                prefetched = self._prefetcher.take(text, pitch_offset, self._voice_signature())
+
+                if prefetched is not None:
+                    audio = prefetched
+                    if _seq is not None and _seq != self._speak_seq:
+                        return
+                elif self.engine in ('espeak_dll', 'espeak'):
                     # Release lock during eSpeak generation (subprocess ~100-300ms)
                     # so newer messages aren't blocked waiting for the lock
                     if lock_acquired:
@@ -2660,11 +2682,12 @@ class StereoSpeech:
 
                 try:
                     # Trim silence (always active - improves responsiveness)
-                    try:
-                        silence_threshold = self.get_silence_threshold()
-                        audio = trim_silence(audio, silence_threshold=silence_threshold)
-                    except Exception as e:
-                        print(f"Warning: Could not trim silence: {e}")
+                    if prefetched is None:
+                        try:
+                            silence_threshold = self.get_silence_threshold()
+                            audio = trim_silence(audio, silence_threshold=silence_threshold)
+                        except Exception as e:
+                            print(f"Warning: Could not trim silence: {e}")
 
                     # Experimental: drive controller rumble from the speech
                     # envelope so deaf/hard-of-hearing users can feel what is
@@ -2848,6 +2871,84 @@ class StereoSpeech:
             if lock_acquired:
                 self.speech_lock.release()
     
+    def _voice_signature(self):
+        """What prefetched audio must match to be played: engine and settings."""
+        return (self.engine, self._voice_epoch)
+
+    def _invalidate_prefetch(self):
+        """A voice setting changed: drop audio rendered with the old one."""
+        self._voice_epoch += 1
+        self._prefetcher.clear()
+
+    def _can_prefetch(self):
+        """Whether the current engine renders to memory and may do so
+        alongside the foreground (direct-playback engines gain nothing)."""
+        if not PYDUB_AVAILABLE:
+            return False
+        if self.engine in ('espeak_dll', 'espeak'):
+            return ESPEAK_AVAILABLE
+        if self.engine == 'sapi5':
+            return self._sapi_worker is not None
+        if self.engine == 'say':
+            return SAY_AVAILABLE
+        if self.engine in ('spd', 'none'):
+            return False
+        registry = _get_engine_registry()
+        tts_engine = registry.get_titantts_engine(self.engine) if registry else None
+        # Engines that want the speech lock held are not safe to run twice at once.
+        return bool(tts_engine and getattr(tts_engine, 'needs_lock_release', False))
+
+    def _render_for_prefetch(self, text, pitch_offset):
+        """Render ``text`` to trimmed audio the way speak() would, without
+        touching the playback state. Runs on the prefetch thread."""
+        audio = None
+        if self.engine in ('espeak_dll', 'espeak'):
+            audio = self._generate_espeak_dll_to_memory(text, pitch_offset, track=False)
+            if not audio:
+                audio = self._generate_espeak_to_memory(text, pitch_offset, track=False)
+        elif self.engine == 'sapi5' and self._sapi_worker:
+            temp_wav = tempfile.NamedTemporaryFile(suffix='.wav', delete=False)
+            temp_wav_path = os.path.abspath(temp_wav.name)
+            temp_wav.close()
+            try:
+                temp_file = self._sapi_worker.generate_to_file(
+                    text, temp_wav_path, pitch_offset + self.default_pitch)
+                if temp_file:
+                    audio = AudioSegment.from_wav(temp_file)
+            finally:
+                try:
+                    os.unlink(temp_wav_path)
+                except Exception:
+                    pass
+        elif self.engine == 'say':
+            audio = self._generate_say_to_memory(text, pitch_offset)
+        else:
+            registry = _get_engine_registry()
+            tts_engine = registry.get_titantts_engine(self.engine) if registry else None
+            if tts_engine and tts_engine.is_available():
+                audio = tts_engine.generate(text, pitch_offset + self.default_pitch)
+        if not audio:
+            return None
+        try:
+            audio = trim_silence(audio, silence_threshold=self.get_silence_threshold())
+        except Exception as e:
+            print(f"Warning: Could not trim silence: {e}")
+        return audio
+
+    def prefetch(self, items):
+        """Render likely next utterances in the background.
+
+        ``items`` are (text, pitch_offset) pairs, most likely first - the
+        menu items the user can reach with one key from the focused one.
+        Replaces whatever earlier prefetch is still queued. speak() plays
+        a prefetched item without synthesizing it again.
+        """
+        try:
+            if self._can_prefetch():
+                self._prefetcher.prefetch(items, self._voice_signature())
+        except Exception as e:
+            print(f"[StereoSpeech] Prefetch error: {e}")
+
     def speak_async(self, text, position=0.0, pitch_offset=0, use_fallback=True, elevation=0.0):
         """
         Wypowiada tekst asynchronicznie z pozycjonowaniem stereo / 3D.
@@ -3314,6 +3415,7 @@ class StereoSpeech:
         Args:
             engine (str): Engine type ('espeak', 'sapi5', 'say', 'spd')
         """
+        self._invalidate_prefetch()
         if engine == 'espeak':
             if ESPEAK_DLL_AVAILABLE:
                 self.engine = 'espeak_dll'
@@ -3393,6 +3495,7 @@ class StereoSpeech:
         Args:
             rate (int): Rate from -10 to +10
         """
+        self._invalidate_prefetch()
         try:
             if self.engine == 'sapi5' and self.sapi:
                 clamped_rate = max(-10, min(10, rate))
@@ -3430,6 +3533,7 @@ class StereoSpeech:
         Args:
             volume (int): Volume from 0 to 100
         """
+        self._invalidate_prefetch()
         try:
             if self.engine == 'sapi5' and self.sapi:
                 clamped_vol = max(0, min(100, volume))
@@ -3464,6 +3568,7 @@ class StereoSpeech:
         Args:
             pitch (int): Pitch from -10 to 10
         """
+        self._invalidate_prefetch()
         try:
             self.default_pitch = max(-10, min(10, int(pitch)))
             if self.engine in ('espeak', 'espeak_dll'):
@@ -3826,6 +3931,7 @@ class StereoSpeech:
         Args:
             voice_index (int): Voice index from the available voices list
         """
+        self._invalidate_prefetch()
         try:
             if self.engine == 'sapi5' and self.sapi:
                 # Use cached voice list from _get_all_sapi_voices (includes 32-bit)
@@ -3881,7 +3987,9 @@ def get_stereo_speech():
     global _stereo_speech_instance
     try:
         if _stereo_speech_instance is None:
-            _stereo_speech_instance = StereoSpeech()
+            from src.titan_core.startup_trace import span
+            with span('tts.init', engine='stereo_speech'):
+                _stereo_speech_instance = StereoSpeech()
         return _stereo_speech_instance
     except Exception as e:
         print(f"Error getting stereo speech instance: {e}")
@@ -3909,6 +4017,18 @@ def speak_stereo(text, position=0.0, pitch_offset=0, async_mode=False, elevation
     else:
         stereo_speech.speak(text, position, pitch_offset, elevation=elevation)
 
+def prefetch_stereo(items):
+    """
+    Renderuje w tle to, co prawdopodobnie zostanie powiedziane za chwilę.
+
+    Args:
+        items: pary (tekst, pitch_offset), najbardziej prawdopodobne najpierw -
+            sąsiednie pozycje menu, pierwsza pozycja podmenu
+    """
+    stereo_speech = get_stereo_speech()
+    if stereo_speech:
+        stereo_speech.prefetch(items)
+
 def stop_stereo_speech():
     """Zatrzymuje aktualną stereo mowę."""
     stereo_speech = get_stereo_speech()
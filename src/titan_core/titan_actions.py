@@ -28,6 +28,7 @@ yourself.
 import inspect
 import json
 import os
+import socket
 import sys
 import threading
 import time
@@ -87,6 +88,20 @@ ERROR_PIPE_BUSY = 231
 INFINITE = 0xFFFFFFFF
 MAX_LINE = 4 * 1024 * 1024
 
+# Framing (see _Channel). Messages larger than BINARY_THRESHOLD go out as a
+# length-prefixed frame once both ends read frames; a frame may be far larger
+# than a line, because its length is known before a byte of it is read.
+FRAME_MARK = b'%'
+BINARY_THRESHOLD = 64 * 1024
+MAX_FRAME = 64 * 1024 * 1024
+
+# What this end of the bus understands, announced in hello and welcome. Each
+# side only uses what BOTH announced, so an old Titan and a new add-on (or the
+# other way round) still talk plain JSON lines.
+#   binary - length-prefixed frames and raw bytes values
+#   chunks - a long action streams partial results before its result
+FEATURES = ('binary', 'chunks')
+
 
 def _overlapped_type():
     import ctypes
@@ -102,24 +117,175 @@ def _overlapped_type():
     return OVERLAPPED
 
 
-class PipeChannel:
-    """Newline-delimited JSON over one overlapped Windows pipe handle.
+class _Channel:
+    """Messages over one byte stream. The transport is the subclass's business.
 
-    Safe for one reader thread and one writer thread at once, which is what a
-    push protocol needs.
+    Two framings share the stream. A plain message is one line of JSON, as it
+    always was. A line starting with ``%`` is a frame header,
+    ``%<json length> <blob length>``, followed by exactly that many bytes of
+    JSON and then of raw bytes. A large result is then read with its length
+    known up front instead of scanned for a newline chunk by chunk, and a
+    ``bytes`` value travels as itself instead of failing to serialise. Frames
+    are only *written* once both ends have said in the handshake that they read
+    them (``binary``); reading always understands both.
+
+    Safe for one reader thread and any number of writer threads, which is what
+    a protocol with many requests in flight needs.
     """
 
+    def __init__(self):
+        self._buffer = bytearray()
+        self._scanned = 0            # how much of _buffer holds no newline
+        self._closed = False
+        self._write_lock = threading.Lock()
+        self.binary = False          # the other end reads frames
+        self.streams = False         # the other end takes 'chunk' messages
+
+    # ------------------------------------------------- what a transport provides
+    def _recv(self):
+        """Some bytes, or b'' when the other end went away."""
+        raise NotImplementedError
+
+    def _send(self, data):
+        """Write all of ``data`` (under the write lock). False on failure."""
+        raise NotImplementedError
+
+    def _close_transport(self):
+        raise NotImplementedError
+
+    # ----------------------------------------------------------------- reading
+    def _fill(self):
+        if self._closed:
+            return False
+        chunk = self._recv()
+        if not chunk:
+            return False
+        self._buffer += chunk
+        return True
+
+    def read_line(self):
+        """Block until a whole line arrives. None means the peer went away."""
+        while True:
+            index = self._buffer.find(b'\n', self._scanned)
+            if index >= 0:
+                line = bytes(self._buffer[:index])
+                del self._buffer[:index + 1]
+                self._scanned = 0
+                return line
+            self._scanned = len(self._buffer)
+            if len(self._buffer) > MAX_LINE or not self._fill():
+                return None
+
+    def _read_exact(self, count):
+        while len(self._buffer) < count:
+            if not self._fill():
+                return None
+        data = bytes(self._buffer[:count])
+        del self._buffer[:count]
+        self._scanned = 0
+        return data
+
+    def _read_frame(self, header):
+        try:
+            sizes = [int(part) for part in header[1:].split()]
+            json_length = sizes[0]
+            blob_length = sizes[1] if len(sizes) > 1 else 0
+        except (ValueError, IndexError):
+            return None
+        if min(json_length, blob_length) < 0 or \
+                json_length + blob_length > MAX_FRAME:
+            return None
+        body = self._read_exact(json_length + blob_length)
+        if body is None:
+            return None
+        try:
+            message = json.loads(body[:json_length].decode('utf-8',
+                                                           errors='replace'))
+        except Exception:
+            return {}
+        if blob_length and isinstance(message, dict):
+            message[message.pop('blob', None) or 'data'] = body[json_length:]
+        return message
+
+    def read_message(self):
+        """The next message as a dict. None means the peer went away; a line
+        that is not JSON is skipped, as it always was."""
+        while True:
+            line = self.read_line()
+            if line is None:
+                return None
+            if line[:1] == FRAME_MARK:
+                message = self._read_frame(line)
+                if message is None:
+                    # A bad header leaves the stream out of step for good.
+                    return None
+            else:
+                try:
+                    message = json.loads(line.decode('utf-8', errors='replace'))
+                except Exception:
+                    continue
+            if isinstance(message, dict):
+                return message
+
+    # ----------------------------------------------------------------- writing
+    def write_message(self, obj):
+        """Send one message. False when it could not be sent - including when
+        it is too large for the framing the other end understands."""
+        blob_key = next((key for key, value in obj.items()
+                         if isinstance(value, (bytes, bytearray, memoryview))),
+                        None)
+        blob = b''
+        if blob_key is not None:
+            obj = dict(obj)
+            value = bytes(obj.pop(blob_key))
+            if self.binary:
+                blob = value
+                obj['blob'] = blob_key
+            else:
+                obj[blob_key] = value.decode('utf-8', errors='replace')
+        try:
+            data = json.dumps(obj, ensure_ascii=False).encode('utf-8')
+        except Exception:
+            return False
+        if self.binary and (blob or len(data) > BINARY_THRESHOLD):
+            if len(data) + len(blob) > MAX_FRAME:
+                return False
+            data = b'%%%d %d\n' % (len(data), len(blob)) + data + blob
+        elif len(data) > MAX_LINE:
+            return False
+        else:
+            data += b'\n'
+        with self._write_lock:
+            if self._closed:
+                return False
+            return self._send(data)
+
+    # Every caller used to send lines; now they send messages.
+    write_line = write_message
+
+    def close(self):
+        with self._write_lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._close_transport()
+
+
+class PipeChannel(_Channel):
+    """The bus protocol over one overlapped Windows pipe handle."""
+
+    _READ_SIZE = 65536
+
     def __init__(self, handle):
+        super().__init__()
         import ctypes
         from ctypes import wintypes
         self._ctypes = ctypes
         self._wintypes = wintypes
         self._kernel32 = ctypes.windll.kernel32
         self.handle = handle
-        self._buffer = b''
-        self._closed = False
-        self._write_lock = threading.Lock()
         self._overlapped = _overlapped_type()
+        self._chunk = (ctypes.c_ubyte * self._READ_SIZE)()
 
         create_event = self._kernel32.CreateEventW
         create_event.restype = wintypes.HANDLE
@@ -183,61 +349,41 @@ class PipeChannel:
         return bool(self._result(self.handle, ctypes.byref(overlapped),
                                  ctypes.byref(count), True))
 
-    def read_line(self):
-        """Block until a whole line arrives. None means the peer went away."""
+    def _recv(self):
         ctypes, wintypes = self._ctypes, self._wintypes
-        chunk = (ctypes.c_ubyte * 8192)()
-        while True:
-            index = self._buffer.find(b'\n')
-            if index >= 0:
-                line, self._buffer = self._buffer[:index], self._buffer[index + 1:]
-                return line
-            if len(self._buffer) > MAX_LINE or self._closed:
-                return None
-            overlapped = self._overlapped()
-            overlapped.hEvent = self._read_event
-            self._kernel32.ResetEvent(self._read_event)
-            got = wintypes.DWORD(0)
-            ok = self._read_file(self.handle, ctypes.byref(chunk), 8192,
-                                 ctypes.byref(got), ctypes.byref(overlapped))
-            if not ok and not self._finish(overlapped, self._read_event, got):
-                return None
-            if got.value == 0:
-                return None
-            self._buffer += bytes(chunk[:got.value])
-
-    def write_line(self, obj):
+        overlapped = self._overlapped()
+        overlapped.hEvent = self._read_event
+        self._kernel32.ResetEvent(self._read_event)
+        got = wintypes.DWORD(0)
+        ok = self._read_file(self.handle, ctypes.byref(self._chunk),
+                             self._READ_SIZE, ctypes.byref(got),
+                             ctypes.byref(overlapped))
+        if not ok and not self._finish(overlapped, self._read_event, got):
+            return b''
+        return bytes(self._chunk[:got.value])
+
+    def _send(self, data):
         ctypes, wintypes = self._ctypes, self._wintypes
-        try:
-            data = (json.dumps(obj, ensure_ascii=False) + '\n').encode('utf-8')
-        except Exception:
-            return False
         buf = (ctypes.c_ubyte * len(data)).from_buffer_copy(data)
-        with self._write_lock:
-            if self._closed:
+        written = 0
+        while written < len(data):
+            overlapped = self._overlapped()
+            overlapped.hEvent = self._write_event
+            self._kernel32.ResetEvent(self._write_event)
+            count = wintypes.DWORD(0)
+            ok = self._write_file(self.handle, ctypes.byref(buf, written),
+                                  len(data) - written, ctypes.byref(count),
+                                  ctypes.byref(overlapped))
+            if not ok and not self._finish(overlapped, self._write_event,
+                                           count):
+                return False
+            if count.value == 0:
                 return False
-            written = 0
-            while written < len(data):
-                overlapped = self._overlapped()
-                overlapped.hEvent = self._write_event
-                self._kernel32.ResetEvent(self._write_event)
-                count = wintypes.DWORD(0)
-                ok = self._write_file(self.handle, ctypes.byref(buf, written),
-                                      len(data) - written, ctypes.byref(count),
-                                      ctypes.byref(overlapped))
-                if not ok and not self._finish(overlapped, self._write_event,
-                                               count):
-                    return False
-                if count.value == 0:
-                    return False
-                written += count.value
+            written += count.value
         return True
 
-    def close(self):
+    def _close_transport(self):
         with self._write_lock:
-            if self._closed:
-                return
-            self._closed = True
             handle, self.handle = self.handle, None
         if handle:
             try:
@@ -255,6 +401,42 @@ class PipeChannel:
                 pass
 
 
+class SocketChannel(_Channel):
+    """The bus protocol over a connected socket.
+
+    Titan only listens on the named pipe. This is how the whole protocol runs
+    where there are no named pipes: over a ``socket.socketpair()`` in the tests
+    and in ``actions.bus.benchmark()``.
+    """
+
+    def __init__(self, sock):
+        super().__init__()
+        self.sock = sock
+
+    def _recv(self):
+        try:
+            return self.sock.recv(65536)
+        except OSError:
+            return b''
+
+    def _send(self, data):
+        try:
+            self.sock.sendall(data)
+            return True
+        except OSError:
+            return False
+
+    def _close_transport(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
 # --------------------------------------------------------------------------- #
 # Calling the add-on's own code safely
 # --------------------------------------------------------------------------- #
@@ -348,9 +530,20 @@ def _encode_result(value):
         return {'__titan_failed__': True, 'reason': str(value.reason)}
     if isinstance(value, (str, int, float, bool, list, dict)) or value is None:
         return value
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        # Sent as raw bytes when Titan reads frames, as text otherwise.
+        return bytes(value)
     return str(value)
 
 
+def _join_chunks(chunks):
+    """The result of a streaming action that returned nothing of its own:
+    what it yielded, as one text when it yielded text."""
+    if all(isinstance(chunk, str) for chunk in chunks):
+        return '\n'.join(chunks)
+    return list(chunks)
+
+
 def _call_handler(handler, args, marshal):
     """Call a handler with only the arguments it actually declares, on the
     right thread."""
@@ -467,7 +660,7 @@ def _ask_titan(payload, timeout):
         waiter = [threading.Event(), None]
         _pending_calls[request_id] = waiter
     payload['id'] = request_id
-    if not channel.write_line(payload):
+    if not channel.write_message(payload):
         with _call_lock:
             _pending_calls.pop(request_id, None)
         return {'ok': False, 'error': 'could not reach Titan'}
@@ -537,42 +730,84 @@ def list_addons(timeout=15.0):
 # --------------------------------------------------------------------------- #
 # The bus thread
 # --------------------------------------------------------------------------- #
+def _stream(client, request_id, chunks, marshal):
+    """Run a generator handler, sending each value it yields as a ``chunk``
+    the moment it is yielded. Returns the action's final result.
+
+    Every step of the generator goes through the same marshaller the call
+    did, so a streaming handler touches its interface from the right thread
+    just like an ordinary one. A Titan that does not take chunks gets them all
+    at once, in the result.
+    """
+    runner = marshal or _wx_marshal()
+    collected = []
+    seq = 0
+    while True:
+        try:
+            if runner is not None:
+                item = runner(lambda: next(chunks))
+            else:
+                item = next(chunks)
+        except StopIteration as finished:
+            final = finished.value
+            break
+        item = _encode_result(item)
+        if client.streams:
+            client.write_message({'type': 'chunk', 'id': request_id,
+                                  'seq': seq, 'data': item})
+        else:
+            collected.append(item)
+        seq += 1
+    if final is None and collected:
+        final = _join_chunks(collected)
+    return final
+
+
 def _serve_invoke(client, handlers, marshal, message):
     """Answer one invocation. Runs on its own thread, which matters twice over:
     a slow handler must not stall the session, and a handler that calls back
     into Titan (``call()`` below) needs the reader loop free to deliver its
-    answer - doing this inline would deadlock."""
+    answer - doing this inline would deadlock. It is also what lets Titan have
+    many invocations in flight on one connection: each is answered, by id,
+    whenever it is done.
+
+    A handler that is a generator streams: see ``_stream``.
+    """
     request_id = message.get('id')
     name = message.get('action', '')
     handler = handlers.get(name)
     if handler is None:
-        client.write_line({'type': 'result', 'id': request_id, 'ok': False,
-                           'error': f"unknown action '{name}'"})
+        client.write_message({'type': 'result', 'id': request_id, 'ok': False,
+                              'error': f"unknown action '{name}'"})
         return
     try:
-        value = _encode_result(_call_handler(handler, message.get('args'),
-                                             marshal))
-        client.write_line({'type': 'result', 'id': request_id, 'ok': True,
-                           'result': value})
+        value = _call_handler(handler, message.get('args'), marshal)
+        if inspect.isgenerator(value):
+            value = _stream(client, request_id, value, marshal)
+        value = _encode_result(value)
+        if not client.write_message({'type': 'result', 'id': request_id,
+                                     'ok': True, 'result': value}):
+            client.write_message({'type': 'result', 'id': request_id,
+                                  'ok': False,
+                                  'error': 'the result was too large to send'})
     except Exception as e:
-        client.write_line({'type': 'result', 'id': request_id, 'ok': False,
-                           'error': f"{type(e).__name__}: {e}"})
+        client.write_message({'type': 'result', 'id': request_id, 'ok': False,
+                              'error': f"{type(e).__name__}: {e}"})
 
 
 def _session(client, handlers, hello, marshal):
-    if not client.write_line(hello):
+    if not client.write_message(hello):
         return
-    line = client.read_line()
-    if line is None:
-        return
-    try:
-        welcome = json.loads(line.decode('utf-8', errors='replace'))
-    except Exception:
+    welcome = client.read_message()
+    if welcome is None:
         return
     if not welcome.get('ok'):
         _state['last_error'] = str(welcome.get('error') or 'refused')
         _log(f"Titan refused the join: {_state['last_error']}")
         return
+    common = set(welcome.get('features') or ()) & set(FEATURES)
+    client.binary = 'binary' in common
+    client.streams = 'chunks' in common
     _state['connected'] = True
     _state['last_error'] = ''
     with _call_lock:
@@ -581,13 +816,9 @@ def _session(client, handlers, hello, marshal):
 
     try:
         while not _stop.is_set():
-            line = client.read_line()
-            if line is None:
+            message = client.read_message()
+            if message is None:
                 break
-            try:
-                message = json.loads(line.decode('utf-8', errors='replace'))
-            except Exception:
-                continue
             kind = message.get('type')
             if kind == 'invoke':
                 threading.Thread(
@@ -597,7 +828,7 @@ def _session(client, handlers, hello, marshal):
             elif kind in ('call_result', 'list_result'):
                 _resolve_call(message)
             elif kind == 'ping':
-                client.write_line({'type': 'pong'})
+                client.write_message({'type': 'pong'})
     finally:
         with _call_lock:
             if _outbound['channel'] is client:
@@ -637,7 +868,10 @@ def serve(handlers, id=None, label='', kind='app', actions=None, marshal=None):
             named arguments Titan sends; parameters it does not declare are
             dropped, so adding a parameter later never breaks an old handler.
             Return a string to tell the AI what happened; anything else is
-            serialised as JSON.
+            serialised as JSON, and ``bytes`` travel as raw bytes. A handler
+            that is a generator streams: each value it yields reaches Titan
+            as it is yielded (a long copy can say how far it has got), and
+            what it returns is the result.
         id: Stable add-on id, matching ``__actions.json``. Defaults to the
             name of the directory the running script lives in.
         label: Human name, used when the AI talks about this add-on.
@@ -661,6 +895,17 @@ def serve(handlers, id=None, label='', kind='app', actions=None, marshal=None):
         _log("serve() needs a non-empty {name: callable} mapping")
         return False
 
+    hello = _build_hello(handlers, id, label, kind, actions)
+    _stop.clear()
+    _worker = threading.Thread(target=_worker_loop,
+                               args=(dict(handlers), hello, marshal),
+                               name='TitanActionBusClient', daemon=True)
+    _worker.start()
+    return True
+
+
+def _build_hello(handlers, id=None, label='', kind='app', actions=None):
+    """The message an add-on joins with."""
     if not id:
         try:
             main = sys.modules.get('__main__')
@@ -671,7 +916,7 @@ def serve(handlers, id=None, label='', kind='app', actions=None, marshal=None):
     id = ''.join(ch if ch.isalnum() or ch == '_' else '_'
                  for ch in str(id).lower()).strip('_') or 'addon'
 
-    hello = {
+    return {
         'type': 'hello',
         'token': _read_token(),
         'id': id,
@@ -680,15 +925,9 @@ def serve(handlers, id=None, label='', kind='app', actions=None, marshal=None):
         'pid': os.getpid(),
         'path': os.path.abspath(os.path.dirname(sys.argv[0] or '.')),
         'actions': _describe(handlers, actions),
+        'features': list(FEATURES),
     }
 
-    _stop.clear()
-    _worker = threading.Thread(target=_worker_loop,
-                               args=(dict(handlers), hello, marshal),
-                               name='TitanActionBusClient', daemon=True)
-    _worker.start()
-    return True
-
 
 def connect(id=None, label='', kind='app'):
     """Join the bus purely as a caller, offering nothing.
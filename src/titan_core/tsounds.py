@@ -1,6 +1,5 @@
 # -*- coding: utf-8 -*-
 import wx
-import threading
 import time
 import platform
 import subprocess
@@ -34,9 +33,9 @@ else:
     }
 
 
-class SystemAudioFeedback(threading.Thread):
+class SystemAudioFeedback:
     """
-    Wątek monitorujący procesy i aktywne okno, bez globalnego hooka klawiatury.
+    Monitoruje procesy i aktywne okno, bez globalnego hooka klawiatury.
 
     1) Procesy z oknem:
        - Aplikacja systemowa => sysprocess_open/close
@@ -45,12 +44,23 @@ class SystemAudioFeedback(threading.Thread):
        - Otwarcie => statusbar.ogg
        - Zamknięcie => applist.ogg
     3) Zwykły skok kursora (zmiana zwykłego okna) => focus.ogg
+
+    Nie ma już własnego wątku, który co 100 ms sprawdzał wszystko naraz.
+    Trzy tematy systemowego huba zdarzeń (src/system/event_hub.py):
+
+        process.pids       zbiór PID-ów           0.25 s, w spokoju do 0.5 s
+        window.pids        PID-y z widocznym oknem 0.2 s, w spokoju do 1 s
+        window.foreground  aktywne okno            na Windows zdarzenie
+                                                   (SetWinEventHook), gdzie
+                                                   indziej 0.1 s, do 0.5 s
+
+    Zmiana aktywnego okna od razu odpytuje process.pids i window.pids:
+    nowa aplikacja zwykle właśnie wtedy się pokazuje.
     """
 
-    def __init__(self):
-        super().__init__()
-        self.daemon = True
-        self._stop_event = threading.Event()
+    def __init__(self, hub=None):
+        self.hub = hub
+        self._unwatch = []
 
         # PID of the main TCE process — all TCE windows (Telegram, Titan-Net,
         # Settings, etc.) live in this process and should be ignored.
@@ -68,7 +78,7 @@ class SystemAudioFeedback(threading.Thread):
         self.prev_window = None
         self.prev_window_name = None
 
-    def run(self):
+    def start(self):
         global play_sound
 
         # Import play_sound here to ensure sound system is initialized first
@@ -79,32 +89,43 @@ class SystemAudioFeedback(threading.Thread):
             print(f"Failed to import play_sound in tsounds: {e}")
             return
 
+        from src.system.event_hub import get_hub
+        hub = self.hub or get_hub()
+        self.hub = hub
+
         # Inicjalizacja stanu procesów
         self.prev_pids = self._get_current_pids()
 
-        while not self._stop_event.is_set():
-            try:
-                # 1. Monitoruj procesy (cross-platform via psutil)
-                self._monitor_processes()
-                # 2. Monitoruj okna procesów
-                self._monitor_windows()
-                # 3. Monitoruj aktywne okno (skok kursora, dialogi, itp.)
-                self._monitor_active_window()
-            except Exception as e:
-                print(f"Error in SystemAudioFeedback monitoring loop: {e}")
-
-            time.sleep(0.1)
+        self._unwatch = [
+            hub.watch('process.pids', lambda: frozenset(self._get_current_pids()),
+                      lambda topic, old, new: self._monitor_processes(new),
+                      interval=0.25, max_interval=0.5),
+            hub.watch('window.pids', self._window_pids,
+                      lambda topic, old, new: self._mark_windows(new - (old or frozenset())),
+                      interval=0.2, max_interval=1.0),
+            hub.watch('window.foreground', self._foreground,
+                      self._on_foreground,
+                      interval=0.1, max_interval=0.5,
+                      # xdotool / osascript outside Windows: its own thread.
+                      blocking=not IS_WINDOWS),
+        ]
 
     def stop(self):
-        """Zatrzymuje wątek."""
-        self._stop_event.set()
+        """Zatrzymuje monitorowanie."""
+        for unwatch in self._unwatch:
+            unwatch()
+        self._unwatch = []
+
+    def is_alive(self):
+        return bool(self._unwatch)
 
     # --------------------------------------------------------------------------
     #                           MONITOROWANIE PROCESÓW
     # --------------------------------------------------------------------------
-    def _monitor_processes(self):
+    def _monitor_processes(self, current_pids=None):
         try:
-            current_pids = self._get_current_pids()
+            if current_pids is None:
+                current_pids = self._get_current_pids()
             new_pids = current_pids - self.prev_pids
             closed_pids = self.prev_pids - current_pids
 
@@ -113,7 +134,11 @@ class SystemAudioFeedback(threading.Thread):
             for pid in closed_pids:
                 self._on_closed_process(pid)
 
-            self.prev_pids = current_pids
+            self.prev_pids = set(current_pids)
+            if new_pids and self.hub is not None:
+                # The window may have been seen before the process was.
+                self._mark_windows(self.hub.value('window.pids') or frozenset())
+                self.hub.poke('window.pids')
         except Exception as e:
             print(f"Error monitoring processes: {e}")
 
@@ -163,41 +188,41 @@ class SystemAudioFeedback(threading.Thread):
     # --------------------------------------------------------------------------
     #                      MONITOROWANIE OKIEN PROCESÓW
     # --------------------------------------------------------------------------
-    def _monitor_windows(self):
+    def _mark_windows(self, pids):
         """
-        Sprawdza, czy procesy z self.process_info mają top-level window.
-        Jeśli tak i 'had_window' == False => odtwarzamy open.ogg (systemowe lub użytkownika).
+        Procesy z self.process_info, które właśnie dostały okno: jeśli
+        'had_window' == False => odtwarzamy open.ogg (systemowe lub użytkownika).
         """
         global play_sound
+        for pid in pids:
+            info = self.process_info.get(pid)
+            if info is None or info.get("had_window"):
+                continue
+            info["had_window"] = True
+            if play_sound:
+                try:
+                    if info.get("is_system"):
+                        play_sound("system/sysprocess_open.ogg")
+                    else:
+                        play_sound("ui/uiopen.ogg")
+                except Exception as e:
+                    print(f"Error playing open sound: {e}")
 
+    def _window_pids(self):
+        """Value of 'window.pids': processes that have a window."""
         if IS_WINDOWS:
-            self._monitor_windows_win32()
-        else:
-            self._monitor_windows_crossplatform()
+            return self._window_pids_win32()
+        return self._window_pids_crossplatform()
 
-    def _monitor_windows_win32(self):
-        """Windows: enumerate windows via win32gui."""
-        global play_sound
+    def _window_pids_win32(self):
+        """Windows: enumerate visible top-level windows via win32gui."""
+        pids = set()
 
         def enum_handler(hwnd, _):
             try:
-                if not win32gui.IsWindow(hwnd):
-                    return True
-                if not win32gui.IsWindowVisible(hwnd):
-                    return True
-
-                _, pid = win32process.GetWindowThreadProcessId(hwnd)
-                if pid in self.process_info:
-                    info = self.process_info[pid]
-                    if not info.get("had_window") and play_sound:
-                        info["had_window"] = True
-                        try:
-                            if info.get("is_system"):
-                                play_sound("system/sysprocess_open.ogg")
-                            else:
-                                play_sound("ui/uiopen.ogg")
-                        except Exception as e:
-                            print(f"Error playing open sound: {e}")
+                if win32gui.IsWindow(hwnd) and win32gui.IsWindowVisible(hwnd):
+                    _, pid = win32process.GetWindowThreadProcessId(hwnd)
+                    pids.add(pid)
             except Exception:
                 pass
             return True
@@ -206,59 +231,69 @@ class SystemAudioFeedback(threading.Thread):
             win32gui.EnumWindows(enum_handler, None)
         except Exception as e:
             print(f"Error enumerating windows: {e}")
+            return None
+        return frozenset(pids)
 
-    def _monitor_windows_crossplatform(self):
-        """macOS/Linux: mark processes that have GUI windows via psutil."""
-        global play_sound
+    def _window_pids_crossplatform(self):
+        """macOS/Linux: processes that look like GUI apps, via psutil.
+
+        On macOS/Linux we can't easily enumerate windows without X11/Quartz.
+        Heuristic: a running process with a display connection (DISPLAY or
+        WAYLAND_DISPLAY, or any process on macOS) alive for over a second.
+        """
+        pids = set()
         for pid, info in list(self.process_info.items()):
             if info.get("had_window"):
+                pids.add(pid)
                 continue
             try:
                 proc = psutil.Process(pid)
-                # Check if process has any open files that suggest a GUI
-                # Or just check if it has connections (basic heuristic)
-                # On macOS/Linux we can't easily enumerate windows without X11/Quartz
-                # Use a simple heuristic: processes with a terminal or display connection
                 if proc.status() == psutil.STATUS_RUNNING:
-                    # Check if the process has a DISPLAY env var (X11) or is a known GUI app
                     try:
                         environ = proc.environ()
                         if 'DISPLAY' in environ or 'WAYLAND_DISPLAY' in environ or IS_MACOS:
-                            # Heuristic: if process has been alive > 1 second and has a display, assume GUI
                             if time.time() - proc.create_time() > 1.0:
-                                info["had_window"] = True
-                                if play_sound:
-                                    try:
-                                        if info.get("is_system"):
-                                            play_sound("system/sysprocess_open.ogg")
-                                        else:
-                                            play_sound("ui/uiopen.ogg")
-                                    except Exception:
-                                        pass
+                                pids.add(pid)
                     except (psutil.AccessDenied, psutil.NoSuchProcess):
                         pass
             except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
                 pass
+        return frozenset(pids)
 
     # --------------------------------------------------------------------------
     #              MONITOROWANIE AKTYWNEGO OKNA (dialogi, menu, focus)
     # --------------------------------------------------------------------------
-    def _monitor_active_window(self):
+    def _foreground(self):
+        """Value of 'window.foreground' where it has to be polled."""
+        if IS_WINDOWS:
+            return win32gui.GetForegroundWindow() or None
+        return self._get_active_window_name() or None
+
+    def _on_foreground(self, topic, old, new):
+        """'window.foreground' changed: a new app usually shows up right now,
+        so its open sound should not wait for the next process poll."""
+        if self.hub is not None:
+            self.hub.poke('process.pids')
+            self.hub.poke('window.pids')
+        self._monitor_active_window(new)
+
+    def _monitor_active_window(self, current=None):
         global play_sound
 
         if not play_sound:
             return
 
         if IS_WINDOWS:
-            self._monitor_active_window_win32()
+            self._monitor_active_window_win32(current)
         else:
-            self._monitor_active_window_crossplatform()
+            self._monitor_active_window_crossplatform(current)
 
-    def _monitor_active_window_win32(self):
-        """Windows: monitor active window via win32gui."""
+    def _monitor_active_window_win32(self, current_window=None):
+        """Windows: react to a new foreground window."""
         global play_sound
         try:
-            current_window = win32gui.GetForegroundWindow()
+            if current_window is None:
+                current_window = win32gui.GetForegroundWindow()
 
             if not current_window or current_window == 0:
                 return
@@ -292,11 +327,12 @@ class SystemAudioFeedback(threading.Thread):
         except Exception:
             pass
 
-    def _monitor_active_window_crossplatform(self):
-        """macOS/Linux: monitor active window name/PID changes."""
+    def _monitor_active_window_crossplatform(self, current_name=None):
+        """macOS/Linux: react to a new active window name."""
         global play_sound
         try:
-            current_name = self._get_active_window_name()
+            if current_name is None:
+                current_name = self._get_active_window_name()
             if not current_name:
                 return
 
@@ -474,8 +510,8 @@ class SystemAudioFeedback(threading.Thread):
 # ------------------------------------------------------------------------------
 def initialize(app=None):
     """
-    Inicjalizuje wątek monitorujący procesy i aktywne okna (bez globalnego hooka).
-    Zwraca wątek, by można go zatrzymać przy zamykaniu Titana.
+    Uruchamia monitorowanie procesów i aktywnych okien (bez globalnego hooka).
+    Zwraca obiekt monitora, by można go zatrzymać przy zamykaniu Titana.
     """
     feedback = SystemAudioFeedback()
     feedback.start()
@@ -35,7 +35,7 @@ from src.titan_core.translation import set_language
 from src.titan_core.app_manager import get_applications, open_application
 from src.titan_core.game_manager import get_games, open_game
 from src.titan_core.statusbar_applet_manager import StatusbarAppletManager
-from src.titan_core.stereo_speech import get_stereo_speech, speak_stereo
+from src.titan_core.stereo_speech import get_stereo_speech, speak_stereo, prefetch_stereo
 # Both are windows the user opens from the Invisible UI, and both cost more
 # to import than the Invisible UI itself - the Settings window alone brings in
 # the whole TTS stack.  Imported when one is opened (see `src/lazy_import.py`).
@@ -530,6 +530,7 @@ class PersistentNavigationHotkeys:
     VK_OEM_6 = 0xDD        # ]
     VK_OEM_COMMA = 0xBC    # ,
     VK_OEM_PERIOD = 0xBE   # .
+    VK_OEM_2 = 0xBF        # /
 
     BUFFER_KEY_MAP = [
         # (action, vk, modifiers) - Shift jumps to first/last of the level
@@ -545,6 +546,7 @@ class PersistentNavigationHotkeys:
         ('next_element', VK_OEM_PERIOD, 0),
         ('first_element', VK_OEM_COMMA, MOD_SHIFT),
         ('last_element', VK_OEM_PERIOD, MOD_SHIFT),
+        ('first_unread', VK_OEM_2, 0),
     ]
 
     def __init__(self, on_key):
@@ -727,6 +729,7 @@ class PersistentNavigationHotkeys:
             '.': lambda: self._enqueue('buffer:next_element'),
             '<shift>+,': lambda: self._enqueue('buffer:first_element'),
             '<shift>+.': lambda: self._enqueue('buffer:last_element'),
+            '/': lambda: self._enqueue('buffer:first_unread'),
         }
         self._fallback_hotkeys = GlobalHotKeys(fallback_map)
         self._fallback_hotkeys.start()
@@ -1896,6 +1899,92 @@ class InvisibleUI:
         except Exception as e:
             print(f"Error in fallback speech: {e}")
 
+    def _category_announcement(self, index):
+        """What focusing category ``index`` speaks: (text, position, pitch, elevation)."""
+        num_categories = len(self.categories)
+        category = self.categories[index]
+        speak_text = category.get('name', 'Unknown category')
+        if get_setting('announce_first_item', 'False', section='invisible_interface').lower() == 'true':
+            elements = category.get('elements', [])
+            if elements:
+                speak_text += f", {elements[0]}"
+
+        # Calculate position for category (vertical navigation)
+        stereo_position = 0.0  # Categories don't use left-right panning
+        pitch_offset = 0
+        elevation = 0.0
+        if num_categories > 1:
+            if is_3d_enabled():
+                # 3D: real elevation instead of pitch (top = up, bottom = down)
+                elevation = (0.5 - (index / (num_categories - 1))) * 2.0  # +1.0 .. -1.0
+            else:
+                # Vertical pitch - higher categories = higher pitch, lower = lower pitch
+                pitch_offset = int((0.5 - (index / (num_categories - 1))) * 10)  # Range -5 to +5
+            # Stereo remains 0.0 (center) for category navigation
+        return speak_text, stereo_position, pitch_offset, elevation
+
+    def _element_announcement(self, category, index):
+        """What focusing element ``index`` of ``category`` speaks: (text, position, pitch)."""
+        elements = category.get('elements', [])
+        num_elements = len(elements)
+        element_name = elements[index]
+        announce_index = get_setting('announce_index', 'False', section='invisible_interface').lower() == 'true'
+        announce_widget_type = get_setting('announce_widget_type', 'False', section='invisible_interface').lower() == 'true'
+
+        speak_text = str(element_name)
+        if announce_index:
+            speak_text += ", " + _("{} of {}").format(index + 1, num_elements)
+
+        try:
+            if announce_widget_type and category.get('name') == _("Widgets") and 'widget_data' in category:
+                widget_data = category.get('widget_data', [])
+                if index < len(widget_data):
+                    widget_type = widget_data[index].get('type', '')
+                    speak_text += f", {_('button') if widget_type == 'button' else _('widget')}"
+        except Exception as e:
+            print(f"Error adding widget type announcement: {e}")
+
+        try:
+            # Add web app type announcement for Titan IM menu
+            if announce_widget_type and category.get('name') == _("Titan IM"):
+                if element_name in [_("Facebook Messenger"), _("WhatsApp")]:
+                    speak_text += f", {_('web application')}"
+        except Exception as e:
+            print(f"Error adding web app announcement: {e}")
+
+        # Calculate stereo position for element (horizontal only, no pitch)
+        stereo_position = 0.0
+        pitch_offset = 0  # Elements don't use pitch, only stereo left-right
+        if num_elements > 1:
+            # Pan horizontally (0.0-1.0)
+            pan = index / (num_elements - 1)
+            # Convert pan to stereo position (-1.0 to 1.0)
+            stereo_position = (pan * 2.0) - 1.0
+        return speak_text, stereo_position, pitch_offset
+
+    def _prefetch_around(self, category_index, element_index):
+        """Have the stereo speech render what the next arrow key would say:
+        the elements left and right of the focus and the categories above
+        and below (see src/titan_core/speech_prefetch.py)."""
+        try:
+            if get_setting('stereo_speech', 'False', section='invisible_interface').lower() != 'true':
+                return
+            items = []
+            category = self.categories[category_index]
+            num_elements = len(category.get('elements', []))
+            for index in (element_index + 1, element_index - 1):
+                if 0 <= index < num_elements:
+                    text, _position, pitch = self._element_announcement(category, index)
+                    items.append((text, pitch))
+            for index in (category_index + 1, category_index - 1):
+                if 0 <= index < len(self.categories):
+                    text, _position, pitch, _elevation = self._category_announcement(index)
+                    items.append((text, pitch))
+            # speak() clamps the pitch the same way before synthesis.
+            prefetch_stereo([(str(text), max(-10, min(10, int(pitch)))) for text, pitch in items])
+        except Exception as e:
+            print(f"Error prefetching speech: {e}")
+
     def navigate_category(self, step):
         new_index = None
         num_categories = 0
@@ -1984,26 +2073,10 @@ class InvisibleUI:
                     print(f"Error playing category sound: {e}")
                 
                 try:
-                    speak_text = new_category.get('name', 'Unknown category')
-                    if get_setting('announce_first_item', 'False', section='invisible_interface').lower() == 'true':
-                        elements = new_category.get('elements', [])
-                        if elements:
-                            speak_text += f", {elements[0]}"
-                    
-                    # Calculate position for category (vertical navigation)
-                    stereo_position = 0.0  # Categories don't use left-right panning
-                    pitch_offset = 0
-                    elevation = 0.0
-                    if num_categories > 1:
-                        if is_3d_enabled():
-                            # 3D: real elevation instead of pitch (top = up, bottom = down)
-                            elevation = (0.5 - (new_index / (num_categories - 1))) * 2.0  # +1.0 .. -1.0
-                        else:
-                            # Vertical pitch - higher categories = higher pitch, lower = lower pitch
-                            pitch_offset = int((0.5 - (new_index / (num_categories - 1))) * 10)  # Range -5 to +5
-                        # Stereo remains 0.0 (center) for category navigation
-
+                    speak_text, stereo_position, pitch_offset, elevation = \
+                        self._category_announcement(new_index)
                     self.speak(speak_text, position=stereo_position, pitch_offset=pitch_offset, elevation=elevation)
+                    self._prefetch_around(new_index, 0)
                 except Exception as e:
                     print(f"Error speaking category: {e}")
                     try:
@@ -2099,41 +2172,10 @@ class InvisibleUI:
                     print(f"Error playing element focus sound: {e}")
                 
                 try:
-                    announce_index = get_setting('announce_index', 'False', section='invisible_interface').lower() == 'true'
-                    announce_widget_type = get_setting('announce_widget_type', 'False', section='invisible_interface').lower() == 'true'
-                    
-                    speak_text = str(element_name)
-                    if announce_index:
-                        speak_text += ", " + _("{} of {}").format(self.current_element_index + 1, num_elements)
-                    
-                    try:
-                        if announce_widget_type and category.get('name') == _("Widgets") and 'widget_data' in category:
-                            widget_data = category.get('widget_data', [])
-                            if self.current_element_index < len(widget_data):
-                                widget_type = widget_data[self.current_element_index].get('type', '')
-                                speak_text += f", {_('button') if widget_type == 'button' else _('widget')}"
-                    except Exception as e:
-                        print(f"Error adding widget type announcement: {e}")
-                    
-                    try:
-                        # Add web app type announcement for Titan IM menu
-                        if announce_widget_type and category.get('name') == _("Titan IM"):
-                            if element_name in [_("Facebook Messenger"), _("WhatsApp")]:
-                                speak_text += f", {_('web application')}"
-                    except Exception as e:
-                        print(f"Error adding web app announcement: {e}")
-                    
-                    # Calculate stereo position for element (horizontal only, no pitch)
-                    stereo_position = 0.0
-                    pitch_offset = 0  # Elements don't use pitch, only stereo left-right
-                    if num_elements > 1:
-                        # Pan horizontally (0.0-1.0)
-                        pan = new_index / (num_elements - 1)
-                        # Convert pan to stereo position (-1.0 to 1.0)
-                        stereo_position = (pan * 2.0) - 1.0
-                        # Pitch = 0 for left-right navigation
-                    
+                    speak_text, stereo_position, pitch_offset = \
+                        self._element_announcement(category, self.current_element_index)
                     self.speak(speak_text, position=stereo_position, pitch_offset=pitch_offset)
+                    self._prefetch_around(self.current_category_index, self.current_element_index)
                 except Exception as e:
                     print(f"Error speaking element: {e}")
                     try:
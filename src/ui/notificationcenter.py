@@ -29,13 +29,45 @@ def create_notifications_file():
     with open(NOTIFICATIONS_FILE_PATH, 'w', encoding='utf-8') as file:
         file.write('')
 
+_store = None
+_store_lock = threading.Lock()
+
+# How many notifications the center lists at a time; more are loaded as the
+# user arrows past the end of the list.
+PAGE_SIZE = 200
+
+
+def get_notification_store():
+    """The notification history (see src/system/notification_store.py).
+
+    bg5notifications.tno is migrated on first use and still read for what
+    other programs append to it. Retention comes from the [notifications]
+    settings keep_entries and keep_days.
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            from src.system.notification_store import NotificationStore, DEFAULT_KEEP_ENTRIES
+            keep_entries, keep_days = DEFAULT_KEEP_ENTRIES, None
+            try:
+                from src.settings.settings import get_setting
+                keep_entries = int(get_setting('keep_entries', DEFAULT_KEEP_ENTRIES,
+                                               section='notifications'))
+                keep_days = get_setting('keep_days', None, section='notifications')
+                keep_days = int(keep_days) if keep_days not in (None, '', '0', 0) else None
+            except Exception as e:
+                print(f"[NotificationCenter] Retention settings unreadable, using defaults: {e}")
+            _store = NotificationStore(os.path.join(get_user_data_dir(), 'notifications'),
+                                       legacy_path=NOTIFICATIONS_FILE_PATH,
+                                       keep_entries=keep_entries, keep_days=keep_days)
+        return _store
+
+
 def add_notification(date, time, appname, content):
-    with open(NOTIFICATIONS_FILE_PATH, 'a', encoding='utf-8') as file:
-        file.write(f'notification\n')
-        file.write(f'date={date}\n')
-        file.write(f'time={time}\n')
-        file.write(f'appname={appname}\n')
-        file.write(f'content={content}\n\n')
+    try:
+        get_notification_store().append(date, time, appname, content)
+    except Exception as e:
+        print(f"[NotificationCenter] Error saving notification: {e}")
 
 def show_notification(title, message):
     """Odtwarza dźwięk powiadomienia i odczytuje jego treść."""
@@ -99,49 +131,37 @@ def _monitor_network_events():
     finally:
         pythoncom.CoUninitialize()
 
-def _monitor_network_events_crossplatform():
-    """Cross-platform network monitoring using psutil polling."""
+def _up_interfaces():
+    """Names of the network interfaces that are up (loopback aside)."""
+    import psutil
+    return frozenset(iface for iface, stat in psutil.net_if_stats().items()
+                     if stat.isup and iface != 'lo')
+
+
+def _on_interfaces(topic, old, new):
+    """Announce interfaces coming up or going down."""
+    if new - old:
+        show_notification("System", "Connected to network")
+    if old - new:
+        show_notification("System", "Disconnected from network")
+
+
+def _monitor_network_events_crossplatform(hub=None):
+    """Cross-platform network monitoring: the interface list, polled by the
+    system event hub every 5 s, backing off to 30 s while it stays the same.
+
+    Returns the function that stops it.
+    """
     try:
-        import psutil
+        import psutil  # noqa: F401
     except ImportError:
         print("psutil not available, network monitoring disabled")
-        return
-
-    def _get_active_connections():
-        """Get set of active network interface addresses."""
-        addrs = {}
-        try:
-            stats = psutil.net_if_stats()
-            for iface, stat in stats.items():
-                if stat.isup and iface != 'lo':
-                    addrs[iface] = stat.isup
-        except Exception:
-            pass
-        return addrs
-
-    last_state = _get_active_connections()
-
-    while True:
-        try:
-            time.sleep(5)
-            current_state = _get_active_connections()
-
-            # Detect new connections
-            for iface in current_state:
-                if iface not in last_state:
-                    show_notification("System", "Connected to network")
-                    break
+        return None
 
-            # Detect disconnections
-            for iface in last_state:
-                if iface not in current_state:
-                    show_notification("System", "Disconnected from network")
-                    break
-
-            last_state = current_state
-        except Exception as e:
-            print(f"Error in network monitoring: {e}")
-            time.sleep(10)
+    from src.system.event_hub import get_hub
+    hub = hub or get_hub()
+    return hub.watch('network.interfaces', _up_interfaces, _on_interfaces,
+                     interval=5.0, max_interval=30.0, initial_delay=5.0)
 
 def start_monitoring():
     """Uruchamia monitorowanie zdarzeń systemowych w tle."""
@@ -149,45 +169,39 @@ def start_monitoring():
         network_thread = threading.Thread(target=_monitor_network_events, daemon=True)
         network_thread.start()
     else:
-        network_thread = threading.Thread(target=_monitor_network_events_crossplatform, daemon=True)
-        network_thread.start()
+        _monitor_network_events_crossplatform()
 
 
-def read_notifications():
+def read_notifications(start=0, limit=None, appname=None):
     """
     Read the stored notifications, newest first.
 
-    Returns a list of dicts with date, time, appname and content keys.
+    Returns a list of dicts with date, time, appname and content keys:
+    ``limit`` of them (all if None) after skipping the newest ``start``,
+    optionally only those of one application.
     """
-    if not os.path.exists(NOTIFICATIONS_FILE_PATH):
-        return []
-
-    entries = []
-    current = None
     try:
-        with open(NOTIFICATIONS_FILE_PATH, 'r', encoding='utf-8') as file:
-            for line in file:
-                line = line.rstrip('\n')
-                if line.strip() == 'notification':
-                    current = {'date': '', 'time': '', 'appname': '', 'content': ''}
-                    entries.append(current)
-                elif current is not None and '=' in line:
-                    key, value = line.split('=', 1)
-                    key = key.strip()
-                    if key in current:
-                        current[key] = value
+        store = get_notification_store()
+        if limit is None:
+            limit = store.count()
+        return store.page(start, limit, appname=appname)
     except Exception as e:
         print(f"[NotificationCenter] Error reading notifications: {e}")
         return []
 
-    entries.reverse()
-    return entries
+
+def count_notifications():
+    try:
+        return get_notification_store().count()
+    except Exception as e:
+        print(f"[NotificationCenter] Error counting notifications: {e}")
+        return 0
 
 
 def clear_notifications():
     """Remove every stored notification."""
     try:
-        create_notifications_file()
+        get_notification_store().clear()
         return True
     except Exception as e:
         print(f"[NotificationCenter] Error clearing notifications: {e}")
@@ -234,6 +248,7 @@ def show_notification_center(parent=None):
 
             self.clear_button.Bind(wx.EVT_BUTTON, self._on_clear)
             self.listbox.Bind(wx.EVT_LISTBOX_DCLICK, self._on_read)
+            self.listbox.Bind(wx.EVT_LISTBOX, self._on_select)
             self.Bind(wx.EVT_CHAR_HOOK, self._on_char_hook)
 
             self._reload()
@@ -245,19 +260,33 @@ def show_notification_center(parent=None):
                 pass
 
         def _reload(self):
-            self.entries = read_notifications()
+            # Only the newest page is read; the rest follows as the user
+            # reaches the end of the list (_on_select).
+            self.total = count_notifications()
+            self.entries = []
             self.listbox.Clear()
-            for entry in self.entries:
-                self.listbox.Append("{} {} - {}: {}".format(
-                    entry['date'], entry['time'],
-                    entry['appname'], entry['content']).strip())
+            self._load_more()
             if self.listbox.GetCount():
                 self.listbox.SetSelection(0)
-                speaker.speak(_("Notification center, {} items").format(
-                    self.listbox.GetCount()))
+                speaker.speak(_("Notification center, {} items").format(self.total))
             else:
                 speaker.speak(_("Notification center, no notifications"))
 
+        def _load_more(self):
+            page = read_notifications(len(self.entries), PAGE_SIZE)
+            self.entries.extend(page)
+            self.listbox.Append(["{} {} - {}: {}".format(
+                entry['date'], entry['time'],
+                entry['appname'], entry['content']).strip() for entry in page])
+            return bool(page)
+
+        def _on_select(self, event):
+            index = self.listbox.GetSelection()
+            if (index != wx.NOT_FOUND and index >= self.listbox.GetCount() - 1
+                    and len(self.entries) < self.total):
+                self._load_more()
+            event.Skip()
+
         def _on_read(self, event):
             index = self.listbox.GetSelection()
             if index != wx.NOT_FOUND:
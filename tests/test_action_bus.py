@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+"""
+The Action Bus protocol: many calls in flight, streamed results, binary frames.
+
+Run it directly:  python tests/test_action_bus.py
+
+Titan listens on a Windows named pipe, but everything above the pipe is the
+same code over any channel. `bus.loopback()` runs both real ends - the
+add-on's session from titan_actions and Titan's side from actions/bus - over
+a socketpair, so this runs anywhere.
+"""
+
+import os
+import socket
+import sys
+import threading
+import time
+import unittest
+
+REPO = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, REPO)
+
+from src.titan_core import titan_actions                      # noqa: E402
+from src.titan_core.actions import bus                        # noqa: E402
+
+
+def slow(delay=0.0, text=''):
+    time.sleep(float(delay))
+    return text
+
+
+def count_to(n=3, pause=0.0):
+    for index in range(1, int(n) + 1):
+        time.sleep(float(pause))
+        yield f'{index} of {n}'
+
+
+def count_and_summarise(n=3):
+    for index in range(int(n)):
+        yield index
+    return f'counted {n}'
+
+
+def raw_bytes():
+    return b'\x00binary\nwith a newline\xff'
+
+
+def big_text(size=0):
+    return 'x' * int(size)
+
+
+HANDLERS = {'slow': slow, 'count_to': count_to,
+            'count_and_summarise': count_and_summarise,
+            'raw_bytes': raw_bytes, 'big_text': big_text}
+
+
+class BusTestCase(unittest.TestCase):
+    features = None
+
+    def setUp(self):
+        self.peer, self.addon_io, close = bus.loopback(
+            HANDLERS, addon_id='test_' + self.id().rsplit('.', 1)[-1][5:30],
+            features=self.features)
+        self.addCleanup(close)
+        self.assertIsNotNone(self.peer, "the add-on never joined")
+
+
+class MultiplexingTests(BusTestCase):
+
+    def test_responses_come_back_in_the_order_they_finish(self):
+        first = self.peer.submit('slow', {'delay': 0.4, 'text': 'slow one'})
+        second = self.peer.submit('slow', {'delay': 0, 'text': 'quick one'})
+        self.assertEqual(second.wait(2.0), (True, 'quick one'))
+        self.assertFalse(first.done(), "the quick call waited for the slow one")
+        self.assertEqual(first.wait(2.0), (True, 'slow one'))
+
+    def test_many_calls_share_one_connection(self):
+        started = time.perf_counter()
+        calls = [self.peer.submit('slow', {'delay': 0.1, 'text': str(i)})
+                 for i in range(30)]
+        self.assertEqual(self.peer.in_flight, 30)
+        results = [call.wait(5.0) for call in calls]
+        self.assertEqual(results, [(True, str(i)) for i in range(30)])
+        self.assertLess(time.perf_counter() - started, 1.5,
+                        "thirty 0.1s calls ran one after another")
+
+    def test_invoke_still_answers_with_text(self):
+        self.assertEqual(self.peer.invoke('slow', {'text': 'hello'}),
+                         (True, 'hello'))
+        self.assertEqual(self.peer.invoke('missing', {}),
+                         (False, "unknown action 'missing'"))
+
+    def test_a_call_that_times_out_is_forgotten(self):
+        call = self.peer.submit('slow', {'delay': 0.5})
+        ok, error = call.wait(0.05)
+        self.assertFalse(ok)
+        self.assertIn('did not answer', error)
+        self.assertEqual(self.peer.in_flight, 0)
+
+    def test_a_disconnect_fails_what_is_in_flight(self):
+        call = self.peer.submit('slow', {'delay': 5})
+        self.addon_io.close()
+        ok, error = call.wait(2.0)
+        self.assertFalse(ok)
+        self.assertIn('disconnected', error)
+
+
+class StreamingTests(BusTestCase):
+
+    def test_chunks_arrive_before_the_result(self):
+        seen = []
+        call = self.peer.submit('count_to', {'n': 3},
+                                on_chunk=lambda data: seen.append(data))
+        self.assertEqual(call.wait(2.0), (True, '1 of 3\n2 of 3\n3 of 3'))
+        self.assertEqual(seen, ['1 of 3', '2 of 3', '3 of 3'])
+
+    def test_a_returned_value_is_the_result(self):
+        seen = []
+        ok, result = self.peer.invoke('count_and_summarise', {'n': 4},
+                                      on_chunk=seen.append)
+        self.assertEqual((ok, result), (True, 'counted 4'))
+        self.assertEqual(seen, [0, 1, 2, 3])
+
+    def test_each_chunk_extends_the_timeout(self):
+        call = self.peer.submit('count_to', {'n': 5, 'pause': 0.1})
+        ok, result = call.wait(0.3)
+        self.assertTrue(ok, "a streaming action was cut off: %s" % result)
+        self.assertTrue(result.endswith('5 of 5'))
+
+
+class BinaryFrameTests(BusTestCase):
+
+    def test_both_ends_agree_on_the_features(self):
+        self.assertEqual(self.peer.features, {'binary', 'chunks'})
+        self.assertTrue(self.addon_io.binary)
+        self.assertTrue(self.addon_io.streams)
+
+    def test_bytes_travel_as_bytes(self):
+        self.assertEqual(self.peer.submit('raw_bytes').wait(2.0),
+                         (True, raw_bytes()))
+        ok, text = self.peer.invoke('raw_bytes', {})
+        self.assertTrue(ok)
+        self.assertIsInstance(text, str)
+
+    def test_a_result_larger_than_a_line_may_be(self):
+        size = titan_actions.MAX_LINE + 1024
+        ok, result = self.peer.submit('big_text', {'size': size}).wait(10.0)
+        self.assertTrue(ok, result)
+        self.assertEqual(len(result), size)
+
+
+class OlderAddonTests(BusTestCase):
+    """An add-on from before features existed announces none."""
+
+    features = []
+
+    def test_nothing_new_is_sent_to_it(self):
+        self.assertEqual(self.peer.features, set())
+        self.assertFalse(self.peer.io.binary)
+        self.assertFalse(self.addon_io.binary)
+
+    def test_a_stream_arrives_whole(self):
+        seen = []
+        ok, result = self.peer.invoke('count_to', {'n': 2}, on_chunk=seen.append)
+        self.assertEqual((ok, result), (True, '1 of 2\n2 of 2'))
+        self.assertEqual(seen, [])
+
+    def test_a_too_large_result_is_an_error_not_a_hang(self):
+        size = titan_actions.MAX_LINE + 1024
+        ok, error = self.peer.submit('big_text', {'size': size}).wait(10.0)
+        self.assertFalse(ok)
+        self.assertIn('too large', error)
+
+
+class ChannelTests(unittest.TestCase):
+    """The framing on its own, over a bare socketpair."""
+
+    def setUp(self):
+        left, right = socket.socketpair()
+        self.writer = titan_actions.SocketChannel(left)
+        self.reader = titan_actions.SocketChannel(right)
+        self.addCleanup(self.writer.close)
+        self.addCleanup(self.reader.close)
+
+    def test_lines_and_frames_interleave(self):
+        self.writer.binary = True
+        self.writer.write_message({'type': 'a'})
+        self.writer.write_message({'type': 'b', 'data': b'\n\x00\n'})
+        self.writer.write_message({'type': 'c', 'text': 'y' * 100000})
+        self.assertEqual(self.reader.read_message(), {'type': 'a'})
+        self.assertEqual(self.reader.read_message(),
+                         {'type': 'b', 'data': b'\n\x00\n'})
+        self.assertEqual(len(self.reader.read_message()['text']), 100000)
+
+    def test_a_line_that_is_not_json_is_skipped(self):
+        self.writer._send(b'not json at all\n')
+        self.writer.write_message({'type': 'after'})
+        self.assertEqual(self.reader.read_message(), {'type': 'after'})
+
+    def test_a_reader_sees_the_end(self):
+        self.writer.close()
+        self.assertIsNone(self.reader.read_message())
+
+    def test_one_reader_many_writers(self):
+        self.writer.binary = True
+        payload = 'z' * 200000
+
+        def send(index):
+            self.writer.write_message({'index': index, 'text': payload})
+        threads = [threading.Thread(target=send, args=(i,)) for i in range(8)]
+        received = []
+
+        def receive():
+            for _ in range(8):
+                received.append(self.reader.read_message())
+        reader = threading.Thread(target=receive)
+        reader.start()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        reader.join(5.0)
+        self.assertEqual(sorted(m['index'] for m in received), list(range(8)))
+        self.assertTrue(all(m['text'] == payload for m in received))
+
+
+class BenchmarkTests(unittest.TestCase):
+
+    def test_the_benchmark_runs(self):
+        result = bus.benchmark(calls=200, in_flight=16, payload_bytes=100000)
+        self.assertEqual(result['calls'], 200)
+        self.assertGreater(result['pipelined_per_second'], 0)
+        self.assertIsNotNone(result['large_as_frame_ms'])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""
+The add-on catalog: manifests read once, changes found with stat.
+
+Run it directly:  python tests/test_addon_catalog.py
+
+Each test builds a small `data/applications` of its own and a catalog over
+it, with the revalidation interval at zero so every read checks the disk.
+What is counted is the number of manifest files actually opened - the whole
+point of the catalog is that asking again does not read them again.
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+from collections import OrderedDict
+from unittest import mock
+
+REPO = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, REPO)
+
+from src.titan_core import addon_catalog                      # noqa: E402
+
+
+APP = 'name_en="{name}"\nname_pl="{name} PL"\nshortname="{short}"\n{extra}'
+
+
+class CatalogTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix='titan_catalog_')
+        self.apps = os.path.join(self.root, 'applications')
+        os.makedirs(self.apps)
+        self.cache_path = os.path.join(self.root, 'cache', 'addon_catalog.json')
+        self.addCleanup(shutil.rmtree, self.root, True)
+        self.reads = 0
+        original = addon_catalog.AddonCatalog._read_files
+
+        def counting(catalog, path, stamp):
+            self.reads += len(stamp)
+            return original(catalog, path, stamp)
+        patcher = mock.patch.object(addon_catalog.AddonCatalog, '_read_files',
+                                    counting)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def catalog(self):
+        def discover(subdir):
+            folder = os.path.join(self.root, subdir)
+            return OrderedDict((name, os.path.join(folder, name))
+                               for name in sorted(os.listdir(folder))
+                               if os.path.isdir(os.path.join(folder, name)))
+
+        def roots(subdir):
+            yield os.path.join(self.root, subdir)
+        return addon_catalog.AddonCatalog(
+            cache_path=self.cache_path,
+            kinds={'app': addon_catalog.CATALOG_KINDS['app']},
+            revalidate_interval=0, discover=discover, roots=roots)
+
+    def write_app(self, folder, name, short, extra=''):
+        path = os.path.join(self.apps, folder)
+        os.makedirs(path, exist_ok=True)
+        manifest = os.path.join(path, '__app.tce')
+        with open(manifest, 'w', encoding='utf-8') as handle:
+            handle.write(APP.format(name=name, short=short, extra=extra))
+        return manifest
+
+    def bump_mtime(self, path):
+        """Move a file's or folder's time on, however coarse the file system."""
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 2_000_000_000))
+
+
+class LookupTests(CatalogTestCase):
+
+    def test_entries_and_lookups(self):
+        self.write_app('tEdit', 'Text Editor', 'tedit')
+        self.write_app('tNotes', 'Notes', 'tnotes', 'hidden="true"\n')
+        catalog = self.catalog()
+        self.assertEqual([e.name for e in catalog.entries('app')],
+                         ['tEdit', 'tNotes'])
+        self.assertEqual(catalog.get('app', 'tNotes').key_values()['hidden'],
+                         'true')
+        entry = catalog.find_by_shortname('app', 'tedit')
+        self.assertEqual(entry.path, os.path.join(self.apps, 'tEdit'))
+        self.assertIsNone(catalog.find_by_shortname('app', 'nothing'))
+
+    def test_action_manifests_are_parsed_too(self):
+        self.write_app('tEdit', 'Text Editor', 'tedit')
+        with open(os.path.join(self.apps, 'tEdit', '__actions.json'), 'w',
+                  encoding='utf-8') as handle:
+            json.dump({'actions': [{'name': 'open_file'}]}, handle)
+        entry = self.catalog().get('app', 'tEdit')
+        self.assertEqual(entry.action_manifest_name(), '__actions.json')
+        self.assertEqual(entry.action_manifest()['actions'][0]['name'],
+                         'open_file')
+
+    def test_a_broken_manifest_does_not_hide_the_others(self):
+        self.write_app('tEdit', 'Text Editor', 'tedit')
+        os.makedirs(os.path.join(self.apps, 'broken'))
+        with open(os.path.join(self.apps, 'broken', '__actions.json'), 'w',
+                  encoding='utf-8') as handle:
+            handle.write('{not json')
+        catalog = self.catalog()
+        self.assertIn('__error__', catalog.get('app', 'broken').action_manifest())
+        self.assertIsNotNone(catalog.find_by_shortname('app', 'tedit'))
+
+
+class RevalidationTests(CatalogTestCase):
+
+    def test_asking_again_reads_nothing(self):
+        self.write_app('tEdit', 'Text Editor', 'tedit')
+        self.write_app('tNotes', 'Notes', 'tnotes')
+        catalog = self.catalog()
+        catalog.entries('app')
+        self.assertEqual(self.reads, 2)
+        for _ in range(20):
+            catalog.entries('app')
+            catalog.find_by_shortname('app', 'tnotes')
+        self.assertEqual(self.reads, 2)
+
+    def test_an_edited_manifest_is_read_again_and_reported(self):
+        manifest = self.write_app('tEdit', 'Text Editor', 'tedit')
+        catalog = self.catalog()
+        catalog.entries('app')
+        seen = []
+        catalog.subscribe(lambda *change: seen.append(change))
+        self.write_app('tEdit', 'Text Editor 2', 'tedit2')
+        self.bump_mtime(manifest)
+        self.assertIsNone(catalog.find_by_shortname('app', 'tedit'))
+        self.assertEqual(catalog.find_by_shortname('app', 'tedit2').name, 'tEdit')
+        self.assertEqual(seen, [('app', [], ['tEdit'], [])])
+
+    def test_a_touched_but_unchanged_manifest_is_not_a_change(self):
+        manifest = self.write_app('tEdit', 'Text Editor', 'tedit')
+        catalog = self.catalog()
+        catalog.entries('app')
+        seen = []
+        catalog.subscribe(lambda *change: seen.append(change))
+        self.bump_mtime(manifest)
+        catalog.entries('app')
+        self.assertEqual(seen, [])
+        reads = self.reads
+        catalog.entries('app')
+        self.assertEqual(self.reads, reads, "the new time was not remembered")
+
+    def test_added_and_removed_folders_are_noticed(self):
+        self.write_app('tEdit', 'Text Editor', 'tedit')
+        self.write_app('tNotes', 'Notes', 'tnotes')
+        catalog = self.catalog()
+        catalog.entries('app')
+        seen = []
+        unsubscribe = catalog.subscribe(lambda *change: seen.append(change))
+        shutil.rmtree(os.path.join(self.apps, 'tNotes'))
+        self.write_app('tMedia', 'Media', 'tmedia')
+        self.bump_mtime(self.apps)
+        self.assertEqual([e.name for e in catalog.entries('app')],
+                         ['tEdit', 'tMedia'])
+        self.assertEqual(seen, [('app', ['tMedia'], [], ['tNotes'])])
+        unsubscribe()
+        self.write_app('tOther', 'Other', 'tother')
+        catalog.invalidate('app')
+        catalog.entries('app')
+        self.assertEqual(len(seen), 1, "an unsubscribed listener was called")
+
+    def test_the_interval_spares_even_the_stat(self):
+        self.write_app('tEdit', 'Text Editor', 'tedit')
+        catalog = self.catalog()
+        catalog.revalidate_interval = 60
+        catalog.entries('app')
+        with mock.patch.object(addon_catalog.os, 'stat') as stat:
+            catalog.entries('app')
+            catalog.find_by_shortname('app', 'tedit')
+        stat.assert_not_called()
+
+
+class PersistenceTests(CatalogTestCase):
+
+    def test_a_restart_reads_the_cache_not_the_manifests(self):
+        for index in range(5):
+            self.write_app('app%d' % index, 'App %d' % index, 'app%d' % index)
+        self.catalog().entries('app')
+        self.assertTrue(os.path.isfile(self.cache_path))
+        self.reads = 0
+        restarted = self.catalog()
+        seen = []
+        restarted.subscribe(lambda *change: seen.append(change))
+        self.assertEqual(len(restarted.entries('app')), 5)
+        self.assertEqual(restarted.find_by_shortname('app', 'app3').name, 'app3')
+        self.assertEqual(self.reads, 0)
+        self.assertEqual(seen, [], "an unchanged disk was reported as changed")
+
+    def test_a_change_while_titan_was_closed_is_found(self):
+        manifest = self.write_app('tEdit', 'Text Editor', 'tedit')
+        self.catalog().entries('app')
+        self.write_app('tEdit', 'Text Editor', 'tedit3')
+        self.bump_mtime(manifest)
+        restarted = self.catalog()
+        self.assertIsNotNone(restarted.find_by_shortname('app', 'tedit3'))
+
+    def test_an_unreadable_cache_is_ignored(self):
+        self.write_app('tEdit', 'Text Editor', 'tedit')
+        os.makedirs(os.path.dirname(self.cache_path))
+        with open(self.cache_path, 'w', encoding='utf-8') as handle:
+            handle.write('garbage')
+        self.assertEqual(len(self.catalog().entries('app')), 1)
+
+
+class RepositoryCatalogTests(unittest.TestCase):
+    """The real data/ folder, through the real discovery."""
+
+    def test_every_bundled_app_with_a_shortname_is_found_by_it(self):
+        catalog = addon_catalog.AddonCatalog(cache_path=None)
+        entries = catalog.entries('app')
+        self.assertTrue(entries)
+        started = time.perf_counter()
+        for entry in entries:
+            short = entry.key_values().get('shortname')
+            if short:
+                self.assertIs(catalog.find_by_shortname('app', short).path,
+                              entry.path)
+        self.assertLess(time.perf_counter() - started, 0.5)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
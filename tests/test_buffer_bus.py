@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+"""
+The buffer bus IPC bridge: one connection per child, pushes in acked batches.
+
+Run it directly:  python tests/test_buffer_bus.py
+
+Every test runs a private host whose pushes go to a list instead of the
+buffer manager, so nothing here needs sound, wx or a running Titan.
+"""
+
+import json
+import os
+import socket
+import sys
+import threading
+import time
+import unittest
+from unittest import mock
+
+REPO = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, REPO)
+
+from src.buffers import buffer_bus                            # noqa: E402
+
+
+def push_payload(text):
+    return {"category_id": "test", "buffer_id": "chat", "text": text,
+            "author": "alice"}
+
+
+class HostTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.received = []
+        self.lock = threading.Lock()
+
+        def apply(**payload):
+            with self.lock:
+                self.received.append(payload)
+        self.server = buffer_bus._BufferIPCServer(apply=apply)
+        self.server.start()
+        self.addCleanup(self.server.stop)
+
+    def channel(self, **options):
+        channel = buffer_bus._ForwardChannel(self.server.port, self.server.token,
+                                             **options)
+        self.addCleanup(channel.close, 0)
+        return channel
+
+    def texts(self):
+        with self.lock:
+            return [payload['text'] for payload in self.received]
+
+    def raw_line(self, sock, payload):
+        sock.sendall((json.dumps(payload) + '\n').encode('utf-8'))
+
+    def wait_for(self, predicate, timeout=3.0):
+        deadline = time.time() + timeout
+        while not predicate() and time.time() < deadline:
+            time.sleep(0.005)
+        return predicate()
+
+
+class BatchingTests(HostTestCase):
+
+    def test_pushes_arrive_in_order_over_one_connection(self):
+        channel = self.channel()
+        for index in range(500):
+            channel.send(push_payload('message %d' % index))
+        self.assertTrue(channel.flush(5.0))
+        self.assertEqual(self.texts(), ['message %d' % i for i in range(500)])
+        self.assertEqual(self.server.connections, 1)
+        self.assertLess(self.server.batches, 500 // 10,
+                        "a burst was not gathered into batches")
+
+    def test_a_lone_push_is_not_held_longer_than_the_delay(self):
+        channel = self.channel(max_delay=0.01)
+        started = time.perf_counter()
+        channel.send(push_payload('just one'))
+        self.assertTrue(self.wait_for(lambda: self.texts() == ['just one']))
+        self.assertLess(time.perf_counter() - started, 0.5)
+
+    def test_a_full_batch_leaves_without_waiting(self):
+        channel = self.channel(max_items=8, max_delay=60)
+        for index in range(8):
+            channel.send(push_payload(str(index)))
+        self.assertTrue(self.wait_for(lambda: len(self.texts()) == 8, 2.0))
+
+    def test_unserialisable_raw_is_dropped_not_the_push(self):
+        channel = self.channel()
+        payload = push_payload('with raw')
+        payload['raw'] = object()
+        channel.send(payload)
+        self.assertTrue(channel.flush(2.0))
+        self.assertIsNone(self.received[0]['raw'])
+
+
+class HostTests(HostTestCase):
+
+    def test_a_batch_is_acked_and_a_repeat_is_not_applied_twice(self):
+        with socket.create_connection(('127.0.0.1', self.server.port)) as sock:
+            reader = sock.makefile('rb')
+            batch = {"_token": self.server.token, "_client": "c1", "_seq": 1,
+                     "_batch": [push_payload('a'), push_payload('b')]}
+            self.raw_line(sock, batch)
+            self.assertEqual(json.loads(reader.readline()),
+                             {"ack": 1, "applied": 2})
+            self.raw_line(sock, batch)
+            self.assertEqual(json.loads(reader.readline())['ack'], 1)
+        self.assertEqual(self.texts(), ['a', 'b'])
+        self.assertEqual(self.server.duplicates, 1)
+
+    def test_the_old_single_push_line_still_works(self):
+        payload = push_payload('from an older child')
+        payload['_token'] = self.server.token
+        with socket.create_connection(('127.0.0.1', self.server.port)) as sock:
+            self.raw_line(sock, payload)
+        self.assertTrue(self.wait_for(lambda: self.texts() == ['from an older child']))
+
+    def test_a_wrong_token_is_rejected(self):
+        with socket.create_connection(('127.0.0.1', self.server.port)) as sock:
+            self.raw_line(sock, {"_token": "wrong", "_client": "c", "_seq": 1,
+                                 "_batch": [push_payload('intruder')]})
+        self.assertTrue(self.wait_for(lambda: self.server.rejected == 1))
+        self.assertEqual(self.texts(), [])
+
+    def test_many_producers_share_the_single_host_thread(self):
+        channels = [self.channel() for _ in range(20)]
+        threads_before = threading.active_count()
+        for index, channel in enumerate(channels):
+            channel.send(push_payload('producer %d' % index))
+        for channel in channels:
+            self.assertTrue(channel.flush(5.0))
+        self.assertEqual(len(self.texts()), 20)
+        self.assertEqual(self.server.connections, 20)
+        # Each channel adds its own writer and ack reader; the host adds none.
+        self.assertLessEqual(threading.active_count() - threads_before, 40)
+
+
+class ReconnectTests(HostTestCase):
+
+    def test_pushes_wait_for_a_host_that_is_not_there_yet(self):
+        spare = socket.socket()
+        spare.bind(('127.0.0.1', 0))
+        dead_port = spare.getsockname()[1]
+        spare.close()
+        channel = buffer_bus._ForwardChannel(dead_port, self.server.token)
+        self.addCleanup(channel.close, 0)
+        for index in range(3):
+            channel.send(push_payload(str(index)))
+        self.assertFalse(channel.flush(0.2))
+        channel.port = self.server.port
+        self.assertTrue(channel.flush(5.0))
+        self.assertEqual(self.texts(), ['0', '1', '2'])
+
+    def test_a_dropped_connection_is_replaced(self):
+        channel = self.channel()
+        channel.send(push_payload('before'))
+        self.assertTrue(channel.flush(2.0))
+        channel._drop_socket()
+        channel.send(push_payload('after'))
+        self.assertTrue(channel.flush(5.0))
+        self.assertEqual(self.texts(), ['before', 'after'])
+        self.assertEqual(channel.reconnects, 1)
+
+    def test_an_old_connection_closing_late_leaves_the_writer_idle(self):
+        """A replaced socket's reader used to leave a resend flag behind that
+        only a new connection cleared: the writer spun on empty sends."""
+        channel = self.channel()
+        channel.send(push_payload('first'))
+        self.assertTrue(channel.flush(2.0))
+        old = channel._sock
+        channel._sock = None            # the writer reconnects, A's reader lives on
+        arrived, gate = threading.Event(), threading.Event()
+        self.addCleanup(gate.set)
+        apply = self.server._apply
+        self.server._apply = lambda **payload: (arrived.set(), gate.wait(5.0),
+                                                apply(**payload))
+
+        def ack_readers():
+            return sum(t.name == 'BufferBusAck' and t.is_alive()
+                       for t in threading.enumerate())
+        channel.send(push_payload('second'))
+        self.assertTrue(arrived.wait(2.0))      # sent on the new connection
+        readers = ack_readers()
+        old.shutdown(socket.SHUT_RDWR)  # dies while 'second' is unacked
+        self.assertTrue(self.wait_for(lambda: ack_readers() < readers))
+        gate.set()
+        self.assertTrue(channel.flush(2.0))
+        sent = channel.batches_sent
+        time.sleep(0.2)
+        self.assertEqual(channel.batches_sent, sent)
+        self.assertFalse(channel._resend)
+        self.assertEqual(self.texts(), ['first', 'second'])
+
+    def test_the_oldest_pushes_go_when_the_queue_is_full(self):
+        channel = buffer_bus._ForwardChannel(1, 'token', max_pending=5,
+                                             max_delay=60)
+        self.addCleanup(channel.close, 0)
+        with mock.patch('builtins.print'):
+            for index in range(8):
+                channel.send(push_payload(str(index)))
+        self.assertEqual(channel.dropped, 3)
+
+
+class ForwardingClientTests(HostTestCase):
+    """push() in a child process, which is any process seeing TITAN_BUFFER_IPC."""
+
+    def setUp(self):
+        super().setUp()
+        env = mock.patch.dict(os.environ, {
+            buffer_bus.IPC_ENV: '%d:%s' % (self.server.port, self.server.token)})
+        env.start()
+        self.addCleanup(env.stop)
+        self.addCleanup(self._forget_channel)
+
+    def _forget_channel(self):
+        if buffer_bus._channel is not None:
+            buffer_bus._channel.close(timeout=0)
+        buffer_bus._channel = None
+
+    def test_push_forwards_and_flush_waits_for_the_host(self):
+        self.assertFalse(buffer_bus.push('test', 'chat', 'hello', author='bob'))
+        self.assertFalse(buffer_bus.push('test', 'chat', 'again', author='bob'))
+        self.assertTrue(buffer_bus.flush(2.0))
+        self.assertEqual(self.texts(), ['hello', 'again'])
+        self.assertEqual(self.server.connections, 1)
+
+
+class BenchmarkTests(unittest.TestCase):
+
+    def test_the_benchmark_delivers_everything(self):
+        result = buffer_bus.benchmark(messages=2000, producers=2, timeout=10)
+        self.assertEqual(result['messages'], 2000)
+        self.assertGreater(result['per_second'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""
+Buffer history: the in-memory ring, the SQLite store behind it and the jumps.
+
+Run it directly:  python tests/test_buffer_store.py
+
+Every test drives a private BufferManager (the process-wide one opens the
+store in the user data directory); the store tests use a file in a
+temporary directory and "restart" by opening it again.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+REPO = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, REPO)
+
+from src.buffers.buffer_store import BufferStore   # noqa: E402
+from src.buffers.buffer_system import ALL_BUFFER_ID, BufferManager   # noqa: E402
+
+
+def fill(mgr, count, buffer_id='chat', start=0, step=1.0):
+    for i in range(start, start + count):
+        mgr.add_element('tg', buffer_id, f"{buffer_id} {i}", author='ann',
+                        kind='message', raw={'id': i}, timestamp=1000.0 + i * step)
+
+
+class MemoryOnlyTest(unittest.TestCase):
+    def test_memory_stays_bounded_and_the_cursor_does_not_drift(self):
+        mgr = BufferManager()
+        fill(mgr, 600)
+        history = mgr.categories['tg'].buffers['chat'].elements
+        self.assertEqual(len(history), 500)
+        self.assertEqual(len(history._ring), 500)
+        self.assertEqual(mgr.first_element().text, 'chat 100')
+        mgr.next_element()
+        fill(mgr, 1, start=600)          # chat 100 goes
+        self.assertEqual(mgr.current_element_preview(), 'ann: chat 101')
+        fill(mgr, 50, start=601)         # so does the reviewed one
+        self.assertEqual(mgr.current_element_preview(), 'ann: chat 151')
+
+    def test_first_unread_follows_review(self):
+        mgr = BufferManager()
+        fill(mgr, 10)
+        self.assertEqual(mgr.first_unread().text, 'chat 0')
+        for _ in range(4):
+            mgr.next_element()
+        fill(mgr, 3, start=10)
+        self.assertEqual(mgr.unread_count('tg'), 8)
+        nav = mgr.first_unread()
+        self.assertEqual((nav.text, nav.index), ('chat 5', 6))
+        mgr.last_element()
+        self.assertEqual(mgr.first_unread().level, 'no_unread')
+        self.assertEqual(mgr.unread_count('tg', 'chat'), 0)
+
+    def test_jump_to_time_with_late_timestamps(self):
+        mgr = BufferManager()
+        fill(mgr, 100)
+        mgr.add_element('tg', 'chat', 'late', timestamp=1010.0)  # clock skew
+        fill(mgr, 10, start=100)
+        self.assertEqual(mgr.jump_to_time(1050.0).text, 'chat 50')
+        self.assertEqual(mgr.jump_to_time(1050.5).text, 'chat 51')
+        self.assertEqual(mgr.jump_to_time(0).text, 'chat 0')
+        self.assertEqual(mgr.jump_to_time(10 ** 9).text, 'chat 109')
+        # 'late' counts as arriving with chat 99, not back at chat 10.
+        self.assertEqual(mgr.jump_to_time(1099.5).text, 'chat 100')
+        self.assertEqual(mgr.jump_to_time(1011.0).text, 'chat 11')
+
+    def test_the_all_buffer_merges_in_time_order_and_is_cached(self):
+        mgr = BufferManager()
+        fill(mgr, 50, 'chat', step=2.0)
+        fill(mgr, 50, 'pm', start=0, step=3.0)
+        cat = mgr.categories['tg']
+        cat.current_buffer_id = ALL_BUFFER_ID
+        elements = mgr._all_elements(cat)[0]
+        stamps = [e.timestamp for e in elements]
+        self.assertEqual(len(elements), 100)
+        self.assertEqual(stamps, sorted(stamps))
+        mgr.next_element()
+        self.assertIs(mgr._all_elements(cat)[0], elements)     # no re-merge
+        mgr.add_element('tg', 'pm', 'new', timestamp=5000.0)
+        self.assertEqual(mgr.last_element().text, 'new')
+        # Reviewing in "All" marks the source buffers read.
+        self.assertEqual(mgr.unread_count('tg', 'pm'), 0)
+        self.assertEqual(mgr.first_unread().text, 'chat 0')    # skipped over
+        cat.current_buffer_id = 'chat'
+        mgr.last_element()
+        cat.current_buffer_id = ALL_BUFFER_ID
+        mgr.add_element('tg', 'chat', 'unseen', timestamp=6000.0)
+        self.assertEqual(mgr.first_unread().text, 'unseen')
+        self.assertEqual(mgr.jump_to_time(1010.0).text, 'chat 5')
+
+
+class StoreTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'buffers', 'history.sqlite')
+        self.stores = []
+
+    def tearDown(self):
+        for store in self.stores:
+            store.close()
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def open(self, keep=5000):
+        store = BufferStore(self.path, keep_per_buffer=keep, flush_delay=None)
+        self.stores.append(store)
+        mgr = BufferManager(store=store)
+        mgr.register_category('tg', 'Telegram')
+        mgr.ensure_buffer('tg', 'chat', 'Chat', kind='message')
+        return mgr, store
+
+    def test_history_and_review_state_survive_a_restart(self):
+        mgr, store = self.open()
+        fill(mgr, 2000)
+        mgr.first_element()
+        for _ in range(9):
+            mgr.next_element()
+        store.close()
+        mgr, store = self.open()
+        history = mgr.categories['tg'].buffers['chat'].elements
+        self.assertEqual(len(history), 2000)
+        self.assertEqual(mgr.current_element_preview(), 'ann: chat 9')
+        self.assertEqual(mgr.unread_count('tg'), 1990)
+        nav = mgr.first_unread()
+        self.assertEqual((nav.text, nav.index, nav.count), ('chat 10', 11, 2000))
+        self.assertIsNone(history[0].raw)
+        self.assertEqual(mgr.last_element().text, 'chat 1999')
+        fill(mgr, 1, start=2000)
+        self.assertEqual(history.next_seq, 2001)
+
+    def test_older_elements_are_paged_from_disk(self):
+        mgr, store = self.open()
+        fill(mgr, 3000)
+        history = mgr.categories['tg'].buffers['chat'].elements
+        self.assertEqual(sum(e is not None for e in history._ring), 500)
+        self.assertEqual([e.text for e in history], [f"chat {i}" for i in range(3000)])
+        reads = store.stats['page_reads']
+        self.assertLessEqual(reads, 2500 // 64 + 1)
+        mgr.first_element()
+        for _ in range(63):
+            mgr.next_element()
+        self.assertEqual(store.stats['page_reads'], reads + 1)
+        self.assertLessEqual(len(store._pages), 16)
+
+    def test_the_store_keeps_at_most_keep_per_buffer(self):
+        mgr, store = self.open(keep=1000)
+        fill(mgr, 2500)
+        store.flush()
+        count = store._db.execute("SELECT COUNT(*) FROM elements").fetchone()[0]
+        self.assertEqual(count, 1000)
+        self.assertEqual(mgr.first_element().text, 'chat 1500')
+        store.close()
+        mgr, store = self.open(keep=1000)
+        self.assertEqual(mgr.first_element().text, 'chat 1500')
+
+    def test_jumping_in_time_past_the_ring_uses_the_index(self):
+        mgr, store = self.open()
+        fill(mgr, 4000)
+        self.assertEqual(mgr.jump_to_time(1123.5).text, 'chat 124')
+        self.assertEqual(mgr.jump_to_time(3700.0).text, 'chat 2700')
+        self.assertEqual(mgr.jump_to_time(0).text, 'chat 0')
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+"""
+Components imported side by side, in dependency order, or not at all yet.
+
+Run it directly:  python tests/test_component_loading.py
+
+Every enabled component used to be imported one after another before the
+main window, so one slow init.py held up the launcher's first speech.  These
+tests build small components in a temporary folder and check the three
+promises of the loader: independent components are imported in parallel but
+registered in discovery order, a component is never imported before what it
+`depends` on, and `load = on_demand` / `load = deferred` keep a component off
+the startup path entirely - until its menu entry is pressed, or until the
+window is up.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import textwrap
+import time
+import unittest
+from collections import OrderedDict
+from unittest import mock
+
+REPO = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, REPO)
+
+from src.titan_core import component_manager as cm_module     # noqa: E402
+
+
+SLOW = 0.25
+
+
+class ComponentFolder(object):
+    """A data/components directory made of the components it is given."""
+
+    def __init__(self):
+        self.root = tempfile.mkdtemp(prefix='titan_components_')
+        self.entries = OrderedDict()
+
+    def add(self, folder, source, **manifest):
+        path = os.path.join(self.root, folder)
+        os.makedirs(path)
+        lines = ['[component]', 'name = %s' % folder, 'status = 0']
+        lines += ['%s = %s' % (key, value) for key, value in manifest.items()]
+        with open(os.path.join(path, '__component__.TCE'), 'w',
+                  encoding='utf-8') as handle:
+            handle.write('\n'.join(lines) + '\n')
+        with open(os.path.join(path, 'init.py'), 'w', encoding='utf-8') as handle:
+            handle.write(textwrap.dedent(source))
+        self.entries[folder] = path
+
+    def manager(self):
+        with mock.patch.object(cm_module, '_discover_data_entries',
+                               return_value=OrderedDict(self.entries)), \
+                mock.patch.object(cm_module, '_get_base_path',
+                                  return_value=self.root):
+            return cm_module.ComponentManager()
+
+    def cleanup(self):
+        for folder in self.entries:
+            sys.modules.pop(folder, None)
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+class LoaderTestCase(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(cm_module, '_log_to_file')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.folder = ComponentFolder()
+        self.addCleanup(self.folder.cleanup)
+
+
+class PlanTests(unittest.TestCase):
+    """plan_load_levels on its own: the order, with nothing imported."""
+
+    def test_independent_components_share_a_level(self):
+        levels = cm_module.plan_load_levels(OrderedDict(
+            [('a', []), ('b', []), ('c', ['a'])]))
+        self.assertEqual(levels, [['a', 'b'], ['c']])
+
+    def test_a_missing_dependency_is_ignored(self):
+        levels = cm_module.plan_load_levels({'a': ['not-installed']})
+        self.assertEqual(levels, [['a']])
+
+    def test_a_cycle_falls_back_to_one_at_a_time(self):
+        levels = cm_module.plan_load_levels(OrderedDict(
+            [('free', []), ('x', ['y']), ('y', ['x'])]))
+        self.assertEqual(levels, [['free'], ['x'], ['y']])
+
+
+class ParallelImportTests(LoaderTestCase):
+
+    def test_independent_components_are_imported_side_by_side(self):
+        source = """
+            import time
+            time.sleep(%s)
+            """ % SLOW
+        for name in ('tcl_slow_one', 'tcl_slow_two', 'tcl_slow_three'):
+            self.folder.add(name, source)
+        started = time.perf_counter()
+        manager = self.folder.manager()
+        elapsed = time.perf_counter() - started
+        self.assertEqual(len(manager.components), 3)
+        self.assertLess(elapsed, SLOW * 2.5,
+                        "three %.2fs imports took %.2fs: they ran one after "
+                        "another" % (SLOW, elapsed))
+
+    def test_registration_keeps_the_discovery_order(self):
+        # The first is the slowest, so it is the last to finish importing.
+        self.folder.add('tcl_first', "import time\ntime.sleep(%s)\n" % SLOW)
+        self.folder.add('tcl_second', "")
+        self.folder.add('tcl_third', "")
+        manager = self.folder.manager()
+        self.assertEqual([m.__name__ for m in manager.components],
+                         ['tcl_first', 'tcl_second', 'tcl_third'])
+
+    def test_a_dependency_is_imported_before_its_dependant(self):
+        self.folder.add('tcl_uses_base', """
+            import sys
+            SAW_BASE = 'tcl_base' in sys.modules
+            """, depends='tcl_base')
+        self.folder.add('tcl_base', "import time\ntime.sleep(0.05)\n")
+        manager = self.folder.manager()
+        self.assertTrue(sys.modules['tcl_uses_base'].SAW_BASE)
+        self.assertEqual([m.__name__ for m in manager.components],
+                         ['tcl_base', 'tcl_uses_base'])
+
+    def test_parallel_false_keeps_a_component_on_the_loading_thread(self):
+        self.folder.add('tcl_pinned', """
+            import threading
+            THREAD = threading.current_thread().name
+            """, parallel='false')
+        self.folder.add('tcl_free', "")
+        manager = self.folder.manager()
+        self.assertNotIn('ComponentImport', sys.modules['tcl_pinned'].THREAD)
+        self.assertEqual(manager.component_load_times['tcl_pinned']['thread'],
+                         sys.modules['tcl_pinned'].THREAD)
+
+    def test_a_broken_component_does_not_stop_the_others(self):
+        self.folder.add('tcl_broken', "raise RuntimeError('broken on purpose')\n")
+        self.folder.add('tcl_fine', "")
+        manager = self.folder.manager()
+        self.assertEqual([m.__name__ for m in manager.components], ['tcl_fine'])
+        self.assertTrue(manager.component_load_times['tcl_broken']['failed'])
+
+
+class DeferredLoadingTests(LoaderTestCase):
+
+    MENU_SOURCE = """
+        IMPORTED = True
+        CALLS = []
+        INITIALIZED = []
+
+        def _open(event=None):
+            CALLS.append(event)
+            return 'opened'
+
+        def add_menu(component_manager):
+            component_manager.register_menu_function('Heavy tool', _open)
+
+        def initialize(app):
+            INITIALIZED.append(app)
+        """
+
+    def test_an_on_demand_component_is_not_imported_at_startup(self):
+        self.folder.add('tcl_heavy', self.MENU_SOURCE,
+                        load='on_demand', menu='Heavy tool')
+        manager = self.folder.manager()
+        self.assertNotIn('tcl_heavy', sys.modules)
+        self.assertEqual(manager.components, [])
+        self.assertIn('Heavy tool', manager.get_component_menu_functions())
+
+    def test_its_menu_entry_loads_and_opens_it(self):
+        self.folder.add('tcl_heavy', self.MENU_SOURCE,
+                        load='on_demand', menu='Heavy tool')
+        manager = self.folder.manager()
+        manager.initialize_components('the app')
+        placeholder = manager.get_component_menu_functions()['Heavy tool']
+        self.assertEqual(placeholder('click'), 'opened')
+        module = sys.modules['tcl_heavy']
+        self.assertEqual(module.CALLS, ['click'])
+        self.assertEqual(module.INITIALIZED, ['the app'])
+        # The real entry replaced the stand-in, and a second press of the
+        # menu the GUI already built does not load it twice.
+        self.assertIs(manager.get_component_menu_functions()['Heavy tool'],
+                      module._open)
+        self.assertEqual(placeholder('again'), 'opened')
+        self.assertEqual(module.INITIALIZED, ['the app'])
+
+    def test_a_startup_dependency_pulls_an_on_demand_one_forward(self):
+        self.folder.add('tcl_lib', "VALUE = 1\n", load='on_demand')
+        self.folder.add('tcl_app', "import tcl_lib\n", depends='tcl_lib')
+        manager = self.folder.manager()
+        self.assertEqual([m.__name__ for m in manager.components],
+                         ['tcl_lib', 'tcl_app'])
+
+    def test_a_deferred_component_loads_after_initialisation(self):
+        self.folder.add('tcl_later', self.MENU_SOURCE, load='deferred')
+        self.folder.add('tcl_now', "")
+        manager = self.folder.manager()
+        self.assertEqual([m.__name__ for m in manager.components], ['tcl_now'])
+        manager.initialize_components('the app')
+        deadline = time.time() + 5
+        while 'tcl_later' not in manager.component_modules and time.time() < deadline:
+            time.sleep(0.01)
+        module = manager.component_modules['tcl_later']
+        self.assertEqual(module.INITIALIZED, ['the app'])
+        self.assertIn('Heavy tool', manager.get_component_menu_functions())
+
+
+class LoadTimeTableTests(LoaderTestCase):
+
+    def test_every_component_has_a_row(self):
+        self.folder.add('tcl_timed', "def initialize(app):\n    pass\n")
+        self.folder.add('tcl_lazy', "", load='on_demand')
+        manager = self.folder.manager()
+        manager.initialize_components(None)
+        rows = {row[0]: row for row in manager.get_load_time_table()}
+        name, mode, imported, registered, initialized = rows['tcl_timed']
+        self.assertEqual(mode, 'startup')
+        for value in (imported, registered, initialized):
+            self.assertIsNotNone(value)
+        self.assertEqual(rows['tcl_lazy'][1:], ('on_demand', None, None, None))
+        self.assertIn('tcl_timed', manager.format_load_time_table())
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
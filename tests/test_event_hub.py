@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+"""
+The system event hub: adaptive polling, pushed topics and the shared timer.
+
+Run it directly:  python tests/test_event_hub.py
+
+Most tests drive the hub by hand - a FakeBackend holds the "system" values
+and a fake clock plus ``run_due()`` stand in for the timer thread - so
+nothing here depends on timing. The last test runs the real thread.
+"""
+
+import os
+import sys
+import threading
+import time
+import unittest
+
+REPO = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, REPO)
+
+from src.system.event_hub import FakeBackend, SystemEventHub     # noqa: E402
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class HubTest(unittest.TestCase):
+    def setUp(self):
+        self.backend = FakeBackend(pushed=('window.foreground',))
+        self.clock = Clock()
+        self.hub = SystemEventHub(self.backend, clock=self.clock)
+        self.seen = []
+
+    def record(self, topic, old, new):
+        self.seen.append((topic, old, new))
+
+    def advance_to(self, when):
+        """Step the fake clock to ``when``, running every poll due on the way."""
+        while self.hub._heap and self.hub._heap[0][0] <= when:
+            self.clock.now = self.hub._heap[0][0]
+            self.hub.run_due()
+        self.clock.now = when
+
+    def test_changes_are_reported_but_not_the_first_value(self):
+        self.backend.set('audio.volume', 50)
+        self.hub.watch('audio.volume', self.backend.poller('audio.volume'),
+                       self.record, interval=0.2, max_interval=1.0)
+        self.advance_to(1.0)
+        self.assertEqual(self.seen, [])
+        self.backend.set('audio.volume', 60)
+        self.advance_to(3.0)
+        self.assertEqual(self.seen, [('audio.volume', 50, 60)])
+        self.assertEqual(self.hub.value('audio.volume'), 60)
+
+    def test_a_quiet_source_backs_off_and_a_change_resets_it(self):
+        self.backend.set('power.battery', (True, 80))
+        self.hub.watch('power.battery', self.backend.poller('power.battery'),
+                       self.record, interval=1.0, max_interval=4.0)
+        self.advance_to(60.0)
+        # 0, 2, 6, then every 4 s: far fewer than the 61 fixed-rate polls.
+        self.assertEqual(self.backend.reads['power.battery'], 16)
+        self.assertEqual(self.hub.stats()['topics']['power.battery']['interval'], 4.0)
+        self.backend.set('power.battery', (False, 80))
+        self.advance_to(62.5)           # polled at 62, next at 63
+        self.assertEqual(len(self.seen), 1)
+        self.assertEqual(self.hub.stats()['topics']['power.battery']['interval'], 1.0)
+
+    def test_none_and_errors_are_not_changes(self):
+        values = iter([3, None, 3, 4])
+
+        def poll():
+            value = next(values, 4)
+            if value is None:
+                raise OSError("device went away")
+            return value
+        self.hub.watch('network.connections', poll, self.record, interval=1.0)
+        self.advance_to(10.0)
+        self.assertEqual(self.seen, [('network.connections', 3, 4)])
+        self.assertEqual(self.hub.stats()['topics']['network.connections']['errors'], 1)
+
+    def test_pushed_topics_are_never_polled(self):
+        self.hub.watch('window.foreground', self.backend.poller('window.foreground'),
+                       self.record, interval=0.1)
+        self.advance_to(30.0)
+        self.assertNotIn('window.foreground', self.backend.reads)
+        self.backend.push('window.foreground', 1, 2)
+        self.assertEqual(self.seen, [('window.foreground', 1, 2)])
+        self.assertEqual(self.hub.stats()['topics']['window.foreground']['events'], 1)
+
+    def test_the_last_unwatch_stops_the_polling(self):
+        self.backend.set('process.pids', frozenset({1}))
+        poll = self.backend.poller('process.pids')
+        first = self.hub.watch('process.pids', poll, self.record, interval=0.5)
+        second = self.hub.watch('process.pids', poll, self.record, interval=0.5)
+        self.advance_to(2.0)
+        first()
+        self.backend.set('process.pids', frozenset({1, 2}))
+        self.advance_to(4.0)
+        self.assertEqual(len(self.seen), 1)          # the remaining subscriber
+        second()
+        reads = self.backend.reads['process.pids']
+        self.advance_to(60.0)
+        self.assertEqual(self.backend.reads['process.pids'], reads)
+        stats = self.hub.stats()['topics']['process.pids']
+        self.assertEqual((stats['polled'], stats['subscribers']), (False, 0))
+
+    def test_poke_polls_at_once(self):
+        self.backend.set('window.pids', frozenset())
+        self.hub.watch('window.pids', self.backend.poller('window.pids'),
+                       self.record, interval=0.2, max_interval=1.0)
+        self.advance_to(20.0)
+        self.backend.set('window.pids', frozenset({42}))
+        self.hub.poke('window.pids')
+        self.hub.run_due()
+        self.assertEqual(self.seen, [('window.pids', frozenset(), frozenset({42}))])
+
+    def test_a_poll_may_unwatch_its_own_topic(self):
+        """The charger monitor stops once a poll finds no battery."""
+        readings = [(True, 80), None]
+        unwatch = []
+
+        def poll():
+            reading = readings.pop(0) if readings else (True, 80)
+            if reading is None:
+                unwatch[0]()
+            return reading
+        unwatch.append(self.hub.watch('power.battery', poll, self.record, interval=1.0))
+        self.advance_to(30.0)
+        self.assertEqual(readings, [])
+        self.assertNotIn('power.battery', self.hub.stats()['topics'])
+        self.assertEqual(self.hub._heap, [])
+        self.assertEqual(self.seen, [])
+
+
+class TimerThreadTest(unittest.TestCase):
+    def test_an_idle_hub_hardly_wakes_up(self):
+        backend = FakeBackend()
+        hub = SystemEventHub(backend)
+        hub.start()
+        self.addCleanup(hub.stop)
+        for topic, interval in (('audio.volume', 0.02), ('power.battery', 0.05),
+                                ('process.pids', 0.025)):
+            backend.set(topic, 1)
+            hub.watch(topic, backend.poller(topic), lambda *a: None,
+                      interval=interval, max_interval=0.2)
+        time.sleep(1.0)
+        stats = hub.stats()
+        polls = sum(t['polls'] for t in stats['topics'].values())
+        # At the base intervals this would be about 110 polls; backed off it
+        # is a handful per source, and the wakeups are no more than the polls.
+        self.assertLess(polls, 40)
+        self.assertLessEqual(stats['wakeups'], polls)
+        backend.set('audio.volume', 2)
+        deadline = time.time() + 1.0
+        while not hub.stats()['topics']['audio.volume']['events'] and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(hub.stats()['topics']['audio.volume']['events'], 1)
+
+    def test_a_blocking_poll_does_not_hold_up_the_others(self):
+        backend = FakeBackend()
+        hub = SystemEventHub(backend)
+        hub.start()
+        self.addCleanup(hub.stop)
+
+        def netsh():
+            time.sleep(0.4)
+            return 1
+        hub.watch('network.connections', netsh, lambda *a: None,
+                  interval=0.01, blocking=True)
+        backend.set('audio.volume', 1)
+        hub.watch('audio.volume', backend.poller('audio.volume'), lambda *a: None,
+                  interval=0.02, max_interval=0.02)
+        time.sleep(0.5)
+        # On the shared timer the volume would wait out every 0.4 s read.
+        self.assertGreater(backend.reads['audio.volume'], 10)
+        self.assertLessEqual(hub.stats()['topics']['network.connections']['polls'], 2)
+        workers = [t for t in threading.enumerate()
+                   if t.name == 'SystemEventHub:network.connections']
+        self.assertEqual(len(workers), 1)
+        hub.stop()
+        workers[0].join(1.0)
+        self.assertFalse(workers[0].is_alive())
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
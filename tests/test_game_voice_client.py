@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+TitanNetClient.game_voice_chunk: binary frames for servers that take them,
+base64 JSON for the rest, nothing at all while the session is paused.
+
+Run it directly:  python tests/test_game_voice_client.py
+
+The client's event loop runs on a thread as it does in the app; the
+websocket is a stand-in that records what would have gone on the wire.
+"""
+
+import asyncio
+import json
+import os
+import struct
+import sys
+import threading
+import unittest
+from unittest import mock
+
+REPO = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, REPO)
+
+with mock.patch('builtins.print'):
+    from src.network.titan_net import TitanNetClient         # noqa: E402
+
+
+class Wire:
+    def __init__(self):
+        self.frames = []
+        self.done = threading.Event()
+
+    async def send(self, frame):
+        self.frames.append(frame)
+        self.done.set()
+
+
+class GameVoiceTests(unittest.TestCase):
+
+    def setUp(self):
+        with mock.patch('builtins.print'):
+            self.client = TitanNetClient('localhost')
+        self.client.loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=self.client.loop.run_forever, daemon=True)
+        thread.start()
+        self.addCleanup(self.client.loop.close)
+        self.addCleanup(thread.join, 2)
+        self.addCleanup(self.client.loop.call_soon_threadsafe, self.client.loop.stop)
+        self.client.is_connected = True
+        self.client.user_id = 4
+        self.wire = Wire()
+        self.client.websocket = self.wire
+
+    def sent(self):
+        self.assertTrue(self.wire.done.wait(2))
+        return self.wire.frames[-1]
+
+    def test_binary_when_the_server_takes_it(self):
+        self.client._binary_game_voice = True
+        self.assertTrue(self.client.game_voice_chunk(7, b'pcm')['queued'])
+        frame = self.sent()
+        self.assertEqual(struct.unpack('>BIII', frame[:13]), (0x02, 7, 4, 1))
+        self.assertEqual(frame[13:], b'pcm')
+
+    def test_json_for_older_servers(self):
+        self.client.game_voice_chunk(7, b'pcm')
+        message = json.loads(self.sent())
+        self.assertEqual((message['type'], message['audio_b64']), ('game_voice_chunk', 'cGNt'))
+
+    def test_pause_and_resume(self):
+        self.client._binary_game_voice = True
+        seen = []
+        self.client.on_game_voice_backpressure = seen.append
+        self.client._on_game_voice_backpressure({'session_id': 7, 'paused': True})
+        self.assertTrue(self.client.game_voice_chunk(7, b'pcm')['paused'])
+        self.assertEqual(self.wire.frames, [])
+        self.client._on_game_voice_backpressure({'session_id': 7, 'paused': False})
+        self.client.game_voice_chunk(7, b'pcm')
+        self.sent()
+        self.assertEqual(len(seen), 2)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
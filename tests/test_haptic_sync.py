@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+The haptic envelope store and the envelope follower in haptic_sync.
+
+Run it directly:  python tests/test_haptic_sync.py
+
+Decoding goes through the pygame mixer in Titan; here `_decode` is replaced
+by a function that hands back synthetic samples, so the store, its disk
+files and the mixer thread all run for real without audio hardware.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+REPO = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, REPO)
+
+import numpy as np                                           # noqa: E402
+from src.controller import haptic_sync as hs                 # noqa: E402
+
+
+def loop_follow(amp, decay):
+    """Instant attack, exponential release, one hop at a time."""
+    env = np.empty_like(amp)
+    prev = 0.0
+    for i in range(len(amp)):
+        prev = max(amp[i], prev * decay)
+        env[i] = prev
+    return env
+
+
+def burst(freq=22050, seconds=0.5):
+    """Half a second of a loud tone followed by the same of silence."""
+    n = int(freq * seconds)
+    tone = (np.sin(np.arange(n) * 0.3) * 20000).astype(np.int16)
+    return np.concatenate([tone, np.zeros(n, dtype=np.int16)]), freq
+
+
+class Follower(unittest.TestCase):
+    def test_same_envelope_as_the_loop(self):
+        rng = np.random.default_rng(7)
+        decay = float(np.exp(-hs._HOP_SECONDS / hs._RELEASE_SECONDS))
+        for amp in (rng.random(5000), np.zeros(40), np.array([1.0, 0.0, 0.0, 0.5, 0.0]),
+                    np.abs(rng.normal(size=30000)) * (rng.random(30000) > 0.9)):
+            self.assertTrue(np.allclose(hs._follow(amp, decay), loop_follow(amp, decay),
+                                        rtol=1e-9, atol=1e-12))
+        self.assertEqual(len(hs._follow(np.zeros(0), decay)), 0)
+
+
+class Store(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix="titan_haptics_")
+        self.addCleanup(shutil.rmtree, self.tmp, True)
+        self.sounds = []
+        for i in range(4):
+            path = os.path.join(self.tmp, f"s{i}.ogg")
+            with open(path, 'wb') as f:
+                f.write(b'OggS' + bytes([i]))
+            self.sounds.append(path)
+        self.decoded = []
+        patcher = mock.patch.object(hs, '_decode', side_effect=self.decode)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def decode(self, path):
+        self.decoded.append(os.path.basename(path))
+        return burst()
+
+    def test_least_recently_used_goes_first(self):
+        store = hs._EnvelopeStore(None, entries=2)
+        a, b, c = (hs._sound_key(p) for p in self.sounds[:3])
+        store.get(a[0])
+        store.get(b[0])
+        store.cached(a)              # a is now the most recent
+        store.get(c[0])
+        self.assertIsNotNone(store.cached(a))
+        self.assertIsNone(store.cached(b))
+        self.assertEqual(store.stats['evicted'], 1)
+
+    def test_envelopes_survive_a_restart_until_the_file_changes(self):
+        directory = os.path.join(self.tmp, 'cache')
+        first = hs._EnvelopeStore(directory).get(self.sounds[0])
+        again = hs._EnvelopeStore(directory)
+        self.assertTrue(np.array_equal(again.get(self.sounds[0]), first))
+        self.assertEqual((self.decoded, again.stats['disk_hits']), (['s0.ogg'], 1))
+        with open(self.sounds[0], 'ab') as f:
+            f.write(b'longer now')
+        hs._EnvelopeStore(directory).get(self.sounds[0])
+        self.assertEqual(self.decoded, ['s0.ogg', 's0.ogg'])
+
+    def test_precompute_decodes_each_sound_once(self):
+        store = hs._EnvelopeStore(os.path.join(self.tmp, 'cache'))
+        with open(os.path.join(self.tmp, 'readme.txt'), 'w') as f:
+            f.write('not a sound')
+        self.assertEqual(store.precompute(self.tmp), 4)
+        deadline = time.time() + 5.0
+        while len(store._queued) and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(sorted(self.decoded), ['s0.ogg', 's1.ogg', 's2.ogg', 's3.ogg'])
+        self.assertEqual(store.precompute(self.tmp), 0)
+
+
+class PendingVoice(unittest.TestCase):
+    """A sound the store has not seen yet still rumbles, in step with itself."""
+
+    def test_a_miss_joins_at_the_right_offset(self):
+        tmp = tempfile.mkdtemp(prefix="titan_haptics_")
+        self.addCleanup(shutil.rmtree, tmp, True)
+        path = os.path.join(tmp, 'new.ogg')
+        with open(path, 'wb') as f:
+            f.write(b'OggS')
+
+        def slow_decode(_path):
+            time.sleep(0.15)
+            return burst()
+
+        levels = []
+        engine = hs._HapticSyncEngine()
+        engine._set_motors = lambda level: levels.append((time.time(), level))
+        self.addCleanup(engine.stop)
+        with mock.patch.object(hs, '_store', hs._EnvelopeStore(None)), \
+                mock.patch.object(hs, '_decode', side_effect=slow_decode):
+            started = time.time()
+            engine.add_voice(path)
+            self.assertIsNone(engine._voices[0]['env'])    # returned before decoding
+            time.sleep(0.9)
+        felt = [t - started for t, level in levels if level > 0.0]
+        self.assertTrue(felt, "the voice never reached the motors")
+        # Nothing before the envelope existed; the tone's first 150 ms are
+        # skipped, not replayed late, and the rumble fades after the tone.
+        self.assertGreaterEqual(felt[0], 0.14)
+        self.assertLess(felt[0], 0.45)
+        release = -np.log(hs._NOISE_GATE) * hs._RELEASE_SECONDS
+        self.assertLess(felt[-1], 0.5 + release + 0.1)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""
+The Titan IM conversation history and the window of it a tab shows.
+
+Run it directly:  python tests/test_im_history.py
+
+The service is a FakeBackend answering load_history from a list the way the
+web clients do (oldest first, ``has_more`` while older messages remain), and
+the list control is a FakeView - a Python list with the same four calls the
+conversation window implements - so every row change can be checked without
+wx.
+"""
+
+import os
+import random
+import sys
+import unittest
+from dataclasses import dataclass, replace
+
+REPO = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, REPO)
+
+from src.network.im_history import ConversationHistory, HistoryWindow   # noqa: E402
+
+
+@dataclass
+class Msg:
+    id: str
+    text: str = ''
+    kind: str = 'text'
+
+
+FILTERS = {
+    'media': lambda m: m.kind in ('image', 'voice'),
+    'links': lambda m: 'https://' in m.text,
+}
+
+
+def fmt(message):
+    return f"{message.id}: {message.text}"
+
+
+class FakeBackend:
+    def __init__(self, count):
+        self.messages = [Msg(f"m{i}", f"text {i}") for i in range(count)]
+        self.requests = []
+
+    def load_history(self, chat_id, before_id='', limit=50, callback=None):
+        self.requests.append((before_id, limit))
+        end = len(self.messages)
+        if before_id:
+            end = [m.id for m in self.messages].index(before_id)
+        page = self.messages[max(0, end - limit):end]
+        callback({'success': True, 'messages': list(page), 'has_more': end - limit > 0})
+
+
+class FakeView:
+    def __init__(self):
+        self.rows = []
+        self.calls = []
+
+    def reset_rows(self, items, texts):
+        self.calls.append('reset')
+        self.rows = list(zip(items, texts))
+
+    def insert_rows(self, position, items, texts):
+        self.calls.append('insert')
+        self.rows[position:position] = list(zip(items, texts))
+
+    def remove_rows(self, position, count):
+        self.calls.append('remove')
+        del self.rows[position:position + count]
+
+    def update_row(self, position, item, text):
+        self.calls.append('update')
+        self.rows[position] = (item, text)
+
+    def texts(self):
+        return [text for _item, text in self.rows]
+
+
+class HistoryTest(unittest.TestCase):
+    def open(self, count=500, tab='', size=100):
+        backend = FakeBackend(count)
+        history = ConversationHistory(backend, 'chat', FILTERS, page_size=60)
+        view = FakeView()
+        window = HistoryWindow(history, view, tab, fmt, size=size)
+        history.load_latest(lambda result: None)
+        return backend, history, view, window
+
+    def expected(self, history, tab, size):
+        items = history.view_items(tab)
+        return [fmt(m) for m in items[-size:]]
+
+    def test_opening_shows_the_newest_page(self):
+        _backend, history, view, window = self.open()
+        self.assertEqual(len(history), 60)
+        self.assertEqual(view.texts(), [f"m{i}: text {i}" for i in range(440, 500)])
+        self.assertTrue(history.has_more)
+        self.assertEqual(window.stats['formatted'], 60)
+
+    def test_a_new_message_is_one_row(self):
+        _backend, history, view, window = self.open(size=60)
+        view.calls.clear()
+        self.assertTrue(history.append(Msg('new', 'hello')))
+        self.assertFalse(history.append(Msg('new', 'hello')))   # delivered twice
+        self.assertEqual(view.calls, ['insert', 'remove'])       # the ring is full
+        self.assertEqual(view.texts(), self.expected(history, '', 60))
+        self.assertEqual(window.stats['formatted'], 61)
+
+    def test_long_chats_cost_the_same_per_message(self):
+        _backend, history, view, window = self.open(size=300)
+        for i in range(20000):
+            history.append(Msg(f"x{i}", f"chat {i}", 'image' if i % 10 == 0 else 'text'))
+        formatted = window.stats['formatted']
+        view.calls.clear()
+        for i in range(100):
+            history.append(Msg(f"y{i}", f"more {i}"))
+        self.assertEqual(window.stats['formatted'] - formatted, 100)
+        self.assertEqual(view.calls, ['insert', 'remove'] * 100)
+        self.assertEqual(view.texts(), self.expected(history, '', 300))
+
+    def test_tab_views_follow_the_history(self):
+        backend, history, view, window = self.open(tab='media', size=1000)
+        rng = random.Random(3)
+        for i in range(400):
+            roll = rng.random()
+            if roll < 0.6:
+                kind = rng.choice(['text', 'image', 'voice'])
+                history.append(Msg(f"n{i}", f"n{i} https://x" if rng.random() < .2 else f"n{i}", kind))
+            elif roll < 0.9 and len(history):
+                old = history.view_items()[rng.randrange(len(history))]
+                history.replace(replace(old, kind=rng.choice(['text', 'image']),
+                                        text=old.text + ' https://y'))
+            elif history.has_more:
+                history.load_older(lambda result, added: None, limit=30)
+        for tab, check in FILTERS.items():
+            self.assertEqual(history.view_items(tab),
+                             [m for m in history.view_items() if check(m)])
+        self.assertEqual(view.texts(), self.expected(history, 'media', 1000))
+        for index, message in enumerate(history.view_items('links')):
+            self.assertEqual(history.view_index('links', message.id), index)
+
+    def test_an_edit_rewrites_only_its_row(self):
+        _backend, history, view, window = self.open(size=60)
+        view.calls.clear()
+        history.replace(Msg('m470', 'edited'))
+        self.assertEqual(view.calls, ['update'])
+        self.assertEqual(view.rows[30][1], 'm470: edited')
+        self.assertFalse(history.replace(Msg('unknown', 'x')))
+
+    def test_going_back_uses_memory_before_the_service(self):
+        backend, history, view, window = self.open(count=200, size=50)
+        self.assertEqual(view.texts()[0], 'm150: text 150')
+        self.assertEqual(window.show_older(), 10)              # already loaded
+        self.assertEqual(view.texts()[0], 'm140: text 140')
+        self.assertEqual(len(view.rows), 50)
+        self.assertEqual(len(backend.requests), 1)
+        self.assertEqual(window.show_older(), 0)
+        added = []
+        history.load_older(lambda result, new: added.extend(new), limit=100)
+        self.assertEqual(backend.requests[-1], ('m140', 100))
+        self.assertEqual(len(added), 100)
+        # Half a window of the new page goes on screen above m140.
+        self.assertEqual(view.texts()[:2], ['m115: text 115', 'm116: text 116'])
+        self.assertEqual(window.row_of('m140'), 25)
+        self.assertEqual(window.show_older(), 25)
+        self.assertEqual(view.texts()[0], 'm90: text 90')
+        history.load_older(lambda result, new: added.extend(new), limit=100)
+        self.assertFalse(history.has_more)
+        self.assertEqual(history.oldest_id, 'm0')
+
+    def test_new_messages_are_not_lost_after_going_back(self):
+        """Paging back past the window's size dropped the newest rows, and
+        every message after that was ignored."""
+        backend, history, view, window = self.open(count=1000, size=60)
+        for _ in range(6):
+            history.load_older(lambda result, new: None, limit=50)
+        self.assertFalse(window.at_end)
+        window.follow = False                  # reading old messages
+        history.append(Msg('late', 'unseen yet'))
+        self.assertNotIn('late: unseen yet', view.texts())
+        while window.show_newer():
+            pass
+        self.assertTrue(window.at_end)
+        self.assertEqual(view.texts(), self.expected(history, '', 60))
+        window.show_older(30)
+        window.follow = True                   # on the last row
+        history.append(Msg('new', 'hello'))
+        self.assertEqual(view.texts()[-1], 'new: hello')
+        self.assertEqual(view.texts(), self.expected(history, '', 60))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+TitanNetClient's message history cache: reopening a chat downloads only
+what is new.
+
+Run it directly:  python tests/test_message_history_cache.py
+
+The server is a list of messages behind a stand-in for
+`_request_history_page` that answers exactly as the server's keyset pages
+do (newest first, `has_more` when older messages remain in the window).
+"""
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+REPO = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, REPO)
+
+with mock.patch('builtins.print'):
+    from src.network.titan_net import TitanNetClient         # noqa: E402
+
+
+class FakeHistoryServer:
+    def __init__(self, count):
+        self.messages = [{'id': i, 'message': 'm%d' % i} for i in range(1, count + 1)]
+        self.requests = []
+        self.sent = 0
+
+    def add(self, count):
+        start = self.messages[-1]['id'] + 1 if self.messages else 1
+        self.messages.extend({'id': i, 'message': 'm%d' % i}
+                             for i in range(start, start + count))
+
+    def page(self, request, response_type):
+        self.requests.append(request)
+        window = [m for m in self.messages
+                  if (not request.get('before_id') or m['id'] < request['before_id'])
+                  and (not request.get('after_id') or m['id'] > request['after_id'])]
+        window.reverse()
+        limit = request['limit']
+        self.sent += min(limit, len(window))
+        return {'type': response_type, 'messages': window[:limit],
+                'has_more': len(window) > limit}
+
+
+class HistoryCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        with mock.patch('builtins.print'):
+            self.client = TitanNetClient('localhost')
+        self.client.is_connected = True
+        self.client.websocket = object()
+        self.server = FakeHistoryServer(1000)
+        patcher = mock.patch.object(self.client, '_request_history_page',
+                                    side_effect=self.server.page)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def ids(self, result):
+        return [m['id'] for m in result['messages']]
+
+    def test_reopening_a_room_fetches_only_new_messages(self):
+        first = self.client.get_room_messages(5)
+        self.assertEqual(self.ids(first), list(range(1000, 900, -1)))
+        self.assertTrue(first['has_more'])
+        self.server.add(3)
+        again = self.client.get_room_messages(5)
+        self.assertEqual(self.ids(again), list(range(1003, 903, -1)))
+        self.assertEqual(again['fetched_count'], 3)
+        self.assertEqual(self.server.requests[-1]['after_id'], 1000)
+        self.assertEqual(self.server.sent, 103)
+
+    def test_nothing_new_downloads_nothing(self):
+        self.client.get_room_messages(5)
+        sent = self.server.sent
+        self.assertEqual(self.ids(self.client.get_room_messages(5)),
+                         list(range(1000, 900, -1)))
+        self.assertEqual(self.server.sent, sent)
+
+    def test_a_gap_bigger_than_a_page_replaces_the_cache(self):
+        self.client.get_room_messages(5, limit=10)
+        self.server.add(50)
+        result = self.client.get_room_messages(5, limit=10)
+        self.assertEqual(self.ids(result), list(range(1050, 1040, -1)))
+        self.assertTrue(result['has_more'])
+        self.server.add(1)
+        self.assertEqual(self.ids(self.client.get_room_messages(5, limit=10)),
+                         list(range(1051, 1041, -1)))
+
+    def test_scrolling_back(self):
+        page = self.client.get_room_messages(5, limit=10)
+        older = self.client.get_room_messages(5, limit=10, before_id=page['oldest_id'])
+        self.assertEqual(self.ids(older), list(range(990, 980, -1)))
+        # A scrolled-back page never replaces the newest-first cache.
+        self.server.add(1)
+        self.assertEqual(self.ids(self.client.get_room_messages(5, limit=10))[0], 1001)
+
+    def test_a_larger_window_than_cached_is_fetched_whole(self):
+        self.client.get_room_messages(5, limit=10)
+        result = self.client.get_room_messages(5, limit=50)
+        self.assertEqual(len(result['messages']), 50)
+        self.assertIsNone(self.server.requests[-1]['after_id'])
+
+    def test_the_cache_expires(self):
+        self.client.get_room_messages(5)
+        with mock.patch('src.network.titan_net.time.time',
+                        return_value=10 ** 12):
+            self.client.get_room_messages(5)
+        self.assertIsNone(self.server.requests[-1]['after_id'])
+
+    def test_completing_the_cache_does_not_renew_it(self):
+        start = 10 ** 9
+        with mock.patch('src.network.titan_net.time.time', return_value=start):
+            self.client.get_room_messages(5)
+        ttl = self.client.HISTORY_CACHE_TTL
+        for quarter in range(1, 5):
+            self.server.add(1)
+            with mock.patch('src.network.titan_net.time.time',
+                            return_value=start + quarter * ttl / 4 - 1):
+                self.client.get_room_messages(5)
+            self.assertIsNotNone(self.server.requests[-1]['after_id'])
+        with mock.patch('src.network.titan_net.time.time', return_value=start + ttl):
+            self.client.get_room_messages(5)
+        self.assertIsNone(self.server.requests[-1]['after_id'])
+
+    def test_rooms_and_private_chats_are_kept_apart(self):
+        self.client.get_room_messages(5, limit=5)
+        self.client.get_private_messages(5, limit=5)
+        self.assertIsNone(self.server.requests[-1]['after_id'])
+        self.assertEqual(self.server.requests[-1]['type'], 'get_messages')
+
+    def test_logout_forgets_history(self):
+        self.client.get_room_messages(5, limit=5)
+        with mock.patch.object(self.client, '_stop_listener'), \
+                mock.patch('builtins.print'):
+            self.client.websocket = None
+            self.client.logout()
+        self.assertEqual(self.client._history_cache, {})
+
+    def test_no_answer(self):
+        with mock.patch.object(self.client, '_request_history_page',
+                               return_value=None):
+            result = self.client.get_private_messages(9)
+        self.assertFalse(result['success'])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+The notification store behind the notification center.
+
+Run it directly:  python tests/test_notification_store.py
+
+Every test gets its own temporary folder standing in for the user data
+directory, with a bg5notifications.tno beside it written the way Titan and
+tDownloader used to write it.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+from datetime import datetime, timedelta
+
+REPO = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, REPO)
+
+from src.system import notification_store as ns                 # noqa: E402
+
+
+def legacy_block(date, time_, appname, content):
+    return (f'notification\ndate={date}\ntime={time_}\n'
+            f'appname={appname}\ncontent={content}\n\n')
+
+
+class StoreTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix="titan_notifications_")
+        self.addCleanup(shutil.rmtree, self.tmp, True)
+        self.legacy = os.path.join(self.tmp, 'bg5notifications.tno')
+        self.directory = os.path.join(self.tmp, 'notifications')
+
+    def store(self, **kw):
+        return ns.NotificationStore(self.directory, legacy_path=self.legacy, **kw)
+
+    def fill(self, store, count, app=lambda i: 'App'):
+        for i in range(count):
+            store.append('2026-10-01', '12:00', app(i), f'n{i}')
+
+    def test_pages_are_newest_first(self):
+        store = self.store()
+        self.fill(store, 25)
+        self.assertEqual([e['content'] for e in store.page(0, 3)], ['n24', 'n23', 'n22'])
+        self.assertEqual([e['content'] for e in store.page(23, 10)], ['n1', 'n0'])
+        self.assertEqual(store.page(25, 10), [])
+        self.assertEqual(store.count(), 25)
+
+    def test_filtering_by_application(self):
+        store = self.store()
+        self.fill(store, 9000, app=lambda i: 'Mail' if i % 1000 == 0 else 'Chat')
+        mail = store.page(0, 5, appname='Mail')
+        self.assertEqual([e['content'] for e in mail], ['n8000', 'n7000', 'n6000', 'n5000', 'n4000'])
+        self.assertEqual([e['content'] for e in store.page(7, 5, appname='Mail')], ['n1000', 'n0'])
+        self.assertEqual(store.page(0, 5, appname='Nobody'), [])
+
+    def test_the_legacy_file_is_migrated_and_then_followed(self):
+        with open(self.legacy, 'w', encoding='utf-8') as f:
+            f.write(legacy_block('2025-01-01', '08:00', 'Old', 'first'))
+            f.write(legacy_block('2025-01-02', '09:00', 'Old', 'a=b, with an equals sign'))
+        store = self.store()
+        self.assertEqual(store.page(0, 1)[0]['content'], 'a=b, with an equals sign')
+        # Another program keeps appending the old way; a half-written block waits.
+        with open(self.legacy, 'a', encoding='utf-8') as f:
+            f.write(legacy_block('2025-01-03', '10:00', 'tDownloader', 'done'))
+            f.write('notification\ndate=2025-01-04\n')
+        self.assertEqual([e['content'] for e in store.page(0, 5)],
+                         ['done', 'a=b, with an equals sign', 'first'])
+        # A restart does not import anything twice.
+        self.assertEqual(self.store().count(), 3)
+
+    def test_a_torn_append_is_cut_off_and_a_lost_index_rebuilt(self):
+        store = self.store()
+        self.fill(store, 10)
+        with open(store.log_path, 'ab') as f:
+            f.write(b'{"date": "2026-10-01", "conte')        # died mid-write
+        with open(store.index_path, 'r+b') as f:
+            f.truncate(ns._RECORD.size * 7 + 5)             # and mid-index
+        again = self.store()
+        self.assertEqual(again.count(), 10)
+        self.assertEqual(again.page(0, 1)[0]['content'], 'n9')
+        again.append('2026-10-02', '13:00', 'App', 'after')
+        self.assertEqual([e['content'] for e in self.store().page(0, 2)], ['after', 'n9'])
+
+    def test_retention_keeps_the_newest(self):
+        store = self.store(keep_entries=100)
+        self.fill(store, 250)
+        self.assertLessEqual(store.count(), 200)
+        self.assertEqual(store.page(0, 1)[0]['content'], 'n249')
+        reopened = self.store(keep_entries=100)
+        self.assertEqual(reopened.page(0, 1)[0]['content'], 'n249')
+        old = datetime.now() - timedelta(days=40)
+        aged = ns.NotificationStore(os.path.join(self.tmp, 'aged'), keep_days=30)
+        aged.append(old.strftime('%Y-%m-%d'), '10:00', 'App', 'old')
+        aged.append(datetime.now().strftime('%Y-%m-%d'), '10:00', 'App', 'new')
+        reopened = ns.NotificationStore(os.path.join(self.tmp, 'aged'), keep_days=30)
+        self.assertEqual([e['content'] for e in reopened.page(0, 10)], ['new'])
+
+    def test_clear_empties_both_files(self):
+        with open(self.legacy, 'w', encoding='utf-8') as f:
+            f.write(legacy_block('2025-01-01', '08:00', 'Old', 'first'))
+        store = self.store()
+        self.fill(store, 3)
+        store.clear()
+        self.assertEqual((store.count(), os.path.getsize(self.legacy)), (0, 0))
+        self.assertEqual(self.store().count(), 0)
+
+    def test_opening_does_not_depend_on_the_history_size(self):
+        timings = []
+        for count in (100, 20000):
+            store = ns.NotificationStore(os.path.join(self.tmp, str(count)), keep_entries=None)
+            store.extend([{'date': '2026-10-01', 'time': '12:00', 'appname': 'App',
+                           'content': f'n{i}'} for i in range(count)])
+            started = time.perf_counter()
+            for _ in range(20):
+                page = ns.NotificationStore(store.directory, keep_entries=None).page(0, 50)
+            timings.append(time.perf_counter() - started)
+            self.assertEqual(page[0]['content'], f'n{count - 1}')
+        self.assertLess(timings[1], timings[0] * 5)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
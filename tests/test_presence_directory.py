@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+TitanNetClient's mirror of the online-user and room lists: one snapshot,
+then the server's directory_delta pushes keep it current.
+
+Run it directly:  python tests/test_presence_directory.py
+
+The snapshot request is answered by a stand-in for `_send_and_wait`; deltas
+are fed to `_apply_directory_delta` the way the listener thread does.
+"""
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+REPO = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, REPO)
+
+with mock.patch('builtins.print'):
+    from src.network.titan_net import TitanNetClient         # noqa: E402
+
+
+def delta(version, op, **fields):
+    return dict(type='directory_delta', version=version, op=op, **fields)
+
+
+SNAPSHOT = {
+    'type': 'directory', 'version': 10,
+    'users': [{'id': 1, 'username': 'ala'}, {'id': 2, 'username': 'bob'}],
+    'rooms': [{'id': 5, 'name': 'lobby', 'member_count': 2}],
+}
+
+
+class DirectoryMirrorTests(unittest.TestCase):
+
+    def setUp(self):
+        with mock.patch('builtins.print'):
+            self.client = TitanNetClient('localhost')
+        self.client.is_connected = True
+        self.client.websocket = object()
+        self.requests = []
+        self.snapshot = dict(SNAPSHOT)
+        patcher = mock.patch.object(self.client, '_send_and_wait',
+                                    side_effect=self.answer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def answer(self, request, response_type, timeout=5):
+        self.requests.append(request['type'])
+        if request['type'] == 'get_directory':
+            return self.snapshot
+        return {'type': response_type, 'rooms': [], 'users': []}
+
+    def usernames(self):
+        return [u['username'] for u in self.client.get_online_users()['users']]
+
+    def test_one_snapshot_then_no_more_requests(self):
+        self.assertEqual(self.usernames(), ['ala', 'bob'])
+        self.assertEqual(self.client.get_rooms()['rooms'][0]['name'], 'lobby')
+        self.usernames()
+        self.assertEqual(self.requests, ['get_directory'])
+        self.assertTrue(self.client.directory_is_live())
+
+    def test_deltas_keep_the_lists_current(self):
+        self.usernames()
+        changes = []
+        self.client.on_directory_changed = lambda op, d: changes.append(op)
+        self.client._apply_directory_delta(delta(11, 'user_online', user={'id': 3, 'username': 'cyd'}))
+        self.client._apply_directory_delta(delta(12, 'user_offline', user_id=1))
+        self.client._apply_directory_delta(delta(13, 'room_added', room={'id': 6, 'name': 'new', 'member_count': 1}))
+        self.client._apply_directory_delta(delta(14, 'room_members', room_id=5, member_count=3))
+        self.client._apply_directory_delta(delta(15, 'room_removed', room_id=6))
+        self.assertEqual(self.usernames(), ['bob', 'cyd'])
+        self.assertEqual([(r['id'], r['member_count']) for r in self.client.get_rooms()['rooms']],
+                         [(5, 3)])
+        self.assertEqual(len(changes), 5)
+        self.assertEqual(self.requests, ['get_directory'])
+
+    def test_deltas_already_in_the_snapshot_are_ignored(self):
+        self.usernames()
+        self.client._apply_directory_delta(delta(9, 'user_offline', user_id=1))
+        self.assertEqual(self.usernames(), ['ala', 'bob'])
+
+    def test_deltas_racing_the_snapshot_are_replayed(self):
+        # The listener sees two deltas while the snapshot is on its way; one
+        # is already part of it, the other is newer.
+        async def racing(request, response_type, timeout=5):
+            self.client._apply_directory_delta(delta(10, 'user_offline', user_id=2))
+            self.client._apply_directory_delta(delta(11, 'user_offline', user_id=1))
+            return self.snapshot
+        with mock.patch.object(self.client, '_send_and_wait', side_effect=racing):
+            self.assertEqual(self.usernames(), ['bob'])
+
+    def test_resync_takes_a_new_snapshot(self):
+        self.usernames()
+        self.client._apply_directory_delta(delta(10, 'resync'))
+        self.assertFalse(self.client.directory_is_live())
+        self.snapshot = dict(SNAPSHOT, users=[{'id': 1, 'username': 'ala'}])
+        self.assertEqual(self.usernames(), ['ala'])
+        self.assertEqual(self.requests, ['get_directory', 'get_directory'])
+
+    def test_an_old_server_is_asked_the_old_way(self):
+        self.snapshot = None
+        self.client.get_rooms()
+        self.client.get_rooms()
+        self.assertEqual(self.requests, ['get_directory', 'get_rooms', 'get_rooms'])
+        self.assertFalse(self.client.directory_is_live())
+
+    def test_logout_forgets_the_mirror(self):
+        self.usernames()
+        with mock.patch.object(self.client, '_stop_listener'), \
+                mock.patch('builtins.print'):
+            self.client.websocket = None
+            self.client.logout()
+        self.assertFalse(self.client.directory_is_live())
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
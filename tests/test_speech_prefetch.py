@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+Speculative menu speech: the SpeechPrefetcher behind StereoSpeech.prefetch.
+
+Run it directly:  python tests/test_speech_prefetch.py
+
+The synthesizer is a function that takes a while and returns a string, so
+the worker thread, the cancellation of stale work and the hand-over to the
+foreground run for real without a speech engine.
+"""
+
+import os
+import sys
+import threading
+import time
+import unittest
+
+REPO = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, REPO)
+
+from src.titan_core.speech_prefetch import SpeechPrefetcher     # noqa: E402
+
+VOICE = ('espeak', 0)
+
+
+class Synth:
+    """Renders 'text@pitch' after ``delay``; ``gate`` holds it back."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.gate = threading.Event()
+        self.gate.set()
+        self.rendered = []
+
+    def __call__(self, text, pitch_offset):
+        self.gate.wait(5.0)
+        time.sleep(self.delay)
+        self.rendered.append(text)
+        return f"{text}@{pitch_offset}"
+
+
+def settle(prefetcher, timeout=2.0):
+    deadline = time.time() + timeout
+    while (prefetcher._queue or prefetcher._in_flight) and time.time() < deadline:
+        time.sleep(0.005)
+
+
+class PrefetcherTest(unittest.TestCase):
+    def prefetcher(self, synth, **kw):
+        return SpeechPrefetcher(synth, idle_priority=False, **kw)
+
+    def test_rendered_items_are_handed_over_once(self):
+        synth = Synth()
+        prefetcher = self.prefetcher(synth)
+        prefetcher.prefetch([('Games', 0), ('Settings', 0), ('Chess', 30)], VOICE)
+        settle(prefetcher)
+        self.assertEqual(prefetcher.take('Chess', 30, VOICE), 'Chess@30')
+        self.assertIsNone(prefetcher.take('Chess', 0, VOICE))       # other pitch
+        self.assertIsNone(prefetcher.take('Games', 0, ('sapi5', 0)))  # other voice
+        prefetcher.prefetch([('Games', 0), ('Settings', 0)], VOICE)
+        settle(prefetcher)
+        self.assertEqual(synth.rendered, ['Games', 'Settings', 'Chess'])
+
+    def test_a_jump_cancels_what_is_still_queued(self):
+        synth = Synth()
+        synth.gate.clear()
+        prefetcher = self.prefetcher(synth)
+        prefetcher.prefetch([('a', 0), ('b', 0), ('c', 0)], VOICE)
+        time.sleep(0.05)                          # 'a' is being rendered
+        prefetcher.prefetch([('x', 0), ('y', 0)], VOICE)
+        synth.gate.set()
+        settle(prefetcher)
+        self.assertEqual(synth.rendered, ['a', 'x', 'y'])
+        self.assertEqual(prefetcher.stats['dropped'], 2)
+        self.assertEqual(prefetcher.take('a', 0, VOICE), 'a@0')     # finished, kept
+
+    def test_the_foreground_waits_for_an_item_in_flight(self):
+        synth = Synth(delay=0.2)
+        prefetcher = self.prefetcher(synth)
+        prefetcher.prefetch([('Next item', 0)], VOICE)
+        time.sleep(0.05)
+        started = time.perf_counter()
+        self.assertEqual(prefetcher.take('Next item', 0, VOICE), 'Next item@0')
+        self.assertLess(time.perf_counter() - started, 0.2)
+        self.assertEqual((synth.rendered, prefetcher.stats['waited']), (['Next item'], 1))
+
+    def test_a_voice_change_discards_audio_in_flight(self):
+        synth = Synth()
+        synth.gate.clear()
+        prefetcher = self.prefetcher(synth)
+        prefetcher.prefetch([('old voice', 0), ('queued', 0)], VOICE)
+        time.sleep(0.05)
+        prefetcher.clear()
+        synth.gate.set()
+        settle(prefetcher)
+        self.assertEqual(synth.rendered, ['old voice'])
+        self.assertIsNone(prefetcher.take('old voice', 0, VOICE))
+
+    def test_the_cache_is_bounded(self):
+        prefetcher = self.prefetcher(Synth(), entries=3)
+        for name in 'abcde':
+            prefetcher.prefetch([(name, 0)], VOICE)
+            settle(prefetcher)
+        self.assertEqual(list(key[1] for key in prefetcher._cache), ['c', 'd', 'e'])
+
+    def test_walking_a_menu_finds_the_next_item_ready(self):
+        # 120 ms per synthesis, a key press every 200 ms: after the first
+        # item every hop should be served from the prefetcher.
+        synth = Synth(delay=0.12)
+        prefetcher = self.prefetcher(synth)
+        menu = [f"item {i}" for i in range(8)]
+        waits = []
+        for index, name in enumerate(menu):
+            started = time.perf_counter()
+            if prefetcher.take(name, 0, VOICE) is None:
+                synth(name, 0)                     # what speak() does on a miss
+            waits.append(time.perf_counter() - started)
+            prefetcher.prefetch([(menu[i], 0) for i in (index + 1, index - 1)
+                                 if 0 <= i < len(menu)], VOICE)
+            time.sleep(0.2)
+        self.assertGreaterEqual(prefetcher.stats['hits'], len(menu) - 1)
+        self.assertLess(max(waits[1:]), 0.05)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
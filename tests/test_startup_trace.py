@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""
+The startup trace: what it records, what it writes, and the budgets it keeps.
+
+Run it directly:  python tests/test_startup_trace.py
+
+The last class is the one that matters day to day.  It runs the phases of a
+startup that need no window - loading the settings and discovering the games -
+under the real spans and fails when one of them goes over its budget in
+`startup_trace.PHASE_BUDGETS_MS`, printing the whole budget table so the
+failure says which phase and by how much.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+REPO = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, REPO)
+
+from src.titan_core import startup_trace                     # noqa: E402
+
+
+class SpanTests(unittest.TestCase):
+    """A span is a phase with a start and a length."""
+
+    def setUp(self):
+        startup_trace.reset()
+
+    def tearDown(self):
+        startup_trace.reset()
+
+    def test_a_span_is_recorded_with_its_duration(self):
+        with startup_trace.span('settings'):
+            time.sleep(0.02)
+        totals = startup_trace.phase_totals()
+        self.assertIn('settings', totals)
+        self.assertGreaterEqual(totals['settings'], 15.0)
+
+    def test_a_phase_that_calls_itself_is_counted_once(self):
+        """`get_games_by_platform` calls `get_games`; both are the phase."""
+        with startup_trace.span('games.discover'):
+            with startup_trace.span('games.discover'):
+                time.sleep(0.01)
+        recorded = [e for e in startup_trace.events() if e['ph'] == 'X']
+        self.assertEqual(len(recorded), 2, "both stay on the timeline")
+        outer = max(e['dur'] for e in recorded) / 1000.0
+        self.assertAlmostEqual(startup_trace.phase_totals()['games.discover'],
+                               outer, places=3)
+
+    def test_the_same_phase_on_two_threads_adds_up(self):
+        def work():
+            with startup_trace.span('components.load'):
+                time.sleep(0.01)
+        threads = [threading.Thread(target=work) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertGreaterEqual(startup_trace.phase_totals()['components.load'],
+                                18.0)
+
+    def test_an_exception_ends_the_span_and_is_not_swallowed(self):
+        with self.assertRaises(ValueError):
+            with startup_trace.span('gui.build'):
+                raise ValueError('no window')
+        event = startup_trace.events()[-1]
+        self.assertEqual(event['name'], 'gui.build')
+        self.assertTrue(event['args']['failed'])
+
+    def test_the_decorator_is_a_span_around_each_call(self):
+        @startup_trace.traced('apps.discover')
+        def discover():
+            return ['tedit']
+        self.assertEqual(discover(), ['tedit'])
+        self.assertEqual(discover.__name__, 'discover')
+        self.assertIn('apps.discover', startup_trace.phase_totals())
+
+
+class FinishTests(unittest.TestCase):
+    """After startup the menus call the same functions: nothing may pile up."""
+
+    def setUp(self):
+        startup_trace.reset()
+
+    def tearDown(self):
+        startup_trace.set_output_path(None)
+        startup_trace.reset()
+
+    def test_nothing_is_recorded_after_finish(self):
+        with startup_trace.span('settings'):
+            pass
+        startup_trace.finish()
+        for _ in range(100):
+            with startup_trace.span('apps.discover'):
+                pass
+        self.assertEqual(len(startup_trace.events()), 1)
+        self.assertFalse(startup_trace.is_recording())
+
+    def test_finish_writes_a_chrome_trace_when_asked_to(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'trace', 'startup.json')
+            startup_trace.set_output_path(path)
+            with startup_trace.span('settings'):
+                pass
+            startup_trace.mark('main window shown')
+            startup_trace.finish()
+            with open(path, encoding='utf-8') as handle:
+                payload = json.load(handle)
+        names = [event['name'] for event in payload['traceEvents']]
+        self.assertEqual(names, ['settings', 'main window shown'])
+        complete = payload['traceEvents'][0]
+        for key in ('ph', 'ts', 'dur', 'pid', 'tid'):
+            self.assertIn(key, complete)
+        self.assertEqual(complete['ph'], 'X')
+
+    def test_a_startup_that_never_finishes_does_not_grow_forever(self):
+        for _ in range(startup_trace._MAX_EVENTS + 50):
+            startup_trace.mark('tick')
+        self.assertEqual(len(startup_trace.events()), startup_trace._MAX_EVENTS)
+
+
+class BudgetReportTests(unittest.TestCase):
+    """The table, from numbers given to it rather than measured."""
+
+    def test_a_phase_over_its_budget_is_flagged(self):
+        rows = startup_trace.budget_report(
+            budgets={'settings': 100, 'gui.build': 1000},
+            totals={'settings': 150.0, 'gui.build': 900.0})
+        self.assertEqual(rows, [('settings', 150.0, 100, True),
+                                ('gui.build', 900.0, 1000, False)])
+
+    def test_a_phase_that_did_not_run_is_never_over(self):
+        rows = startup_trace.over_budget(budgets={'tts.init': 10}, totals={})
+        self.assertEqual(rows, [])
+
+    def test_a_phase_without_a_budget_is_shown_but_not_failed(self):
+        rows = startup_trace.budget_report(budgets={},
+                                           totals={'component': 5.0})
+        self.assertEqual(rows, [('component', 5.0, None, False)])
+        self.assertIn('component', startup_trace.format_budget_table(rows))
+
+    def test_every_traced_phase_has_a_budget(self):
+        """A phase added to the code without a budget is a phase unguarded."""
+        used = set()
+        for root in (os.path.join(REPO, 'main.py'), os.path.join(REPO, 'src')):
+            paths = [root] if root.endswith('.py') else [
+                os.path.join(f, n) for f, _d, files in os.walk(root)
+                for n in files if n.endswith('.py')]
+            for path in paths:
+                with open(path, encoding='utf-8', errors='replace') as handle:
+                    source = handle.read()
+                for marker in ("traced('", "span('"):
+                    start = 0
+                    while True:
+                        at = source.find(marker, start)
+                        if at < 0:
+                            break
+                        at += len(marker)
+                        used.add(source[at:source.index("'", at)])
+                        start = at
+        self.assertTrue(used, "no traced phases found at all")
+        missing = sorted(used - set(startup_trace.PHASE_BUDGETS_MS))
+        self.assertEqual(missing, [], "phases without a budget: %s" % missing)
+
+
+class HeadlessPhaseBudgetTests(unittest.TestCase):
+    """The phases that run without a window, held to their budgets."""
+
+    def setUp(self):
+        startup_trace.reset()
+
+    def tearDown(self):
+        startup_trace.reset()
+
+    def test_headless_phases_stay_within_budget(self):
+        from src.settings.settings import load_settings
+        from src.titan_core import game_manager
+
+        with startup_trace.span('settings'):
+            load_settings()
+        game_manager.get_games_by_platform()
+
+        totals = startup_trace.phase_totals()
+        self.assertIn('games.discover', totals,
+                      "game discovery is no longer traced")
+        ran = {name: startup_trace.PHASE_BUDGETS_MS[name]
+               for name in totals if name in startup_trace.PHASE_BUDGETS_MS}
+        over = startup_trace.over_budget(budgets=ran, totals=totals)
+        self.assertEqual(over, [], "\n" + startup_trace.format_budget_table(
+            startup_trace.budget_report(budgets=ran, totals=totals)))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+Statusbar applet refreshes: the scheduler, the worker pool and timeouts.
+
+Run it directly:  python tests/test_statusbar_scheduler.py
+
+Real applets (applet.json + main.py) are written to a temporary folder and
+loaded through StatusbarAppletManager as Titan loads them; the built-in
+items (clock, battery, ...) are replaced by a counter so nothing here
+touches the system.
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import textwrap
+import threading
+import time
+import unittest
+from unittest import mock
+
+REPO = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, REPO)
+
+from src.titan_core import statusbar_applet_manager as sam      # noqa: E402
+
+APPLET = '''
+import threading, time
+calls = 0
+delay = {delay}
+release = threading.Event()
+release.set()
+
+def get_statusbar_item_info():
+    return {{"name": "{name}", "update_interval": {interval}, "timeout": {timeout}}}
+
+def get_statusbar_item_text():
+    global calls
+    calls += 1
+    release.wait()
+    time.sleep(delay)
+    return "{name}: " + str(calls)
+'''
+
+
+class SchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix="titan_applets_")
+        self.addCleanup(shutil.rmtree, self.tmp, True)
+        self.entries = {}
+        self.builtin_calls = 0
+        for target, value in (('_discover_data_entries', lambda kind: dict(self.entries)),
+                              ('_ensure_user_data_subdir', lambda *a: None),
+                              ('get_project_root', lambda: self.tmp)):
+            patcher = mock.patch.object(sam, target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(sam.StatusbarAppletManager, '_update_builtin_cache',
+                                    lambda manager: self._count_builtin())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _count_builtin(self):
+        self.builtin_calls += 1
+
+    def applet(self, name, interval=1, timeout=2.0, delay=0.0):
+        folder = os.path.join(self.tmp, name)
+        os.makedirs(folder)
+        with open(os.path.join(folder, 'applet.json'), 'w') as f:
+            json.dump({"name": name}, f)
+        with open(os.path.join(folder, 'main.py'), 'w') as f:
+            f.write(textwrap.dedent(APPLET.format(name=name, interval=interval,
+                                                  timeout=timeout, delay=delay)))
+        self.entries[name] = folder
+
+    def manager(self):
+        manager = sam.StatusbarAppletManager()
+        self.addCleanup(manager.stop_auto_update)
+        return manager
+
+    def module(self, name):
+        return sys.modules[f"statusbar_applets.{name}.main"]
+
+    def test_refreshes_follow_each_applets_interval(self):
+        self.applet('fast', interval=1)
+        self.applet('slow', interval=30)
+        manager = self.manager()
+        manager.start_auto_update()
+        time.sleep(2.3)
+        manager.stop_auto_update()
+        stats = manager.get_refresh_stats()
+        self.assertEqual(stats['items']['fast']['runs'], 1 + 2)      # load + two ticks
+        self.assertEqual(stats['items']['slow']['runs'], 1)          # load only
+        # One wakeup per due refresh, not one per second per applet.
+        self.assertLessEqual(stats['wakeups'], 4)
+        self.assertEqual(manager.get_applet_text('fast'), 'fast: 3')
+
+    def test_a_hung_applet_costs_one_thread(self):
+        self.applet('hung', interval=1, timeout=0.2)
+        manager = self.manager()
+        module = self.module('hung')
+        module.release.clear()
+        self.addCleanup(module.release.set)
+        threads_before = threading.active_count()
+        for _ in range(5):
+            manager.update_applet_cache('hung')
+        self.assertEqual(manager.get_applet_text('hung'), sam.TIMEOUT_TEXT)
+        stats = manager.get_refresh_stats()['items']['hung']
+        self.assertEqual((stats['timeouts'], stats['coalesced'], module.calls), (1, 4, 2))
+        self.assertLessEqual(threading.active_count() - threads_before, 1)
+        module.release.set()
+        deadline = time.time() + 2.0
+        while manager.get_refresh_stats()['items']['hung']['in_flight'] and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(manager.get_refresh_stats()['items']['hung']['late'], 1)
+        self.assertEqual(manager.get_applet_text('hung'), 'hung: 2')
+
+    def test_the_scheduler_times_out_and_replaces_the_stuck_worker(self):
+        self.applet('hung', interval=1, timeout=0.2)
+        self.applet('fine', interval=1)
+        manager = self.manager()
+        self.module('hung').release.clear()
+        self.addCleanup(self.module('hung').release.set)
+        manager.start_auto_update(workers=1)
+        time.sleep(2.5)
+        stats = manager.get_refresh_stats()
+        self.assertEqual(stats['items']['hung']['timeouts'], 1)
+        self.assertGreaterEqual(stats['items']['fine']['runs'], 3)   # not starved
+        self.assertEqual((stats['workers'], stats['stuck']), (2, 1))
+
+    def test_requests_during_a_refresh_are_coalesced(self):
+        self.applet('busy', interval=60, delay=0.3)
+        manager = self.manager()
+        manager.start_auto_update()
+        module = self.module('busy')
+        calls_after_load = module.calls
+        manager.request_refresh('busy')
+        time.sleep(0.05)
+        for _ in range(10):
+            manager.request_refresh('busy')
+        time.sleep(1.0)
+        self.assertEqual(module.calls - calls_after_load, 2)
+        self.assertEqual(manager.get_refresh_stats()['items']['busy']['coalesced'], 10)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""
+The block VAD: batched features, the noise floor, lookahead, the feature
+cache and its accuracy and cost on the labelled corpus.
+
+Run it directly:  python tests/test_vad_engine.py
+
+Audio is synthetic (voice_bench.synthetic_speech and vad_corpus), so no
+microphone, sound card or webrtcvad is needed.
+"""
+
+import os
+import sys
+import time
+import unittest
+
+import numpy as np
+
+REPO = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, REPO)
+
+from src.network import vad_fallback   # noqa: E402
+from src.network.vad_fallback import FEATURES, Vad, VadEngine, block_features   # noqa: E402
+from src.network.voice_bench import run_vad_benchmark, synthetic_speech, vad_corpus   # noqa: E402
+from src.network.voice_capture import VoiceCaptureManager   # noqa: E402
+
+RATE = 16000
+FRAME = 320
+
+
+def frames_of(samples):
+    count = len(samples) // FRAME
+    return [samples[i * FRAME:(i + 1) * FRAME].tobytes() for i in range(count)]
+
+
+def tone(frames, level=4000.0, hz=300.0, start=0):
+    n = np.arange(start * FRAME, (start + frames) * FRAME)
+    return (np.sin(2 * np.pi * hz * n / RATE) * level).astype(np.int16)
+
+
+def hiss(frames, level=60.0, seed=0):
+    return np.random.default_rng(seed).normal(0.0, level, frames * FRAME).astype(np.int16)
+
+
+class BatchTest(unittest.TestCase):
+    def test_a_block_decides_like_frame_by_frame(self):
+        samples, _, _ = vad_corpus(seconds_per_scene=3.0)
+        chunks = frames_of(samples)
+        one, batched = Vad(0), Vad(0)
+        expected = [one.is_speech(chunk, RATE) for chunk in chunks]
+        got = []
+        for start in range(0, len(chunks), 7):
+            got.extend(batched.is_speech_frames(chunks[start:start + 7], RATE))
+        self.assertEqual(got, expected)
+        self.assertAlmostEqual(batched.noise_floor, one.noise_floor, delta=1.0)
+
+    def test_the_one_frame_path_matches_the_block_path(self):
+        samples, _ = synthetic_speech(1.0, seed=3)
+        block, last = block_features(samples, FRAME, RATE)
+        previous = None
+        for index in range(len(block)):
+            row, previous = block_features(samples[index * FRAME:(index + 1) * FRAME],
+                                           FRAME, RATE, previous)
+            np.testing.assert_allclose(row[0], block[index], rtol=1e-3, atol=1e-2)
+        np.testing.assert_allclose(previous, last, rtol=1e-3, atol=1e-3)
+
+    def test_the_feature_cache_keeps_the_last_frames(self):
+        samples, _ = synthetic_speech(2.0, seed=1)
+        engine = VadEngine(cache_frames=40)
+        for start in range(0, len(samples), 13 * FRAME):
+            engine.push(samples[start:start + 13 * FRAME])
+        block, _ = block_features(samples, FRAME, RATE)
+        self.assertEqual(engine.frames_seen, len(block))
+        self.assertEqual(engine.features().shape, (40, len(FEATURES)))
+        np.testing.assert_allclose(engine.features(10), block[-10:], rtol=1e-3, atol=1e-2)
+        self.assertEqual(len(engine.raw_decisions(5)), 5)
+
+
+class DecisionTest(unittest.TestCase):
+    def test_lookahead_trails_by_n_frames_and_adds_pre_roll(self):
+        audio = np.concatenate([hiss(100), tone(10, start=100), hiss(20, seed=1)])
+        ahead = VadEngine(lookahead=4)
+        self.assertEqual(len(ahead.push(audio[:50 * FRAME])), 46)
+        self.assertEqual(len(ahead.flush()), 4)
+        for lookahead, first in ((0, 100), (2, 100), (4, 98), (5, 97)):
+            engine = VadEngine(lookahead=lookahead)
+            decisions = engine.push(audio) + engine.flush()
+            self.assertEqual(len(decisions), 130)
+            self.assertEqual(decisions.index(True), first, lookahead)
+
+    def test_lookahead_ignores_a_click(self):
+        audio = hiss(100)
+        audio[60 * FRAME:61 * FRAME] = tone(1, level=9000.0, hz=3000.0)
+        plain, ahead = VadEngine(lookahead=0), VadEngine(lookahead=2)
+        self.assertTrue(any(plain.push(audio)))
+        self.assertFalse(any(ahead.push(audio) + ahead.flush()))
+
+    def test_the_floor_follows_a_room_that_gets_louder(self):
+        """A fan coming on must not read as endless speech."""
+        quiet, loud = hiss(150, 40.0), hiss(400, 600.0, seed=2)
+        engine = VadEngine()
+        engine.push(quiet)
+        decisions = engine.push(loud)
+        # Closed again once the three-second minimum window has seen it.
+        self.assertFalse(any(decisions[200:]))
+        self.assertGreater(engine.noise_floor, 300.0)
+
+    def test_without_numpy_the_scalar_path_still_decides(self):
+        original = vad_fallback._np
+        vad_fallback._np = None
+        try:
+            vad = Vad(0)
+            quiet = [vad.is_speech(chunk, RATE) for chunk in frames_of(hiss(50))]
+            loud = [vad.is_speech(chunk, RATE) for chunk in frames_of(tone(5))]
+        finally:
+            vad_fallback._np = original
+        self.assertFalse(any(quiet[10:]))
+        self.assertTrue(all(loud))
+
+
+class CaptureTest(unittest.TestCase):
+    def test_a_backlog_is_judged_in_one_call(self):
+        manager = VoiceCaptureManager(sample_rate=RATE, chunk_duration_ms=20, use_vad=True)
+        calls = []
+
+        class Recording(Vad):
+            def is_speech_frames(self, frames, sample_rate):
+                calls.append(len(frames))
+                return super().is_speech_frames(frames, sample_rate)
+
+            def is_speech(self, buf, sample_rate):
+                calls.append(1)
+                return super().is_speech(buf, sample_rate)
+
+        manager.vad = Recording(0)
+        sent = []
+        manager.on_audio_chunk = sent.append
+        chunks = frames_of(np.concatenate([hiss(30), tone(10, start=30)]))
+        manager.process_chunks(chunks)
+        self.assertEqual(calls, [40])
+        self.assertTrue(manager.is_speaking)
+        self.assertEqual(len(sent), 9)       # speech starts on its second frame
+
+    def test_a_backend_without_batching_goes_chunk_by_chunk(self):
+        manager = VoiceCaptureManager(sample_rate=RATE, chunk_duration_ms=20, use_vad=True)
+        seen = []
+
+        class Single:
+            def is_speech(self, buf, sample_rate):
+                seen.append(buf)
+                return True
+
+        manager.vad = Single()
+        chunks = frames_of(tone(4))
+        manager.process_chunks(chunks)
+        self.assertEqual(seen, chunks)
+
+
+class CorpusTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.report = run_vad_benchmark(seconds_per_scene=20.0)
+
+    def test_the_corpus_is_labelled_per_frame(self):
+        samples, labels, scenes = vad_corpus(seconds_per_scene=2.0)
+        self.assertEqual(len(labels), len(samples) // FRAME)
+        self.assertEqual(len(scenes), len(labels))
+        self.assertTrue(0.2 < labels.mean() < 0.9)
+
+    def test_accuracy(self):
+        runs = self.report['runs']
+        immediate, ahead = runs['block L0']['scores'], runs['block L2']['scores']
+        self.assertEqual(runs['frame']['scores'], immediate)
+        self.assertGreaterEqual(immediate['all']['accuracy'], 0.85)
+        self.assertGreaterEqual(immediate['all']['recall'], 0.95)
+        for scene in ('room', 'fan', 'hum'):
+            self.assertLessEqual(immediate[scene]['false_alarm'], 0.25, scene)
+        self.assertGreaterEqual(ahead['all']['accuracy'], 0.9)
+        self.assertLessEqual(ahead['keys']['false_alarm'], 0.25)
+
+    def test_a_block_costs_less_than_frame_by_frame(self):
+        runs = self.report['runs']
+        self.assertLess(runs['block L0']['cpu_us_per_second'], runs['frame']['cpu_us_per_second'])
+        # Far inside real time: under 2% of a core either way.
+        self.assertLess(runs['frame']['cpu_us_per_second'], 20000)
+        started = time.process_time()
+        VadEngine().push(synthetic_speech(5.0)[0])
+        self.assertLess((time.process_time() - started) / 5.0 * 1e6, 20000)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+The offline voice pipeline benchmark and the receive path it drives.
+
+Run it directly:  python tests/test_voice_bench.py
+
+Nothing here needs a microphone, a sound card, wx or opuslib: the benchmark
+feeds synthetic speech through capture, VAD, AGC, packetizing, a simulated
+network, the jitter queues and the mixer on a virtual clock, with raw PCM
+where Opus is not installed (as the client does). The budget test is the
+regression gate for the hot voice path.
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+import wave
+
+import numpy as np
+
+REPO = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, REPO)
+
+from src.network import voice_bench   # noqa: E402
+from src.network.voice_playback import CHUNK_SAMPLES, VoiceMixer   # noqa: E402
+
+
+class MixerTest(unittest.TestCase):
+    def test_a_speaker_joins_after_the_jitter_buffer_fills(self):
+        mixer = VoiceMixer(jitter_frames=3)
+        frame = np.full(CHUNK_SAMPLES, 1000, dtype=np.int16).tobytes()
+        for _ in range(2):
+            mixer.add(7, frame)
+            self.assertFalse(mixer.mix().any())
+        mixer.add(7, frame)
+        for _ in range(3):
+            self.assertEqual(int(mixer.mix()[0]), 1000)
+        self.assertFalse(mixer.mix().any())                 # underrun
+        self.assertEqual(mixer.underruns[7], 1)
+
+    def test_speakers_are_summed_and_clipped(self):
+        mixer = VoiceMixer(jitter_frames=1, soft_clip=False)
+        mixer.add(1, np.full(CHUNK_SAMPLES, 30000, dtype=np.int16).tobytes())
+        mixer.add(2, np.full(CHUNK_SAMPLES, 30000, dtype=np.int16).tobytes())
+        self.assertEqual(int(mixer.mix()[0]), 32767)
+        mixer.add(1, np.full(CHUNK_SAMPLES, 3000, dtype=np.int16).tobytes())
+        mixer.stop_user(2)
+        self.assertEqual(int(mixer.mix(volume=0.5)[-1]), 1500)   # ramped down to it
+
+
+class BenchmarkTest(unittest.TestCase):
+    def run_bench(self, **options):
+        defaults = dict(seconds=4.0, speakers=3, codec=None, allocations=False)
+        defaults.update(options)
+        return voice_bench.run_benchmark(**defaults)
+
+    def test_every_frame_arrives_with_a_fixed_latency(self):
+        report = self.run_bench(use_vad=False, jitter_ms=0.0)
+        self.assertEqual(report['lost'], 0)
+        self.assertEqual(report['played'], report['sent'])
+        self.assertEqual(report['sent'], report['frames'] * 3)
+        # 20 ms captured + 40 ms network + waiting for the third frame
+        # (to the next tick) + the 20 ms output block.
+        self.assertAlmostEqual(report['latency_ms']['p50'], 130.0, places=3)
+        self.assertAlmostEqual(report['latency_ms']['max'], 130.0, places=3)
+
+    def test_loss_and_jitter_are_accounted_for(self):
+        report = self.run_bench(use_vad=False, loss=0.1, jitter_ms=30.0)
+        self.assertEqual(report['played'] + report['lost'], report['sent'])
+        self.assertAlmostEqual(report['lost'] / report['sent'], 0.1, delta=0.04)
+        self.assertGreater(report['underrun_ticks'], 0)
+        self.assertGreater(report['latency_ms']['p95'], report['latency_ms']['p50'])
+
+    def test_vad_only_sends_while_speaking(self):
+        samples, speech = voice_bench.synthetic_speech(6.0, seed=4)
+        report = self.run_bench(samples=samples, speakers=1, use_vad=True)
+        labelled = int(speech[::CHUNK_SAMPLES][:report['frames']].sum())
+        self.assertEqual(report['stages']['vad']['calls'], report['frames'])
+        self.assertLess(report['sent'], report['frames'])
+        self.assertGreater(report['sent'], labelled * 0.8)
+
+    def test_stages_report_cpu_and_allocations(self):
+        report = self.run_bench(seconds=2.0, allocations=True)
+        # Raw PCM frames skip the decoder; the mixer converts them as a block.
+        for stage in ('capture', 'vad', 'agc', 'packetize', 'jitter', 'convert', 'mix'):
+            entry = report['stages'][stage]
+            self.assertGreater(entry['calls'], 0, stage)
+            self.assertGreaterEqual(entry['wall_us_p95'], 0.0)
+            self.assertIn('alloc_bytes_per_call', entry)
+        self.assertGreater(report['stages']['mix']['alloc_bytes_per_call'], 0)
+        self.assertIn('mix', voice_bench.format_report(report))
+        self.assertIn('convert', voice_bench.format_report(report))
+
+    def test_a_busy_room_fits_well_inside_the_frame(self):
+        report = self.run_bench(seconds=3.0, speakers=12, use_vad=True)
+        # 12 speakers should cost a few percent of each 20 ms frame; half of
+        # it means something in the hot path has gone badly wrong.
+        self.assertLess(report['budget_used'], 0.5, voice_bench.format_report(report))
+
+    def test_a_stereo_mix_costs_about_the_same(self):
+        report = self.run_bench(seconds=2.0, speakers=8, stereo=True)
+        self.assertEqual(report['channels'], 2)
+        self.assertEqual(report['played'], report['sent'])
+        self.assertIn('stereo mix', voice_bench.format_report(report))
+
+    def test_a_recorded_wav_is_brought_to_16k_mono(self):
+        path = os.path.join(tempfile.mkdtemp(), 'talk.wav')
+        stereo = np.zeros((8000, 2), dtype='<i2')
+        stereo[:, 0] = 1000
+        stereo[:, 1] = 3000
+        with wave.open(path, 'wb') as w:
+            w.setnchannels(2)
+            w.setsampwidth(2)
+            w.setframerate(8000)
+            w.writeframes(stereo.tobytes())
+        samples = voice_bench.load_wav(path)
+        self.assertEqual(len(samples), 16000)
+        self.assertEqual(int(samples[100]), 2000)
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
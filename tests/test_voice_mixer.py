@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+"""
+The voice mixer engine: the block mix, gain, pan, ducking, soft clipping
+and the sinks.
+
+Run it directly:  python tests/test_voice_mixer.py
+
+Frames are raw 16-bit PCM (what a sender without Opus transmits) or short
+"Opus" frames for a FakeCodec that expands them to a constant level, so no
+codec, sound card or wx is needed.
+"""
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+import numpy as np
+
+REPO = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, REPO)
+
+from src.network import voice_playback   # noqa: E402
+from src.network.voice_playback import (   # noqa: E402
+    CHUNK_SAMPLES, DUCK_GAIN, DUCK_HOLD_FRAMES, MAX_PLC_FRAMES, SOFT_CLIP_KNEE,
+    STALE_FRAME_SECONDS, MemorySink, StreamSink, VoiceFrameDecoder, VoiceMixer)
+
+
+def pcm(level):
+    return np.full(CHUNK_SAMPLES, level, dtype=np.int16).tobytes()
+
+
+class FakeCodec:
+    """Decodes a frame b'<level>' to that level; PLC repeats it halved."""
+
+    def __init__(self):
+        self.level = 0
+
+    def decode(self, data):
+        if data is None:
+            self.level //= 2
+        else:
+            self.level = int(data)
+        return pcm(self.level)
+
+
+class MixTest(unittest.TestCase):
+    def test_the_block_mix_is_the_weighted_sum(self):
+        rng = np.random.default_rng(5)
+        frames = (rng.standard_normal((40, CHUNK_SAMPLES)) * 400).astype(np.int16)
+        gains = rng.uniform(0.0, 2.0, 40)
+        mixer = VoiceMixer(jitter_frames=1)
+        for user_id in range(40):
+            mixer.set_gain(user_id, gains[user_id])
+            mixer.add(user_id, frames[user_id].tobytes())
+        out = mixer.mix(volume=0.8)
+        expected = (frames.astype(np.float64) * gains[:, None]).sum(axis=0) * 0.8
+        self.assertEqual(out.shape, (CHUNK_SAMPLES,))
+        self.assertLessEqual(np.abs(out - expected).max(), 1.0)
+        self.assertEqual(mixer.stats['most_rows'], 40)
+
+    def test_pan_places_speakers_in_stereo(self):
+        mixer = VoiceMixer(jitter_frames=1, channels=2)
+        mixer.set_pan('left', 0.0)
+        mixer.set_pan('right', 1.0)
+        mixer.set_pan('quarter', 0.25)
+        for user_id, level in (('left', 1000), ('right', 2000), ('centre', 400), ('quarter', 100)):
+            mixer.add(user_id, pcm(level))
+        out = mixer.mix()
+        self.assertEqual(out.shape, (CHUNK_SAMPLES, 2))
+        # Centre is full level on both sides; a quarter is full left, half right.
+        self.assertEqual(out[0].tolist(), [1000 + 400 + 100, 2000 + 400 + 50])
+
+    def test_gain_changes_are_ramped_over_a_frame(self):
+        mixer = VoiceMixer(jitter_frames=1)
+        mixer.add(1, pcm(10000))
+        self.assertEqual(int(mixer.mix()[-1]), 10000)
+        mixer.set_gain(1, 0.0)
+        mixer.add(1, pcm(10000))
+        out = mixer.mix()
+        self.assertGreater(int(out[0]), 9900)
+        self.assertTrue((np.diff(out.astype(np.int32)) <= 0).all())
+        self.assertEqual(int(out[-1]), 0)
+        mixer.add(1, pcm(10000))
+        self.assertFalse(mixer.mix().any())
+
+    def test_a_priority_speaker_ducks_the_room(self):
+        mixer = VoiceMixer(jitter_frames=1)
+        mixer.set_priority('host')
+        mixer.add('guest', pcm(1000))
+        self.assertEqual(int(mixer.mix()[-1]), 1000)
+        for _ in range(2):
+            mixer.add('guest', pcm(1000))
+            mixer.add('host', pcm(0))
+            out = mixer.mix()
+        self.assertEqual(int(out[0]), int(1000 * DUCK_GAIN))
+        # The host pauses: the guest stays down for the hold, then comes back.
+        for _ in range(DUCK_HOLD_FRAMES - 1):
+            mixer.add('guest', pcm(1000))
+            self.assertEqual(int(mixer.mix()[-1]), int(1000 * DUCK_GAIN))
+        for _ in range(2):                                  # (ramped back up)
+            mixer.add('guest', pcm(1000))
+            out = mixer.mix()
+        self.assertEqual(int(out[0]), 1000)
+        mixer.set_priority('host', False)
+        self.assertEqual(mixer.priority, set())
+
+    def test_loud_mixes_are_soft_clipped(self):
+        mixer = VoiceMixer(jitter_frames=1)
+        knee = SOFT_CLIP_KNEE * 32767
+        levels = []
+        for total in (20000, 24000, 40000, 60000):
+            mixer.add(1, pcm(total // 2))
+            mixer.add(2, pcm(total - total // 2))
+            levels.append(int(mixer.mix()[0]))
+        self.assertEqual(levels[0], 20000)                  # below the knee
+        self.assertGreater(levels[1], knee)
+        self.assertLess(levels[1], 24000)
+        self.assertLess(levels[1], levels[2])
+        self.assertLess(levels[2], levels[3])
+        self.assertLessEqual(levels[3], 32767)
+        self.assertEqual(mixer.stats['soft_clipped'], 3)
+
+    def test_a_stopped_speaker_rejoins_after_refilling(self):
+        mixer = VoiceMixer(jitter_frames=2)
+        for _ in range(2):
+            mixer.add(1, pcm(500))
+        self.assertEqual(int(mixer.mix()[0]), 500)
+        mixer.stop_user(1)
+        self.assertFalse(mixer.mix().any())
+        mixer.add(1, pcm(700))
+        self.assertFalse(mixer.mix().any())                 # refilling
+        mixer.add(1, pcm(700))
+        self.assertEqual(int(mixer.mix()[0]), 700)
+
+    def test_late_frames_do_not_open_the_next_talk_spurt(self):
+        mixer = VoiceMixer(jitter_frames=3)
+        now = [100.0]
+        with mock.patch.object(voice_playback.time, 'monotonic', lambda: now[0]):
+            for _ in range(3):
+                mixer.add(1, pcm(500))
+            self.assertEqual(int(mixer.mix()[0]), 500)
+            mixer.stop_user(1)
+            for _ in range(2):                      # in flight at voice_stopped
+                mixer.add(1, pcm(300))
+            now[0] += STALE_FRAME_SECONDS + 1.0
+            mixer.add(1, pcm(700))
+            self.assertEqual(len(mixer.buffers[1]), 1)
+            for _ in range(2):
+                mixer.add(1, pcm(700))
+            self.assertEqual(int(mixer.mix()[0]), 700)
+
+
+class DecodeTest(unittest.TestCase):
+    def test_opus_frames_and_plc_go_through_the_decoder(self):
+        mixer = VoiceMixer(decoder=VoiceFrameDecoder(codec_factory=FakeCodec), jitter_frames=1)
+        mixer.add(1, b'4000')
+        mixer.add(2, pcm(100))
+        self.assertEqual(int(mixer.mix(plc=True)[0]), 4100)
+        levels = [int(mixer.mix(plc=True)[0]) for _ in range(MAX_PLC_FRAMES + 1)]
+        self.assertEqual(levels, [2000, 1000, 500, 250, 125, 0])
+        mixer.add(1, pcm(300)[:601])                       # short, odd length raw PCM
+        out = mixer.mix()
+        self.assertEqual(int(out[0]), 300)
+        self.assertFalse(out[300:].any())                   # padded to a frame
+
+
+class SinkTest(unittest.TestCase):
+    def test_tick_hands_frames_to_the_sink(self):
+        sink = MemorySink(maxlen=3)
+        mixer = VoiceMixer(jitter_frames=1, sink=sink)
+        for level in range(1, 6):
+            mixer.add(1, pcm(level))
+            mixer.tick()
+        self.assertEqual([int(frame[0]) for frame in sink.frames], [3, 4, 5])
+        self.assertEqual(len(sink.samples()), 3 * CHUNK_SAMPLES)
+
+    def test_the_stream_sink_writes_device_shaped_blocks(self):
+        written = []
+
+        class Stream:
+            def write(self, block):
+                written.append(block.shape)
+
+        VoiceMixer(channels=1, sink=StreamSink(Stream())).tick()
+        VoiceMixer(channels=2, sink=StreamSink(Stream(), channels=2)).tick()
+        self.assertEqual(written, [(CHUNK_SAMPLES, 1), (CHUNK_SAMPLES, 2)])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,95 @@
+"""
+Load harness for the broadcast paths: CPU per broadcast at high fan-out.
+
+Run directly:  python bench_broadcast.py [fan-out ...]
+Opens real websocket connections on localhost (default 10, 100 and 500
+of them) and pushes a user_status-sized message to all of them, first the
+way ``broadcast()`` used to (``json.dumps`` plus one awaited ``send`` per
+recipient through ``asyncio.gather``), then through frames.py (one
+``encode`` and one ``websockets.broadcast``). Prints the process CPU time
+per broadcast for each. The clients drain their sockets in the same
+process, so absolute numbers include their share; the difference between
+the two rows is what the server saves.
+"""
+
+import asyncio
+import json
+import sys
+import time
+
+import websockets
+
+import frames
+
+MESSAGE = {
+    "type": "user_status", "user_id": 1234, "username": "someone",
+    "titan_number": 104322, "status": "online", "has_custom_sounds": False,
+}
+ROUNDS = 200
+
+
+async def _old_broadcast(sockets, message):
+    message_json = json.dumps(message)
+
+    async def send_to_client(ws):
+        try:
+            await ws.send(message_json)
+        except websockets.exceptions.ConnectionClosed:
+            pass
+    await asyncio.gather(*(send_to_client(ws) for ws in sockets), return_exceptions=True)
+
+
+async def _new_broadcast(sockets, message):
+    frames.fan_out(sockets, frames.encode(message))
+
+
+async def _measure(fan_out: int):
+    server_sockets = []
+    ready = asyncio.Event()
+
+    async def handler(ws):
+        server_sockets.append(ws)
+        if len(server_sockets) == fan_out:
+            ready.set()
+        await ws.wait_closed()
+
+    async def drain(ws, counter):
+        async for _ in ws:
+            counter[0] += 1
+
+    results = {}
+    async with websockets.serve(handler, '127.0.0.1', 0, compression=None,
+                                write_limit=2 * 1024 * 1024) as server:
+        port = server.sockets[0].getsockname()[1]
+        clients = [await websockets.connect(f"ws://127.0.0.1:{port}", compression=None)
+                   for _ in range(fan_out)]
+        await ready.wait()
+        received = [0]
+        drains = [asyncio.create_task(drain(ws, received)) for ws in clients]
+        for name, path in (("gather + json.dumps", _old_broadcast),
+                           ("frames.fan_out", _new_broadcast)):
+            received[0] = 0
+            started = time.process_time()
+            for _ in range(ROUNDS):
+                await path(server_sockets, MESSAGE)
+                await asyncio.sleep(0)
+            while received[0] < ROUNDS * fan_out:
+                await asyncio.sleep(0.001)
+            results[name] = (time.process_time() - started) * 1000.0 / ROUNDS
+        for ws in clients:
+            await ws.close()
+        for task in drains:
+            task.cancel()
+    return results
+
+
+def main(argv):
+    sizes = [int(a) for a in argv] or [10, 100, 500]
+    print(f"JSON backend: {frames.JSON_BACKEND}; {ROUNDS} broadcasts per row")
+    for fan_out in sizes:
+        for name, ms in asyncio.run(_measure(fan_out)).items():
+            print(f"  fan-out {fan_out:5d}  {name:22s} {ms:8.3f} ms CPU / broadcast")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
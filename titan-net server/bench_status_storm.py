@@ -0,0 +1,105 @@
+"""
+Load harness: a reconnect storm of status broadcasts.
+
+Run directly:  python bench_status_storm.py [users]
+After a restart every user reconnects at once; each login and each drop
+broadcasts a ``user_status``. This times one offline + online pair per user
+(default 2000 users, a third of them with custom sounds on disk) two ways:
+
+    before   the old broadcast_user_status: read the user on the executor,
+             then list data/sfx/<user> on the executor
+    after    the profile asset index (profile_assets.py)
+
+The database here is a dict, so "before" is a lower bound: a real
+SQLCipher read costs more than a dict lookup. Fan-out is left out (each
+broadcast goes to nobody) so the numbers are the status pipeline alone.
+"""
+
+import asyncio
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+
+from profile_assets import ProfileAssetIndex
+
+
+class DictDatabase:
+    def __init__(self, users):
+        self.users = users
+
+    def get_user_by_id(self, user_id):
+        return self.users.get(user_id)
+
+
+async def _before(db, user_id, status):
+    loop = asyncio.get_event_loop()
+    user = await loop.run_in_executor(None, db.get_user_by_id, user_id)
+    if not user:
+        return None
+
+    def _check_sounds():
+        safe_username = re.sub(r'[^a-zA-Z0-9._-]', '_', user['username'])
+        user_sfx_dir = os.path.join('data', 'sfx', safe_username)
+        return os.path.isdir(user_sfx_dir) and len(os.listdir(user_sfx_dir)) > 0
+    has_custom_sounds = await loop.run_in_executor(None, _check_sounds)
+    return {"type": "user_status", "user_id": user_id, "username": user['username'],
+            "titan_number": user['titan_number'], "status": status,
+            "has_custom_sounds": has_custom_sounds}
+
+
+async def _after(index, db, user_id, status):
+    fields = index.status_fields(user_id)
+    if fields is None:
+        user = await asyncio.get_event_loop().run_in_executor(None, db.get_user_by_id, user_id)
+        if not user:
+            return None
+        index.remember_user(user)
+        fields = index.status_fields(user_id)
+    return {"type": "user_status", "user_id": user_id, "username": fields['username'],
+            "titan_number": fields['titan_number'], "status": status,
+            "has_custom_sounds": fields['has_custom_sounds']}
+
+
+async def _storm(step, users):
+    started_wall, started_cpu = time.perf_counter(), time.process_time()
+    for status in ('offline', 'online'):
+        await asyncio.gather(*(step(uid, status) for uid in users))
+    return time.perf_counter() - started_wall, time.process_time() - started_cpu
+
+
+def main(argv):
+    count = int(argv[0]) if argv else 2000
+    tmp = tempfile.mkdtemp(prefix="titannet_storm_")
+    cwd = os.getcwd()
+    try:
+        os.chdir(tmp)
+        users = {uid: {'id': uid, 'username': f"user{uid}", 'titan_number': 100000 + uid}
+                 for uid in range(1, count + 1)}
+        for uid in range(1, count + 1, 3):
+            os.makedirs(os.path.join('data', 'sfx', f"user{uid}"))
+            with open(os.path.join('data', 'sfx', f"user{uid}", 'login.ogg'), 'wb') as f:
+                f.write(b'OggS')
+        db = DictDatabase(users)
+        index = ProfileAssetIndex().load()
+        # The logins that caused the storm put every user's card in memory.
+        for user in users.values():
+            index.remember_user(user)
+
+        before = asyncio.run(_storm(lambda uid, st: _before(db, uid, st), users))
+        after = asyncio.run(_storm(lambda uid, st: _after(index, db, uid, st), users))
+        broadcasts = 2 * count
+        print(f"{count} users, {broadcasts} status broadcasts")
+        for name, (wall, cpu) in (("before (DB read + listdir)", before),
+                                  ("after (profile asset index)", after)):
+            print(f"  {name:28s} {wall * 1000:9.1f} ms wall  {cpu * 1000:9.1f} ms CPU  "
+                  f"{wall * 1e6 / broadcasts:7.1f} us / broadcast")
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
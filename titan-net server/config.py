@@ -29,6 +29,32 @@ class Config:
     # Database settings
     DATABASE_PATH = os.getenv('DATABASE_PATH', 'database/titannet.db')
 
+    # Group commit: queued writes marked @batchable (room / private messages,
+    # status changes, game session log) share one transaction, so a burst
+    # costs one SQLCipher commit instead of one per write. The window is how
+    # long the first write of a batch waits for company; see group_commit.py.
+    DB_GROUP_COMMIT = os.getenv('DB_GROUP_COMMIT', '1') == '1'
+    DB_GROUP_COMMIT_WINDOW_MS = float(os.getenv('DB_GROUP_COMMIT_WINDOW_MS', 1))
+    DB_GROUP_COMMIT_MAX_BATCH = int(os.getenv('DB_GROUP_COMMIT_MAX_BATCH', 64))
+
+    # Voice rooms relay only the most active speakers (voice_forwarding.py):
+    # at most VOICE_MAX_SPEAKERS at a time (0 relays everyone). A new
+    # speaker takes a slot from a selected one only when it is
+    # VOICE_SWITCH_HYSTERESIS times as active and that speaker has held the
+    # slot for VOICE_SWITCH_HOLD_MS.
+    VOICE_MAX_SPEAKERS = int(os.getenv('VOICE_MAX_SPEAKERS', 4))
+    VOICE_SWITCH_HYSTERESIS = float(os.getenv('VOICE_SWITCH_HYSTERESIS', 1.5))
+    VOICE_SWITCH_HOLD_MS = float(os.getenv('VOICE_SWITCH_HOLD_MS', 600))
+    # Rooms mixed on the server from startup (comma-separated room ids);
+    # moderators can switch others with set_voice_mixing. See voice_mixer.py.
+    VOICE_MIX_ROOMS = os.getenv('VOICE_MIX_ROOMS', '')
+
+    # permessage-deflate, per message class (frames.py): 'off' (lowest
+    # latency), 'selective' (only text messages of WS_COMPRESS_MIN_BYTES or
+    # more; voice never) or 'all'.
+    WS_COMPRESSION = os.getenv('WS_COMPRESSION', 'off')
+    WS_COMPRESS_MIN_BYTES = int(os.getenv('WS_COMPRESS_MIN_BYTES', 1024))
+
     # File upload settings
     UPLOAD_DIR = os.getenv('UPLOAD_DIR', 'uploads')
     MAX_UPLOAD_SIZE = int(os.getenv('MAX_UPLOAD_SIZE', 1024 * 1024 * 1024))  # 1GB
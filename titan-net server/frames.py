@@ -0,0 +1,185 @@
+"""
+Frames - a server push serialized once and shared by everyone who gets it.
+
+The pushes that go to many people at once (``broadcast``, which carries
+``broadcast_user_status`` and the presence deltas, ``broadcast_to_room``,
+``push_server_sound``, ``push_remote_screen`` and the game session
+broadcasts) used to call ``json.dumps`` and then await one ``send`` per
+recipient through ``asyncio.gather``. ``push_server_sound`` even serialized
+the same payload again for every recipient. At a few hundred recipients
+almost all of that CPU went to creating one task per send and encoding the
+same text to UTF-8 once per socket; the JSON was a smaller part.
+
+This module is the encoding layer those paths share:
+
+``encode(message)``
+    One message to one text frame. Uses ``orjson`` when it is installed
+    (several times faster than ``json``, and it emits UTF-8 instead of
+    ``\\u`` escapes, so non-Latin chat is smaller on the wire too) and the
+    standard library otherwise. Anything orjson will not take (integers
+    beyond 64 bits, say) goes through ``json`` exactly as before.
+
+``fan_out(sockets, frame)``
+    Hands one frame to many websockets with ``websockets.broadcast()``,
+    like the voice relay already does: the text is encoded to bytes once,
+    there is no task per recipient and no await. A connection that is
+    closing is skipped (its handler unregisters it); a slow one is not
+    waited for.
+
+Compression (permessage-deflate) is negotiated per connection but applied
+per message, so it can be tuned per message class. ``WS_COMPRESSION``
+chooses the mode: ``off`` (the default, as before), ``selective`` or
+``all``. In ``selective`` mode binary frames - voice, whose Opus payload
+does not compress - and text frames shorter than ``WS_COMPRESS_MIN_BYTES``
+go out as they are, and only the large text frames (histories, directory
+snapshots, screens, file lists) are deflated. Clients offer the extension
+from this version on; older ones do not, and get everything uncompressed.
+
+``STATS`` counts frames encoded, deliveries and deflate
+savings; the heartbeat logs ``summary()``.
+"""
+
+import json
+import time
+from typing import Any, Dict, Iterable, List, Union
+
+import websockets
+from websockets.extensions.permessage_deflate import (PerMessageDeflate,
+                                                      ServerPerMessageDeflateFactory)
+from websockets.frames import CTRL_OPCODES, Opcode
+
+try:
+    import orjson  # type: ignore
+    JSON_BACKEND = 'orjson'
+except Exception:  # optional dependency
+    orjson = None  # type: ignore
+    JSON_BACKEND = 'json'
+
+COMPRESSION_MODES = ('off', 'selective', 'all')
+DEFAULT_COMPRESS_MIN_BYTES = 1024
+
+
+class _FrameStats:
+    __slots__ = ('encoded', 'encoded_bytes', 'encode_ms', 'fallbacks',
+                 'fan_outs', 'deliveries', 'deflated', 'deflate_skipped',
+                 'deflate_in', 'deflate_out')
+
+    def __init__(self):
+        for name in self.__slots__:
+            setattr(self, name, 0)
+
+    def as_dict(self) -> Dict[str, Any]:
+        out = {name: getattr(self, name) for name in self.__slots__}
+        out['encode_ms'] = round(self.encode_ms, 3)
+        out['backend'] = JSON_BACKEND
+        return out
+
+
+STATS = _FrameStats()
+
+
+def _orjson_text(message: Any) -> str:
+    return orjson.dumps(message, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+
+
+def encode(message: Any) -> str:
+    """Serialize one message into the text of a websocket frame."""
+    started = time.perf_counter()
+    if orjson is not None:
+        try:
+            text = _orjson_text(message)
+        except TypeError:
+            # orjson.JSONEncodeError is a TypeError. Let json decide, so
+            # whatever serialized before still does (and what did not still
+            # raises the same error).
+            STATS.fallbacks += 1
+            text = json.dumps(message)
+    else:
+        text = json.dumps(message)
+    STATS.encode_ms += (time.perf_counter() - started) * 1000.0
+    STATS.encoded += 1
+    STATS.encoded_bytes += len(text)
+    return text
+
+
+def fan_out(sockets: Iterable[Any], frame: Union[str, bytes]) -> int:
+    """Write one frame to every socket in ``sockets``; how many there were."""
+    targets: List[Any] = list(sockets)
+    if targets:
+        websockets.broadcast(targets, frame)
+        STATS.fan_outs += 1
+        STATS.deliveries += len(targets)
+    return len(targets)
+
+
+# ---------------------------------------------------------------- deflate
+class SelectiveDeflate(PerMessageDeflate):
+    """permessage-deflate that leaves binary and small text messages alone."""
+
+    def __init__(self, *args, min_bytes: int = DEFAULT_COMPRESS_MIN_BYTES, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.min_bytes = min_bytes
+        self._passing = False
+
+    def encode(self, frame):
+        if frame.opcode in CTRL_OPCODES:
+            return frame
+        # Continuation frames follow the decision made for their first frame.
+        if frame.opcode is not Opcode.CONT:
+            self._passing = frame.opcode is Opcode.BINARY or len(frame.data) < self.min_bytes
+        if self._passing:
+            STATS.deflate_skipped += 1
+            return frame
+        encoded = super().encode(frame)
+        STATS.deflated += 1
+        STATS.deflate_in += len(frame.data)
+        STATS.deflate_out += len(encoded.data)
+        return encoded
+
+
+class SelectiveDeflateFactory(ServerPerMessageDeflateFactory):
+    """Negotiates permessage-deflate like the library does, then hands the
+    connection a ``SelectiveDeflate`` instead of the compress-everything one."""
+
+    def __init__(self, min_bytes: int = DEFAULT_COMPRESS_MIN_BYTES, **kwargs):
+        super().__init__(**kwargs)
+        self.min_bytes = min_bytes
+
+    def process_request_params(self, params, accepted_extensions):
+        response, ext = super().process_request_params(params, accepted_extensions)
+        return response, SelectiveDeflate(
+            ext.remote_no_context_takeover, ext.local_no_context_takeover,
+            ext.remote_max_window_bits, ext.local_max_window_bits,
+            ext.compress_settings, min_bytes=self.min_bytes)
+
+
+def serve_options(mode: str, min_bytes: int = DEFAULT_COMPRESS_MIN_BYTES) -> Dict[str, Any]:
+    """``websockets.serve`` keyword arguments for a compression mode."""
+    mode = (mode or 'off').lower()
+    if mode not in COMPRESSION_MODES:
+        raise ValueError(f"WS_COMPRESSION must be one of {', '.join(COMPRESSION_MODES)}, not {mode!r}")
+    if mode == 'off':
+        return {'compression': None}
+    # The library's own defaults: 4 KiB windows, memLevel 5 - a few KiB of
+    # zlib state per connection rather than the 256 KiB of zlib's defaults.
+    settings = dict(server_max_window_bits=12, client_max_window_bits=12,
+                    compress_settings={'memLevel': 5})
+    if mode == 'all':
+        return {'compression': None, 'extensions': [ServerPerMessageDeflateFactory(**settings)]}
+    return {'compression': None,
+            'extensions': [SelectiveDeflateFactory(min_bytes=max(0, int(min_bytes)), **settings)]}
+
+
+def stats() -> Dict[str, Any]:
+    return STATS.as_dict()
+
+
+def summary() -> str:
+    """One log line for the heartbeat."""
+    s = STATS
+    line = (f"{JSON_BACKEND}: {s.encoded} frames encoded ({s.encode_ms:.1f} ms), "
+            f"{s.deliveries} deliveries in {s.fan_outs} fan-outs")
+    if s.deflated:
+        saved = 100.0 * (s.deflate_in - s.deflate_out) / s.deflate_in if s.deflate_in else 0.0
+        line += f", deflated {s.deflated} ({saved:.0f}% smaller), {s.deflate_skipped} left plain"
+    return line
@@ -32,13 +32,14 @@ from __future__ import annotations
 
 import asyncio
 import base64
+import collections
 import datetime
 import json
 import logging
 import re
 import os
 import random
-from typing import Optional, Dict, Any, List, Callable, Awaitable
+from typing import Optional, Dict, Any, List, Callable, Awaitable, Tuple
 
 logger = logging.getLogger('GeminiGameWorker')
 
@@ -642,6 +643,104 @@ def roll_dice_notation(notation: str) -> Dict[str, Any]:
     }
 
 
+# ---------------------------------------------------------------------------
+# Player voice buffer — between the websocket reader and the Live socket.
+# ---------------------------------------------------------------------------
+
+# High-water mark, in mic frames. The client sends one frame every
+# 20-30 ms, so 64 frames is about two seconds of speech the model has not
+# taken yet. Past it the oldest frame is dropped (the model should hear
+# what the player is saying now, not a second-old backlog) and the
+# session is told to pause its mics.
+VOICE_BUFFER_FRAMES = 64
+# Low-water mark: once the pump has brought the backlog down to this many
+# frames the session is told it may send again.
+VOICE_RESUME_FRAMES = 16
+# A sequence number further behind the last one than this (frames, about
+# two seconds) is not a late frame but a client that started counting
+# again - a restart or a reconnect - and is accepted as the new start.
+VOICE_SEQ_RESTART = 100
+
+
+class VoiceFrameBuffer:
+    """Bounded FIFO of player mic frames with sequence checks.
+
+    Before this every chunk went into the worker's unbounded ``_inbox`` as
+    base64 text, so a Live socket that stalled (reconnect after a
+    turn_complete, a slow network to Google) let the queue grow without
+    limit while players kept talking, and the model then heard the whole
+    backlog late. Frames now wait here, at most ``capacity`` of them.
+
+    ``offer`` is called from the websocket reader and never blocks — it
+    returns True when the buffer has just become backlogged, so the caller
+    can tell the session's clients to pause their mics. ``take`` is awaited
+    by the worker's voice pump and returns ``(frame, resumed)``; ``resumed``
+    is True when the backlog has just drained to the low-water mark.
+
+    Binary frames carry a per-speaker sequence number: a repeated or older
+    number is dropped (``stale``), a jump forward is counted in ``gaps``.
+    The numbering starts over when the frame comes from a different
+    connection (``source``) or is more than VOICE_SEQ_RESTART behind
+    (``restarts``) - otherwise a player who reconnected would be mute until
+    the new count passed the old one. Frames from the JSON path have no
+    number and skip the check.
+    """
+
+    def __init__(self, capacity: int = VOICE_BUFFER_FRAMES,
+                 resume_at: int = VOICE_RESUME_FRAMES):
+        self.capacity = max(1, int(capacity))
+        self.resume_at = max(0, min(int(resume_at), self.capacity - 1))
+        self._frames: collections.deque = collections.deque()
+        self._ready = asyncio.Event()
+        self._last_seq: Dict[int, Tuple[Any, int]] = {}   # user -> (source, seq)
+        self.backlogged = False
+        self.stats = {'accepted': 0, 'forwarded': 0, 'dropped': 0,
+                      'stale': 0, 'gaps': 0, 'restarts': 0, 'pauses': 0}
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def offer(self, user_id: int, username: str, audio: bytes,
+              seq: Optional[int] = None, source: Any = None) -> bool:
+        if not audio:
+            return False
+        if seq is not None:
+            last_source, last = self._last_seq.get(user_id, (source, None))
+            if last is not None and last_source == source:
+                step = (seq - last) & 0xFFFFFFFF
+                if step >= 0x80000000 and 0x100000000 - step > VOICE_SEQ_RESTART:
+                    self.stats['restarts'] += 1
+                elif step == 0 or step >= 0x80000000:
+                    self.stats['stale'] += 1
+                    return False
+                else:
+                    self.stats['gaps'] += step - 1
+            self._last_seq[user_id] = (source, seq)
+        if len(self._frames) >= self.capacity:
+            self._frames.popleft()
+            self.stats['dropped'] += 1
+        self._frames.append((user_id, username, audio))
+        self.stats['accepted'] += 1
+        self._ready.set()
+        if not self.backlogged and len(self._frames) >= self.capacity:
+            self.backlogged = True
+            self.stats['pauses'] += 1
+            return True
+        return False
+
+    async def take(self):
+        while not self._frames:
+            self._ready.clear()
+            await self._ready.wait()
+        frame = self._frames.popleft()
+        self.stats['forwarded'] += 1
+        resumed = False
+        if self.backlogged and len(self._frames) <= self.resume_at:
+            self.backlogged = False
+            resumed = True
+        return frame, resumed
+
+
 # ---------------------------------------------------------------------------
 # Worker
 # ---------------------------------------------------------------------------
@@ -651,7 +750,8 @@ class GeminiGameWorker:
 
     The Titan-Net server constructs the worker, calls ``start()`` once,
     feeds it player text/voice frames via ``send_player_text`` /
-    ``send_voice_chunk``, and tears it down via ``shutdown(reason)``.
+    ``send_voice_frame`` (``send_voice_chunk`` for base64 JSON frames),
+    and tears it down via ``shutdown(reason)``.
 
     All broadcasts back to the room go through ``broadcast_cb`` (the
     server's ``_broadcast_to_session``) so we never grab a websocket
@@ -683,6 +783,9 @@ class GeminiGameWorker:
         self._task: Optional[asyncio.Task] = None
         self._stop_event = asyncio.Event()
         self._inbox: asyncio.Queue = asyncio.Queue()
+        # Player mic frames bypass the inbox: bounded, sequence-checked,
+        # drained by _pump_voice next to whichever loop is running.
+        self._voice = VoiceFrameBuffer()
         self._live_session = None  # type: Any
         self._client = None        # type: Any
         self._game: Optional[Dict[str, Any]] = None
@@ -793,10 +896,56 @@ class GeminiGameWorker:
         })
 
     async def send_voice_chunk(self, *, user_id: int, username: str, audio_b64: str):
-        await self._inbox.put({
-            'type': 'voice_chunk',
-            'user_id': user_id, 'username': username, 'audio_b64': audio_b64,
-        })
+        """JSON-path mic chunk (older clients): decode and buffer it."""
+        try:
+            audio = base64.b64decode(audio_b64)
+        except Exception:
+            return
+        await self.send_voice_frame(user_id=user_id, username=username, audio=audio)
+
+    async def send_voice_frame(self, *, user_id: int, username: str, audio: bytes,
+                               seq: Optional[int] = None, source: Any = None) -> bool:
+        """Buffer one raw mic frame. False if it was dropped as stale.
+
+        ``source`` identifies the player's connection; ``seq`` is checked
+        against the last frame from the same one.
+
+        When the buffer crosses its high-water mark the session's clients
+        get ``game_voice_backpressure`` with ``paused: true``; the pump
+        sends ``paused: false`` once the backlog has drained.
+        """
+        accepted = self._voice.stats['accepted']
+        if self._voice.offer(user_id, username, audio, seq, source):
+            logger.info(
+                f"[GAMES] session {self.session_id}: voice backlog at "
+                f"{len(self._voice)} frames, pausing mics"
+            )
+            await self._announce_voice_pressure(True)
+        return self._voice.stats['accepted'] != accepted
+
+    def voice_stats(self) -> Dict[str, int]:
+        return dict(self._voice.stats, queued=len(self._voice))
+
+    async def _announce_voice_pressure(self, paused: bool):
+        try:
+            await self._broadcast(self.session_id, {
+                "type": "game_voice_backpressure",
+                "session_id": self.session_id,
+                "paused": paused,
+            })
+        except Exception as e:
+            logger.warning(f"[GAMES] voice backpressure broadcast failed: {e}")
+
+    async def _pump_voice(self, sink: Callable[[bytes], Awaitable[None]]):
+        """Feed buffered mic frames to ``sink`` one at a time, in order."""
+        while not self._stop_event.is_set():
+            (user_id, username, audio), resumed = await self._voice.take()
+            try:
+                await sink(audio)
+            except Exception as e:
+                logger.error(f"[GAMES] live.send audio failed: {e}", exc_info=True)
+            if resumed:
+                await self._announce_voice_pressure(False)
 
     # ------------------------------------------------------------------
     # Main loop
@@ -930,7 +1079,19 @@ class GeminiGameWorker:
     # Stub loop (no SDK / wrong provider / no key)
     # ------------------------------------------------------------------
 
+    async def _stub_voice_sink(self, audio: bytes):
+        """No model is listening: the frame has been counted, drop it."""
+
     async def _stub_loop(self):
+        # Mic frames are still drained so the buffer never sits at its
+        # high-water mark and keeps the players' mics paused.
+        voice_task = asyncio.create_task(self._pump_voice(self._stub_voice_sink))
+        try:
+            await self._stub_inbox()
+        finally:
+            voice_task.cancel()
+
+    async def _stub_inbox(self):
         while not self._stop_event.is_set():
             try:
                 msg = await self._inbox.get()
@@ -1269,10 +1430,12 @@ class GeminiGameWorker:
                                 # in session 30.
                                 await self._replay_history(live)
                             drain_task = asyncio.create_task(self._drain_inbox(live))
+                            voice_task = asyncio.create_task(self._pump_voice(
+                                lambda audio, live=live: self._send_audio_chunk(live, audio)))
                             recv_task = asyncio.create_task(self._receive_loop(live))
                             stop_task = asyncio.create_task(self._stop_event.wait())
                             done, pending = await asyncio.wait(
-                                {drain_task, recv_task, stop_task},
+                                {drain_task, voice_task, recv_task, stop_task},
                                 return_when=asyncio.FIRST_COMPLETED,
                             )
                             for t in pending:
@@ -1377,7 +1540,7 @@ class GeminiGameWorker:
             })
 
     async def _drain_inbox(self, live):
-        """Forward player input (text + audio) into the Gemini Live socket.
+        """Forward typed player input into the Gemini Live socket.
 
         google-genai >= 1.0 split ``live.send(...)`` into two surfaces:
 
@@ -1390,6 +1553,8 @@ class GeminiGameWorker:
 
         We feature-detect both methods and fall back to the legacy
         ``send(input=..., end_of_turn=...)`` shape if the SDK is older.
+        Mic audio does not come through here: ``_pump_voice`` drains the
+        bounded voice buffer into ``_send_audio_chunk`` alongside this loop.
         """
         while not self._stop_event.is_set():
             msg = await self._inbox.get()
@@ -1406,17 +1571,6 @@ class GeminiGameWorker:
                 except Exception as e:
                     logger.error(f"[GAMES] live.send text failed: {e}", exc_info=True)
 
-            elif mtype == 'voice_chunk':
-                audio_b64 = msg.get('audio_b64') or ''
-                try:
-                    audio_bytes = base64.b64decode(audio_b64)
-                except Exception:
-                    continue
-                try:
-                    await self._send_audio_chunk(live, audio_bytes)
-                except Exception as e:
-                    logger.error(f"[GAMES] live.send audio failed: {e}", exc_info=True)
-
     def _record_turn(self, role: str, text: str):
         """Append to the rolling history buffer. Capped at MAX_HISTORY pairs.
 
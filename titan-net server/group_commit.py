@@ -0,0 +1,341 @@
+"""
+Group commit for the database writer thread.
+
+Every write submitted through ``Database.run_write`` runs on the single
+db-writer thread, and before this module each one was its own transaction.
+Under SQLCipher a COMMIT is the expensive part of a small write (the WAL
+frame is encrypted and HMAC'd, then fsync'd), so during busy chat hours the
+queue grew one commit at a time while the writes themselves were cheap.
+
+``GroupCommitWriter`` replaces the writer executor. It is the same single
+thread with the same ``submit() -> Future`` interface, but when several
+*batchable* writes are queued it runs them inside one transaction:
+
+    BEGIN IMMEDIATE
+      SAVEPOINT group_item ; write 1 ; RELEASE     -> result 1
+      SAVEPOINT group_item ; write 2 ; ROLLBACK TO -> write 2 raised
+      SAVEPOINT group_item ; write 3 ; RELEASE     -> result 3
+    COMMIT                                          -> futures 1 and 3 resolve,
+                                                       future 2 gets its error
+
+Guarantees (tests in test_group_commit.py):
+
+  * Order. Writes are applied in the order they were submitted, batched or
+    not; a non-batchable write ends the batch in front of it and runs after
+    it commits.
+  * Durability. A future resolves only after the COMMIT that contains its
+    write has returned - never earlier than with one transaction per write.
+    The price is latency: a write may wait up to ``window`` for company and
+    then for the others in its batch.
+  * Isolation. A write that raises is rolled back to its savepoint and gets
+    the exception; the rest of the batch commits. If SQLite abandons the
+    whole transaction (or COMMIT itself fails) the batch is rolled back and
+    every write in it is replayed on its own, exactly as before group commit
+    existed, so one poisoned batch never fails writes that would have
+    succeeded alone.
+
+Only writes marked with ``batchable`` are grouped. Inside a batch the write
+sees a connection whose ``commit()`` does nothing and whose ``rollback()``
+rolls back to the write's savepoint, so the ordinary
+``conn.commit(); conn.close()`` write body works unchanged. Anything that
+manages its own transaction (BEGIN IMMEDIATE cascades), checkpoints the WAL
+or must prove the real commit path (the heartbeat) stays unmarked and runs
+alone, as it always did.
+
+The swapped-in connection is a wrapper around the writer thread's *own*
+connection, not a shared third one, so this is not the connection sharing
+``_serialized_write`` warns against.
+"""
+
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger('TitanNetDB')
+
+_STOP = object()
+
+
+def batchable(fn):
+    """Mark a write as safe to share a transaction with other writes.
+
+    Safe means: it only uses ``db.get_connection()``, ends with
+    ``conn.commit()`` (or ``rollback()`` on its own error path), and never
+    issues BEGIN / COMMIT / PRAGMA statements of its own.
+    """
+    fn.group_commit = True
+    return fn
+
+
+class _BatchConnection:
+    """The writer connection as a write sees it inside a group commit."""
+
+    __slots__ = ('_real',)
+
+    def __init__(self, real):
+        object.__setattr__(self, '_real', real)
+
+    def __getattr__(self, name):
+        return getattr(self._real, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._real, name, value)
+
+    def commit(self):
+        # The group commits once, after the last write of the batch.
+        pass
+
+    def rollback(self):
+        self._real.execute("ROLLBACK TO SAVEPOINT group_item")
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.rollback()
+        return False
+
+
+class _Item:
+    __slots__ = ('fn', 'args', 'kwargs', 'future', 'queued_at')
+
+    def __init__(self, fn, args, kwargs):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.future = Future()
+        self.queued_at = time.perf_counter()
+
+    @property
+    def batchable(self) -> bool:
+        return bool(getattr(self.fn, 'group_commit', False))
+
+    def call(self):
+        return self.fn(*self.args, **self.kwargs)
+
+
+class GroupCommitWriter:
+    """Single writer thread that commits queued batchable writes together.
+
+    ``window`` is how long the first write of a batch waits for others
+    (seconds); writes already queued behind a running commit are always
+    picked up without waiting. ``max_batch`` bounds one transaction.
+    """
+
+    def __init__(self, db, window: float = 0.001, max_batch: int = 64,
+                 name: str = 'db-writer'):
+        self.db = db
+        self.window = max(0.0, float(window))
+        self.max_batch = max(1, int(max_batch))
+        self._queue: "queue.Queue" = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._commit_ms = deque(maxlen=512)
+        self._wait_ms = deque(maxlen=512)
+        self._counters = {
+            'submitted': 0, 'completed': 0, 'failed': 0,
+            'batches': 0, 'batched_writes': 0, 'solo_writes': 0,
+            'largest_batch': 0, 'fallbacks': 0, 'max_queue_depth': 0,
+        }
+        self._shutdown = False
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    # ------------------------------------------------------------- interface
+    def submit(self, fn, *args, **kwargs) -> Future:
+        if self._shutdown:
+            raise RuntimeError('cannot schedule new writes after shutdown')
+        item = _Item(fn, args, kwargs)
+        self._queue.put(item)
+        depth = self._queue.qsize()
+        with self._stats_lock:
+            self._counters['submitted'] += 1
+            if depth > self._counters['max_queue_depth']:
+                self._counters['max_queue_depth'] = depth
+        return item.future
+
+    def shutdown(self, wait: bool = True):
+        """Stop taking writes; queued ones still run before the thread ends."""
+        if not self._shutdown:
+            self._shutdown = True
+            self._queue.put(_STOP)
+        if wait and threading.current_thread() is not self._thread:
+            self._thread.join()
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, batch sizes and commit latency, for logs and /api."""
+        with self._stats_lock:
+            out = dict(self._counters)
+            commits = sorted(self._commit_ms)
+            waits = sorted(self._wait_ms)
+        out['queue_depth'] = self._queue.qsize()
+        out['mean_batch'] = (round(out['batched_writes'] / out['batches'], 2)
+                             if out['batches'] else 0.0)
+        out['commit_ms_p50'] = _percentile(commits, 0.50)
+        out['commit_ms_p95'] = _percentile(commits, 0.95)
+        out['commit_ms_max'] = round(commits[-1], 3) if commits else 0.0
+        out['queue_wait_ms_p95'] = _percentile(waits, 0.95)
+        out['window_ms'] = self.window * 1000.0
+        out['max_batch'] = self.max_batch
+        return out
+
+    # ---------------------------------------------------------------- thread
+    def _run(self):
+        pending: Optional[_Item] = None
+        while True:
+            item = pending if pending is not None else self._queue.get()
+            pending = None
+            if item is _STOP:
+                break
+            if not item.batchable:
+                self._run_solo(item)
+                continue
+            batch = [item]
+            deadline = time.perf_counter() + self.window
+            stop = False
+            while len(batch) < self.max_batch:
+                try:
+                    nxt = self._queue.get_nowait()
+                except queue.Empty:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    try:
+                        nxt = self._queue.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                if nxt is _STOP:
+                    stop = True
+                    break
+                if not nxt.batchable:
+                    pending = nxt      # runs after this batch commits
+                    break
+                batch.append(nxt)
+            if len(batch) == 1:
+                self._run_solo(batch[0])
+            else:
+                self._run_batch(batch)
+            if stop:
+                break
+        # Whatever arrived after shutdown() was called still gets written.
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                self._run_solo(item)
+
+    def _started(self, item: _Item) -> bool:
+        if not item.future.set_running_or_notify_cancel():
+            return False
+        self._note_wait(item)
+        return True
+
+    def _run_solo(self, item: _Item, replay: bool = False):
+        if not replay and not self._started(item):
+            return
+        started = time.perf_counter()
+        try:
+            result = item.call()
+        except BaseException as e:
+            self._finish(item, False, e)
+        else:
+            self._finish(item, True, result)
+        with self._stats_lock:
+            self._counters['solo_writes'] += 1
+            if item.batchable:
+                self._commit_ms.append((time.perf_counter() - started) * 1000.0)
+
+    def _run_batch(self, batch):
+        batch = [item for item in batch if self._started(item)]
+        if not batch:
+            return
+        db = self.db
+        outcomes = []
+        broken = False
+        with db._writer_lock:
+            db.get_connection()              # open this thread's connection
+            real = db._tls.conn
+            started = time.perf_counter()
+            try:
+                if real.in_transaction:
+                    real.commit()
+                real.execute("BEGIN IMMEDIATE")
+            except Exception as e:
+                logger.warning(f"[GROUP-COMMIT] could not begin a batch ({e}); "
+                               f"writing {len(batch)} items one by one")
+                broken = True
+            if not broken:
+                db._tls.conn = _BatchConnection(real)
+                try:
+                    for item in batch:
+                        real.execute("SAVEPOINT group_item")
+                        try:
+                            result = item.call()
+                        except BaseException as e:
+                            if not real.in_transaction:
+                                broken = True     # SQLite dropped the batch
+                                break
+                            real.execute("ROLLBACK TO SAVEPOINT group_item")
+                            real.execute("RELEASE SAVEPOINT group_item")
+                            outcomes.append((False, e))
+                        else:
+                            real.execute("RELEASE SAVEPOINT group_item")
+                            outcomes.append((True, result))
+                    if not broken:
+                        real.commit()
+                except Exception as e:
+                    logger.warning(f"[GROUP-COMMIT] batch of {len(batch)} failed "
+                                   f"({type(e).__name__}: {e}); replaying one by one")
+                    broken = True
+                finally:
+                    db._tls.conn = real
+                if broken:
+                    try:
+                        real.rollback()
+                    except Exception:
+                        pass
+            elapsed_ms = (time.perf_counter() - started) * 1000.0
+
+        if broken:
+            with self._stats_lock:
+                self._counters['fallbacks'] += 1
+            for item in batch:
+                self._run_solo(item, replay=True)
+            return
+
+        with self._stats_lock:
+            self._counters['batches'] += 1
+            self._counters['batched_writes'] += len(batch)
+            if len(batch) > self._counters['largest_batch']:
+                self._counters['largest_batch'] = len(batch)
+            self._commit_ms.append(elapsed_ms)
+        for item, (ok, value) in zip(batch, outcomes):
+            self._finish(item, ok, value)
+
+    def _finish(self, item: _Item, ok: bool, value):
+        with self._stats_lock:
+            self._counters['completed' if ok else 'failed'] += 1
+        if ok:
+            item.future.set_result(value)
+        else:
+            item.future.set_exception(value)
+
+    def _note_wait(self, item: _Item):
+        with self._stats_lock:
+            self._wait_ms.append((time.perf_counter() - item.queued_at) * 1000.0)
+
+
+def _percentile(values, fraction: float) -> float:
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(round(fraction * (len(values) - 1))))
+    return round(values[index], 3)
@@ -19,9 +19,10 @@ from typing import Dict, Optional, Any
 import mimetypes
 import urllib.parse
 import tempfile
-from models import Database
+from models import Database, history_limit, history_cursor
 from config import Config
 import remote_ui
+from profile_assets import ProfileAssetIndex
 
 # Create logs directory if it doesn't exist
 import os
@@ -290,6 +291,10 @@ class TitanNetHTTPServer:
         # What's New route
         self.app.router.add_get('/api/whats_new', self.handle_whats_new)
 
+        # Message history (keyset pages: ?before=<id>, ?after=<id>, ?limit=)
+        self.app.router.add_get('/api/rooms/{room_id}/messages', self.handle_get_room_history)
+        self.app.router.add_get('/api/messages/{user_id}', self.handle_get_private_history)
+
         # Room moderation routes
         self.app.router.add_post('/api/rooms/{room_id}/kick', self.handle_kick_user)
         self.app.router.add_post('/api/rooms/{room_id}/ban', self.handle_ban_user)
@@ -299,6 +304,7 @@ class TitanNetHTTPServer:
 
         # User sound (business card) routes
         self.app.router.add_post('/api/users/sounds/upload', self.handle_user_sound_upload)
+        self.app.router.add_delete('/api/users/sounds/{sound_type}', self.handle_user_sound_delete)
         self.app.router.add_get('/api/users/sounds/{username}/{sound_type}', self.handle_get_user_sound)
 
         # OAuth proxy routes (Spotify, Allegro, ...)
@@ -3021,6 +3027,7 @@ class TitanNetHTTPServer:
 
             if result['success']:
                 logger.info(f"User {user_id} banned from room {room_id} by {user['username']}")
+                await self._refresh_ws_room(room_id)
 
             return web.json_response(result)
 
@@ -3634,6 +3641,7 @@ class TitanNetHTTPServer:
 
             if result['success']:
                 logger.info(f"User {username} kicked from room {room_id} by {user['username']}")
+                await self._refresh_ws_room(room_id)
 
             return web.json_response(result)
 
@@ -3674,6 +3682,7 @@ class TitanNetHTTPServer:
 
             if result['success']:
                 logger.info(f"User {username} banned from room {room_id} by {user['username']}")
+                await self._refresh_ws_room(room_id)
 
             return web.json_response(result)
 
@@ -3720,6 +3729,71 @@ class TitanNetHTTPServer:
             logger.error(f"Unban user error: {e}", exc_info=True)
             return web.json_response({'success': False, 'error': str(e)}, status=500)
 
+    @staticmethod
+    def _history_query(request: web.Request):
+        """(limit, before_id, after_id) from a history request's query string."""
+        return (history_limit(request.query.get('limit')),
+                history_cursor(request.query.get('before')),
+                history_cursor(request.query.get('after')))
+
+    async def handle_get_room_history(self, request: web.Request) -> web.Response:
+        """One page of a room's message history.
+
+        ``?after=<id>`` returns only what arrived since that message, so a
+        client reopening a room fetches the new messages and nothing else;
+        ``?before=<id>`` scrolls back. Private rooms are for members only.
+        """
+        try:
+            user = self.verify_token(request)
+            if not user:
+                return web.json_response({'success': False, 'error': 'Authentication required'}, status=401)
+
+            room_id = int(request.match_info['room_id'])
+            limit, before_id, after_id = self._history_query(request)
+
+            loop = asyncio.get_event_loop()
+            room = await loop.run_in_executor(None, self.db.get_room_by_id, room_id)
+            if not room:
+                return web.json_response({'success': False, 'error': 'Room not found'}, status=404)
+            if room.get('is_private'):
+                member = await loop.run_in_executor(None, self.db.is_user_in_room, room_id, user['id'])
+                if not member:
+                    return web.json_response({'success': False, 'error': 'Not a member of this room'}, status=403)
+
+            page = await loop.run_in_executor(
+                None, self.db.get_room_message_page, room_id, limit, before_id, after_id
+            )
+            return web.json_response({'success': True, 'room_id': room_id, **page})
+
+        except ValueError:
+            return web.json_response({'success': False, 'error': 'Invalid room ID'}, status=400)
+        except Exception as e:
+            logger.error(f"Get room history error: {e}", exc_info=True)
+            return web.json_response({'success': False, 'error': str(e)}, status=500)
+
+    async def handle_get_private_history(self, request: web.Request) -> web.Response:
+        """One page of the caller's private conversation with another user."""
+        try:
+            user = self.verify_token(request)
+            if not user:
+                return web.json_response({'success': False, 'error': 'Authentication required'}, status=401)
+
+            other_user_id = int(request.match_info['user_id'])
+            limit, before_id, after_id = self._history_query(request)
+
+            loop = asyncio.get_event_loop()
+            page = await loop.run_in_executor(
+                None, self.db.get_private_message_page, user['id'], other_user_id,
+                limit, before_id, after_id
+            )
+            return web.json_response({'success': True, 'user_id': other_user_id, **page})
+
+        except ValueError:
+            return web.json_response({'success': False, 'error': 'Invalid user ID'}, status=400)
+        except Exception as e:
+            logger.error(f"Get private history error: {e}", exc_info=True)
+            return web.json_response({'success': False, 'error': str(e)}, status=500)
+
     async def handle_delete_message(self, request: web.Request) -> web.Response:
         """Delete room message (moderator only)"""
         try:
@@ -3742,6 +3816,18 @@ class TitanNetHTTPServer:
             logger.error(f"Delete message error: {e}", exc_info=True)
             return web.json_response({'success': False, 'error': str(e)}, status=500)
 
+    async def _refresh_ws_room(self, room_id) -> None:
+        """Tell the websocket server a room changed behind its handlers, so
+        its routing index and presence registry (room list, member counts)
+        pick the change up and connected clients hear about it."""
+        try:
+            ws_server = getattr(self, 'ws_server', None)
+            refresh = getattr(ws_server, 'refresh_room', None) if ws_server else None
+            if refresh:
+                await refresh(int(room_id))
+        except Exception as e:
+            logger.warning(f"Room {room_id} refresh on the live server failed: {e}")
+
     async def handle_delete_room(self, request: web.Request) -> web.Response:
         """Delete room (moderator only)"""
         try:
@@ -3757,6 +3843,7 @@ class TitanNetHTTPServer:
 
             if result['success']:
                 logger.info(f"Room {room_id} deleted by {user['username']}")
+                await self._refresh_ws_room(room_id)
 
             return web.json_response(result)
 
@@ -3771,6 +3858,18 @@ class TitanNetHTTPServer:
     VALID_SOUND_EXTENSIONS = {'.wav', '.ogg', '.mp3'}
     MAX_SOUND_SIZE = 5 * 1024 * 1024  # 5 MB per file
 
+    def _profile_assets(self) -> ProfileAssetIndex:
+        """The websocket server's profile asset index, which status
+        broadcasts read; a standalone HTTP server keeps its own, saved to
+        the same file, so the websocket server picks it up on its next start."""
+        ws_server = getattr(self, 'ws_server', None)
+        index = getattr(ws_server, '_profile_assets', None) if ws_server else None
+        if index is None:
+            index = getattr(self, '_own_profile_assets', None)
+            if index is None:
+                index = self._own_profile_assets = ProfileAssetIndex().load()
+        return index
+
     async def handle_user_sound_upload(self, request: web.Request) -> web.Response:
         """Upload a user business-card sound (login/logout/new_message/avatar)."""
         try:
@@ -3826,6 +3925,7 @@ class TitanNetHTTPServer:
 
             with open(dest_path, 'wb') as f:
                 f.write(file_data)
+            self._profile_assets().sound_uploaded(username, sound_type, ext, len(file_data))
 
             logger.info(f"User sound uploaded: {safe_username}/{sound_type}{ext} ({len(file_data)} bytes)")
 
@@ -3839,6 +3939,37 @@ class TitanNetHTTPServer:
             logger.error(f"User sound upload error: {e}", exc_info=True)
             return web.json_response({'success': False, 'error': str(e)}, status=500)
 
+    async def handle_user_sound_delete(self, request: web.Request) -> web.Response:
+        """Remove one of the caller's business-card sounds."""
+        try:
+            user = self.verify_token(request)
+            if not user:
+                return web.json_response({'success': False, 'error': 'Authentication required'}, status=401)
+
+            sound_type = request.match_info['sound_type']
+            if sound_type not in self.VALID_SOUND_TYPES:
+                return web.json_response({'success': False, 'error': 'Invalid sound type'}, status=400)
+
+            username = user['username']
+            safe_username = re.sub(r'[^a-zA-Z0-9._-]', '_', username)
+            user_sfx_dir = os.path.join('data', 'sfx', safe_username)
+            removed = False
+            for ext in self.VALID_SOUND_EXTENSIONS:
+                file_path = os.path.join(user_sfx_dir, f'{sound_type}{ext}')
+                if os.path.exists(file_path):
+                    os.remove(file_path)
+                    removed = True
+            self._profile_assets().sound_deleted(username, sound_type)
+
+            if not removed:
+                return web.json_response({'success': False, 'error': 'Sound not found'}, status=404)
+            logger.info(f"User sound deleted: {safe_username}/{sound_type}")
+            return web.json_response({'success': True, 'sound_type': sound_type})
+
+        except Exception as e:
+            logger.error(f"User sound delete error: {e}", exc_info=True)
+            return web.json_response({'success': False, 'error': str(e)}, status=500)
+
     async def handle_get_user_sound(self, request: web.Request) -> web.Response:
         """Download a user's business-card sound."""
         try:
@@ -0,0 +1,279 @@
+"""
+Message router - from a websocket message's ``type`` to its handler.
+
+``handle_client`` used to reach the handlers through one if/elif chain of
+about ninety branches. A message near the end of it (the games, Cerberus
+admin commands) paid for every string comparison in front of it, adding a
+feature made everything after it slower, and nothing counted how often each
+type arrived or how long it took.
+
+Every authenticated message type is now one ``Route`` in a dict:
+
+    handler   the server method that answers it
+    data      whether the handler takes the payload (``handler(sid, data)``)
+    reply     whether the handler's return value is sent back to the client
+    auth      'session' (must be logged in) or 'none'; roles (moderator,
+              admin, developer) stay checked inside the handlers, which
+              know their own rules
+    rate      rate class, see ``RATE_CLASSES``: how many a session may send
+              and whether each one is logged
+    schema    payload fields the handler relies on, see ``validate``
+
+Dispatch is one dict lookup whatever the number of routes. ``login`` and
+``register`` are not routes: they run before there is a session, carry the
+Cerberus brute-force bookkeeping and set the connection's session id, so
+``handle_client`` keeps them inline.
+
+Per type the router keeps calls, errors (the handler raised), rejections
+(not logged in, over the rate, bad payload) and a latency histogram. The
+``router_stats`` message returns them to moderators; the heartbeat logs the
+busiest and slowest types.
+"""
+
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import frames
+
+# Latency histogram bucket upper bounds, milliseconds. The last bucket
+# catches everything slower.
+LATENCY_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500,
+                      1000, 2500, 5000, float('inf'))
+
+# Rate classes: (messages per second, burst) per session, and whether each
+# message is written to the log. ``stream`` is voice (about 33 per second
+# per speaker; the Cerberus flood check still applies), ``poll`` the list
+# and history requests clients repeat, ``heavy`` uploads and admin actions.
+RATE_CLASSES: Dict[str, Dict[str, Any]] = {
+    'stream': {'rate': None, 'burst': None, 'log': False},
+    'poll':   {'rate': 20.0, 'burst': 60, 'log': False},
+    'normal': {'rate': 10.0, 'burst': 40, 'log': True},
+    'heavy':  {'rate': 1.0,  'burst': 10, 'log': True},
+}
+
+# Schema field kinds. Validation only rejects a payload a handler could not
+# use; it never converts values. Ids may arrive as JSON numbers or, from the
+# web client, as digit strings.
+def _is_id(value) -> bool:
+    if isinstance(value, bool):
+        return False
+    if isinstance(value, int):
+        return True
+    return isinstance(value, str) and value.strip().isdigit()
+
+
+FIELD_KINDS: Dict[str, Callable[[Any], bool]] = {
+    'id': _is_id,
+    'text': lambda v: isinstance(v, str),
+    'number': lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    'bool': lambda v: isinstance(v, bool),
+    'dict': lambda v: isinstance(v, dict),
+    'list': lambda v: isinstance(v, list),
+}
+
+
+def validate(schema: Optional[Dict[str, str]], data: Dict) -> Optional[str]:
+    """Check ``data`` against ``schema``; the problem, or None if it is fine.
+
+    ``schema`` maps field name to kind (see FIELD_KINDS). A kind ending in
+    ``?`` is optional: it may be missing or null, but if present must fit.
+    """
+    if not schema:
+        return None
+    for field, kind in schema.items():
+        optional = kind.endswith('?')
+        value = data.get(field)
+        if value is None or value == '':
+            if optional:
+                continue
+            return f"{field} is required"
+        if not FIELD_KINDS[kind.rstrip('?')](value):
+            return f"{field} must be {kind.rstrip('?')}"
+    return None
+
+
+class Route:
+    __slots__ = ('type', 'handler', 'data', 'reply', 'auth', 'rate', 'schema', 'log')
+
+    def __init__(self, msg_type: str, handler: Callable, data: bool = True,
+                 reply: bool = True, auth: str = 'session', rate: str = 'normal',
+                 schema: Optional[Dict[str, str]] = None):
+        if auth not in ('session', 'none'):
+            raise ValueError(f"route {msg_type}: unknown auth {auth!r}")
+        if rate not in RATE_CLASSES:
+            raise ValueError(f"route {msg_type}: unknown rate class {rate!r}")
+        for kind in (schema or {}).values():
+            if kind.rstrip('?') not in FIELD_KINDS:
+                raise ValueError(f"route {msg_type}: unknown field kind {kind!r}")
+        self.type = msg_type
+        self.handler = handler
+        self.data = data
+        self.reply = reply
+        self.auth = auth
+        self.rate = rate
+        self.schema = schema
+        self.log = RATE_CLASSES[rate]['log']
+
+
+class _TypeStats:
+    __slots__ = ('calls', 'errors', 'rejected', 'total_ms', 'max_ms', 'buckets')
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.rejected = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * len(LATENCY_BUCKETS_MS)
+
+    def record(self, elapsed_ms: float):
+        self.calls += 1
+        self.total_ms += elapsed_ms
+        if elapsed_ms > self.max_ms:
+            self.max_ms = elapsed_ms
+        for i, bound in enumerate(LATENCY_BUCKETS_MS):
+            if elapsed_ms <= bound:
+                self.buckets[i] += 1
+                break
+
+    def percentile(self, fraction: float) -> float:
+        """Upper bound of the bucket holding the given fraction of calls."""
+        if not self.calls:
+            return 0.0
+        wanted = fraction * self.calls
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS_MS, self.buckets):
+            seen += count
+            if seen >= wanted:
+                return round(self.max_ms if bound == float('inf') else bound, 3)
+        return round(self.max_ms, 3)
+
+    def as_dict(self) -> Dict[str, Any]:
+        calls = self.calls
+        return {
+            'calls': calls,
+            'errors': self.errors,
+            'rejected': self.rejected,
+            'error_rate': round(self.errors / calls, 4) if calls else 0.0,
+            'mean_ms': round(self.total_ms / calls, 3) if calls else 0.0,
+            'p50_ms': self.percentile(0.50),
+            'p95_ms': self.percentile(0.95),
+            'p99_ms': self.percentile(0.99),
+            'max_ms': round(self.max_ms, 3),
+            'histogram': {
+                ('inf' if bound == float('inf') else str(bound)): count
+                for bound, count in zip(LATENCY_BUCKETS_MS, self.buckets) if count
+            },
+        }
+
+
+class MessageRouter:
+    """Dispatch table for authenticated websocket messages."""
+
+    def __init__(self):
+        self._routes: Dict[str, Route] = {}
+        self._stats: Dict[str, _TypeStats] = {}
+        # {session_id: {rate_class: (tokens, last_refill)}}
+        self._buckets: Dict[str, Dict[str, Tuple[float, float]]] = {}
+        self.unknown = 0
+        self.started = time.time()
+
+    def add(self, msg_type: str, handler: Callable, **options) -> Route:
+        if msg_type in self._routes:
+            raise ValueError(f"route {msg_type} registered twice")
+        route = Route(msg_type, handler, **options)
+        self._routes[msg_type] = route
+        self._stats[msg_type] = _TypeStats()
+        return route
+
+    def route(self, msg_type: Optional[str]) -> Optional[Route]:
+        return self._routes.get(msg_type)
+
+    def should_log(self, msg_type: Optional[str]) -> bool:
+        route = self._routes.get(msg_type)
+        return route is None or route.log
+
+    def forget_session(self, session_id: str):
+        self._buckets.pop(session_id, None)
+
+    def _allow(self, session_id: str, rate_class: str) -> bool:
+        spec = RATE_CLASSES[rate_class]
+        if spec['rate'] is None:
+            return True
+        now = time.monotonic()
+        buckets = self._buckets.setdefault(session_id, {})
+        tokens, last = buckets.get(rate_class, (float(spec['burst']), now))
+        tokens = min(float(spec['burst']), tokens + (now - last) * spec['rate'])
+        if tokens < 1.0:
+            buckets[rate_class] = (tokens, now)
+            return False
+        buckets[rate_class] = (tokens - 1.0, now)
+        return True
+
+    async def dispatch(self, session_id: Optional[str], websocket, msg_type: Optional[str],
+                       data: Dict) -> bool:
+        """Run the handler for ``msg_type``. False if there is no such route.
+
+        A rejected message is answered with an ``error`` naming the type. A
+        handler that raises is counted and the exception re-raised, so
+        ``handle_client`` logs it exactly as before.
+        """
+        route = self._routes.get(msg_type)
+        if route is None:
+            self.unknown += 1
+            return False
+        stats = self._stats[msg_type]
+
+        problem = None
+        if route.auth == 'session' and not session_id:
+            problem = "Not authenticated"
+        elif session_id and not self._allow(session_id, route.rate):
+            problem = "Rate limited"
+        else:
+            problem = validate(route.schema, data)
+            if problem:
+                problem = f"Invalid {msg_type}: {problem}"
+        if problem:
+            stats.rejected += 1
+            await websocket.send(frames.encode({"type": "error", "error": problem,
+                                                "request_type": msg_type}))
+            return True
+
+        started = time.perf_counter()
+        try:
+            if route.data:
+                response = await route.handler(session_id, data)
+            else:
+                response = await route.handler(session_id)
+            if route.reply:
+                await websocket.send(frames.encode(response))
+        except Exception:
+            stats.errors += 1
+            raise
+        finally:
+            stats.record((time.perf_counter() - started) * 1000.0)
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-type counters and latency for every type seen at least once."""
+        types = {name: s.as_dict() for name, s in self._stats.items()
+                 if s.calls or s.rejected}
+        return {
+            'since': self.started,
+            'routes': len(self._routes),
+            'unknown_types': self.unknown,
+            'types': types,
+        }
+
+    def summary(self, top: int = 5) -> str:
+        """One log line: the busiest and the slowest (p95) types."""
+        seen = [(name, s) for name, s in self._stats.items() if s.calls]
+        if not seen:
+            return "no messages"
+        busiest = sorted(seen, key=lambda item: item[1].calls, reverse=True)[:top]
+        slowest = sorted(seen, key=lambda item: item[1].percentile(0.95), reverse=True)[:top]
+        errors = sum(s.errors for _, s in seen)
+        rejected = sum(s.rejected for s in self._stats.values())
+        return ("busiest " + ", ".join(f"{n} {s.calls}" for n, s in busiest)
+                + "; slowest p95 " + ", ".join(f"{n} {s.percentile(0.95)} ms" for n, s in slowest)
+                + f"; errors {errors}, rejected {rejected}")
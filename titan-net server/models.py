@@ -34,6 +34,8 @@ import logging
 from argon2 import PasswordHasher
 from argon2.exceptions import VerifyMismatchError, InvalidHash, VerificationError
 
+from group_commit import GroupCommitWriter, batchable
+
 # RFC-9106 baseline parameters: 64 MiB memory, 3 iterations, 4 lanes.
 # ~80-150 ms per verify on a typical Linux server, comfortably inside the
 # 8 s wait_for(authenticate_user) ceiling in server.py.
@@ -54,6 +56,29 @@ logger = logging.getLogger('TitanNetDB')
 _LIVE_INSTANCES: Dict[str, "Database"] = {}
 _LIVE_INSTANCES_LOCK = threading.Lock()
 
+# Message history pages. A page is at most this many messages, whatever the
+# client asks for; older history is reached with ``before_id``.
+HISTORY_DEFAULT_LIMIT = 100
+HISTORY_MAX_LIMIT = 500
+
+
+def history_limit(value, default: int = HISTORY_DEFAULT_LIMIT) -> int:
+    """A client-supplied page size, clamped to 1..HISTORY_MAX_LIMIT."""
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(value, HISTORY_MAX_LIMIT))
+
+
+def history_cursor(value) -> Optional[int]:
+    """A client-supplied message id cursor, or None when absent / invalid."""
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return None
+    return value if value > 0 else None
+
 
 def _is_pid_alive(pid: int) -> bool:
     """Cross-platform check whether a PID is currently alive."""
@@ -225,6 +250,15 @@ class Database:
             self.db_key = Config.DATABASE_KEY
         except Exception:
             self.db_key = None
+        try:
+            from config import Config
+            group_commit = Config.DB_GROUP_COMMIT
+            group_window_ms = Config.DB_GROUP_COMMIT_WINDOW_MS
+            group_max_batch = Config.DB_GROUP_COMMIT_MAX_BATCH
+        except Exception:
+            group_commit = os.getenv('DB_GROUP_COMMIT', '1') == '1'
+            group_window_ms = float(os.getenv('DB_GROUP_COMMIT_WINDOW_MS', 1))
+            group_max_batch = int(os.getenv('DB_GROUP_COMMIT_MAX_BATCH', 64))
 
         # Thread-local connection pool. SQLCipher's PBKDF2 key derivation is
         # the dominant cost of opening a connection; caching one real
@@ -268,9 +302,21 @@ class Database:
         # status updates, etc.) MUST migrate to `run_write`. Lower-traffic
         # writes can stay on the legacy thread-local pool until they are
         # touched, but any NEW write code is required to use `run_write`.
-        self._writer_executor = ThreadPoolExecutor(
-            max_workers=1, thread_name_prefix='db-writer'
-        )
+        #
+        # With DB_GROUP_COMMIT on (the default) the "executor" is a
+        # GroupCommitWriter: the same single thread and submit() interface,
+        # but queued writes marked @batchable share one transaction, one
+        # savepoint each. Ordering, durability and failure isolation are
+        # spelled out in group_commit.py.
+        if group_commit:
+            self._writer_executor = GroupCommitWriter(
+                self, window=group_window_ms / 1000.0,
+                max_batch=group_max_batch,
+            )
+        else:
+            self._writer_executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix='db-writer'
+            )
         # Lock for ad-hoc serialization when callers can't easily refactor
         # to the executor pattern (e.g. multi-statement transactions that
         # must stay in the calling thread).
@@ -650,6 +696,14 @@ class Database:
         """
         return self._writer_executor.submit(fn, *args, **kwargs)
 
+    def writer_stats(self) -> Dict[str, Any]:
+        """Writer queue depth, batch sizes and commit latency (group commit).
+
+        Empty when group commit is off: a plain executor keeps no figures.
+        """
+        stats = getattr(self._writer_executor, 'stats', None)
+        return stats() if stats else {}
+
     async def run_write_async(self, fn, *args, **kwargs):
         """Async helper that awaits a write submitted through `run_write`."""
         import asyncio
@@ -1750,6 +1804,12 @@ class Database:
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_private_messages_recipient_read ON private_messages(recipient_id, read)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_private_messages_sent_at ON private_messages(sent_at)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_room_messages_room_sent ON room_messages(room_id, sent_at)")
+            # Keyset history pages walk a conversation by message id. Room
+            # history needs nothing new: idx_room_messages_room already is
+            # (room_id, id), since SQLite appends the rowid (= id) to every
+            # index. A private conversation is two directions, each of which
+            # this index serves in id order.
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_private_messages_pair ON private_messages(sender_id, recipient_id, id)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_forum_topics_updated ON forum_topics(updated_at DESC)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_forum_topics_pinned_updated ON forum_topics(is_pinned DESC, updated_at DESC)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_app_repository_approved ON app_repository(approved, approved_at)")
@@ -2724,6 +2784,7 @@ class Database:
             return dict(user)
         return None
 
+    @batchable
     @_serialized_write
     def update_user_status(self, user_id: int, status: str):
         """Update user online status"""
@@ -2859,6 +2920,7 @@ class Database:
         conn.close()
         return users
 
+    @batchable
     @_serialized_write
     def send_private_message(self, sender_id: int, recipient_id: int, message: str) -> Dict[str, Any]:
         """Send private message"""
@@ -2883,27 +2945,90 @@ class Database:
             "sent_at": sent_at
         }
 
-    def get_private_messages(self, user1_id: int, user2_id: int, limit: int = 100) -> List[Dict[str, Any]]:
-        """Get private messages between two users"""
+    @staticmethod
+    def _history_bounds(column: str, before_id: Optional[int],
+                        after_id: Optional[int]) -> Tuple[str, List[int]]:
+        """SQL (leading AND included) and parameters for an id window."""
+        sql, params = "", []
+        if before_id:
+            sql += f" AND {column} < ?"
+            params.append(before_id)
+        if after_id:
+            sql += f" AND {column} > ?"
+            params.append(after_id)
+        return sql, params
+
+    @staticmethod
+    def _history_page(rows, limit: int) -> Dict[str, Any]:
+        """Turn ``limit + 1`` newest-first rows into a page.
+
+        The extra row is only there to tell whether anything older is left
+        inside the requested window; it is not returned.
+        """
+        messages = [dict(row) for row in rows[:limit]]
+        return {
+            "messages": messages,
+            "has_more": len(rows) > limit,
+            "newest_id": messages[0]['id'] if messages else None,
+            "oldest_id": messages[-1]['id'] if messages else None,
+        }
+
+    def get_private_message_page(self, user1_id: int, user2_id: int,
+                                 limit: int = HISTORY_DEFAULT_LIMIT,
+                                 before_id: Optional[int] = None,
+                                 after_id: Optional[int] = None) -> Dict[str, Any]:
+        """One page of the conversation between two users, newest first.
+
+        ``before_id`` pages back through history (pass the previous page's
+        ``oldest_id``); ``after_id`` asks only for what arrived since the
+        newest message the client already has. ``has_more`` says older
+        messages remain inside that window - for an ``after_id`` request it
+        means the gap was larger than one page.
+
+        Each direction of the conversation is read separately through
+        idx_private_messages_pair, newest first and cut at the page size,
+        so a page costs the same however long the conversation is. (The
+        single OR query this replaces had to sort the whole conversation.)
+        """
+        bounds, bound_params = self._history_bounds('id', before_id, after_id)
+        fetch = limit + 1
         conn = self.get_connection()
         cursor = conn.cursor()
 
-        cursor.execute("""
+        cursor.execute(f"""
             SELECT pm.*,
                    u1.username as sender_username,
                    u2.username as recipient_username
-            FROM private_messages pm
+            FROM (
+                SELECT * FROM (
+                    SELECT * FROM private_messages
+                    WHERE sender_id = ? AND recipient_id = ?{bounds}
+                    ORDER BY id DESC LIMIT ?
+                )
+                UNION ALL
+                SELECT * FROM (
+                    SELECT * FROM private_messages
+                    WHERE sender_id = ? AND recipient_id = ?{bounds}
+                    ORDER BY id DESC LIMIT ?
+                )
+            ) pm
             JOIN users u1 ON pm.sender_id = u1.id
             JOIN users u2 ON pm.recipient_id = u2.id
-            WHERE (pm.sender_id = ? AND pm.recipient_id = ?)
-               OR (pm.sender_id = ? AND pm.recipient_id = ?)
-            ORDER BY pm.sent_at DESC
+            ORDER BY pm.id DESC
             LIMIT ?
-        """, (user1_id, user2_id, user2_id, user1_id, limit))
+        """, (user1_id, user2_id, *bound_params, fetch,
+              user2_id, user1_id, *bound_params, fetch, fetch))
 
-        messages = [dict(row) for row in cursor.fetchall()]
+        page = self._history_page(cursor.fetchall(), limit)
         conn.close()
-        return messages
+        return page
+
+    def get_private_messages(self, user1_id: int, user2_id: int, limit: int = 100,
+                             before_id: Optional[int] = None,
+                             after_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Get private messages between two users (newest first)"""
+        return self.get_private_message_page(user1_id, user2_id, limit,
+                                             before_id, after_id)['messages']
 
     def get_unread_private_messages_summary(self, user_id: int) -> List[Dict[str, Any]]:
         """Get summary of unread private messages grouped by sender"""
@@ -2924,6 +3049,7 @@ class Database:
         conn.close()
         return summary
 
+    @batchable
     @_serialized_write
     def mark_private_messages_as_read(self, recipient_id: int, sender_id: int) -> bool:
         """Mark all unread private messages from sender to recipient as read"""
@@ -3049,13 +3175,15 @@ class Database:
             return {"success": False, "error": "Already a member"}
 
     @_serialized_write
-    def leave_chat_room(self, room_id: int, user_id: int):
-        """Leave chat room"""
+    def leave_chat_room(self, room_id: int, user_id: int) -> bool:
+        """Leave chat room. True if the user was a member."""
         conn = self.get_connection()
         cursor = conn.cursor()
         cursor.execute("DELETE FROM room_members WHERE room_id = ? AND user_id = ?", (room_id, user_id))
+        left = cursor.rowcount > 0
         conn.commit()
         conn.close()
+        return left
 
     @_serialized_write
     def delete_chat_room(self, room_id: int, user_id: int) -> bool:
@@ -3080,6 +3208,7 @@ class Database:
         conn.close()
         return True
 
+    @batchable
     @_serialized_write
     def send_room_message(self, room_id: int, user_id: int, message: str) -> Dict[str, Any]:
         """Send message to chat room"""
@@ -3104,42 +3233,73 @@ class Database:
             "sent_at": sent_at
         }
 
-    def get_room_messages(self, room_id: int, limit: int = 100) -> List[Dict[str, Any]]:
-        """Get messages from chat room"""
+    def get_room_message_page(self, room_id: int, limit: int = HISTORY_DEFAULT_LIMIT,
+                              before_id: Optional[int] = None,
+                              after_id: Optional[int] = None) -> Dict[str, Any]:
+        """One page of a room's history, newest first.
+
+        Same cursors and page shape as get_private_message_page. The query
+        walks idx_room_messages_room backwards from the cursor and stops
+        after ``limit + 1`` rows.
+        """
+        bounds, bound_params = self._history_bounds('rm.id', before_id, after_id)
         conn = self.get_connection()
         cursor = conn.cursor()
 
-        cursor.execute("""
+        cursor.execute(f"""
             SELECT rm.*, u.username, u.titan_number
             FROM room_messages rm
             JOIN users u ON rm.user_id = u.id
-            WHERE rm.room_id = ?
-            ORDER BY rm.sent_at DESC
+            WHERE rm.room_id = ?{bounds}
+            ORDER BY rm.id DESC
             LIMIT ?
-        """, (room_id, limit))
+        """, (room_id, *bound_params, limit + 1))
 
-        messages = [dict(row) for row in cursor.fetchall()]
+        page = self._history_page(cursor.fetchall(), limit)
         conn.close()
-        return messages
+        return page
+
+    def get_room_messages(self, room_id: int, limit: int = 100,
+                          before_id: Optional[int] = None,
+                          after_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Get messages from chat room (newest first)"""
+        return self.get_room_message_page(room_id, limit, before_id, after_id)['messages']
+
+    _ROOM_SUMMARY_SQL = """
+        SELECT cr.*, u.username as creator_username,
+               COALESCE(COUNT(rm.user_id), 0) as member_count
+        FROM chat_rooms cr
+        JOIN users u ON cr.creator_id = u.id
+        LEFT JOIN room_members rm ON rm.room_id = cr.id
+    """
 
     def get_available_rooms(self) -> List[Dict[str, Any]]:
         """Get list of all chat rooms - optimized with GROUP BY instead of correlated subquery"""
         conn = self.get_connection()
         cursor = conn.cursor()
 
-        cursor.execute("""
-            SELECT cr.*, u.username as creator_username,
-                   COALESCE(COUNT(rm.user_id), 0) as member_count
-            FROM chat_rooms cr
-            JOIN users u ON cr.creator_id = u.id
-            LEFT JOIN room_members rm ON rm.room_id = cr.id
-            GROUP BY cr.id
-        """)
+        cursor.execute(self._ROOM_SUMMARY_SQL + " GROUP BY cr.id")
 
         rooms = [dict(row) for row in cursor.fetchall()]
         conn.close()
         return rooms
 
+    def get_room_summary(self, room_id: int) -> Optional[Dict[str, Any]]:
+        """One row of ``get_available_rooms`` (None if the room is gone).
+
+        Used by the server's presence registry to pick up a room that was
+        created, or changed behind its back (moderator kick / ban / delete
+        over HTTP), without reloading the whole list.
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute(self._ROOM_SUMMARY_SQL + " WHERE cr.id = ? GROUP BY cr.id", (room_id,))
+
+        row = cursor.fetchone()
+        conn.close()
+        return dict(row) if row else None
+
     def get_room_by_id(self, room_id: int) -> Optional[Dict[str, Any]]:
         """Get room information by ID"""
         conn = self.get_connection()
@@ -6778,6 +6938,7 @@ class Database:
         conn.close()
         return {"success": True, "status": status}
 
+    @batchable
     @_serialized_write
     def log_session_event(self, session_id: int, turn_n: int, actor: str,
                           action_type: str, payload: Optional[Dict] = None) -> int:
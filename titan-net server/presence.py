@@ -0,0 +1,149 @@
+"""
+Versioned in-memory directory of who is online and which rooms exist.
+
+``get_online_users`` and ``get_rooms`` used to be answered from the database
+behind 2 s / 3 s timed caches. Every client polls both lists while the
+matching view is open, so under load the server re-ran the same two queries
+on a timer whether anything had changed or not - and for a couple of seconds
+after a change it still served the old list.
+
+Everything that changes these lists already passes through a server handler
+(connect, disconnect, create / delete room, join / leave room), so the
+handlers now update ``PresenceRegistry`` directly and the lists are served
+from memory. Each change bumps ``version`` and returns a delta message,
+which the server broadcasts as ``directory_delta``:
+
+    {"type": "directory_delta", "version": 42, "op": "user_online",  "user": {...}}
+    {"type": "directory_delta", "version": 43, "op": "user_offline", "user_id": 7}
+    {"type": "directory_delta", "version": 44, "op": "room_added",   "room": {...}}
+    {"type": "directory_delta", "version": 45, "op": "room_updated", "room": {...}}
+    {"type": "directory_delta", "version": 46, "op": "room_removed", "room_id": 3}
+    {"type": "directory_delta", "version": 47, "op": "room_members", "room_id": 3,
+                                                  "member_count": 5}
+
+A client takes one ``get_directory`` snapshot, applies the deltas with a
+higher version on top of it, and never has to poll the lists again. User
+deltas are filtered per viewer like every other presence message (blocked
+parties never see each other), so versions a viewer receives are increasing
+but not contiguous; ordering on the one websocket is what keeps the mirror
+correct, not gap detection. When a block or unblock changes what a viewer
+may see, that viewer is sent ``op: "resync"`` and takes a fresh snapshot.
+
+The registry is touched only from the asyncio loop, like ``_blocks`` and the
+routing index, so it has no lock. Online users are not loaded from the
+database: ``main.py`` marks everybody offline at startup, so the registry
+starts empty and fills as sessions log in. Rooms are loaded once when the
+server is constructed.
+"""
+
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# What a room row carries to clients. ``get_available_rooms`` selects
+# ``cr.*``, which includes ``password_hash``; that never leaves the server.
+_PRIVATE_ROOM_FIELDS = ('password_hash',)
+
+# What an online-user entry carries (same columns get_online_users selects).
+USER_FIELDS = ('id', 'username', 'titan_number', 'full_name', 'status')
+
+
+def _room_key(room_id) -> Any:
+    """Room ids arrive from clients as whatever JSON they sent; rooms are
+    keyed by the integer primary key."""
+    try:
+        return int(room_id)
+    except (TypeError, ValueError):
+        return room_id
+
+
+def _public_room(row: Dict[str, Any]) -> Dict[str, Any]:
+    room = {k: v for k, v in dict(row).items() if k not in _PRIVATE_ROOM_FIELDS}
+    room['member_count'] = int(room.get('member_count') or 0)
+    return room
+
+
+class PresenceRegistry:
+    """Online users and rooms, plus a version counter bumped on every change.
+
+    Mutators return the ``directory_delta`` message to broadcast, or None
+    when nothing changed (a second session of a user already online, a
+    room that is already gone), so callers never announce a no-op.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self._users: Dict[int, Dict[str, Any]] = {}
+        self._rooms: Dict[int, Dict[str, Any]] = {}
+
+    def _delta(self, op: str, **fields) -> Dict[str, Any]:
+        self.version += 1
+        return {"type": "directory_delta", "version": self.version, "op": op, **fields}
+
+    # ---------------------------------------------------------------- users
+    def user_online(self, user: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        entry = {field: user.get(field) for field in USER_FIELDS}
+        entry['status'] = 'online'
+        if self._users.get(entry['id']) == entry:
+            return None
+        self._users[entry['id']] = entry
+        return self._delta("user_online", user=entry)
+
+    def user_offline(self, user_id: int) -> Optional[Dict[str, Any]]:
+        if self._users.pop(user_id, None) is None:
+            return None
+        return self._delta("user_offline", user_id=user_id)
+
+    def is_online(self, user_id: int) -> bool:
+        return user_id in self._users
+
+    def online_users(self, visible: Optional[Callable[[int], bool]] = None) -> List[Dict[str, Any]]:
+        """Online users, in login order; ``visible(user_id)`` filters per viewer."""
+        if visible is None:
+            return list(self._users.values())
+        return [u for u in self._users.values() if visible(u['id'])]
+
+    # ---------------------------------------------------------------- rooms
+    def load_rooms(self, rows: Iterable[Dict[str, Any]]):
+        """Replace the room list (startup). Not a change clients are told about."""
+        self._rooms = {}
+        for row in rows:
+            room = _public_room(row)
+            self._rooms[room['id']] = room
+
+    def room_added(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        room = _public_room(row)
+        op = "room_updated" if room['id'] in self._rooms else "room_added"
+        self._rooms[room['id']] = room
+        return self._delta(op, room=room)
+
+    def room_removed(self, room_id: int) -> Optional[Dict[str, Any]]:
+        room_id = _room_key(room_id)
+        if self._rooms.pop(room_id, None) is None:
+            return None
+        return self._delta("room_removed", room_id=room_id)
+
+    def room_members_changed(self, room_id: int, change: int) -> Optional[Dict[str, Any]]:
+        """Adjust ``member_count`` by ``change`` (+1 join, -1 leave)."""
+        room_id = _room_key(room_id)
+        room = self._rooms.get(room_id)
+        if room is None or not change:
+            return None
+        count = max(0, room['member_count'] + change)
+        if count == room['member_count']:
+            return None
+        room['member_count'] = count
+        return self._delta("room_members", room_id=room_id, member_count=count)
+
+    def has_room(self, room_id: int) -> bool:
+        return _room_key(room_id) in self._rooms
+
+    def rooms(self) -> List[Dict[str, Any]]:
+        return list(self._rooms.values())
+
+    # ------------------------------------------------------------- snapshot
+    def snapshot(self, visible: Optional[Callable[[int], bool]] = None) -> Dict[str, Any]:
+        """Everything a client needs to start following the deltas."""
+        return {
+            "version": self.version,
+            "users": self.online_users(visible),
+            "rooms": self.rooms(),
+        }
@@ -0,0 +1,161 @@
+"""
+Per-user profile assets - what a status broadcast needs to know, in memory.
+
+Every ``user_status`` broadcast used to read the user back from the database
+and list ``data/sfx/<user>`` to fill in ``has_custom_sounds``; the login
+response and every private message listed the directory again. After a
+server restart everybody reconnects within a few seconds, and each
+reconnect was a database read plus a directory scan on the executor - a
+few thousand of them queued behind the logins they were slowing down.
+
+``ProfileAssetIndex`` keeps the answers instead:
+
+    sounds   safe username -> {sound type: {"ext", "size", "updated"}}
+    cards    user id       -> {"username", "titan_number"}
+
+Sounds change only through the HTTP upload and delete handlers
+(http_server.py), which update the index as they write or remove the file.
+The index is saved to ``data/profile_assets.json`` after each change, so a
+restart loads one small file instead of scanning the sound directories. If
+the file is missing or unreadable the directories are scanned once and the
+file written again; delete it to force that after editing ``data/sfx`` by
+hand.
+
+Cards are filled from the user row the login already has in hand, and
+usernames and Titan numbers never change, so a status broadcast for a user
+who logged in since the start is pure memory work. They are not saved: the
+database is encrypted and a plain JSON list of every user would undo that.
+
+Touched only from the asyncio loop (the HTTP server runs on the same loop
+in main.py); no lock.
+"""
+
+import json
+import logging
+import os
+import re
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger('TitanNetServer')
+
+SOUND_TYPES = ('login', 'logout', 'new_message', 'avatar')
+SOUND_EXTENSIONS = ('.wav', '.ogg', '.mp3')
+
+DEFAULT_SFX_ROOT = os.path.join('data', 'sfx')
+DEFAULT_INDEX_PATH = os.path.join('data', 'profile_assets.json')
+INDEX_VERSION = 1
+
+
+def safe_name(username: str) -> str:
+    """The directory a user's sounds live in (same rule as the handlers)."""
+    return re.sub(r'[^a-zA-Z0-9._-]', '_', username or '')
+
+
+class ProfileAssetIndex:
+    """Custom sounds per user, plus the user fields status broadcasts carry."""
+
+    def __init__(self, sfx_root: str = DEFAULT_SFX_ROOT, path: Optional[str] = DEFAULT_INDEX_PATH):
+        self.sfx_root = sfx_root
+        # path None keeps the index in memory only (tests, tools).
+        self.path = path
+        self._sounds: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._cards: Dict[int, Dict[str, Any]] = {}
+        self.stats = {'lookups': 0, 'card_misses': 0, 'scans': 0, 'saves': 0}
+
+    # ------------------------------------------------------------ storage
+    def load(self) -> 'ProfileAssetIndex':
+        """Load the saved index, or scan the sound directories once."""
+        if self.path and os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    saved = json.load(f)
+                if saved.get('version') == INDEX_VERSION:
+                    self._sounds = {name: dict(sounds) for name, sounds in saved['sounds'].items()}
+                    logger.info(f"[ASSETS] loaded sounds of {len(self._sounds)} users from {self.path}")
+                    return self
+            except Exception as e:
+                logger.warning(f"[ASSETS] {self.path} unreadable ({e}); rescanning {self.sfx_root}")
+        self.rebuild()
+        self.save()
+        return self
+
+    def rebuild(self):
+        """Scan ``sfx_root``: one listing per user directory."""
+        sounds: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        try:
+            names = os.listdir(self.sfx_root)
+        except FileNotFoundError:
+            names = []
+        for name in names:
+            user_dir = os.path.join(self.sfx_root, name)
+            if not os.path.isdir(user_dir):
+                continue
+            found = {}
+            for filename in os.listdir(user_dir):
+                stem, ext = os.path.splitext(filename)
+                if stem in SOUND_TYPES and ext.lower() in SOUND_EXTENSIONS:
+                    st = os.stat(os.path.join(user_dir, filename))
+                    found[stem] = {'ext': ext.lower(), 'size': st.st_size, 'updated': st.st_mtime}
+            if found:
+                sounds[name] = found
+        self._sounds = sounds
+        self.stats['scans'] += 1
+        logger.info(f"[ASSETS] scanned {self.sfx_root}: custom sounds for {len(sounds)} users")
+
+    def save(self):
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp = f"{self.path}.tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump({'version': INDEX_VERSION, 'sounds': self._sounds}, f)
+            os.replace(tmp, self.path)
+            self.stats['saves'] += 1
+        except Exception as e:
+            # The in-memory index is still right; the next start rescans.
+            logger.error(f"[ASSETS] could not save {self.path}: {e}")
+
+    # ------------------------------------------------------------- sounds
+    def has_custom_sounds(self, username: str) -> bool:
+        self.stats['lookups'] += 1
+        return bool(self._sounds.get(safe_name(username)))
+
+    def sounds(self, username: str) -> Dict[str, str]:
+        """{sound type: extension} for one user."""
+        return {kind: info['ext'] for kind, info in self._sounds.get(safe_name(username), {}).items()}
+
+    def sound_uploaded(self, username: str, sound_type: str, ext: str, size: int):
+        self._sounds.setdefault(safe_name(username), {})[sound_type] = {
+            'ext': ext.lower(), 'size': int(size), 'updated': time.time()}
+        self.save()
+
+    def sound_deleted(self, username: str, sound_type: str) -> bool:
+        name = safe_name(username)
+        sounds = self._sounds.get(name)
+        if not sounds or sounds.pop(sound_type, None) is None:
+            return False
+        if not sounds:
+            del self._sounds[name]
+        self.save()
+        return True
+
+    # -------------------------------------------------------------- cards
+    def remember_user(self, user: Dict[str, Any]):
+        """Keep the fields status broadcasts need from a user row."""
+        self._cards[user['id']] = {'username': user['username'],
+                                   'titan_number': user.get('titan_number')}
+
+    def status_fields(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """``username``, ``titan_number`` and ``has_custom_sounds`` for a
+        user, or None if the user has not been seen since the start."""
+        card = self._cards.get(user_id)
+        if card is None:
+            self.stats['card_misses'] += 1
+            return None
+        return dict(card, has_custom_sounds=self.has_custom_sounds(card['username']))
+
+    def summary(self) -> str:
+        return (f"{len(self._sounds)} users with sounds, {len(self._cards)} cards, "
+                f"{self.stats['lookups']} lookups, {self.stats['card_misses']} card misses")
@@ -0,0 +1,275 @@
+"""
+Routing index - who a targeted message goes to, without scanning every client.
+
+TitanNetServer keeps its connections in ``self.clients`` ({session_id: client}).
+Every targeted send used to walk that whole dict: ``send_to_user`` to find one
+user's sessions, ``broadcast_to_room`` to find the members' sessions, and the
+game broadcast additionally read the game session from the DB first. With a
+few hundred people online, a room message to five of them touched every
+connection on the server.
+
+This module keeps the answer ready instead:
+
+    user id           -> the sessions that user has open
+    room id           -> the open sessions of that room's members
+    game session id   -> the open sessions of that game's current players
+
+``ClientRegistry`` is a dict, so ``self.clients`` keeps working everywhere it
+is read; storing or deleting a client updates the index as a side effect, so a
+new code path that registers a session cannot forget to. Room and game
+membership is told to the index where it changes (join, leave, delete) or
+loaded from the DB the first time a room or game is routed to. A delivery then
+costs one set lookup plus one step per recipient.
+
+``check()`` rebuilds everything from scratch and reports every difference. The
+server runs it after each change when ROUTING_SELF_CHECK=1 is set in the
+environment; it is far too slow for production and exactly what a test wants.
+"""
+
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+class _Groups:
+    """Membership of one kind of group (rooms, or game sessions).
+
+    Only groups whose membership has been loaded are known; routing to an
+    unknown group means the caller has to load it first.
+    """
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self.members: Dict[int, Set[int]] = {}     # group -> user ids
+        self.of_user: Dict[int, Set[int]] = {}     # user id -> groups
+        self.sessions: Dict[int, Set[str]] = {}    # group -> session ids
+
+    def known(self, group: int) -> bool:
+        return group in self.members
+
+    def set_members(self, group: int, user_ids: Iterable[int],
+                    by_user: Dict[int, Set[str]]):
+        self.drop(group)
+        members = set(user_ids)
+        self.members[group] = members
+        sessions: Set[str] = set()
+        for user_id in members:
+            self.of_user.setdefault(user_id, set()).add(group)
+            sessions.update(by_user.get(user_id, ()))
+        self.sessions[group] = sessions
+
+    def add(self, group: int, user_id: int, by_user: Dict[int, Set[str]]):
+        if group not in self.members:
+            return          # not loaded: the next load will include them
+        self.members[group].add(user_id)
+        self.of_user.setdefault(user_id, set()).add(group)
+        self.sessions[group].update(by_user.get(user_id, ()))
+
+    def discard(self, group: int, user_id: int, by_user: Dict[int, Set[str]]):
+        members = self.members.get(group)
+        if members is None or user_id not in members:
+            return
+        members.discard(user_id)
+        self.sessions[group].difference_update(by_user.get(user_id, ()))
+        groups = self.of_user.get(user_id)
+        if groups is not None:
+            groups.discard(group)
+            if not groups:
+                del self.of_user[user_id]
+
+    def drop(self, group: int):
+        for user_id in self.members.pop(group, ()):
+            groups = self.of_user.get(user_id)
+            if groups is not None:
+                groups.discard(group)
+                if not groups:
+                    del self.of_user[user_id]
+        self.sessions.pop(group, None)
+
+    def session_added(self, user_id: int, session_id: str):
+        for group in self.of_user.get(user_id, ()):
+            self.sessions[group].add(session_id)
+
+    def session_removed(self, user_id: int, session_id: str):
+        for group in self.of_user.get(user_id, ()):
+            self.sessions[group].discard(session_id)
+
+    def check(self, by_user: Dict[int, Set[str]]) -> List[str]:
+        problems = []
+        of_user: Dict[int, Set[int]] = {}
+        for group, members in self.members.items():
+            for user_id in members:
+                of_user.setdefault(user_id, set()).add(group)
+            expected = set()
+            for user_id in members:
+                expected.update(by_user.get(user_id, ()))
+            if self.sessions.get(group) != expected:
+                problems.append(f"{self.kind} {group}: sessions "
+                                f"{sorted(self.sessions.get(group) or ())} != "
+                                f"{sorted(expected)}")
+        if of_user != self.of_user:
+            problems.append(f"{self.kind}: reverse membership is out of step")
+        if set(self.sessions) != set(self.members):
+            problems.append(f"{self.kind}: session sets for unknown groups")
+        return problems
+
+
+class RoutingIndex:
+    """user -> sessions, room -> sessions and game -> sessions, kept live."""
+
+    def __init__(self):
+        self._user_of: Dict[str, int] = {}        # session id -> user id
+        self._by_user: Dict[int, Set[str]] = {}   # user id -> session ids
+        self._rooms = _Groups('room')
+        self._games = _Groups('game')
+
+    # ------------------------------------------------------------ sessions
+    def add_session(self, session_id: str, user_id: int):
+        previous = self._user_of.get(session_id)
+        if previous == user_id:
+            return
+        if previous is not None:
+            self.remove_session(session_id)
+        self._user_of[session_id] = user_id
+        self._by_user.setdefault(user_id, set()).add(session_id)
+        self._rooms.session_added(user_id, session_id)
+        self._games.session_added(user_id, session_id)
+
+    def remove_session(self, session_id: str):
+        user_id = self._user_of.pop(session_id, None)
+        if user_id is None:
+            return
+        sessions = self._by_user.get(user_id)
+        if sessions is not None:
+            sessions.discard(session_id)
+            if not sessions:
+                del self._by_user[user_id]
+        self._rooms.session_removed(user_id, session_id)
+        self._games.session_removed(user_id, session_id)
+
+    def clear_sessions(self):
+        for session_id in list(self._user_of):
+            self.remove_session(session_id)
+
+    def user_sessions(self, user_id: int) -> Tuple[str, ...]:
+        """The sessions ``user_id`` has open (a copy: sends await)."""
+        return tuple(self._by_user.get(user_id, ()))
+
+    def is_online(self, user_id: int) -> bool:
+        return user_id in self._by_user
+
+    def online_user_count(self) -> int:
+        return len(self._by_user)
+
+    # --------------------------------------------------------------- rooms
+    def has_room(self, room_id: int) -> bool:
+        return self._rooms.known(room_id)
+
+    def set_room_members(self, room_id: int, user_ids: Iterable[int]):
+        self._rooms.set_members(room_id, user_ids, self._by_user)
+
+    def add_room_member(self, room_id: int, user_id: int):
+        self._rooms.add(room_id, user_id, self._by_user)
+
+    def remove_room_member(self, room_id: int, user_id: int):
+        self._rooms.discard(room_id, user_id, self._by_user)
+
+    def forget_room(self, room_id: int):
+        """Drop what is known about a room; the next send reloads it."""
+        self._rooms.drop(room_id)
+
+    def room_members(self, room_id: int) -> Optional[Set[int]]:
+        members = self._rooms.members.get(room_id)
+        return None if members is None else set(members)
+
+    def room_sessions(self, room_id: int) -> Tuple[str, ...]:
+        return tuple(self._rooms.sessions.get(room_id, ()))
+
+    def rooms_of_user(self, user_id: int) -> Set[int]:
+        return set(self._rooms.of_user.get(user_id, ()))
+
+    # --------------------------------------------------------------- games
+    def has_game(self, game_session_id: int) -> bool:
+        return self._games.known(game_session_id)
+
+    def set_game_players(self, game_session_id: int, user_ids: Iterable[int]):
+        self._games.set_members(game_session_id, user_ids, self._by_user)
+
+    def add_game_player(self, game_session_id: int, user_id: int):
+        self._games.add(game_session_id, user_id, self._by_user)
+
+    def remove_game_player(self, game_session_id: int, user_id: int):
+        self._games.discard(game_session_id, user_id, self._by_user)
+
+    def forget_game(self, game_session_id: int):
+        self._games.drop(game_session_id)
+
+    def game_players(self, game_session_id: int) -> Optional[Set[int]]:
+        players = self._games.members.get(game_session_id)
+        return None if players is None else set(players)
+
+    def game_sessions(self, game_session_id: int) -> Tuple[str, ...]:
+        return tuple(self._games.sessions.get(game_session_id, ()))
+
+    # --------------------------------------------------------- self-check
+    def check(self, clients: Dict[str, Dict]) -> List[str]:
+        """Every way the index disagrees with ``clients`` and itself."""
+        problems = []
+        user_of = {sid: c['user_id'] for sid, c in clients.items()}
+        if user_of != self._user_of:
+            problems.append("sessions: index and clients disagree")
+        by_user: Dict[int, Set[str]] = {}
+        for session_id, user_id in user_of.items():
+            by_user.setdefault(user_id, set()).add(session_id)
+        if by_user != self._by_user:
+            problems.append("users: user -> sessions is out of step")
+        problems.extend(self._rooms.check(by_user))
+        problems.extend(self._games.check(by_user))
+        return problems
+
+
+class ClientRegistry(dict):
+    """``{session_id: client}`` that keeps a RoutingIndex in step with itself.
+
+    Only whole clients are stored and deleted; a client's user_id never
+    changes under the same session id, which is what lets the index trust it.
+    """
+
+    def __init__(self, index: RoutingIndex):
+        super().__init__()
+        self.index = index
+
+    def __setitem__(self, session_id, client):
+        super().__setitem__(session_id, client)
+        self.index.add_session(session_id, client['user_id'])
+
+    def __delitem__(self, session_id):
+        super().__delitem__(session_id)
+        self.index.remove_session(session_id)
+
+    _missing = object()
+
+    def pop(self, session_id, default=_missing):
+        if session_id in self:
+            client = super().pop(session_id)
+            self.index.remove_session(session_id)
+            return client
+        if default is ClientRegistry._missing:
+            raise KeyError(session_id)
+        return default
+
+    def popitem(self):
+        session_id, client = super().popitem()
+        self.index.remove_session(session_id)
+        return session_id, client
+
+    def clear(self):
+        super().clear()
+        self.index.clear_sessions()
+
+    def setdefault(self, session_id, client=None):
+        if session_id not in self:
+            self[session_id] = client
+        return super().__getitem__(session_id)
+
+    def update(self, *args, **kwargs):
+        for session_id, client in dict(*args, **kwargs).items():
+            self[session_id] = client
@@ -15,8 +15,17 @@ from datetime import datetime
 from typing import Dict, Set, Optional, List, Any
 import secrets
 import hashlib
-from models import Database
+from models import Database, history_limit, history_cursor
 import remote_ui
+from routing import RoutingIndex, ClientRegistry
+from presence import PresenceRegistry
+from profile_assets import ProfileAssetIndex
+from message_router import MessageRouter
+# A voice packet's type byte may carry the sender's VAD verdict in its top
+# two bits; VOICE_TYPE_MASK strips them before the type is compared.
+from voice_forwarding import VoiceForwarder, VOICE_TYPE_MASK, packet_speech
+from voice_mixer import VoiceMixer, FRAME_MS
+import frames
 from cerberus import CerberusProtocol, THREAT_NAMES
 from dangerous_cerberus import DangerousCerberus
 from hackback import HackBackProtocol, identify_cloud_provider
@@ -31,6 +40,9 @@ except Exception as _gw_err:
 # Binary voice packet constants
 VOICE_AUDIO_TYPE = 0x01
 VOICE_HEADER_SIZE = 13  # 1 + 4 + 4 + 4 bytes
+# Game voice uses the same 13-byte header: type, game session id (where
+# room voice has the room id), user id, sequence number.
+GAME_VOICE_TYPE = 0x02
 
 # Create logs directory if it doesn't exist
 import os
@@ -110,11 +122,30 @@ class TitanNetServer:
         self.db = db if db is not None else Database()
 
         # Connected clients: {session_id: {"websocket": ws, "user_id": id, "username": name}}
-        self.clients: Dict[str, Dict] = {}
+        # Storing or deleting a client keeps the routing index (user, room and
+        # game session -> sessions) in step, so a targeted send touches only
+        # its recipients instead of scanning every connection. See routing.py.
+        self._routes = RoutingIndex()
+        self.clients: Dict[str, Dict] = ClientRegistry(self._routes)
+        # ROUTING_SELF_CHECK=1 rebuilds the index after every change and logs
+        # any difference. Debugging only: it costs a full scan each time.
+        self._routing_self_check = os.getenv('ROUTING_SELF_CHECK', '0') == '1'
 
         # Room voice channels: {room_id: {user_id: websocket}}
         self.voice_channels: Dict[int, Dict[int, websockets.WebSocketServerProtocol]] = {}
 
+        # Which speakers each voice room relays right now (the most active
+        # few, see voice_forwarding.py), with forwarded / suppressed bytes.
+        self._voice_forwarder = self._build_voice_forwarder()
+        # Rooms a moderator (or VOICE_MIX_ROOMS) switched to server-side
+        # mixing: one decoded, mixed and re-encoded stream per listener group
+        # instead of one stream per speaker (voice_mixer.py). Each mixed
+        # room runs a 20 ms loop task while anyone is in its voice channel.
+        self._voice_mixer = VoiceMixer()
+        self._voice_mix_tasks: Dict[int, asyncio.Task] = {}
+        for room_id in self._configured_mix_rooms():
+            self._voice_mixer.enable(room_id)
+
         # Room websocket cache: {room_id: {user_id: websocket}} — all members, updated on join/leave
         # Used for O(1) voice relay without DB queries
         self._room_websockets: Dict[int, Dict[int, any]] = {}
@@ -122,10 +153,10 @@ class TitanNetServer:
         # Room type cache: {room_id: room_type_str} — avoids DB on voice_start
         self._room_type_cache: Dict[int, str] = {}
 
-        # Cache for frequently accessed data
-        self._room_members_cache: Dict[str, Set[int]] = {}
-        self._online_users_cache: Optional[List[Dict]] = None
-        self._online_users_cache_time: float = 0
+        # Room membership lives in the routing index: loaded from the DB the
+        # first time a room is routed to, then kept current on join / leave /
+        # delete. Online users and the room list live in the presence
+        # registry (set up below, once the block map is loaded).
 
         # In-memory user-block map for "full ignore" enforcement on the hot
         # message paths. {blocker_id: set(blocked_ids)}. Loaded from the DB at
@@ -142,9 +173,30 @@ class TitanNetServer:
         # Broadcast messages cache
         self._broadcast_messages_cache: Dict[str, List[str]] = {}
 
-        # Rooms list cache (invalidated on create/delete room)
-        self._rooms_cache: Optional[List[Dict]] = None
-        self._rooms_cache_time: float = 0
+        # Authenticated websocket messages go through one dispatch table
+        # (per-type auth, rate class, payload schema and latency stats)
+        # instead of a ninety-branch if/elif chain in handle_client.
+        self._router = self._build_router()
+
+        # Online users and rooms, served from memory and kept current by the
+        # connect / disconnect / room handlers, which broadcast each change
+        # as a versioned ``directory_delta`` (see presence.py). Replaces the
+        # 2 s / 3 s timed caches over get_online_users / get_available_rooms.
+        self._presence = PresenceRegistry()
+        try:
+            self._presence.load_rooms(self.db.get_available_rooms())
+        except Exception as _e:
+            logger.error(f"Could not load chat rooms: {_e}")
+
+        # Custom sounds per user and the user fields a status broadcast
+        # carries, so a status change (or a reconnect storm of them) needs
+        # no database read and no directory scan. The HTTP sound upload and
+        # delete handlers keep it current; see profile_assets.py.
+        self._profile_assets = ProfileAssetIndex()
+        try:
+            self._profile_assets.load()
+        except Exception as _e:
+            logger.error(f"Could not load the profile asset index: {_e}")
 
         # Interactive Games: per-session AI worker registry (Phase 4 fills this).
         # Maps session_id -> GeminiGameWorker. Cleanup runs in
@@ -443,6 +495,7 @@ class TitanNetServer:
             "username": user_data['username'],
             "titan_number": user_data['titan_number']
         }
+        self._profile_assets.remember_user(user_data)
 
         # Update user status to online. Routed through the writer
         # executor so the asyncio loop is not blocked by ``_serialized_write``'s
@@ -455,8 +508,10 @@ class TitanNetServer:
             logger.error(f"register_client: update_user_status failed: {e}")
 
         logger.info(f"Client registered: {user_data['username']} (Session: {session_id})")
+        self._check_routes('register')
 
         # Notify all clients about new user online
+        await self._publish_presence(self._presence.user_online(user_data), user_data['id'])
         await self.broadcast_user_status(user_data['id'], 'online')
 
         return session_id
@@ -469,17 +524,12 @@ class TitanNetServer:
             username = client['username']
 
             # Check if user has other active sessions before full cleanup
-            other_sessions = [
-                sid for sid, c in self.clients.items()
-                if c['user_id'] == user_id and sid != session_id
-            ]
+            other_sessions = [sid for sid in self._routes.user_sessions(user_id)
+                              if sid != session_id]
 
             # Remove user from all voice channels
             for room_id in list(self.voice_channels.keys()):
-                if user_id in self.voice_channels[room_id]:
-                    del self.voice_channels[room_id][user_id]
-                    if not self.voice_channels[room_id]:
-                        del self.voice_channels[room_id]
+                if self._leave_voice_channel(room_id, user_id):
                     # Notify room that user stopped voice
                     await self.broadcast_to_room(room_id, {
                         "type": "voice_stopped",
@@ -510,11 +560,11 @@ class TitanNetServer:
                         self.db.delete_user_room_memberships, user_id
                     )
 
-                    # Invalidate cache and notify room members
+                    # Update the routing index and notify room members
                     for room_id in user_rooms:
-                        cache_key = f"room_members_{room_id}"
-                        if cache_key in self._room_members_cache:
-                            del self._room_members_cache[cache_key]
+                        self._routes.remove_room_member(room_id, user_id)
+                        await self._publish_presence(
+                            self._presence.room_members_changed(room_id, -1))
                         await self.broadcast_to_room(room_id, {
                             "type": "user_left_room",
                             "room_id": room_id,
@@ -531,6 +581,7 @@ class TitanNetServer:
                     logger.error(f"unregister_client: update_user_status failed: {e}")
 
             del self.clients[session_id]
+            self._check_routes('unregister')
             # Drop any Remote UI screens this session had open.
             self._open_screens.pop(session_id, None)
             logger.info(f"Client unregistered: {username} (Session: {session_id}){' (other sessions still active)' if other_sessions else ''}")
@@ -538,29 +589,32 @@ class TitanNetServer:
             # Only broadcast offline if no other sessions remain
             if not other_sessions:
                 # Notify all clients about user offline
+                await self._publish_presence(self._presence.user_offline(user_id), user_id)
                 await self.broadcast_user_status(user_id, 'offline')
 
     async def broadcast_user_status(self, user_id: int, status: str):
-        """Broadcast user status change to all clients"""
-        loop = asyncio.get_event_loop()
-        user = await loop.run_in_executor(None, self.db.get_user_by_id, user_id)
-        if not user:
-            return
+        """Broadcast user status change to all clients.
 
-        # Check if user has custom business card sounds
-        def _check_sounds():
-            safe_username = re.sub(r'[^a-zA-Z0-9._-]', '_', user['username'])
-            user_sfx_dir = os.path.join('data', 'sfx', safe_username)
-            return os.path.isdir(user_sfx_dir) and len(os.listdir(user_sfx_dir)) > 0
-        has_custom_sounds = await loop.run_in_executor(None, _check_sounds)
+        Everything in the message comes from the profile asset index; the
+        database is read only for a user who has not logged in since the
+        server started."""
+        fields = self._profile_assets.status_fields(user_id)
+        if fields is None:
+            loop = asyncio.get_event_loop()
+            user = await loop.run_in_executor(None, self.db.get_user_by_id, user_id)
+            if not user:
+                return
+            self._profile_assets.remember_user(user)
+            fields = self._profile_assets.status_fields(user_id)
 
         message = {
             "type": "user_status",
             "user_id": user_id,
-            "username": user['username'],
-            "titan_number": user['titan_number'],
+            "username": fields['username'],
+            "titan_number": fields['titan_number'],
             "status": status,
-            "has_custom_sounds": has_custom_sounds
+            # Custom business card sounds
+            "has_custom_sounds": fields['has_custom_sounds']
         }
 
         # Pass the sender so blocked parties don't get each other's presence.
@@ -580,40 +634,28 @@ class TitanNetServer:
 
     async def broadcast(self, message: Dict, exclude_session: Optional[str] = None,
                         sender_user_id: Optional[int] = None):
-        """Broadcast message to all connected clients - optimized with parallel sends.
+        """Broadcast message to all connected clients - one frame, one fan-out.
 
         When ``sender_user_id`` is given, clients that are mutually blocked with
         the sender ("full ignore") are skipped so blocked parties never see the
-        sender's messages or presence changes."""
-        disconnected = []
-        message_json = json.dumps(message)  # Serialize once
-
-        async def send_to_client(session_id, client):
-            try:
-                await client['websocket'].send(message_json)
-            except websockets.exceptions.ConnectionClosed:
-                disconnected.append(session_id)
-
-        # Send to all clients in parallel
-        tasks = [
-            send_to_client(session_id, client)
-            for session_id, client in self.clients.items()
-            if session_id != exclude_session
-            and not self._is_hidden(sender_user_id, client['user_id'])
-        ]
-
-        if tasks:
-            await asyncio.gather(*tasks, return_exceptions=True)
-
-        # Clean up disconnected clients
-        for session_id in disconnected:
-            await self.unregister_client(session_id)
+        sender's messages or presence changes.
+
+        The message is serialized once and written to every socket by
+        ``websockets.broadcast()`` (frames.py), without a task per recipient.
+        A connection that closed meanwhile is skipped; its own handler
+        unregisters it."""
+        frames.fan_out((client['websocket']
+                        for session_id, client in self.clients.items()
+                        if session_id != exclude_session
+                        and not self._is_hidden(sender_user_id, client['user_id'])),
+                       frames.encode(message))
 
     async def send_to_user(self, user_id: int, message: Dict):
         """Send message to specific user - optimized"""
-        message_json = json.dumps(message)  # Serialize once
+        message_json = frames.encode(message)  # Serialize once
 
-        # Find and send to all sessions of this user (may have multiple sessions)
+        # Send to all sessions of this user (may have multiple sessions),
+        # straight from the routing index.
         async def send_to_client(client):
             try:
                 await client['websocket'].send(message_json)
@@ -622,8 +664,7 @@ class TitanNetServer:
 
         tasks = [
             send_to_client(client)
-            for client in self.clients.values()
-            if client['user_id'] == user_id
+            for client in self._clients_of(self._routes.user_sessions(user_id))
         ]
 
         if tasks:
@@ -632,11 +673,9 @@ class TitanNetServer:
     async def broadcast_to_room(self, room_id: int, message: Dict, exclude_user_id: Optional[int] = None,
                                 sender_user_id: Optional[int] = None):
         """Broadcast message to all members of a room - optimized with caching and parallel sends"""
-        # Cache room members to avoid repeated DB queries
-        cache_key = f"room_members_{room_id}"
-        member_ids = self._room_members_cache.get(cache_key)
-
-        if member_ids is None:
+        # Room membership is loaded from the DB once, then the routing index
+        # keeps it (and the members' open sessions) current.
+        if not self._routes.has_room(room_id):
             loop = asyncio.get_event_loop()
             def _fetch():
                 conn = self.db.get_connection()
@@ -646,28 +685,86 @@ class TitanNetServer:
                 conn.close()
                 return ids
             member_ids = await loop.run_in_executor(None, _fetch)
-            self._room_members_cache[cache_key] = member_ids
-
-        # Serialize message once
-        message_json = json.dumps(message)
-
-        async def send_to_client(client):
-            try:
-                await client['websocket'].send(message_json)
-            except websockets.exceptions.ConnectionClosed:
-                pass
-
-        # Broadcast to members only - parallel sends. Skip anyone mutually
-        # blocked with the sender so a "full ignore" hides room messages too.
-        tasks = [
-            send_to_client(client)
-            for client in self.clients.values()
-            if client['user_id'] != exclude_user_id and client['user_id'] in member_ids
-            and not self._is_hidden(sender_user_id, client['user_id'])
-        ]
+            if not self._routes.has_room(room_id):
+                self._routes.set_room_members(room_id, member_ids)
+
+        # Broadcast to members only, one frame for all of them. Skip anyone
+        # mutually blocked with the sender so a "full ignore" hides room
+        # messages too.
+        frames.fan_out((client['websocket']
+                        for client in self._clients_of(self._routes.room_sessions(room_id))
+                        if client['user_id'] != exclude_user_id
+                        and not self._is_hidden(sender_user_id, client['user_id'])),
+                       frames.encode(message))
+
+    def _clients_of(self, session_ids) -> List[Dict]:
+        """The clients behind ``session_ids`` that are still connected."""
+        clients = []
+        for sid in session_ids:
+            client = self.clients.get(sid)
+            if client is not None:
+                clients.append(client)
+        return clients
+
+    def _check_routes(self, where: str):
+        """ROUTING_SELF_CHECK=1: compare the routing index against a rebuild
+        from ``self.clients`` and log every difference."""
+        if not self._routing_self_check:
+            return
+        problems = self._routes.check(self.clients)
+        for problem in problems:
+            logger.error(f"[ROUTING] after {where}: {problem}")
+
+    def _visible_to(self, viewer_id: Optional[int]):
+        """Per-viewer filter for presence lists ("full ignore")."""
+        return lambda user_id: not self._is_hidden(viewer_id, user_id)
+
+    async def _publish_presence(self, delta: Optional[Dict], subject_user_id: Optional[int] = None):
+        """Broadcast a presence registry change. ``delta`` is None when the
+        registry did not change, so callers can pass the mutator's result
+        straight through. ``subject_user_id`` hides user deltas from the
+        people that user is mutually blocked with."""
+        if delta is not None:
+            await self.broadcast(delta, sender_user_id=subject_user_id)
+
+    async def _presence_room_changed(self, room_id: int) -> bool:
+        """Re-read one room into the presence registry and announce it.
+        Returns False if the room no longer exists."""
+        loop = asyncio.get_event_loop()
+        try:
+            row = await loop.run_in_executor(None, self.db.get_room_summary, room_id)
+        except Exception as e:
+            logger.error(f"[PRESENCE] could not read room {room_id}: {e}")
+            return True
+        if row is None:
+            await self._publish_presence(self._presence.room_removed(room_id))
+            return False
+        await self._publish_presence(self._presence.room_added(row))
+        return True
 
-        if tasks:
-            await asyncio.gather(*tasks, return_exceptions=True)
+    def _forget_room_state(self, room_id: int):
+        """Drop every in-memory trace of a deleted room."""
+        self._routes.forget_room(room_id)
+        if room_id in self.voice_channels:
+            del self.voice_channels[room_id]
+        self._voice_forwarder.forget_room(room_id)
+        self._voice_mixer.disable(room_id)
+        if room_id in self._room_websockets:
+            del self._room_websockets[room_id]
+        self._room_type_cache.pop(room_id, None)
+
+    async def refresh_room(self, room_id: int):
+        """A room was changed outside the websocket handlers (moderator kick,
+        ban or delete over HTTP). Reload its member list on next use and bring
+        the presence registry up to date; a deleted room is cleaned up and
+        announced like handle_delete_room does."""
+        self._routes.forget_room(room_id)
+        if not await self._presence_room_changed(room_id):
+            self._forget_room_state(room_id)
+            await self.broadcast({
+                "type": "room_removed",
+                "room_id": room_id
+            })
 
     async def handle_login(self, websocket: websockets.WebSocketServerProtocol, data: Dict) -> Dict:
         """Handle login request"""
@@ -751,8 +848,10 @@ class TitanNetServer:
                 "username": user['username'],
                 "titan_number": user['titan_number']
             }
+            self._profile_assets.remember_user(user)
 
             logger.info(f"Client registered: {user['username']} (Session: {session_id})")
+            self._check_routes('login')
 
             # Run all login data fetches in parallel (non-blocking).
             # Use the auth pool here too — these run right after a successful
@@ -761,27 +860,23 @@ class TitanNetServer:
                 # Status update is a WRITE — must go through the serialized
                 # writer executor, not the multi-worker auth pool.
                 update_status = self.db.run_write_async(self.db.update_user_status, user['id'], 'online')
-                online_future = loop.run_in_executor(self._auth_executor, self.db.get_online_users, user['id'])
                 unread_future = loop.run_in_executor(self._auth_executor, self.db.get_unread_private_messages_summary, user['id'])
 
-                # Check custom sounds (filesystem I/O)
-                def _check_sounds():
-                    safe_username = re.sub(r'[^a-zA-Z0-9._-]', '_', user['username'])
-                    user_sfx_dir = os.path.join('data', 'sfx', safe_username)
-                    return os.path.isdir(user_sfx_dir) and len(os.listdir(user_sfx_dir)) > 0
-                sounds_future = loop.run_in_executor(self._auth_executor, _check_sounds)
-
                 # MOTD is fast (file read), but run in executor too
                 motd_future = loop.run_in_executor(self._auth_executor, self.load_motd, language)
 
                 # Await all in parallel
                 await update_status
-                online_users, unread_summary, has_custom_sounds, motd = await asyncio.gather(
-                    online_future, unread_future, sounds_future, motd_future
-                )
-                return online_users, unread_summary, has_custom_sounds, motd
+                unread_summary, motd = await asyncio.gather(unread_future, motd_future)
+                # Custom sounds come from the profile asset index (memory).
+                return unread_summary, self._profile_assets.has_custom_sounds(user['username']), motd
 
-            online_users, unread_summary, has_custom_sounds, motd = await _fetch_login_data()
+            unread_summary, has_custom_sounds, motd = await _fetch_login_data()
+
+            # The online list comes from the presence registry; the delta is
+            # broadcast after the login response goes out (see handler loop).
+            presence_delta = self._presence.user_online(user)
+            online_users = self._presence.online_users(self._visible_to(user['id']))
 
             # Mint an HMAC-signed, role-bound HTTP token (auth_tokens). The
             # client carries this for REST calls; it cannot be forged and its
@@ -803,9 +898,13 @@ class TitanNetServer:
                 "user": user,
                 "http_token": http_token,
                 "online_users": online_users,
+                "directory_version": self._presence.version,
+                "binary_game_voice": True,
+                "voice_flags": True,
                 "unread_messages_summary": unread_summary,
                 "has_custom_sounds": has_custom_sounds,
-                "broadcast_online": True  # Signal to broadcast after sending response
+                "broadcast_online": True,  # Signal to broadcast after sending response
+                "_presence_delta": presence_delta,
             }
 
             if motd:
@@ -957,16 +1056,15 @@ class TitanNetServer:
             }))
             return
 
-        # Save message to database (non-blocking)
-        message_data = await loop.run_in_executor(
-            None, self.db.send_private_message,
+        # Save message to database through the writer, where a burst of
+        # messages shares one commit (group commit, see group_commit.py)
+        message_data = await self.db.run_write_async(
+            self.db.send_private_message,
             client['user_id'], recipient_id, message_text
         )
 
-        # Check if sender has custom sounds
-        safe_username = re.sub(r'[^a-zA-Z0-9._-]', '_', client['username'])
-        user_sfx_dir = os.path.join('data', 'sfx', safe_username)
-        has_custom_sounds = os.path.isdir(user_sfx_dir) and len(os.listdir(user_sfx_dir)) > 0
+        # Check if sender has custom sounds (profile asset index, no disk)
+        has_custom_sounds = self._profile_assets.has_custom_sounds(client['username'])
 
         # Send to recipient if online
         response = {
@@ -989,25 +1087,36 @@ class TitanNetServer:
         }))
 
     async def handle_get_messages(self, session_id: str, data: Dict) -> Dict:
-        """Handle get private messages request"""
+        """Handle get private messages request.
+
+        Keyset-paginated: ``before_id`` pages back from a message id,
+        ``after_id`` returns only messages newer than the last one the
+        client has seen. Without either, the newest page.
+        """
         client = self.clients.get(session_id)
         if not client:
             return {"type": "error", "error": "Not authenticated"}
 
         other_user_id = data.get('user_id')
-        limit = data.get('limit', 100)
+        limit = history_limit(data.get('limit'))
+        before_id = history_cursor(data.get('before_id'))
+        after_id = history_cursor(data.get('after_id'))
 
         if not other_user_id:
             return {"type": "error", "error": "User ID required"}
 
         loop = asyncio.get_event_loop()
-        messages = await loop.run_in_executor(
-            None, self.db.get_private_messages, client['user_id'], other_user_id, limit
+        page = await loop.run_in_executor(
+            None, self.db.get_private_message_page, client['user_id'], other_user_id,
+            limit, before_id, after_id
         )
 
         return {
             "type": "private_messages",
-            "messages": messages
+            "user_id": other_user_id,
+            "before_id": before_id,
+            "after_id": after_id,
+            **page
         }
 
     async def handle_mark_messages_read(self, session_id: str, data: Dict) -> Dict:
@@ -1022,9 +1131,8 @@ class TitanNetServer:
             return {"type": "error", "error": "Sender user ID required"}
 
         # Mark messages from sender to current user as read (non-blocking)
-        loop = asyncio.get_event_loop()
-        success = await loop.run_in_executor(
-            None, self.db.mark_private_messages_as_read, client['user_id'], sender_user_id
+        success = await self.db.run_write_async(
+            self.db.mark_private_messages_as_read, client['user_id'], sender_user_id
         )
 
         return {
@@ -1070,7 +1178,7 @@ class TitanNetServer:
 
         # Broadcast new room to all clients
         if result.get('success'):
-            self._rooms_cache = None  # Invalidate rooms cache
+            await self._presence_room_changed(result['room_id'])
             await self.broadcast({
                 "type": "new_room",
                 "room_id": result['room_id'],
@@ -1109,11 +1217,6 @@ class TitanNetServer:
 
         await self.clients[session_id]['websocket'].send(json.dumps(response))
 
-        # Invalidate room members cache
-        cache_key = f"room_members_{room_id}"
-        if hasattr(self, '_room_members_cache') and cache_key in self._room_members_cache:
-            del self._room_members_cache[cache_key]
-
         # Update room websocket cache for voice relay
         # Always update websocket cache if user is a member (new join OR already a member)
         # This is critical: after reconnection, "Already a member" returns success=False
@@ -1123,8 +1226,11 @@ class TitanNetServer:
             if room_id not in self._room_websockets:
                 self._room_websockets[room_id] = {}
             self._room_websockets[room_id][client['user_id']] = client['websocket']
+            self._routes.add_room_member(room_id, client['user_id'])
+            self._check_routes('join room')
 
         if result.get('success'):
+            await self._publish_presence(self._presence.room_members_changed(room_id, 1))
             await self.broadcast_to_room(room_id, {
                 "type": "user_joined_room",
                 "room_id": room_id,
@@ -1146,10 +1252,7 @@ class TitanNetServer:
         username = client['username']
 
         # Remove from voice channel if active
-        if room_id in self.voice_channels and user_id in self.voice_channels[room_id]:
-            del self.voice_channels[room_id][user_id]
-            if not self.voice_channels[room_id]:
-                del self.voice_channels[room_id]
+        if self._leave_voice_channel(room_id, user_id):
             # Notify room that user stopped voice
             await self.broadcast_to_room(room_id, {
                 "type": "voice_stopped",
@@ -1167,12 +1270,12 @@ class TitanNetServer:
         # Same writer-isolation rule as handle_join_room — leave_chat_room is
         # a write and must run on the db-writer thread, not the loop's default
         # executor pool, to avoid SQLCipher page-cache drift.
-        await self.db.run_write_async(self.db.leave_chat_room, room_id, user_id)
+        left = await self.db.run_write_async(self.db.leave_chat_room, room_id, user_id)
 
-        # Invalidate room members cache
-        cache_key = f"room_members_{room_id}"
-        if cache_key in self._room_members_cache:
-            del self._room_members_cache[cache_key]
+        self._routes.remove_room_member(room_id, user_id)
+        self._check_routes('leave room')
+        if left:
+            await self._publish_presence(self._presence.room_members_changed(room_id, -1))
 
         # Notify room members
         await self.broadcast_to_room(room_id, {
@@ -1206,18 +1309,8 @@ class TitanNetServer:
 
         # Notify all clients and clean up
         if success:
-            self._rooms_cache = None  # Invalidate rooms cache
-            # Invalidate room members cache
-            cache_key = f"room_members_{room_id}"
-            if cache_key in self._room_members_cache:
-                del self._room_members_cache[cache_key]
-
-            # Clean up voice channels and caches
-            if room_id in self.voice_channels:
-                del self.voice_channels[room_id]
-            if room_id in self._room_websockets:
-                del self._room_websockets[room_id]
-            self._room_type_cache.pop(room_id, None)
+            self._forget_room_state(room_id)
+            await self._publish_presence(self._presence.room_removed(room_id))
 
             await self.broadcast({
                 "type": "room_removed",
@@ -1256,39 +1349,34 @@ class TitanNetServer:
         }, sender_user_id=client['user_id'])
 
     async def handle_get_rooms(self, session_id: str) -> Dict:
-        """Handle get available rooms - cached for 3 seconds"""
-        import time
-        current_time = time.time()
-
-        if (self._rooms_cache is not None and
-            current_time - self._rooms_cache_time < 3.0):
-            rooms = self._rooms_cache
-        else:
-            loop = asyncio.get_event_loop()
-            rooms = await loop.run_in_executor(None, self.db.get_available_rooms)
-            self._rooms_cache = rooms
-            self._rooms_cache_time = current_time
-
+        """Handle get available rooms (from the presence registry)"""
         return {
             "type": "rooms_list",
-            "rooms": rooms
+            "rooms": self._presence.rooms(),
+            "version": self._presence.version
         }
 
     async def handle_get_room_messages(self, session_id: str, data: Dict) -> Dict:
-        """Handle get room messages"""
+        """Handle get room messages (same cursors as handle_get_messages)"""
         room_id = data.get('room_id')
-        limit = data.get('limit', 100)
+        limit = history_limit(data.get('limit'))
+        before_id = history_cursor(data.get('before_id'))
+        after_id = history_cursor(data.get('after_id'))
 
         if not room_id:
             return {"type": "error", "error": "Room ID required"}
 
         loop = asyncio.get_event_loop()
-        messages = await loop.run_in_executor(None, self.db.get_room_messages, room_id, limit)
+        page = await loop.run_in_executor(
+            None, self.db.get_room_message_page, room_id, limit, before_id, after_id
+        )
 
         return {
             "type": "room_messages",
             "room_id": room_id,
-            "messages": messages
+            "before_id": before_id,
+            "after_id": after_id,
+            **page
         }
 
     async def handle_voice_start(self, session_id: str, data: Dict):
@@ -1344,16 +1432,92 @@ class TitanNetServer:
             "username": username
         }, exclude_user_id=None)
 
+    @staticmethod
+    def _build_voice_forwarder() -> VoiceForwarder:
+        try:
+            from config import Config
+            max_speakers = Config.VOICE_MAX_SPEAKERS
+            hysteresis = Config.VOICE_SWITCH_HYSTERESIS
+            hold_ms = Config.VOICE_SWITCH_HOLD_MS
+        except Exception:
+            max_speakers = int(os.getenv('VOICE_MAX_SPEAKERS', 4))
+            hysteresis = float(os.getenv('VOICE_SWITCH_HYSTERESIS', 1.5))
+            hold_ms = float(os.getenv('VOICE_SWITCH_HOLD_MS', 600))
+        return VoiceForwarder(max_speakers=max_speakers, hysteresis=hysteresis, hold_ms=hold_ms)
+
+    @staticmethod
+    def _compression_settings():
+        try:
+            from config import Config
+            return Config.WS_COMPRESSION, Config.WS_COMPRESS_MIN_BYTES
+        except Exception:
+            return (os.getenv('WS_COMPRESSION', 'off'),
+                    int(os.getenv('WS_COMPRESS_MIN_BYTES', frames.DEFAULT_COMPRESS_MIN_BYTES)))
+
+    @staticmethod
+    def _configured_mix_rooms() -> List[int]:
+        try:
+            from config import Config
+            rooms = Config.VOICE_MIX_ROOMS
+        except Exception:
+            rooms = os.getenv('VOICE_MIX_ROOMS', '')
+        return [int(r) for r in rooms.replace(' ', '').split(',') if r.isdigit()]
+
+    def _ensure_voice_mix_loop(self, room_id: int):
+        task = self._voice_mix_tasks.get(room_id)
+        if task is None or task.done():
+            self._voice_mix_tasks[room_id] = asyncio.create_task(self._voice_mix_loop(room_id))
+
+    async def _voice_mix_loop(self, room_id: int):
+        """Mix and send one frame every 20 ms while the room is mixed and
+        someone is in its voice channel. Started by the first packet."""
+        loop = asyncio.get_event_loop()
+        frame = FRAME_MS / 1000.0
+        next_at = loop.time()
+        try:
+            while self._voice_mixer.is_mixed(room_id) and self.voice_channels.get(room_id):
+                for targets, packet in self._voice_mixer.tick(
+                        room_id, self._room_websockets.get(room_id) or {}):
+                    websockets.broadcast(targets, packet)
+                next_at += frame
+                delay = next_at - loop.time()
+                if delay < -5 * frame:
+                    # The loop was blocked; skip the lost frames instead of
+                    # sending them in a burst.
+                    next_at = loop.time()
+                    delay = 0
+                await asyncio.sleep(max(0.0, delay))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"[VOICE MIX] room {room_id}: mix loop crashed: {e}", exc_info=True)
+        finally:
+            if self._voice_mix_tasks.get(room_id) is asyncio.current_task():
+                del self._voice_mix_tasks[room_id]
+
+    def _leave_voice_channel(self, room_id: int, user_id: int) -> bool:
+        """Drop ``user_id`` from the room's voice channel; True if they were in it."""
+        channel = self.voice_channels.get(room_id)
+        if channel is None or user_id not in channel:
+            return False
+        del channel[user_id]
+        if not channel:
+            del self.voice_channels[room_id]
+        self._voice_forwarder.forget_speaker(room_id, user_id)
+        self._voice_mixer.forget_speaker(room_id, user_id)
+        return True
+
     async def handle_voice_audio_binary(self, session_id: str, raw_data: bytes):
         """Handle binary voice packet — zero-copy relay via websockets.broadcast().
-        Uses _room_websockets cache for O(1) target lookup, no DB in hot path."""
+        Uses _room_websockets cache for O(1) target lookup, no DB in hot path.
+        Only the room's selected speakers are relayed (voice_forwarding.py)."""
         client_info = self.clients.get(session_id)
         if not client_info:
             return
 
         # Parse only the 13-byte header (no JSON, no base64)
-        packet_type, room_id, user_id, seq = struct.unpack('>BIII', raw_data[:VOICE_HEADER_SIZE])
-        if packet_type != VOICE_AUDIO_TYPE:
+        type_byte, room_id, user_id, seq = struct.unpack('>BIII', raw_data[:VOICE_HEADER_SIZE])
+        if type_byte & VOICE_TYPE_MASK != VOICE_AUDIO_TYPE:
             return
 
         # Verify sender matches session
@@ -1364,11 +1528,26 @@ class TitanNetServer:
         if room_id not in self.voice_channels or user_id not in self.voice_channels[room_id]:
             return
 
+        # Mixed room: the selected speakers go into the room's mix, which the
+        # mix loop sends; nothing is relayed per speaker.
+        if self._voice_mixer.is_mixed(room_id):
+            if self._voice_forwarder.admit(room_id, user_id, packet_speech(type_byte)):
+                self._voice_mixer.push(room_id, user_id, raw_data[VOICE_HEADER_SIZE:])
+                self._ensure_voice_mix_loop(room_id)
+            return
+
         # Build target websocket set from _room_websockets cache (excludes sender)
         room_ws = self._room_websockets.get(room_id)
         if room_ws:
             targets = [ws for uid, ws in room_ws.items() if uid != user_id]
             if targets:
+                forward = self._voice_forwarder.admit(room_id, user_id, packet_speech(type_byte))
+                self._voice_forwarder.record(room_id, forward, len(raw_data), len(targets))
+                if not forward:
+                    return
+                if type_byte != VOICE_AUDIO_TYPE:
+                    # Listeners on older clients only know a plain 0x01.
+                    raw_data = bytes((VOICE_AUDIO_TYPE,)) + raw_data[1:]
                 # websockets.broadcast() — no backpressure, no per-client tasks, no await
                 # Fastest path: single C-level loop, skips slow clients automatically
                 websockets.broadcast(targets, raw_data)
@@ -1393,7 +1572,7 @@ class TitanNetServer:
             return
 
         # Pre-serialize once for all recipients
-        message_json = json.dumps({
+        message_json = frames.encode({
             "type": "voice_audio",
             "room_id": room_id,
             "user_id": user_id,
@@ -1421,10 +1600,7 @@ class TitanNetServer:
         username = client_info.get('username')
 
         # Remove user from voice channel tracking
-        if room_id in self.voice_channels and user_id in self.voice_channels[room_id]:
-            del self.voice_channels[room_id][user_id]
-            if not self.voice_channels[room_id]:
-                del self.voice_channels[room_id]
+        self._leave_voice_channel(room_id, user_id)
 
         logger.info(f"Voice stopped: {username} in room {room_id}")
 
@@ -1473,32 +1649,39 @@ class TitanNetServer:
         }, exclude_user_id=user_id)
 
     async def handle_get_online_users(self, session_id: str) -> Dict:
-        """Handle get online users - cached for 2 seconds"""
-        import time
-        current_time = time.time()
-
-        # Use cached data if less than 2 seconds old
-        if (self._online_users_cache is not None and
-            current_time - self._online_users_cache_time < 2.0):
-            users = self._online_users_cache
-        else:
-            loop = asyncio.get_event_loop()
-            users = await loop.run_in_executor(None, self.db.get_online_users)
-            self._online_users_cache = users
-            self._online_users_cache_time = current_time
-
-        # Filter the (globally cached) list for THIS viewer so mutually-blocked
-        # users never appear online to each other ("full ignore").
+        """Handle get online users (from the presence registry)"""
+        # Filter the shared list for THIS viewer so mutually-blocked users
+        # never appear online to each other ("full ignore").
         client = self.clients.get(session_id)
-        if client:
-            viewer_id = client['user_id']
-            users = [u for u in users if not self._is_hidden(viewer_id, u.get('id'))]
+        visible = self._visible_to(client['user_id']) if client else None
 
         return {
             "type": "online_users",
-            "users": users
+            "users": self._presence.online_users(visible),
+            "version": self._presence.version
         }
 
+    async def handle_get_directory(self, session_id: str) -> Dict:
+        """Snapshot of online users and rooms with the registry version.
+
+        A client that keeps this and applies every ``directory_delta`` with a
+        higher version has both lists without ever polling them again."""
+        client = self.clients.get(session_id)
+        if not client:
+            return {"type": "error", "error": "Not authenticated"}
+        return {
+            "type": "directory",
+            **self._presence.snapshot(self._visible_to(client['user_id']))
+        }
+
+    async def _presence_resync(self, *user_ids: int):
+        """A block or unblock changed who these users may see: their mirrors
+        of the online list are wrong now, so ask them to take a new snapshot."""
+        message = {"type": "directory_delta", "version": self._presence.version,
+                   "op": "resync"}
+        for user_id in user_ids:
+            await self.send_to_user(user_id, message)
+
     async def handle_block_user(self, session_id: str, data: Dict) -> Dict:
         """User X blocks user Y ("full ignore"). Persists + updates the in-memory
         map so enforcement is immediate on this connection."""
@@ -1517,6 +1700,7 @@ class TitanNetServer:
         result = await loop.run_in_executor(None, self.db.block_user, client['user_id'], target_id)
         if result.get('success'):
             self._blocks.setdefault(client['user_id'], set()).add(target_id)
+            await self._presence_resync(client['user_id'], target_id)
         return {"type": "block_result", "success": result.get('success', False),
                 "error": result.get('error'), "user_id": target_id, "blocked": True}
 
@@ -1539,6 +1723,7 @@ class TitanNetServer:
             s = self._blocks.get(client['user_id'])
             if s:
                 s.discard(target_id)
+            await self._presence_resync(client['user_id'], target_id)
         return {"type": "block_result", "success": result.get('success', False),
                 "error": result.get('error'), "user_id": target_id, "blocked": False}
 
@@ -2585,23 +2770,26 @@ class TitanNetServer:
             logger.warning(f"[REMOTE-UI] cannot push unknown screen '{slug}'")
             return 0
         sessions = self._sessions_for_target(target)
-        sent = 0
+        # The screen is built for each session (the handler sees the user,
+        # and each session keeps its own navigation stack), so it is also
+        # serialized per session; sessions whose frames come out identical
+        # still share one fan_out.
+        timestamp = datetime.now().isoformat()
+        by_frame: Dict[str, List[Any]] = {}
         for session_id in sessions:
             built = await self._build_screen(session_id, slug, 'open', {})
             screen = (built.get('result') or {}).get('screen')
-            if not built.get('success') or not screen:
-                continue
-            try:
-                await self.clients[session_id]['websocket'].send(json.dumps({
-                    "type": "remote_screen_push",
-                    "slug": slug,
-                    "screen": screen,
-                    "timestamp": datetime.now().isoformat(),
-                }))
-                sent += 1
-            except Exception:
+            client = self.clients.get(session_id)
+            if not built.get('success') or not screen or client is None:
                 continue
-        return sent
+            frame = frames.encode({
+                "type": "remote_screen_push",
+                "slug": slug,
+                "screen": screen,
+                "timestamp": timestamp,
+            })
+            by_frame.setdefault(frame, []).append(client['websocket'])
+        return sum(frames.fan_out(sockets, frame) for frame, sockets in by_frame.items())
 
     # ================================================================
     # SERVER SOUNDS
@@ -2624,6 +2812,8 @@ class TitanNetServer:
         if kind == 'user':
             user_id = target.get('user_id')
             username = (target.get('username') or '').lower()
+            if user_id and not username:
+                return list(self._routes.user_sessions(user_id))
             return [sid for sid, c in self.clients.items()
                     if (user_id and c['user_id'] == user_id)
                     or (username and (c['username'] or '').lower() == username)]
@@ -2694,7 +2884,7 @@ class TitanNetServer:
         if announce:
             payload['announce'] = str(announce)
 
-        sent = 0
+        targets = []
         for session_id in self._sessions_for_target(target):
             client = self.clients.get(session_id)
             if not client:
@@ -2702,11 +2892,9 @@ class TitanNetServer:
             if not self._sound_rate_ok(client['user_id']):
                 logger.info(f"[SOUNDS] rate limit hit for {client['username']}")
                 continue
-            try:
-                await client['websocket'].send(json.dumps(payload))
-                sent += 1
-            except Exception:
-                continue
+            targets.append(client['websocket'])
+        # Everyone gets the same payload: serialize it once.
+        sent = frames.fan_out(targets, frames.encode(payload))
         logger.info(f"[SOUNDS] '{name}' played at {sent} session(s)")
         return sent
 
@@ -3229,26 +3417,31 @@ class TitanNetServer:
                 })
             except Exception as e:
                 logger.error(f"[GAMES] session_ended broadcast failed: {e}", exc_info=True)
+            self._routes.forget_game(sid)
 
     async def _broadcast_to_session(self, session_id: int, message: Dict):
-        """Send a message to every connected player of a game session."""
-        loop = asyncio.get_event_loop()
-        try:
-            sess = await loop.run_in_executor(self._games_executor, self.db.get_game_session, session_id)
-        except Exception as e:
-            logger.error(f"[GAMES] _broadcast_to_session lookup failed: {e}", exc_info=True)
-            return
-        if not sess:
-            return
-        active_user_ids = {p['user_id'] for p in sess.get('players', [])
-                           if not p.get('left_at')}
-        payload = json.dumps(message)
-        for sid, client in list(self.clients.items()):
-            if client['user_id'] in active_user_ids:
-                try:
-                    await client['websocket'].send(payload)
-                except Exception as e:
-                    logger.warning(f"[GAMES] send to {client.get('username')} failed: {e}")
+        """Send a message to every connected player of a game session.
+
+        The player list is read from the DB once per game session; after
+        that the routing index follows joins and leaves, so the AI game
+        master's stream of narration no longer costs a query per line.
+        """
+        if not self._routes.has_game(session_id):
+            loop = asyncio.get_event_loop()
+            try:
+                sess = await loop.run_in_executor(self._games_executor, self.db.get_game_session, session_id)
+            except Exception as e:
+                logger.error(f"[GAMES] _broadcast_to_session lookup failed: {e}", exc_info=True)
+                return
+            if not sess:
+                return
+            if not self._routes.has_game(session_id):
+                self._routes.set_game_players(
+                    session_id, [p['user_id'] for p in sess.get('players', [])
+                                 if not p.get('left_at')])
+        frames.fan_out((client['websocket']
+                        for client in self._clients_of(self._routes.game_sessions(session_id))),
+                       frames.encode(message))
 
     async def handle_start_game_session(self, session_id: str, data: Dict) -> Dict:
         """Host (creator or any logged-in user) starts a new lobby."""
@@ -3274,6 +3467,9 @@ class TitanNetServer:
         # automatically when google-generativeai is missing or the
         # provider is not yet wired (OpenAI/Anthropic ship in follow-ups).
         gs_id = int(result['session_id'])
+        # create_game_session seats the host, so the routing index can start
+        # from that instead of reading the new session back.
+        self._routes.set_game_players(gs_id, [user_id])
         if _GAME_WORKER_AVAILABLE and GeminiGameWorker is not None:
             try:
                 worker = GeminiGameWorker(
@@ -3318,14 +3514,13 @@ class TitanNetServer:
         a single player. We pick the first connected session for them;
         that's good enough for single-device users (the typical case).
         """
-        payload = json.dumps(message)
-        for sid, client in list(self.clients.items()):
-            if client['user_id'] == user_id:
-                try:
-                    await client['websocket'].send(payload)
-                    return
-                except Exception as e:
-                    logger.warning(f"[GAMES] whisper send to user {user_id} failed: {e}")
+        payload = frames.encode(message)
+        for client in self._clients_of(self._routes.user_sessions(user_id)):
+            try:
+                await client['websocket'].send(payload)
+                return
+            except Exception as e:
+                logger.warning(f"[GAMES] whisper send to user {user_id} failed: {e}")
 
     async def handle_join_game_session(self, session_id: str, data: Dict) -> Dict:
         if session_id not in self.clients:
@@ -3345,6 +3540,7 @@ class TitanNetServer:
             return {"type": "join_game_session_response", "success": False, "error": "Database error"}
         if not result.get('success'):
             return {"type": "join_game_session_response", **result}
+        self._routes.add_game_player(gs_id, user_id)
 
         # Tell every player in the session that someone joined
         await self._broadcast_to_session(gs_id, {
@@ -3371,6 +3567,7 @@ class TitanNetServer:
             )
         except Exception as e:
             logger.error(f"[GAMES] leave_session crashed: {e}", exc_info=True)
+        self._routes.remove_game_player(gs_id, user_id)
 
         # Tell remaining players, and end the session if nobody is left.
         try:
@@ -3432,6 +3629,7 @@ class TitanNetServer:
                 await self.db.run_write_async(self.db.end_game_session, gs_id)
         except Exception as e:
             logger.error(f"[GAMES] end/delete_game_session failed: {e}", exc_info=True)
+        self._routes.forget_game(gs_id)
 
     async def handle_get_game_session(self, session_id: str, data: Dict) -> Dict:
         if session_id not in self.clients:
@@ -3551,6 +3749,40 @@ class TitanNetServer:
             return {"type": "game_voice_chunk_response", "success": False, "error": "Voice routing error"}
         return {"type": "game_voice_chunk_response", "success": True, "session_id": gs_id, "queued": True}
 
+    async def handle_game_voice_binary(self, session_id: str, raw_data: bytes):
+        """Binary game voice frame — the raw-bytes twin of game_voice_chunk.
+
+        The JSON path costs a base64 encode on the client, a JSON parse and
+        a base64 decode here for every 20-30 ms mic frame, a third more
+        bytes on the wire, and no ordering information. This frame is the
+        room-voice header with the game session id in the room id's place;
+        the audio after it goes to the worker's bounded voice buffer as is.
+        The buffer drops stale sequence numbers and tells the session to
+        pause its mics (``game_voice_backpressure``) when it backs up.
+
+        Binary frames have no reply: a frame for a session without a worker,
+        from a user who is not one of its players, or with a forged user id
+        is dropped, as room voice drops them.
+        """
+        client_info = self.clients.get(session_id)
+        if not client_info:
+            return
+        packet_type, gs_id, user_id, seq = struct.unpack('>BIII', raw_data[:VOICE_HEADER_SIZE])
+        if packet_type & VOICE_TYPE_MASK != GAME_VOICE_TYPE or user_id != client_info.get('user_id'):
+            return
+        players = self._routes.game_players(gs_id)
+        if players is not None and user_id not in players:
+            return
+        worker = self._game_session_workers.get(gs_id)
+        if worker is None or len(raw_data) == VOICE_HEADER_SIZE:
+            return
+        try:
+            await worker.send_voice_frame(user_id=user_id, username=client_info['username'],
+                                          audio=raw_data[VOICE_HEADER_SIZE:], seq=seq,
+                                          source=session_id)
+        except Exception as e:
+            logger.error(f"[GAMES] worker.send_voice_frame failed: {e}", exc_info=True)
+
     async def handle_game_advance_turn(self, session_id: str, data: Dict) -> Dict:
         """Manually advance the turn (host-only)."""
         if session_id not in self.clients:
@@ -3830,6 +4062,158 @@ class TitanNetServer:
                 self._recent_auth.pop(k, None)
         return False
 
+    def _build_router(self) -> MessageRouter:
+        """The dispatch table for authenticated messages (message_router.py).
+
+        One line per message type. ``data=False`` handlers take only the
+        session id; ``reply=False`` handlers send their own answers (or
+        none). The rate class also decides whether each message is logged.
+        A schema only names fields the handler cannot do without; handlers
+        that answer a missing field with their own typed error keep doing so.
+        """
+        r = MessageRouter()
+        # Chat
+        r.add('voice_audio', self.handle_voice_audio, reply=False, rate='stream')
+        r.add('private_message', self.handle_private_message, reply=False,
+              schema={'message': 'text', 'recipient_id': 'id?'})
+        r.add('get_messages', self.handle_get_messages, rate='poll')
+        r.add('mark_messages_read', self.handle_mark_messages_read, rate='poll')
+        r.add('create_room', self.handle_create_room, reply=False)
+        r.add('join_room', self.handle_join_room, reply=False,
+              schema={'room_id': 'id', 'password': 'text?'})
+        r.add('leave_room', self.handle_leave_room, reply=False, schema={'room_id': 'id'})
+        r.add('delete_room', self.handle_delete_room, reply=False, schema={'room_id': 'id'})
+        r.add('room_message', self.handle_room_message, reply=False,
+              schema={'room_id': 'id', 'message': 'text'})
+        r.add('get_rooms', self.handle_get_rooms, data=False, rate='poll')
+        r.add('get_room_messages', self.handle_get_room_messages, rate='poll')
+        r.add('voice_start', self.handle_voice_start, reply=False, schema={'room_id': 'id'})
+        r.add('voice_stop', self.handle_voice_stop, reply=False, schema={'room_id': 'id'})
+        r.add('ptt_start', self.handle_ptt_start, reply=False, schema={'room_id': 'id'})
+        r.add('ptt_stop', self.handle_ptt_stop, reply=False, schema={'room_id': 'id'})
+        r.add('get_online_users', self.handle_get_online_users, data=False, rate='poll')
+        r.add('get_directory', self.handle_get_directory, data=False, rate='poll')
+        r.add('block_user', self.handle_block_user)
+        r.add('unblock_user', self.handle_unblock_user)
+        r.add('get_blocked_users', self.handle_get_blocked_users, data=False)
+        r.add('update_blog', self.handle_update_blog, reply=False)
+        r.add('voice_signal', self.handle_voice_signal, reply=False, rate='stream')
+        r.add('ping', self.handle_ping, data=False, rate='poll')
+        # Administration
+        r.add('get_all_users', self.handle_get_all_users, data=False)
+        r.add('delete_user', self.handle_delete_user, rate='heavy')
+        r.add('hard_ban_user', self.handle_hard_ban_user, rate='heavy')
+        r.add('send_broadcast', self.handle_broadcast, rate='heavy')
+        r.add('list_broadcast_files', self.handle_list_broadcast_files)
+        r.add('get_broadcast_file', self.handle_get_broadcast_file)
+        r.add('save_broadcast_file', self.handle_save_broadcast_file, rate='heavy')
+        r.add('submit_app', self.handle_submit_app, rate='heavy')
+        r.add('approve_app', self.handle_approve_app)
+        r.add('router_stats', self.handle_router_stats, data=False)
+        r.add('voice_stats', self.handle_voice_stats, data=False)
+        r.add('set_voice_mixing', self.handle_set_voice_mixing, rate='heavy',
+              schema={'room_id': 'id', 'enabled': 'bool'})
+        # Feedback Hub
+        r.add('create_feedback', self.handle_create_feedback, rate='heavy')
+        r.add('list_feedback', self.handle_list_feedback)
+        r.add('get_feedback', self.handle_get_feedback)
+        r.add('get_feedback_attachment', self.handle_get_feedback_attachment, rate='heavy')
+        r.add('upvote_feedback', self.handle_upvote_feedback)
+        r.add('change_feedback_status', self.handle_change_feedback_status)
+        r.add('delete_feedback', self.handle_delete_feedback)
+        # Remote UI (server-defined screens) and server sounds
+        r.add('list_remote_screens', self.handle_list_remote_screens)
+        r.add('open_remote_screen', self.handle_open_remote_screen)
+        r.add('remote_screen_action', self.handle_remote_screen_action)
+        r.add('list_server_sounds', self.handle_list_server_sounds)
+        r.add('play_server_sound', self.handle_play_server_sound)
+        # Interactive Games (Entertainment tab)
+        r.add('create_game', self.handle_create_game, rate='heavy')
+        r.add('list_games', self.handle_list_games)
+        r.add('get_game', self.handle_get_game)
+        r.add('delete_game', self.handle_delete_game)
+        r.add('get_game_attachment', self.handle_get_game_attachment, rate='heavy')
+        r.add('start_game_session', self.handle_start_game_session)
+        r.add('join_game_session', self.handle_join_game_session)
+        r.add('leave_game_session', self.handle_leave_game_session)
+        r.add('get_game_session', self.handle_get_game_session)
+        r.add('list_game_sessions', self.handle_list_game_sessions)
+        r.add('game_player_action', self.handle_game_player_action)
+        r.add('game_voice_chunk', self.handle_game_voice_chunk, rate='stream')
+        r.add('game_advance_turn', self.handle_game_advance_turn)
+        r.add('game_end_session', self.handle_game_end_session)
+        r.add('wipe_all_game_sessions', self.handle_wipe_all_game_sessions, rate='heavy')
+        # Cerberus Protocol admin commands
+        r.add('cerberus_status', self._handle_cerberus_status, data=False)
+        r.add('cerberus_lockdown', self._handle_cerberus_activate, rate='heavy')
+        r.add('cerberus_unlock', self._handle_cerberus_deactivate, rate='heavy')
+        r.add('cerberus_ban_ip', self._handle_cerberus_ban, rate='heavy')
+        r.add('cerberus_whitelist', self._handle_cerberus_whitelist, rate='heavy')
+        r.add('cerberus_unban_ip', self._handle_cerberus_unban, rate='heavy')
+        r.add('cerberus_logs', self._handle_cerberus_logs)
+        r.add('cerberus_clear_logs', self._handle_cerberus_clear_logs, data=False, rate='heavy')
+        r.add('cerberus_ai_assessment', self._handle_cerberus_ai_assessment, data=False, rate='heavy')
+        r.add('blackwall_deliberate', self._handle_blackwall_deliberate, data=False, rate='heavy')
+        return r
+
+    async def handle_ping(self, session_id: str) -> Dict:
+        return {"type": "pong"}
+
+    async def _is_staff(self, session_id: str) -> bool:
+        """Whether the session belongs to a moderator or an admin."""
+        client = self.clients.get(session_id)
+        if not client:
+            return False
+        loop = asyncio.get_event_loop()
+        user = await loop.run_in_executor(None, self.db.get_user_by_id, client['user_id'])
+        if user and (user.get('is_admin') or user.get('role') == 'admin'):
+            return True
+        return bool(user and await loop.run_in_executor(None, self.db.is_moderator, client['user_id']))
+
+    async def handle_router_stats(self, session_id: str) -> Dict:
+        """Per message type: calls, errors, rejections and latency (moderator or admin)"""
+        if not await self._is_staff(session_id):
+            return {"type": "error", "error": "Moderator or admin access required"}
+
+        return {
+            "type": "router_stats",
+            **self._router.stats(),
+            "frames": frames.stats(),
+        }
+
+    async def handle_voice_stats(self, session_id: str) -> Dict:
+        """Relay and mixing counters, per voice room (moderator or admin)"""
+        if not await self._is_staff(session_id):
+            return {"type": "error", "error": "Moderator or admin access required"}
+        return {
+            "type": "voice_stats",
+            "forwarding": self._voice_forwarder.stats(),
+            "mixing": self._voice_mixer.stats(),
+        }
+
+    async def handle_set_voice_mixing(self, session_id: str, data: Dict) -> Dict:
+        """Switch a room between per-speaker relay and server-side mixing.
+
+        Mixing trades server CPU for client bandwidth and decoding work; the
+        room's ``cpu_percent`` in ``voice_stats`` shows what it costs.
+        """
+        if not await self._is_staff(session_id):
+            return {"type": "set_voice_mixing_response", "success": False,
+                    "error": "Moderator or admin access required"}
+        room_id = int(data['room_id'])
+        if data['enabled']:
+            if not self._voice_mixer.enable(room_id):
+                return {"type": "set_voice_mixing_response", "success": False, "room_id": room_id,
+                        "error": "Server-side mixing needs numpy on the server"}
+            if self.voice_channels.get(room_id):
+                self._ensure_voice_mix_loop(room_id)
+        else:
+            self._voice_mixer.disable(room_id)
+        logger.info(f"[VOICE MIX] {self.clients[session_id]['username']} turned mixing "
+                    f"{'on' if data['enabled'] else 'off'} in room {room_id}")
+        return {"type": "set_voice_mixing_response", "success": True, "room_id": room_id,
+                "enabled": self._voice_mixer.is_mixed(room_id)}
+
     async def handle_client(self, websocket: websockets.WebSocketServerProtocol):
         """Handle individual client connection"""
         session_id = None
@@ -3900,7 +4284,10 @@ class TitanNetServer:
                     # Binary frame = voice audio (fast path, zero-copy relay)
                     if isinstance(message, bytes):
                         if session_id and len(message) >= VOICE_HEADER_SIZE:
-                            await self.handle_voice_audio_binary(session_id, message)
+                            if message[0] & VOICE_TYPE_MASK == GAME_VOICE_TYPE:
+                                await self.handle_game_voice_binary(session_id, message)
+                            else:
+                                await self.handle_voice_audio_binary(session_id, message)
                         continue
 
                     # --- Cerberus: Message flood detection ---
@@ -3921,8 +4308,9 @@ class TitanNetServer:
 
                     data = json.loads(message)
                     msg_type = data.get('type')
-                    # Skip verbose logging for high-frequency messages (voice, ping, get_*)
-                    if msg_type not in ('voice_audio', 'ping', 'get_rooms', 'get_online_users', 'get_room_messages', 'get_messages', 'mark_messages_read'):
+                    # Skip verbose logging for high-frequency messages (the
+                    # stream and poll rate classes: voice, ping, get_*)
+                    if self._router.should_log(msg_type):
                         logger.info(f"[MESSAGE] {msg_type} from {client_addr}")
 
                     # Handle authentication messages
@@ -4041,11 +4429,13 @@ class TitanNetServer:
                         # Send login response first
                         response_copy = response.copy()
                         response_copy.pop('broadcast_online', None)  # Remove internal flag
+                        response_copy.pop('_presence_delta', None)
                         await websocket.send(json.dumps(response_copy))
 
                         # Now broadcast user online status if login was successful
                         if response.get('broadcast_online'):
                             user = response.get('user', {})
+                            await self._publish_presence(response.get('_presence_delta'), user['id'])
                             await self.broadcast_user_status(user['id'], 'online')
 
                     elif msg_type == 'register':
@@ -4076,272 +4466,11 @@ class TitanNetServer:
                             })
                             logger.info(f"[HANDLE] Broadcast complete")
 
-                    # Authenticated-only messages
+                    # Authenticated-only messages: one lookup in the
+                    # dispatch table (see _build_router). Unknown types are
+                    # counted and otherwise ignored, as they always were.
                     elif session_id:
-                        # voice_audio first - highest frequency during calls (~33/sec per speaker)
-                        if msg_type == 'voice_audio':
-                            await self.handle_voice_audio(session_id, data)
-
-                        elif msg_type == 'private_message':
-                            await self.handle_private_message(session_id, data)
-
-                        elif msg_type == 'get_messages':
-                            response = await self.handle_get_messages(session_id, data)
-                            await websocket.send(json.dumps(response))
-
-                        elif msg_type == 'mark_messages_read':
-                            response = await self.handle_mark_messages_read(session_id, data)
-                            await websocket.send(json.dumps(response))
-
-                        elif msg_type == 'create_room':
-                            await self.handle_create_room(session_id, data)
-
-                        elif msg_type == 'join_room':
-                            await self.handle_join_room(session_id, data)
-
-                        elif msg_type == 'leave_room':
-                            await self.handle_leave_room(session_id, data)
-
-                        elif msg_type == 'delete_room':
-                            await self.handle_delete_room(session_id, data)
-
-                        elif msg_type == 'room_message':
-                            await self.handle_room_message(session_id, data)
-
-                        elif msg_type == 'get_rooms':
-                            response = await self.handle_get_rooms(session_id)
-                            await websocket.send(json.dumps(response))
-
-                        elif msg_type == 'get_room_messages':
-                            response = await self.handle_get_room_messages(session_id, data)
-                            await websocket.send(json.dumps(response))
-
-                        elif msg_type == 'voice_start':
-                            await self.handle_voice_start(session_id, data)
-
-                        elif msg_type == 'voice_stop':
-                            await self.handle_voice_stop(session_id, data)
-
-                        elif msg_type == 'ptt_start':
-                            await self.handle_ptt_start(session_id, data)
-
-                        elif msg_type == 'ptt_stop':
-                            await self.handle_ptt_stop(session_id, data)
-
-                        elif msg_type == 'get_online_users':
-                            response = await self.handle_get_online_users(session_id)
-                            await websocket.send(json.dumps(response))
-
-                        elif msg_type == 'block_user':
-                            response = await self.handle_block_user(session_id, data)
-                            await websocket.send(json.dumps(response))
-
-                        elif msg_type == 'unblock_user':
-                            response = await self.handle_unblock_user(session_id, data)
-                            await websocket.send(json.dumps(response))
-
-                        elif msg_type == 'get_blocked_users':
-                            response = await self.handle_get_blocked_users(session_id)
-                            await websocket.send(json.dumps(response))
-
-                        elif msg_type == 'update_blog':
-                            await self.handle_update_blog(session_id, data)
-
-                        elif msg_type == 'voice_signal':
-                            await self.handle_voice_signal(session_id, data)
-
-                        elif msg_type == 'ping':
-                            await websocket.send(json.dumps({"type": "pong"}))
-
-                        elif msg_type == 'get_all_users':
-                            response = await self.handle_get_all_users(session_id)
-                            await websocket.send(json.dumps(response))
-
-                        elif msg_type == 'delete_user':
-                            response = await self.handle_delete_user(session_id, data)
-                            await websocket.send(json.dumps(response))
-
-                        elif msg_type == 'hard_ban_user':
-                            response = await self.handle_hard_ban_user(session_id, data)
-                            await websocket.send(json.dumps(response))
-
-                        elif msg_type == 'send_broadcast':
-                            response = await self.handle_broadcast(session_id, data)
-                            await websocket.send(json.dumps(response))
-
-                        elif msg_type == 'list_broadcast_files':
-                            response = await self.handle_list_broadcast_files(session_id, data)
-                            await websocket.send(json.dumps(response))
-
-                        elif msg_type == 'get_broadcast_file':
-                            response = await self.handle_get_broadcast_file(session_id, data)
-                            await websocket.send(json.dumps(response))
-
-                        elif msg_type == 'save_broadcast_file':
-                            response = await self.handle_save_broadcast_file(session_id, data)
-                            await websocket.send(json.dumps(response))
-
-                        elif msg_type == 'submit_app':
-                            response = await self.handle_submit_app(session_id, data)
-                            await websocket.send(json.dumps(response))
-
-                        elif msg_type == 'approve_app':
-                            response = await self.handle_approve_app(session_id, data)
-                            await websocket.send(json.dumps(response))
-
-                        # --- Feedback Hub ---
-                        elif msg_type == 'create_feedback':
-                            response = await self.handle_create_feedback(session_id, data)
-                            await websocket.send(json.dumps(response))
-
-                        elif msg_type == 'list_feedback':
-                            response = await self.handle_list_feedback(session_id, data)
-                            await websocket.send(json.dumps(response))
-
-                        elif msg_type == 'get_feedback':
-                            response = await self.handle_get_feedback(session_id, data)
-                            await websocket.send(json.dumps(response))
-
-                        elif msg_type == 'get_feedback_attachment':
-                            response = await self.handle_get_feedback_attachment(session_id, data)
-                            await websocket.send(json.dumps(response))
-
-                        elif msg_type == 'upvote_feedback':
-                            response = await self.handle_upvote_feedback(session_id, data)
-                            await websocket.send(json.dumps(response))
-
-                        elif msg_type == 'change_feedback_status':
-                            response = await self.handle_change_feedback_status(session_id, data)
-                            await websocket.send(json.dumps(response))
-
-                        elif msg_type == 'delete_feedback':
-                            response = await self.handle_delete_feedback(session_id, data)
-                            await websocket.send(json.dumps(response))
-
-                        # --- Remote UI (server-defined screens) ---
-                        elif msg_type == 'list_remote_screens':
-                            response = await self.handle_list_remote_screens(session_id, data)
-                            await websocket.send(json.dumps(response))
-
-                        elif msg_type == 'open_remote_screen':
-                            response = await self.handle_open_remote_screen(session_id, data)
-                            await websocket.send(json.dumps(response))
-
-                        elif msg_type == 'remote_screen_action':
-                            response = await self.handle_remote_screen_action(session_id, data)
-                            await websocket.send(json.dumps(response))
-
-                        # --- Server sounds ---
-                        elif msg_type == 'list_server_sounds':
-                            response = await self.handle_list_server_sounds(session_id, data)
-                            await websocket.send(json.dumps(response))
-
-                        elif msg_type == 'play_server_sound':
-                            response = await self.handle_play_server_sound(session_id, data)
-                            await websocket.send(json.dumps(response))
-
-                        # --- Interactive Games (Entertainment tab) ---
-                        elif msg_type == 'create_game':
-                            response = await self.handle_create_game(session_id, data)
-                            await websocket.send(json.dumps(response))
-
-                        elif msg_type == 'list_games':
-                            response = await self.handle_list_games(session_id, data)
-                            await websocket.send(json.dumps(response))
-
-                        elif msg_type == 'get_game':
-                            response = await self.handle_get_game(session_id, data)
-                            await websocket.send(json.dumps(response))
-
-                        elif msg_type == 'delete_game':
-                            response = await self.handle_delete_game(session_id, data)
-                            await websocket.send(json.dumps(response))
-
-                        elif msg_type == 'get_game_attachment':
-                            response = await self.handle_get_game_attachment(session_id, data)
-                            await websocket.send(json.dumps(response))
-
-                        elif msg_type == 'start_game_session':
-                            response = await self.handle_start_game_session(session_id, data)
-                            await websocket.send(json.dumps(response))
-
-                        elif msg_type == 'join_game_session':
-                            response = await self.handle_join_game_session(session_id, data)
-                            await websocket.send(json.dumps(response))
-
-                        elif msg_type == 'leave_game_session':
-                            response = await self.handle_leave_game_session(session_id, data)
-                            await websocket.send(json.dumps(response))
-
-                        elif msg_type == 'get_game_session':
-                            response = await self.handle_get_game_session(session_id, data)
-                            await websocket.send(json.dumps(response))
-
-                        elif msg_type == 'list_game_sessions':
-                            response = await self.handle_list_game_sessions(session_id, data)
-                            await websocket.send(json.dumps(response))
-
-                        elif msg_type == 'game_player_action':
-                            response = await self.handle_game_player_action(session_id, data)
-                            await websocket.send(json.dumps(response))
-
-                        elif msg_type == 'game_voice_chunk':
-                            response = await self.handle_game_voice_chunk(session_id, data)
-                            await websocket.send(json.dumps(response))
-
-                        elif msg_type == 'game_advance_turn':
-                            response = await self.handle_game_advance_turn(session_id, data)
-                            await websocket.send(json.dumps(response))
-
-                        elif msg_type == 'game_end_session':
-                            response = await self.handle_game_end_session(session_id, data)
-                            await websocket.send(json.dumps(response))
-
-                        elif msg_type == 'wipe_all_game_sessions':
-                            response = await self.handle_wipe_all_game_sessions(session_id, data)
-                            await websocket.send(json.dumps(response))
-
-                        # --- Cerberus Protocol admin commands ---
-                        elif msg_type == 'cerberus_status':
-                            response = await self._handle_cerberus_status(session_id)
-                            await websocket.send(json.dumps(response))
-
-                        elif msg_type == 'cerberus_lockdown':
-                            response = await self._handle_cerberus_activate(session_id, data)
-                            await websocket.send(json.dumps(response))
-
-                        elif msg_type == 'cerberus_unlock':
-                            response = await self._handle_cerberus_deactivate(session_id, data)
-                            await websocket.send(json.dumps(response))
-
-                        elif msg_type == 'cerberus_ban_ip':
-                            response = await self._handle_cerberus_ban(session_id, data)
-                            await websocket.send(json.dumps(response))
-
-                        elif msg_type == 'cerberus_whitelist':
-                            response = await self._handle_cerberus_whitelist(session_id, data)
-                            await websocket.send(json.dumps(response))
-
-                        elif msg_type == 'cerberus_unban_ip':
-                            response = await self._handle_cerberus_unban(session_id, data)
-                            await websocket.send(json.dumps(response))
-
-                        elif msg_type == 'cerberus_logs':
-                            response = await self._handle_cerberus_logs(session_id, data)
-                            await websocket.send(json.dumps(response))
-
-                        elif msg_type == 'cerberus_clear_logs':
-                            response = await self._handle_cerberus_clear_logs(session_id)
-                            await websocket.send(json.dumps(response))
-
-                        elif msg_type == 'cerberus_ai_assessment':
-                            response = await self._handle_cerberus_ai_assessment(session_id)
-                            await websocket.send(json.dumps(response))
-
-                        elif msg_type == 'blackwall_deliberate':
-                            response = await self._handle_blackwall_deliberate(session_id)
-                            await websocket.send(json.dumps(response))
-
+                        await self._router.dispatch(session_id, websocket, msg_type, data)
 
                     else:
                         await websocket.send(json.dumps({
@@ -4358,6 +4487,7 @@ class TitanNetServer:
             logger.info("Client connection closed")
         finally:
             if session_id:
+                self._router.forget_session(session_id)
                 await self.unregister_client(session_id)
                 # Clean up IP -> session tracking
                 if client_ip in self._ip_sessions:
@@ -4773,6 +4903,21 @@ class TitanNetServer:
                             f"[HEARTBEAT] DB recovered after {consecutive_failures} failed check(s)"
                         )
                     consecutive_failures = 0
+                    writer = self.db.writer_stats()
+                    if writer:
+                        logger.info(
+                            f"[HEARTBEAT] writer: queue {writer['queue_depth']} "
+                            f"(max {writer['max_queue_depth']}), "
+                            f"{writer['batches']} batches / {writer['batched_writes']} writes "
+                            f"(mean {writer['mean_batch']}), {writer['solo_writes']} solo, "
+                            f"commit p95 {writer['commit_ms_p95']} ms, "
+                            f"fallbacks {writer['fallbacks']}"
+                        )
+                    logger.info(f"[HEARTBEAT] messages: {self._router.summary()}")
+                    logger.info(f"[HEARTBEAT] frames: {frames.summary()}")
+                    logger.info(f"[HEARTBEAT] profile assets: {self._profile_assets.summary()}")
+                    logger.info(f"[HEARTBEAT] voice: {self._voice_forwarder.summary()}; "
+                                f"mixing: {self._voice_mixer.summary()}")
                 else:
                     consecutive_failures += 1
                     logger.error(
@@ -4980,6 +5125,16 @@ class TitanNetServer:
         protocol = "wss" if ssl_context else "ws"
         logger.info(f"Protocol: {protocol}://")
 
+        # permessage-deflate per message class (frames.py): off by default
+        # for the lowest latency; 'selective' deflates only large text
+        # messages and never voice.
+        compression_mode, compress_min_bytes = self._compression_settings()
+        try:
+            compression = frames.serve_options(compression_mode, compress_min_bytes)
+        except ValueError as e:
+            logger.error(f"{e}; compression stays off")
+            compression_mode, compression = 'off', frames.serve_options('off')
+
         # Optimized WebSocket settings for 30-40 users with real-time voice chat
         async with websockets.serve(
             self.handle_client,
@@ -4991,10 +5146,13 @@ class TitanNetServer:
             max_size=50 * 1024 * 1024,  # 50MB max message size (for 30-40 users with voice)
             max_queue=1024,             # Very large queue for hundreds of voice packets (default 32)
             write_limit=2 * 1024 * 1024, # 2MB write buffer for fast broadcast (default 64KB)
-            compression=None            # Disable compression for lower latency
+            **compression
         ):
             logger.info(f"Server started successfully ({protocol}://) with optimized voice settings for 30-40 users")
-            logger.info("  max_size: 50MB, max_queue: 1024, write_limit: 2MB, compression: disabled")
+            logger.info(f"  max_size: 50MB, max_queue: 1024, write_limit: 2MB, "
+                        f"compression: {compression_mode}"
+                        f"{f' (text from {compress_min_bytes} B)' if compression_mode == 'selective' else ''}, "
+                        f"JSON: {frames.JSON_BACKEND}")
             await asyncio.Future()  # Run forever
 
 
@@ -0,0 +1,186 @@
+"""
+Tests for the frame encoding layer (frames.py) and the pushes built on it.
+
+Run directly:  python test_frames.py
+The deflate tests open a real websocket on localhost (an ephemeral port)
+and check what actually crossed the wire; the push tests use a bare
+TitanNetServer whose websockets.broadcast() is replaced by a recorder.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import unittest
+import zlib
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import frames  # noqa: E402
+import websockets  # noqa: E402
+from websockets.frames import Frame, Opcode  # noqa: E402
+from routing import RoutingIndex, ClientRegistry  # noqa: E402
+
+
+class Encoding(unittest.TestCase):
+    def test_same_json_as_the_standard_library(self):
+        message = {"type": "user_status", "user_id": 7, "username": "Zażółć",
+                   "nested": {"a": [1, 2.5, None, True]}, 3: "int key"}
+        self.assertEqual(json.loads(frames.encode(message)),
+                         json.loads(json.dumps(message)))
+
+    def test_what_the_fast_backend_refuses_falls_back(self):
+        big = {"n": 2 ** 70}
+        self.assertEqual(json.loads(frames.encode(big)), big)
+        with self.assertRaises(TypeError):
+            frames.encode({"s": {1, 2}})   # json refuses sets too
+
+    def test_fan_out_counts_and_skips_nobody(self):
+        with mock.patch.object(websockets, 'broadcast') as broadcast:
+            self.assertEqual(frames.fan_out(iter(['a', 'b']), 'x'), 2)
+            self.assertEqual(frames.fan_out([], 'x'), 0)
+        broadcast.assert_called_once_with(['a', 'b'], 'x')
+
+    def test_unknown_compression_mode(self):
+        with self.assertRaises(ValueError):
+            frames.serve_options('zstd')
+        self.assertEqual(frames.serve_options('off'), {'compression': None})
+
+
+class SelectiveDeflateFrames(unittest.TestCase):
+    def setUp(self):
+        self.ext = frames.SelectiveDeflate(False, False, 15, 15, min_bytes=100)
+
+    def test_voice_and_small_text_go_out_plain(self):
+        voice = Frame(Opcode.BINARY, b'\x01' * 500)
+        small = Frame(Opcode.TEXT, b'{"type":"typing"}')
+        self.assertIs(self.ext.encode(voice), voice)
+        self.assertIs(self.ext.encode(small), small)
+
+    def test_large_text_is_deflated(self):
+        text = json.dumps([{"message": "hello there", "id": i} for i in range(50)]).encode()
+        out = self.ext.encode(Frame(Opcode.TEXT, text))
+        self.assertTrue(out.rsv1)
+        self.assertLess(len(out.data), len(text) // 4)
+        inflate = zlib.decompressobj(wbits=-15)
+        self.assertEqual(inflate.decompress(bytes(out.data) + b'\x00\x00\xff\xff'), text)
+
+    def test_continuations_follow_their_first_frame(self):
+        big = b'x' * 200
+        self.assertTrue(self.ext.encode(Frame(Opcode.TEXT, big, fin=False)).rsv1)
+        tail = self.ext.encode(Frame(Opcode.CONT, b'y'))
+        self.assertNotEqual(tail.data, b'y')   # still compressed, though short
+
+
+class DeflateOnTheWire(unittest.TestCase):
+    """A real connection: the client gets every message back intact, and only
+    the large text one was compressed."""
+
+    def test_selective_mode(self):
+        small = json.dumps({"type": "typing", "user_id": 1})
+        large = json.dumps({"type": "history", "messages": ["line"] * 400})
+        voice = b'\x01' + os.urandom(60)
+
+        async def serve(ws):
+            for message in (small, large, voice):
+                await ws.send(message)
+
+        async def scenario():
+            before = frames.STATS.deflated, frames.STATS.deflate_skipped
+            async with websockets.serve(serve, '127.0.0.1', 0,
+                                        **frames.serve_options('selective', 1024)) as server:
+                port = server.sockets[0].getsockname()[1]
+                async with websockets.connect(f"ws://127.0.0.1:{port}",
+                                              compression='deflate') as ws:
+                    got = [await ws.recv() for _ in range(3)]
+            after = frames.STATS.deflated, frames.STATS.deflate_skipped
+            return got, after[0] - before[0], after[1] - before[1]
+
+        got, deflated, skipped = asyncio.run(scenario())
+        self.assertEqual(got, [small, large, voice])
+        self.assertEqual((deflated, skipped), (1, 2))
+
+
+try:
+    import server as S  # noqa: E402
+except Exception:  # missing third-party module in this environment
+    S = None
+
+
+class Socket:
+    def __init__(self):
+        self.frames = []
+
+
+def fake_broadcast(sockets, frame):
+    for ws in sockets:
+        ws.frames.append(frame)
+
+
+class FakeDatabase:
+    def get_server_sound(self, name):
+        return {"name": name, "sha256": "ab" * 32, "size": 10, "mime": "audio/ogg"}
+
+
+@unittest.skipIf(S is None, "server.py could not be imported")
+class SharedPushes(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(S.websockets, 'broadcast', side_effect=fake_broadcast)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        server = S.TitanNetServer.__new__(S.TitanNetServer)
+        server._routes = RoutingIndex()
+        server.clients = ClientRegistry(server._routes)
+        server._blocks = {2: {3}}
+        server._sound_pushes = {}
+        server.db = FakeDatabase()
+        for uid in range(1, 6):
+            server.clients[f"s{uid}"] = {'user_id': uid, 'username': f"u{uid}",
+                                         'websocket': Socket()}
+        self.server = server
+
+    def received(self, sid):
+        return [json.loads(f) for f in self.server.clients[sid]['websocket'].frames]
+
+    def test_a_sound_is_serialized_once_for_everyone(self):
+        with mock.patch.object(frames, 'encode', wraps=frames.encode) as encode:
+            sent = asyncio.run(self.server.push_server_sound('bell'))
+        self.assertEqual((sent, encode.call_count), (5, 1))
+        frame = self.server.clients['s1']['websocket'].frames[0]
+        self.assertTrue(all(self.server.clients[f"s{u}"]['websocket'].frames[0] is frame
+                            for u in range(2, 6)))
+        self.assertEqual(self.received('s4')[0]['sha256'], "ab" * 32)
+
+    def test_broadcast_skips_the_excluded_and_the_blocked(self):
+        asyncio.run(self.server.broadcast({"type": "user_status", "user_id": 3},
+                                          exclude_session='s1', sender_user_id=3))
+        self.assertEqual([sid for sid in self.server.clients if self.received(sid)],
+                         ['s3', 's4', 's5'])
+
+    def test_each_session_gets_the_screen_built_for_it(self):
+        self.server.clients['s1b'] = {'user_id': 1, 'username': 'u1', 'websocket': Socket()}
+
+        async def build(session_id, slug, action, values):
+            return {"success": True, "result": {"screen": {"title": f"for {session_id}"}}}
+
+        self.server.db.get_remote_screen = lambda slug: {"active": True}
+        with mock.patch.object(self.server, '_build_screen', side_effect=build):
+            sent = asyncio.run(self.server.push_remote_screen({'type': 'user', 'user_id': 1}, 'news'))
+        self.assertEqual(sent, 2)
+        self.assertEqual(self.received('s1')[0]['screen'], {"title": "for s1"})
+        self.assertEqual(self.received('s1b')[0]['screen'], {"title": "for s1b"})
+
+    def test_sessions_with_the_same_screen_share_one_fan_out(self):
+        self.server.clients['s1b'] = {'user_id': 1, 'username': 'u1', 'websocket': Socket()}
+
+        async def build(session_id, slug, action, values):
+            return {"success": True, "result": {"screen": {"title": "news"}}}
+
+        self.server.db.get_remote_screen = lambda slug: {"active": True}
+        with mock.patch.object(self.server, '_build_screen', side_effect=build), \
+                mock.patch.object(frames, 'fan_out', wraps=frames.fan_out) as fan_out:
+            sent = asyncio.run(self.server.push_remote_screen({'type': 'user', 'user_id': 1}, 'news'))
+        self.assertEqual((sent, fan_out.call_count), (2, 1))
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,193 @@
+"""
+Tests for binary game voice frames and the AI worker's voice buffer.
+
+Run directly:  python test_game_voice_binary.py
+The worker runs in its stub loop (the fake database has no game, so no
+Gemini SDK or network is touched); the server tests use a bare
+TitanNetServer with fake websockets.
+"""
+
+import asyncio
+import base64
+import os
+import struct
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from gemini_game_worker import GeminiGameWorker, VoiceFrameBuffer  # noqa: E402
+from routing import RoutingIndex, ClientRegistry  # noqa: E402
+
+
+def frame(gs_id, user_id, seq, audio=b'\x01\x02' * 160):
+    return struct.pack('>BIII', 0x02, gs_id, user_id, seq) + audio
+
+
+class NoGames:
+    """Database stand-in: no game row, so the worker goes to stub mode."""
+
+    def get_game(self, game_id, include_api_key=False):
+        return None
+
+
+async def settle(predicate, rounds=200):
+    for _ in range(rounds):
+        if predicate():
+            return True
+        await asyncio.sleep(0)
+    return predicate()
+
+
+class Buffer(unittest.TestCase):
+    def test_sequence_numbers(self):
+        buf = VoiceFrameBuffer()
+        buf.offer(1, 'ala', b'a', seq=10)
+        buf.offer(1, 'ala', b'b', seq=10)        # repeated
+        buf.offer(1, 'ala', b'c', seq=9)         # late
+        buf.offer(1, 'ala', b'd', seq=13)        # 11 and 12 lost
+        buf.offer(2, 'bob', b'e', seq=1)         # other speaker, own numbering
+        buf.offer(1, 'ala', b'f')                # JSON path, unnumbered
+        self.assertEqual((buf.stats['accepted'], buf.stats['stale'], buf.stats['gaps']), (4, 2, 2))
+
+    def test_sequence_wraps(self):
+        buf = VoiceFrameBuffer()
+        buf.offer(1, 'ala', b'a', seq=0xFFFFFFFF)
+        buf.offer(1, 'ala', b'b', seq=0)
+        self.assertEqual((buf.stats['accepted'], buf.stats['stale'], buf.stats['gaps']), (2, 0, 0))
+
+    def test_a_player_who_starts_counting_again_is_heard(self):
+        """A rejoining client numbers from 1 again; it used to be mute until
+        the new numbers passed the old ones."""
+        buf = VoiceFrameBuffer(capacity=10000)
+        for n in range(1, 5001):
+            buf.offer(1, 'ala', b'a', seq=n, source='s-old')
+        for n in range(1, 200):
+            buf.offer(1, 'ala', b'b', seq=n, source='s-new')
+        self.assertEqual((buf.stats['accepted'], buf.stats['stale']), (5000 + 199, 0))
+        # Same connection, numbering restarted: a big backward jump.
+        buf.offer(1, 'ala', b'c', seq=1, source='s-new')
+        self.assertEqual((buf.stats['stale'], buf.stats['restarts']), (0, 1))
+        buf.offer(1, 'ala', b'd', seq=2, source='s-new')
+        buf.offer(1, 'ala', b'e', seq=1, source='s-new')      # merely late
+        self.assertEqual(buf.stats['stale'], 1)
+
+    def test_full_buffer_keeps_the_newest_frames(self):
+        buf = VoiceFrameBuffer(capacity=4, resume_at=1)
+        paused = [buf.offer(1, 'ala', bytes([n]), seq=n) for n in range(1, 7)]
+        self.assertEqual(paused, [False, False, False, True, False, False])
+        self.assertEqual(len(buf), 4)
+        self.assertEqual(buf.stats['dropped'], 2)
+
+        async def drain():
+            return [await buf.take() for _ in range(4)]
+        taken = asyncio.run(drain())
+        self.assertEqual([f[2] for f, _ in taken], [b'\x03', b'\x04', b'\x05', b'\x06'])
+        self.assertEqual([resumed for _, resumed in taken], [False, False, True, False])
+        self.assertFalse(buf.backlogged)
+
+
+class StubWorker(unittest.TestCase):
+    def test_frames_drain_and_backpressure_round_trips(self):
+        async def scenario():
+            sent = []
+
+            async def broadcast(session_id, message):
+                sent.append(message)
+
+            worker = GeminiGameWorker(db=NoGames(), session_id=7, game_id=1,
+                                      broadcast_cb=broadcast)
+            heard = []
+
+            async def sink(audio):
+                heard.append(audio)
+            worker._stub_voice_sink = sink
+
+            # The worker is not running yet: the buffer fills to its mark.
+            capacity = worker._voice.capacity
+            for seq in range(1, capacity + 3):
+                await worker.send_voice_frame(user_id=1, username='ala',
+                                              audio=seq.to_bytes(2, 'big'), seq=seq)
+            pressure = [m['paused'] for m in sent if m['type'] == 'game_voice_backpressure']
+            self.assertEqual(pressure, [True])
+
+            await worker.start()
+            self.assertTrue(await settle(lambda: len(heard) == capacity))
+            # Oldest two were dropped; order of the rest is kept.
+            self.assertEqual(heard[0], (3).to_bytes(2, 'big'))
+            self.assertEqual(heard[-1], (capacity + 2).to_bytes(2, 'big'))
+            pressure = [m['paused'] for m in sent if m['type'] == 'game_voice_backpressure']
+            self.assertEqual(pressure, [True, False])
+
+            # The base64 JSON path lands in the same buffer.
+            await worker.send_voice_chunk(user_id=2, username='bob',
+                                          audio_b64=base64.b64encode(b'json').decode())
+            self.assertTrue(await settle(lambda: heard[-1] == b'json'))
+            self.assertFalse(await worker.send_voice_frame(user_id=1, username='ala',
+                                                           audio=b'old', seq=1))
+            stats = worker.voice_stats()
+            await worker.shutdown('test')
+            return stats
+
+        stats = asyncio.run(scenario())
+        self.assertEqual((stats['dropped'], stats['stale'], stats['queued']), (2, 1, 0))
+        self.assertEqual(stats['forwarded'], stats['accepted'] - stats['dropped'])
+
+
+try:
+    import server as S  # noqa: E402
+except Exception:  # missing third-party module in this environment
+    S = None
+
+
+class FakeSocket:
+    async def send(self, text):
+        pass
+
+
+class RecordingWorker:
+    def __init__(self):
+        self.frames = []
+
+    async def send_voice_frame(self, *, user_id, username, audio, seq=None, source=None):
+        self.frames.append((user_id, username, audio, seq))
+        self.source = source
+        return True
+
+
+@unittest.skipIf(S is None, "server.py could not be imported")
+class ServerPath(unittest.TestCase):
+    def setUp(self):
+        server = S.TitanNetServer.__new__(S.TitanNetServer)
+        server._routes = RoutingIndex()
+        server.clients = ClientRegistry(server._routes)
+        server.clients['s-ala'] = {'user_id': 1, 'username': 'ala', 'websocket': FakeSocket()}
+        server.clients['s-cyd'] = {'user_id': 3, 'username': 'cyd', 'websocket': FakeSocket()}
+        server._routes.set_game_players(7, [1, 2])
+        self.worker = RecordingWorker()
+        server._game_session_workers = {7: self.worker}
+        self.server = server
+
+    def send(self, session_id, raw):
+        asyncio.run(self.server.handle_game_voice_binary(session_id, raw))
+
+    def test_a_players_frame_reaches_the_worker_as_raw_bytes(self):
+        self.send('s-ala', frame(7, 1, 5, b'pcm'))
+        self.assertEqual(self.worker.frames, [(1, 'ala', b'pcm', 5)])
+        self.assertEqual(self.worker.source, 's-ala')
+
+    def test_frames_that_are_not_theirs_to_send_are_dropped(self):
+        self.send('s-ala', frame(7, 2, 1))            # someone else's user id
+        self.send('s-cyd', frame(7, 3, 1))            # not a player
+        self.send('s-ala', frame(8, 1, 1))            # no worker
+        self.send('s-ala', frame(7, 1, 1, b''))       # header only
+        self.send('nobody', frame(7, 1, 1))           # not logged in
+        self.assertEqual(self.worker.frames, [])
+
+    def test_room_voice_packets_are_not_game_voice(self):
+        raw = struct.pack('>BIII', S.VOICE_AUDIO_TYPE, 7, 1, 1) + b'pcm'
+        self.send('s-ala', raw)
+        self.assertEqual(self.worker.frames, [])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
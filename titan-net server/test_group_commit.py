@@ -0,0 +1,279 @@
+"""
+Tests for group commit on the database writer thread (group_commit.py).
+
+Run directly:  python test_group_commit.py
+Works against a throwaway database file. A "gate" write that blocks the
+writer thread is used to line writes up behind it, so the tests decide
+exactly what ends up in one batch.
+"""
+
+import os
+import shutil
+import sqlite3 as plain_sqlite3
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import models  # noqa: E402
+from models import Database  # noqa: E402
+from group_commit import GroupCommitWriter, batchable  # noqa: E402
+
+
+def setUpModule():
+    global DB, TMP
+    TMP = tempfile.mkdtemp(prefix="titannet_group_commit_")
+    DB = Database(os.path.join(TMP, "group.db"))
+    conn = DB.get_connection()
+    conn.execute("CREATE TABLE IF NOT EXISTS gc_log (id INTEGER PRIMARY KEY, tag TEXT)")
+    conn.commit()
+
+
+def tearDownModule():
+    DB.close_all()
+    DB._release_pid_lock()
+    models._LIVE_INSTANCES.pop(os.path.abspath(DB.db_path), None)
+    shutil.rmtree(TMP, ignore_errors=True)
+
+
+@batchable
+def log_tag(tag):
+    conn = DB.get_connection()
+    cur = conn.cursor()
+    cur.execute("INSERT INTO gc_log (tag) VALUES (?)", (tag,))
+    row_id = cur.lastrowid
+    conn.commit()
+    conn.close()
+    return row_id
+
+
+@batchable
+def log_then_fail(tag):
+    conn = DB.get_connection()
+    conn.execute("INSERT INTO gc_log (tag) VALUES (?)", (tag,))
+    raise ValueError("write went wrong")
+
+
+@batchable
+def log_then_roll_back(tag):
+    """The IntegrityError pattern: undo and report failure in the result."""
+    conn = DB.get_connection()
+    conn.execute("INSERT INTO gc_log (tag) VALUES (?)", (tag,))
+    conn.rollback()
+    return {"success": False}
+
+
+@batchable
+def abandon_transaction(tag):
+    """What SQLite does on some errors: the whole transaction is gone."""
+    conn = DB.get_connection()
+    conn.execute("INSERT INTO gc_log (tag) VALUES (?)", (tag,))
+    conn.execute("ROLLBACK")
+    raise plain_sqlite3.OperationalError("transaction abandoned")
+
+
+def _insert(tag):
+    """Same write, not marked: always its own transaction."""
+    conn = DB.get_connection()
+    cur = conn.cursor()
+    cur.execute("INSERT INTO gc_log (tag) VALUES (?)", (tag,))
+    conn.commit()
+    return cur.lastrowid
+
+
+def tags(prefix):
+    conn = DB.get_connection()
+    rows = conn.execute("SELECT tag FROM gc_log WHERE tag LIKE ? ORDER BY id",
+                        (prefix + "%",)).fetchall()
+    conn.close()
+    return [row[0] for row in rows]
+
+
+class WriterTestCase(unittest.TestCase):
+    def setUp(self):
+        self.writer = GroupCommitWriter(DB, window=0.002, max_batch=64,
+                                        name="test-db-writer")
+        self.addCleanup(self.writer.shutdown)
+
+    def gate(self):
+        """Block the writer thread until the returned event is set."""
+        release = threading.Event()
+        started = threading.Event()
+
+        def hold():
+            started.set()
+            release.wait(5)
+        self.writer.submit(hold)
+        started.wait(5)
+        return release
+
+
+class Batching(WriterTestCase):
+    def test_queued_writes_share_one_commit(self):
+        release = self.gate()
+        futures = [self.writer.submit(log_tag, f"batch-{i}") for i in range(20)]
+        release.set()
+        ids = [f.result(5) for f in futures]
+        self.assertEqual(ids, sorted(ids))
+        self.assertEqual(tags("batch-"), [f"batch-{i}" for i in range(20)])
+        stats = self.writer.stats()
+        self.assertEqual(stats["batches"], 1)
+        self.assertEqual(stats["batched_writes"], 20)
+        self.assertEqual(stats["largest_batch"], 20)
+        self.assertGreaterEqual(stats["max_queue_depth"], 20)
+
+    def test_max_batch_bounds_a_transaction(self):
+        self.writer.max_batch = 8
+        release = self.gate()
+        futures = [self.writer.submit(log_tag, f"bounded-{i}") for i in range(20)]
+        release.set()
+        for f in futures:
+            f.result(5)
+        self.assertLessEqual(self.writer.stats()["largest_batch"], 8)
+
+    def test_a_lone_write_is_not_held_back(self):
+        started = time.perf_counter()
+        self.writer.submit(log_tag, "lone").result(5)
+        self.assertLess(time.perf_counter() - started, 0.5)
+        self.assertEqual(self.writer.stats()["batches"], 0)
+
+
+class Ordering(WriterTestCase):
+    def test_unmarked_writes_split_batches_in_order(self):
+        release = self.gate()
+        futures = []
+        for i in range(30):
+            fn = _insert if i % 7 == 3 else log_tag
+            futures.append(self.writer.submit(fn, f"order-{i:02d}"))
+        release.set()
+        for f in futures:
+            f.result(5)
+        self.assertEqual(tags("order-"), [f"order-{i:02d}" for i in range(30)])
+        self.assertGreaterEqual(self.writer.stats()["solo_writes"], 4)
+
+    def test_concurrent_producers_keep_their_own_order(self):
+        def produce(name, out):
+            out.extend(self.writer.submit(log_tag, f"conc-{name}-{i:03d}")
+                       for i in range(150))
+        results = {name: [] for name in "abcdef"}
+        threads = [threading.Thread(target=produce, args=(n, results[n])) for n in results]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        for name, futures in results.items():
+            ids = [f.result(10) for f in futures]
+            self.assertEqual(ids, sorted(ids), f"producer {name} was reordered")
+        written = tags("conc-")
+        self.assertEqual(len(written), 900)
+        for name in results:
+            own = [t for t in written if t.startswith(f"conc-{name}-")]
+            self.assertEqual(own, sorted(own))
+        stats = self.writer.stats()
+        self.assertEqual(stats["completed"], stats["submitted"])
+        self.assertEqual(stats["failed"], 0)
+
+
+class Isolation(WriterTestCase):
+    def test_a_failing_write_is_rolled_back_alone(self):
+        release = self.gate()
+        ok1 = self.writer.submit(log_tag, "iso-1")
+        bad = self.writer.submit(log_then_fail, "iso-bad")
+        ok2 = self.writer.submit(log_tag, "iso-2")
+        release.set()
+        ok1.result(5)
+        ok2.result(5)
+        with self.assertRaises(ValueError):
+            bad.result(5)
+        self.assertEqual(tags("iso-"), ["iso-1", "iso-2"])
+        self.assertEqual(self.writer.stats()["batches"], 1)
+
+    def test_rollback_inside_a_write_undoes_only_that_write(self):
+        release = self.gate()
+        ok = self.writer.submit(log_tag, "rb-kept")
+        undone = self.writer.submit(log_then_roll_back, "rb-undone")
+        release.set()
+        self.assertEqual(undone.result(5), {"success": False})
+        ok.result(5)
+        self.assertEqual(tags("rb-"), ["rb-kept"])
+
+    def test_an_abandoned_batch_is_replayed_write_by_write(self):
+        release = self.gate()
+        first = self.writer.submit(log_tag, "replay-1")
+        bad = self.writer.submit(abandon_transaction, "replay-bad")
+        last = self.writer.submit(log_tag, "replay-2")
+        release.set()
+        first.result(5)
+        last.result(5)
+        with self.assertRaises(Exception):
+            bad.result(5)
+        self.assertEqual(tags("replay-1") + tags("replay-2"), ["replay-1", "replay-2"])
+        self.assertEqual(self.writer.stats()["fallbacks"], 1)
+
+
+@unittest.skipIf(models._USE_SQLCIPHER, "reads the file with plain sqlite3")
+class Durability(WriterTestCase):
+    def test_a_result_means_the_row_is_committed(self):
+        seen = []
+
+        def check(future):
+            other = plain_sqlite3.connect(DB.db_path)
+            try:
+                seen.append(other.execute(
+                    "SELECT COUNT(*) FROM gc_log WHERE tag = ?",
+                    (f"durable-{len(seen)}",)).fetchone()[0])
+            finally:
+                other.close()
+
+        release = self.gate()
+        futures = [self.writer.submit(log_tag, f"durable-{i}") for i in range(10)]
+        for f in futures:
+            f.add_done_callback(check)
+        release.set()
+        for f in futures:
+            f.result(5)
+        # A done-callback may still be running when result() returns.
+        deadline = time.time() + 2
+        while len(seen) < 10 and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(seen, [1] * 10)
+
+
+class Shutdown(WriterTestCase):
+    def test_queued_writes_finish_before_shutdown_returns(self):
+        release = self.gate()
+        futures = [self.writer.submit(log_tag, f"drain-{i}") for i in range(5)]
+        release.set()
+        self.writer.shutdown()
+        self.assertTrue(all(f.done() for f in futures))
+        with self.assertRaises(RuntimeError):
+            self.writer.submit(log_tag, "late")
+
+    def test_stats_shape(self):
+        self.writer.submit(log_tag, "stats").result(5)
+        stats = self.writer.stats()
+        for key in ("queue_depth", "max_queue_depth", "batches", "mean_batch",
+                    "commit_ms_p50", "commit_ms_p95", "commit_ms_max",
+                    "queue_wait_ms_p95", "fallbacks"):
+            self.assertIn(key, stats)
+
+
+class DatabaseWiring(unittest.TestCase):
+    def test_hot_writes_are_marked(self):
+        for name in ("send_room_message", "send_private_message",
+                     "update_user_status", "log_session_event",
+                     "mark_private_messages_as_read"):
+            self.assertTrue(getattr(getattr(Database, name), "group_commit", False), name)
+        for name in ("heartbeat_check", "checkpoint_wal"):
+            self.assertFalse(getattr(getattr(Database, name), "group_commit", False), name)
+
+    def test_run_write_goes_through_group_commit(self):
+        self.assertIsInstance(DB._writer_executor, GroupCommitWriter)
+        self.assertEqual(DB.run_write(log_tag, "wired").result(5) > 0, True)
+        self.assertIn("batches", DB.writer_stats())
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,192 @@
+"""
+Tests for keyset-paginated message history (rooms and private chats).
+
+Run directly:  python test_message_history.py
+Uses a throwaway database file in a temp directory (plain sqlite3 when
+SQLCipher is not installed); the server handlers are exercised on a bare
+TitanNetServer that only has that database.
+"""
+
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import models  # noqa: E402
+from models import Database, history_limit, history_cursor  # noqa: E402
+
+
+def setUpModule():
+    global DB, TMP, ALICE, BOB, CAROL, ROOM, OTHER_ROOM
+    TMP = tempfile.mkdtemp(prefix="titannet_history_")
+    DB = Database(os.path.join(TMP, "history.db"))
+    ALICE = DB.create_user("alice_history", "pw-alice-123")["user_id"]
+    BOB = DB.create_user("bob_history", "pw-bob-123")["user_id"]
+    CAROL = DB.create_user("carol_history", "pw-carol-123")["user_id"]
+    ROOM = DB.create_chat_room("history room", ALICE)["room_id"]
+    OTHER_ROOM = DB.create_chat_room("other room", BOB)["room_id"]
+
+    # Interleave the two rooms and three conversations so every query has
+    # rows of other conversations between its own.
+    now = datetime.now().isoformat()
+    conn = DB.get_connection()
+    cur = conn.cursor()
+    for i in range(300):
+        cur.execute("INSERT INTO room_messages (room_id, user_id, message, sent_at) "
+                    "VALUES (?, ?, ?, ?)", (ROOM, ALICE, f"room {i}", now))
+        cur.execute("INSERT INTO room_messages (room_id, user_id, message, sent_at) "
+                    "VALUES (?, ?, ?, ?)", (OTHER_ROOM, BOB, f"other {i}", now))
+        sender, recipient = (ALICE, BOB) if i % 3 else (BOB, ALICE)
+        cur.execute("INSERT INTO private_messages (sender_id, recipient_id, message, sent_at) "
+                    "VALUES (?, ?, ?, ?)", (sender, recipient, f"pm {i}", now))
+        cur.execute("INSERT INTO private_messages (sender_id, recipient_id, message, sent_at) "
+                    "VALUES (?, ?, ?, ?)", (ALICE, CAROL, f"carol {i}", now))
+    conn.commit()
+    conn.close()
+
+
+def tearDownModule():
+    DB.close_all()
+    DB._release_pid_lock()
+    models._LIVE_INSTANCES.pop(os.path.abspath(DB.db_path), None)
+    shutil.rmtree(TMP, ignore_errors=True)
+
+
+def texts(messages):
+    return [m["message"] for m in messages]
+
+
+class RoomPages(unittest.TestCase):
+    def test_newest_page(self):
+        page = DB.get_room_message_page(ROOM, 10)
+        self.assertEqual(texts(page["messages"]), [f"room {i}" for i in range(299, 289, -1)])
+        self.assertTrue(page["has_more"])
+        self.assertEqual(page["newest_id"], page["messages"][0]["id"])
+        self.assertEqual(page["oldest_id"], page["messages"][-1]["id"])
+
+    def test_paging_back_visits_every_message_once(self):
+        seen, before = [], None
+        while True:
+            page = DB.get_room_message_page(ROOM, 64, before_id=before)
+            seen.extend(texts(page["messages"]))
+            if not page["has_more"]:
+                break
+            before = page["oldest_id"]
+        self.assertEqual(seen, [f"room {i}" for i in range(299, -1, -1)])
+
+    def test_after_returns_only_the_new_messages(self):
+        room = DB.create_chat_room("delta room", BOB)["room_id"]
+        for i in range(5):
+            DB.send_room_message(room, BOB, f"old {i}")
+        newest = DB.get_room_message_page(room, 1)["newest_id"]
+        self.assertEqual(DB.get_room_message_page(room, 50, after_id=newest)["messages"], [])
+        DB.send_room_message(room, ALICE, "fresh")
+        page = DB.get_room_message_page(room, 50, after_id=newest)
+        self.assertEqual(texts(page["messages"]), ["fresh"])
+        self.assertFalse(page["has_more"])
+
+    def test_a_gap_larger_than_a_page_says_so(self):
+        oldest = DB.get_room_message_page(ROOM, 300)["oldest_id"]
+        page = DB.get_room_message_page(ROOM, 20, after_id=oldest)
+        self.assertEqual(len(page["messages"]), 20)
+        self.assertTrue(page["has_more"])
+
+    def test_the_old_list_api_still_works(self):
+        self.assertEqual(len(DB.get_room_messages(OTHER_ROOM, 5)), 5)
+        self.assertEqual(DB.get_room_messages(OTHER_ROOM, 5)[0]["message"], "other 299")
+
+    def test_the_query_uses_the_room_index(self):
+        conn = DB.get_connection()
+        plan = " ".join(row[-1] for row in conn.cursor().execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM room_messages rm "
+            "WHERE rm.room_id = ? AND rm.id < ? ORDER BY rm.id DESC LIMIT 10",
+            (ROOM, 100)).fetchall())
+        conn.close()
+        self.assertIn("idx_room_messages_room", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+
+class PrivatePages(unittest.TestCase):
+    def test_both_directions_in_id_order(self):
+        page = DB.get_private_message_page(ALICE, BOB, 6)
+        self.assertEqual(texts(page["messages"]), [f"pm {i}" for i in range(299, 293, -1)])
+        ids = [m["id"] for m in page["messages"]]
+        self.assertEqual(ids, sorted(ids, reverse=True))
+        self.assertIn("sender_username", page["messages"][0])
+
+    def test_same_conversation_from_either_side(self):
+        self.assertEqual(DB.get_private_message_page(ALICE, BOB, 20)["messages"],
+                         DB.get_private_message_page(BOB, ALICE, 20)["messages"])
+
+    def test_paging_back_never_mixes_conversations(self):
+        seen, before = [], None
+        while True:
+            page = DB.get_private_message_page(BOB, ALICE, 37, before_id=before)
+            seen.extend(texts(page["messages"]))
+            if not page["has_more"]:
+                break
+            before = page["oldest_id"]
+        self.assertEqual(seen, [f"pm {i}" for i in range(299, -1, -1)])
+
+    def test_after(self):
+        newest = DB.get_private_message_page(ALICE, CAROL, 1)["newest_id"]
+        DB.send_private_message(CAROL, ALICE, "reply")
+        self.assertEqual(texts(DB.get_private_message_page(ALICE, CAROL, 10, after_id=newest)["messages"]),
+                         ["reply"])
+
+
+class Clamping(unittest.TestCase):
+    def test_limits_and_cursors(self):
+        self.assertEqual(history_limit(None), models.HISTORY_DEFAULT_LIMIT)
+        self.assertEqual(history_limit("abc"), models.HISTORY_DEFAULT_LIMIT)
+        self.assertEqual(history_limit(0), 1)
+        self.assertEqual(history_limit(10 ** 6), models.HISTORY_MAX_LIMIT)
+        self.assertIsNone(history_cursor(None))
+        self.assertIsNone(history_cursor("x"))
+        self.assertIsNone(history_cursor(-4))
+        self.assertEqual(history_cursor("17"), 17)
+
+
+try:
+    import server as S  # noqa: E402
+except Exception:  # missing third-party module in this environment
+    S = None
+
+
+@unittest.skipIf(S is None, "server.py could not be imported")
+class WebsocketHandlers(unittest.TestCase):
+    def setUp(self):
+        from routing import RoutingIndex, ClientRegistry
+        server = S.TitanNetServer.__new__(S.TitanNetServer)
+        server._routes = RoutingIndex()
+        server.clients = ClientRegistry(server._routes)
+        server.db = DB
+        server.clients["s"] = {"user_id": ALICE, "username": "alice_history",
+                               "websocket": None}
+        self.server = server
+
+    def test_room_history_with_cursor(self):
+        first = asyncio.run(self.server.handle_get_room_messages(
+            "s", {"room_id": OTHER_ROOM, "limit": 3}))
+        self.assertEqual(first["type"], "room_messages")
+        self.assertTrue(first["has_more"])
+        second = asyncio.run(self.server.handle_get_room_messages(
+            "s", {"room_id": OTHER_ROOM, "limit": 3, "before_id": first["oldest_id"]}))
+        self.assertEqual(texts(second["messages"]), ["other 296", "other 295", "other 294"])
+        self.assertEqual(second["before_id"], first["oldest_id"])
+
+    def test_private_history_delta(self):
+        first = asyncio.run(self.server.handle_get_messages("s", {"user_id": CAROL}))
+        self.assertEqual(len(first["messages"]), models.HISTORY_DEFAULT_LIMIT)
+        delta = asyncio.run(self.server.handle_get_messages(
+            "s", {"user_id": CAROL, "after_id": first["newest_id"]}))
+        self.assertEqual(delta["messages"], [])
+        self.assertEqual(delta["user_id"], CAROL)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,173 @@
+"""
+Tests for the websocket message router (message_router.py) and the server's
+dispatch table.
+
+Run directly:  python test_message_router.py
+Handlers are plain coroutines; the table tests build a bare TitanNetServer
+without opening a port or a database.
+"""
+
+import asyncio
+import inspect
+import json
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import message_router  # noqa: E402
+from message_router import MessageRouter, validate  # noqa: E402
+
+
+class FakeSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, text):
+        self.sent.append(json.loads(text))
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+class Validation(unittest.TestCase):
+    def test_required_and_optional_fields(self):
+        schema = {'room_id': 'id', 'password': 'text?'}
+        self.assertIsNone(validate(schema, {'room_id': 5}))
+        self.assertIsNone(validate(schema, {'room_id': '5', 'password': None}))
+        self.assertEqual(validate(schema, {}), "room_id is required")
+        self.assertEqual(validate(schema, {'room_id': 'five'}), "room_id must be id")
+        self.assertEqual(validate(schema, {'room_id': True}), "room_id must be id")
+        self.assertEqual(validate(schema, {'room_id': 1, 'password': 7}), "password must be text")
+
+    def test_bad_declarations_fail_at_startup(self):
+        router = MessageRouter()
+        with self.assertRaises(ValueError):
+            router.add('x', None, rate='warp')
+        with self.assertRaises(ValueError):
+            router.add('y', None, schema={'a': 'uuid'})
+        router.add('z', None)
+        with self.assertRaises(ValueError):
+            router.add('z', None)
+
+
+class Dispatch(unittest.TestCase):
+    def setUp(self):
+        self.router = MessageRouter()
+        self.calls = []
+
+        async def echo(session_id, data):
+            self.calls.append((session_id, data))
+            return {"type": "echo", "n": data.get("n")}
+
+        async def quiet(session_id):
+            self.calls.append((session_id,))
+
+        async def broken(session_id, data):
+            raise RuntimeError("handler bug")
+
+        self.router.add('echo', echo, schema={'n': 'number'})
+        self.router.add('quiet', quiet, data=False, reply=False, rate='poll')
+        self.router.add('broken', broken)
+        self.router.add('public', echo, auth='none')
+        self.ws = FakeSocket()
+
+    def test_routes_reply_and_count(self):
+        self.assertTrue(run(self.router.dispatch('s', self.ws, 'echo', {'n': 1})))
+        self.assertTrue(run(self.router.dispatch('s', self.ws, 'quiet', {})))
+        self.assertEqual(self.ws.sent, [{"type": "echo", "n": 1}])
+        self.assertEqual(self.calls, [('s', {'n': 1}), ('s',)])
+        stats = self.router.stats()['types']
+        self.assertEqual(stats['echo']['calls'], 1)
+        self.assertEqual(sum(stats['echo']['histogram'].values()), 1)
+
+    def test_unknown_types_are_not_routed(self):
+        self.assertFalse(run(self.router.dispatch('s', self.ws, 'nope', {})))
+        self.assertEqual(self.router.stats()['unknown_types'], 1)
+        self.assertEqual(self.ws.sent, [])
+
+    def test_rejections_name_the_type(self):
+        run(self.router.dispatch('s', self.ws, 'echo', {'n': 'x'}))
+        run(self.router.dispatch(None, self.ws, 'echo', {'n': 1}))
+        self.assertEqual([m['request_type'] for m in self.ws.sent], ['echo', 'echo'])
+        self.assertEqual(self.ws.sent[1]['error'], "Not authenticated")
+        self.assertEqual(self.router.stats()['types']['echo']['rejected'], 2)
+        self.assertEqual(self.calls, [])
+        run(self.router.dispatch(None, self.ws, 'public', {'n': 2}))
+        self.assertEqual(self.ws.sent[-1], {"type": "echo", "n": 2})
+
+    def test_a_raising_handler_is_counted_and_re_raised(self):
+        with self.assertRaises(RuntimeError):
+            run(self.router.dispatch('s', self.ws, 'broken', {}))
+        stats = self.router.stats()['types']['broken']
+        self.assertEqual((stats['calls'], stats['errors'], stats['error_rate']), (1, 1, 1.0))
+
+    def test_rate_class_limits_one_session_only(self):
+        spec = message_router.RATE_CLASSES['poll']
+        clock = [1000.0]
+        with mock.patch.object(message_router.time, 'monotonic', side_effect=lambda: clock[0]):
+            for _ in range(spec['burst']):
+                run(self.router.dispatch('a', self.ws, 'quiet', {}))
+            run(self.router.dispatch('a', self.ws, 'quiet', {}))
+            self.assertEqual(self.ws.sent[-1]['error'], "Rate limited")
+            run(self.router.dispatch('b', self.ws, 'quiet', {}))
+            self.assertEqual(len(self.ws.sent), 1)
+            clock[0] += 1.0
+            run(self.router.dispatch('a', self.ws, 'quiet', {}))
+            self.assertEqual(len(self.ws.sent), 1)
+        self.router.forget_session('a')
+        self.assertNotIn('a', self.router._buckets)
+
+    def test_latency_percentiles(self):
+        stats = message_router._TypeStats()
+        for ms in [0.05] * 90 + [40.0] * 9 + [3000.0]:
+            stats.record(ms)
+        self.assertEqual(stats.percentile(0.5), 0.1)
+        self.assertEqual(stats.percentile(0.95), 50)
+        self.assertEqual(stats.percentile(1.0), 5000)
+        self.assertEqual(MessageRouter().summary(), "no messages")
+
+    def test_logging_follows_the_rate_class(self):
+        self.assertTrue(self.router.should_log('echo'))
+        self.assertFalse(self.router.should_log('quiet'))
+        self.assertTrue(self.router.should_log('login'))   # not a route
+
+
+try:
+    import server as S  # noqa: E402
+except Exception:  # missing third-party module in this environment
+    S = None
+
+
+@unittest.skipIf(S is None, "server.py could not be imported")
+class ServerTable(unittest.TestCase):
+    def setUp(self):
+        self.server = S.TitanNetServer.__new__(S.TitanNetServer)
+        self.router = self.server._build_router()
+
+    def test_every_handler_takes_what_the_route_passes(self):
+        for name, route in self.router._routes.items():
+            params = [p for p in inspect.signature(route.handler).parameters.values()
+                      if p.default is inspect.Parameter.empty]
+            self.assertEqual(len(params), 2 if route.data else 1, name)
+            self.assertTrue(inspect.iscoroutinefunction(route.handler), name)
+
+    def test_the_old_chain_is_covered(self):
+        for msg_type in ('voice_audio', 'private_message', 'room_message', 'ping',
+                         'get_rooms', 'get_directory', 'create_game',
+                         'game_voice_chunk', 'cerberus_status', 'blackwall_deliberate'):
+            self.assertIsNotNone(self.router.route(msg_type), msg_type)
+        for quiet in ('voice_audio', 'ping', 'get_rooms', 'get_online_users',
+                      'get_room_messages', 'get_messages', 'mark_messages_read'):
+            self.assertFalse(self.router.should_log(quiet), quiet)
+
+    def test_ping(self):
+        ws = FakeSocket()
+        run(self.router.dispatch('s', ws, 'ping', {}))
+        self.assertEqual(ws.sent, [{"type": "pong"}])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,263 @@
+"""
+Tests for the presence registry (presence.py) and the handlers that keep it.
+
+Run directly:  python test_presence.py
+The registry tests need nothing at all; the handler tests use a throwaway
+database file and a bare TitanNetServer with fake websockets, so no port is
+opened.
+"""
+
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import models  # noqa: E402
+from models import Database  # noqa: E402
+from presence import PresenceRegistry  # noqa: E402
+from profile_assets import ProfileAssetIndex  # noqa: E402
+from routing import RoutingIndex, ClientRegistry  # noqa: E402
+from voice_forwarding import VoiceForwarder  # noqa: E402
+from voice_mixer import VoiceMixer  # noqa: E402
+
+
+def user(user_id, name=None):
+    return {"id": user_id, "username": name or f"user{user_id}",
+            "titan_number": 1000 + user_id, "full_name": None, "status": "online"}
+
+
+def room(room_id, members=0):
+    return {"id": room_id, "name": f"room{room_id}", "room_type": "text",
+            "password_hash": "secret", "is_private": 0, "member_count": members}
+
+
+class Registry(unittest.TestCase):
+    def setUp(self):
+        self.reg = PresenceRegistry()
+
+    def test_every_change_bumps_the_version(self):
+        deltas = [self.reg.user_online(user(1)),
+                  self.reg.room_added(room(5)),
+                  self.reg.room_members_changed(5, 1),
+                  self.reg.user_offline(1),
+                  self.reg.room_removed(5)]
+        self.assertEqual([d["version"] for d in deltas], [1, 2, 3, 4, 5])
+        self.assertEqual([d["op"] for d in deltas],
+                         ["user_online", "room_added", "room_members",
+                          "user_offline", "room_removed"])
+        self.assertEqual(self.reg.version, 5)
+
+    def test_no_op_changes_are_not_announced(self):
+        self.reg.user_online(user(1))
+        self.assertIsNone(self.reg.user_online(user(1)))   # second session
+        self.assertIsNone(self.reg.user_offline(2))
+        self.assertIsNone(self.reg.room_removed(9))
+        self.assertIsNone(self.reg.room_members_changed(9, 1))
+        self.reg.load_rooms([room(5)])
+        self.assertIsNone(self.reg.room_members_changed(5, -1))  # already 0
+        self.assertEqual(self.reg.version, 1)
+
+    def test_password_hash_never_leaves(self):
+        self.reg.load_rooms([room(5)])
+        delta = self.reg.room_added(room(6))
+        self.assertNotIn("password_hash", delta["room"])
+        self.assertNotIn("password_hash", self.reg.rooms()[0])
+
+    def test_room_ids_from_json_match(self):
+        self.reg.load_rooms([room(5, members=2)])
+        self.assertEqual(self.reg.room_members_changed("5", 1)["room_id"], 5)
+        self.assertTrue(self.reg.has_room("5"))
+
+    def test_snapshot_is_filtered_per_viewer(self):
+        for uid in (1, 2, 3):
+            self.reg.user_online(user(uid))
+        snap = self.reg.snapshot(lambda uid: uid != 2)
+        self.assertEqual([u["id"] for u in snap["users"]], [1, 3])
+        self.assertEqual(snap["version"], 3)
+
+    def test_deltas_replayed_on_a_snapshot_rebuild_the_state(self):
+        """A mirror built the way the client builds it ends up equal."""
+        self.reg.load_rooms([room(1, 3), room(2)])
+        start = self.reg.snapshot()
+        mirror = {"users": {u["id"]: dict(u) for u in start["users"]},
+                  "rooms": {r["id"]: dict(r) for r in start["rooms"]}}
+        deltas = [self.reg.user_online(user(7)), self.reg.room_added(room(3)),
+                  self.reg.room_members_changed(3, 1), self.reg.room_members_changed(1, -1),
+                  self.reg.user_online(user(8)), self.reg.user_offline(7),
+                  self.reg.room_removed(2)]
+        for d in deltas:
+            op = d["op"]
+            if op == "user_online":
+                mirror["users"][d["user"]["id"]] = d["user"]
+            elif op == "user_offline":
+                mirror["users"].pop(d["user_id"], None)
+            elif op in ("room_added", "room_updated"):
+                mirror["rooms"][d["room"]["id"]] = d["room"]
+            elif op == "room_removed":
+                mirror["rooms"].pop(d["room_id"], None)
+            elif op == "room_members":
+                mirror["rooms"][d["room_id"]]["member_count"] = d["member_count"]
+        end = self.reg.snapshot()
+        self.assertEqual(list(mirror["users"].values()), end["users"])
+        self.assertEqual(sorted(mirror["rooms"].values(), key=lambda r: r["id"]),
+                         sorted(end["rooms"], key=lambda r: r["id"]))
+
+
+# --------------------------------------------------------------------------
+# The handlers
+# --------------------------------------------------------------------------
+
+try:
+    import server as S  # noqa: E402
+except Exception:  # missing third-party module in this environment
+    S = None
+
+
+def fake_broadcast(sockets, frame):
+    """websockets.broadcast() as the fan-out paths (frames.py) call it."""
+    for ws in sockets:
+        ws.deliver(frame)
+
+
+class FakeSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, text):
+        self.sent.append(json.loads(text))
+
+    def deliver(self, text):
+        self.sent.append(json.loads(text))
+
+    def deltas(self):
+        return [m for m in self.sent if m.get("type") == "directory_delta"]
+
+
+def setUpModule():
+    global DB, TMP, ALICE, BOB
+    TMP = tempfile.mkdtemp(prefix="titannet_presence_")
+    DB = Database(os.path.join(TMP, "presence.db"))
+    ALICE = DB.create_user("alice_presence", "pw-alice-123")["user_id"]
+    BOB = DB.create_user("bob_presence", "pw-bob-123")["user_id"]
+    DB.create_chat_room("existing room", ALICE)
+
+
+def tearDownModule():
+    DB.close_all()
+    DB._release_pid_lock()
+    models._LIVE_INSTANCES.pop(os.path.abspath(DB.db_path), None)
+    shutil.rmtree(TMP, ignore_errors=True)
+
+
+@unittest.skipIf(S is None, "server.py could not be imported")
+class Handlers(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(S.websockets, 'broadcast', side_effect=fake_broadcast)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        server = S.TitanNetServer.__new__(S.TitanNetServer)
+        server._routes = RoutingIndex()
+        server.clients = ClientRegistry(server._routes)
+        server._routing_self_check = True
+        server._blocks = {}
+        server.db = DB
+        server.voice_channels = {}
+        server._voice_forwarder = VoiceForwarder()
+        server._voice_mixer = VoiceMixer()
+        server._room_websockets = {}
+        server._room_type_cache = {}
+        server._open_screens = {}
+        server._presence = PresenceRegistry()
+        server._presence.load_rooms(DB.get_available_rooms())
+        server._profile_assets = ProfileAssetIndex(sfx_root=TMP, path=None)
+        self.server = server
+        self.alice_ws, self.bob_ws = FakeSocket(), FakeSocket()
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+        self.alice = self.run_async(server.register_client(self.alice_ws, DB.get_user_by_id(ALICE)))
+        self.bob = self.run_async(server.register_client(self.bob_ws, DB.get_user_by_id(BOB)))
+
+    def run_async(self, coroutine):
+        return self.loop.run_until_complete(coroutine)
+
+    def test_connect_and_disconnect(self):
+        users = self.run_async(self.server.handle_get_online_users(self.alice))["users"]
+        self.assertEqual({u["id"] for u in users}, {ALICE, BOB})
+        self.assertEqual(self.alice_ws.deltas()[-1]["op"], "user_online")
+        self.run_async(self.server.unregister_client(self.bob))
+        self.assertEqual(self.alice_ws.deltas()[-1],
+                         {"type": "directory_delta", "version": self.server._presence.version,
+                          "op": "user_offline", "user_id": BOB})
+        users = self.run_async(self.server.handle_get_online_users(self.alice))["users"]
+        self.assertEqual([u["id"] for u in users], [ALICE])
+
+    def test_a_second_session_is_not_a_new_user(self):
+        before = self.server._presence.version
+        extra = self.run_async(self.server.register_client(FakeSocket(), DB.get_user_by_id(BOB)))
+        self.assertEqual(self.server._presence.version, before)
+        self.run_async(self.server.unregister_client(extra))
+        self.assertTrue(self.server._presence.is_online(BOB))
+
+    def test_room_lifecycle_without_the_database(self):
+        self.run_async(self.server.handle_create_room(self.alice, {"name": "presence room"}))
+        created = [d for d in self.bob_ws.deltas() if d["op"] == "room_added"][-1]["room"]
+        self.assertEqual(created["member_count"], 1)
+        self.assertNotIn("password_hash", created)
+        room_id = created["id"]
+
+        self.run_async(self.server.handle_join_room(self.bob, {"room_id": room_id}))
+        self.assertEqual(self.alice_ws.deltas()[-1]["member_count"], 2)
+        self.run_async(self.server.handle_leave_room(self.bob, {"room_id": room_id}))
+        self.assertEqual(self.alice_ws.deltas()[-1]["member_count"], 1)
+        # Leaving a room you are not in changes nothing.
+        version = self.server._presence.version
+        self.run_async(self.server.handle_leave_room(self.bob, {"room_id": room_id}))
+        self.assertEqual(self.server._presence.version, version)
+
+        rooms = self.run_async(self.server.handle_get_rooms(self.bob))
+        self.assertEqual(rooms["version"], self.server._presence.version)
+        listed = {r["id"]: r for r in rooms["rooms"]}
+        self.assertEqual(listed[room_id]["member_count"], 1)
+        self.assertEqual({r["id"]: r["member_count"] for r in DB.get_available_rooms()},
+                         {rid: r["member_count"] for rid, r in listed.items()})
+
+        self.run_async(self.server.handle_delete_room(self.alice, {"room_id": room_id}))
+        self.assertEqual(self.bob_ws.deltas()[-1]["op"], "room_removed")
+        self.assertNotIn(room_id, {r["id"] for r in
+                                   self.run_async(self.server.handle_get_rooms(self.bob))["rooms"]})
+
+    def test_disconnect_counts_down_the_rooms_left(self):
+        room_id = DB.create_chat_room("left on disconnect", ALICE)["room_id"]
+        self.run_async(self.server._presence_room_changed(room_id))
+        self.run_async(self.server.handle_join_room(self.bob, {"room_id": room_id}))
+        self.run_async(self.server.unregister_client(self.bob))
+        counts = {r["id"]: r["member_count"] for r in self.server._presence.rooms()}
+        self.assertEqual(counts[room_id], 1)
+
+    def test_blocked_users_do_not_see_each_other(self):
+        self.run_async(self.server.handle_block_user(self.alice, {"user_id": BOB}))
+        self.assertEqual(self.bob_ws.deltas()[-1]["op"], "resync")
+        self.assertEqual(self.alice_ws.deltas()[-1]["op"], "resync")
+        snap = self.run_async(self.server.handle_get_directory(self.bob))
+        self.assertEqual(snap["type"], "directory")
+        self.assertEqual([u["id"] for u in snap["users"]], [BOB])
+        self.run_async(self.server.unregister_client(self.bob))
+        self.assertNotIn("user_offline", [d["op"] for d in self.alice_ws.deltas()])
+        self.run_async(self.server.handle_unblock_user(self.alice, {"user_id": BOB}))
+
+    def test_a_room_changed_over_http_is_picked_up(self):
+        room_id = DB.create_chat_room("moderated room", ALICE)["room_id"]
+        self.run_async(self.server.refresh_room(room_id))
+        DB.delete_chat_room(room_id, ALICE)
+        self.run_async(self.server.refresh_room(room_id))
+        self.assertFalse(self.server._presence.has_room(room_id))
+        self.assertIn("room_removed", [m["type"] for m in self.bob_ws.sent])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,150 @@
+"""
+Tests for the profile asset index (profile_assets.py) and status broadcasts.
+
+Run directly:  python test_profile_assets.py
+Sound directories live in a temporary folder; the status broadcast test
+uses a bare TitanNetServer whose database counts every read.
+"""
+
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from profile_assets import ProfileAssetIndex, safe_name  # noqa: E402
+from routing import RoutingIndex, ClientRegistry  # noqa: E402
+
+
+def put(root, user, filename, data=b'RIFF'):
+    os.makedirs(os.path.join(root, user), exist_ok=True)
+    with open(os.path.join(root, user, filename), 'wb') as f:
+        f.write(data)
+
+
+class Index(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix="titannet_assets_")
+        self.addCleanup(shutil.rmtree, self.tmp, True)
+        self.sfx = os.path.join(self.tmp, 'sfx')
+        self.path = os.path.join(self.tmp, 'profile_assets.json')
+        put(self.sfx, 'alice', 'login.ogg')
+        put(self.sfx, 'alice', 'avatar.WAV')
+        put(self.sfx, 'bob', 'notes.txt')          # not a sound: bob has none
+        os.makedirs(os.path.join(self.sfx, 'carol'))
+
+    def index(self):
+        return ProfileAssetIndex(sfx_root=self.sfx, path=self.path)
+
+    def test_first_start_scans_once_and_saves(self):
+        index = self.index().load()
+        self.assertEqual(index.stats['scans'], 1)
+        self.assertEqual(index.sounds('alice'), {'login': '.ogg', 'avatar': '.wav'})
+        self.assertFalse(index.has_custom_sounds('bob'))
+        self.assertFalse(index.has_custom_sounds('carol'))
+        self.assertTrue(os.path.exists(self.path))
+
+    def test_later_starts_do_not_scan(self):
+        self.index().load()
+        shutil.rmtree(self.sfx)          # the saved index is what counts now
+        index = self.index().load()
+        self.assertEqual(index.stats['scans'], 0)
+        self.assertTrue(index.has_custom_sounds('alice'))
+
+    def test_an_unreadable_file_means_a_rescan(self):
+        with open(self.path, 'w') as f:
+            f.write('{not json')
+        index = self.index().load()
+        self.assertEqual(index.stats['scans'], 1)
+        self.assertTrue(index.has_custom_sounds('alice'))
+
+    def test_upload_and_delete_are_saved(self):
+        index = self.index().load()
+        index.sound_uploaded('Bob Smith', 'logout', '.MP3', 1200)
+        self.assertEqual(safe_name('Bob Smith'), 'Bob_Smith')
+        self.assertEqual(self.index().load().sounds('Bob Smith'), {'logout': '.mp3'})
+        self.assertTrue(index.sound_deleted('Bob Smith', 'logout'))
+        self.assertFalse(index.sound_deleted('Bob Smith', 'logout'))
+        self.assertFalse(self.index().load().has_custom_sounds('Bob Smith'))
+
+    def test_cards_stay_in_memory(self):
+        index = self.index().load()
+        self.assertIsNone(index.status_fields(1))
+        index.remember_user({'id': 1, 'username': 'alice', 'titan_number': 100})
+        self.assertEqual(index.status_fields(1),
+                         {'username': 'alice', 'titan_number': 100, 'has_custom_sounds': True})
+        index.sound_uploaded('alice', 'login', '.wav', 10)
+        with open(self.path) as f:
+            self.assertNotIn('titan_number', f.read())
+
+
+try:
+    import server as S  # noqa: E402
+except Exception:  # missing third-party module in this environment
+    S = None
+
+
+class CountingDatabase:
+    def __init__(self):
+        self.reads = 0
+
+    def get_user_by_id(self, user_id):
+        self.reads += 1
+        return {'id': user_id, 'username': f"user{user_id}", 'titan_number': 1000 + user_id}
+
+
+class Socket:
+    def __init__(self):
+        self.frames = []
+
+
+def fake_broadcast(sockets, frame):
+    for ws in sockets:
+        ws.frames.append(json.loads(frame))
+
+
+@unittest.skipIf(S is None, "server.py could not be imported")
+class StatusBroadcast(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(S.websockets, 'broadcast', side_effect=fake_broadcast)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        server = S.TitanNetServer.__new__(S.TitanNetServer)
+        server._routes = RoutingIndex()
+        server.clients = ClientRegistry(server._routes)
+        server._blocks = {}
+        server.db = CountingDatabase()
+        server._profile_assets = ProfileAssetIndex(path=None)
+        server._profile_assets.sound_uploaded('user1', 'login', '.ogg', 10)
+        self.listener = Socket()
+        server.clients['s9'] = {'user_id': 9, 'username': 'user9', 'websocket': self.listener}
+        self.server = server
+
+    def test_a_storm_of_status_changes_reads_each_user_once(self):
+        async def storm():
+            for _ in range(3):
+                for uid in (1, 2):
+                    await self.server.broadcast_user_status(uid, 'offline')
+                    await self.server.broadcast_user_status(uid, 'online')
+        with mock.patch.object(S.os, 'listdir', side_effect=AssertionError("no scans")):
+            asyncio.run(storm())
+        self.assertEqual(self.server.db.reads, 2)
+        self.assertEqual(len(self.listener.frames), 12)
+        self.assertEqual(self.listener.frames[-1],
+                         {'type': 'user_status', 'user_id': 2, 'username': 'user2',
+                          'titan_number': 1002, 'status': 'online', 'has_custom_sounds': False})
+        self.assertTrue(self.listener.frames[0]['has_custom_sounds'])
+
+    def test_a_logged_in_user_needs_no_read_at_all(self):
+        self.server._profile_assets.remember_user(
+            {'id': 1, 'username': 'user1', 'titan_number': 1001})
+        asyncio.run(self.server.broadcast_user_status(1, 'away'))
+        self.assertEqual(self.server.db.reads, 0)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,295 @@
+"""
+Tests for the routing index (routing.py) and the server send paths built on it.
+
+Run directly:  python test_routing.py
+The index tests need nothing at all; the send-path tests build a bare
+TitanNetServer with a fake database and fake websockets, so no port is
+opened and no SQLCipher file is touched.
+"""
+
+import asyncio
+import json
+import os
+import random
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from routing import RoutingIndex, ClientRegistry  # noqa: E402
+
+
+def registry():
+    index = RoutingIndex()
+    return index, ClientRegistry(index)
+
+
+def client(user_id, name=None):
+    return {"user_id": user_id, "username": name or f"user{user_id}",
+            "websocket": FakeSocket()}
+
+
+def fake_broadcast(sockets, frame):
+    """websockets.broadcast() as the fan-out paths (frames.py) call it."""
+    for ws in sockets:
+        ws.deliver(frame)
+
+
+class FakeSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, text):
+        self.sent.append(json.loads(text))
+
+    def deliver(self, text):
+        self.sent.append(json.loads(text))
+
+    def types(self):
+        return [m.get("type") for m in self.sent]
+
+
+class SessionIndex(unittest.TestCase):
+    def test_sessions_follow_the_dict(self):
+        index, clients = registry()
+        clients["a1"] = client(1)
+        clients["a2"] = client(1)
+        clients["b1"] = client(2)
+        self.assertEqual(set(index.user_sessions(1)), {"a1", "a2"})
+        del clients["a1"]
+        self.assertEqual(index.user_sessions(1), ("a2",))
+        clients.pop("a2")
+        self.assertFalse(index.is_online(1))
+        self.assertEqual(index.online_user_count(), 1)
+        self.assertEqual(index.check(clients), [])
+
+    def test_every_mutator_keeps_the_index(self):
+        index, clients = registry()
+        clients.update({"a": client(1), "b": client(2)})
+        clients.setdefault("c", client(3))
+        clients.popitem()
+        self.assertEqual(index.check(clients), [])
+        self.assertIsNone(clients.pop("missing", None))
+        with self.assertRaises(KeyError):
+            clients.pop("missing")
+        clients.clear()
+        self.assertEqual(index.online_user_count(), 0)
+        self.assertEqual(index.check(clients), [])
+
+    def test_a_session_reused_by_another_user_moves(self):
+        index, clients = registry()
+        clients["s"] = client(1)
+        clients["s"] = client(2)
+        self.assertEqual(index.user_sessions(1), ())
+        self.assertEqual(index.user_sessions(2), ("s",))
+
+
+class RoomIndex(unittest.TestCase):
+    def setUp(self):
+        self.index, self.clients = registry()
+        self.clients["a"] = client(1)
+        self.clients["b"] = client(2)
+        self.index.set_room_members(10, [1, 2, 3])
+
+    def test_only_online_members_have_sessions(self):
+        self.assertEqual(set(self.index.room_sessions(10)), {"a", "b"})
+        self.clients["c"] = client(3)
+        self.assertEqual(set(self.index.room_sessions(10)), {"a", "b", "c"})
+        del self.clients["a"]
+        self.assertEqual(set(self.index.room_sessions(10)), {"b", "c"})
+        self.assertEqual(self.index.check(self.clients), [])
+
+    def test_join_and_leave(self):
+        self.clients["d"] = client(4)
+        self.index.add_room_member(10, 4)
+        self.assertIn("d", self.index.room_sessions(10))
+        self.index.remove_room_member(10, 2)
+        self.assertNotIn("b", self.index.room_sessions(10))
+        self.assertEqual(self.index.rooms_of_user(2), set())
+        self.assertEqual(self.index.check(self.clients), [])
+
+    def test_joining_an_unloaded_room_waits_for_the_load(self):
+        self.index.add_room_member(99, 1)
+        self.assertFalse(self.index.has_room(99))
+        self.assertEqual(self.index.room_sessions(99), ())
+
+    def test_forget_room(self):
+        self.index.forget_room(10)
+        self.assertFalse(self.index.has_room(10))
+        self.assertEqual(self.index.rooms_of_user(1), set())
+        self.assertEqual(self.index.check(self.clients), [])
+
+    def test_check_reports_drift(self):
+        self.index._rooms.sessions[10].add("ghost")
+        self.assertTrue(self.index.check(self.clients))
+
+
+class GameIndex(unittest.TestCase):
+    def test_players_and_their_sessions(self):
+        index, clients = registry()
+        clients["a"] = client(1)
+        index.set_game_players(7, [1])
+        clients["b"] = client(2)
+        index.add_game_player(7, 2)
+        self.assertEqual(set(index.game_sessions(7)), {"a", "b"})
+        index.remove_game_player(7, 1)
+        self.assertEqual(index.game_sessions(7), ("b",))
+        index.forget_game(7)
+        self.assertFalse(index.has_game(7))
+        self.assertEqual(index.check(clients), [])
+
+
+class RandomisedAgainstRebuild(unittest.TestCase):
+    """A long random run of every change, checked against a full rebuild."""
+
+    def test_random_operations(self):
+        rng = random.Random(31)
+        index, clients = registry()
+        for room in range(5):
+            index.set_room_members(room, rng.sample(range(20), 6))
+        for game in range(3):
+            index.set_game_players(game, rng.sample(range(20), 3))
+        for step in range(3000):
+            op = rng.random()
+            if op < 0.35:
+                clients[f"s{rng.randrange(60)}"] = client(rng.randrange(20))
+            elif op < 0.6 and clients:
+                del clients[rng.choice(list(clients))]
+            elif op < 0.7:
+                index.add_room_member(rng.randrange(6), rng.randrange(20))
+            elif op < 0.8:
+                index.remove_room_member(rng.randrange(6), rng.randrange(20))
+            elif op < 0.85:
+                index.set_room_members(rng.randrange(6), rng.sample(range(20), 4))
+            elif op < 0.9:
+                index.add_game_player(rng.randrange(4), rng.randrange(20))
+            elif op < 0.95:
+                index.remove_game_player(rng.randrange(4), rng.randrange(20))
+            else:
+                index.forget_room(rng.randrange(6))
+            self.assertEqual(index.check(clients), [], f"after step {step}")
+
+
+# --------------------------------------------------------------------------
+# The server's send paths
+# --------------------------------------------------------------------------
+
+try:
+    import server as S  # noqa: E402
+except Exception as exc:  # missing third-party module in this environment
+    S = None
+    _IMPORT_ERROR = exc
+
+
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def execute(self, *args):
+        pass
+
+    def fetchall(self):
+        return self.rows
+
+
+class FakeConnection:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def cursor(self):
+        return FakeCursor(self.rows)
+
+    def close(self):
+        pass
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.room_members = {}
+        self.game_sessions = {}
+        self.member_queries = 0
+        self.game_queries = 0
+        self._room = None
+
+    def get_connection(self):
+        self.member_queries += 1
+        # broadcast_to_room's query is the only one these tests reach.
+        rows = [{"user_id": u} for u in self.room_members.get(self._room, ())]
+        return FakeConnection(rows)
+
+    def get_game_session(self, gs_id):
+        self.game_queries += 1
+        return self.game_sessions.get(gs_id)
+
+
+@unittest.skipIf(S is None, "server.py could not be imported")
+class ServerSendPaths(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(S.websockets, 'broadcast', side_effect=fake_broadcast)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        server = S.TitanNetServer.__new__(S.TitanNetServer)
+        server._routes = RoutingIndex()
+        server.clients = ClientRegistry(server._routes)
+        server._routing_self_check = True
+        server._blocks = {}
+        server.db = FakeDatabase()
+        server._games_executor = None
+        self.server = server
+        for sid, uid in (("a1", 1), ("a2", 1), ("b", 2), ("c", 3), ("d", 4)):
+            server.clients[sid] = client(uid)
+
+    def run_async(self, coroutine):
+        return asyncio.run(coroutine)
+
+    def sent(self, sid):
+        return self.server.clients[sid]["websocket"].types()
+
+    def test_send_to_user_reaches_every_session_of_that_user_only(self):
+        self.run_async(self.server.send_to_user(1, {"type": "ping"}))
+        self.assertEqual(self.sent("a1"), ["ping"])
+        self.assertEqual(self.sent("a2"), ["ping"])
+        self.assertEqual(self.sent("b"), [])
+
+    def test_room_members_are_loaded_once(self):
+        db = self.server.db
+        db._room = 5
+        db.room_members[5] = [1, 2, 9]
+        for _ in range(3):
+            self.run_async(self.server.broadcast_to_room(5, {"type": "msg"},
+                                                         exclude_user_id=2))
+        self.assertEqual(db.member_queries, 1)
+        self.assertEqual(self.sent("a1"), ["msg"] * 3)
+        self.assertEqual(self.sent("b"), [])
+        self.assertEqual(self.sent("c"), [])
+
+    def test_room_broadcast_respects_blocks(self):
+        self.server.db._room = 5
+        self.server.db.room_members[5] = [1, 2, 3]
+        self.server._blocks = {3: {2}}
+        self.run_async(self.server.broadcast_to_room(5, {"type": "msg"},
+                                                     sender_user_id=2))
+        self.assertEqual(self.sent("c"), [])
+        self.assertEqual(self.sent("a1"), ["msg"])
+
+    def test_game_players_are_read_once_per_session(self):
+        db = self.server.db
+        db.game_sessions[8] = {"players": [{"user_id": 3, "left_at": None},
+                                           {"user_id": 4, "left_at": "earlier"}]}
+        for _ in range(4):
+            self.run_async(self.server._broadcast_to_session(8, {"type": "narration"}))
+        self.assertEqual(db.game_queries, 1)
+        self.assertEqual(self.sent("c"), ["narration"] * 4)
+        self.assertEqual(self.sent("d"), [])
+
+    def test_a_whisper_goes_to_one_session(self):
+        self.run_async(self.server._send_to_user(1, {"type": "whisper"}))
+        self.assertEqual(len(self.sent("a1") + self.sent("a2")), 1)
+
+    def test_sound_target_by_user_id(self):
+        self.assertEqual(set(self.server._sessions_for_target(
+            {"type": "user", "user_id": 1})), {"a1", "a2"})
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
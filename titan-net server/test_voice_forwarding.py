@@ -0,0 +1,193 @@
+"""
+Tests for selective voice forwarding (voice_forwarding.py) and the relay.
+
+Run directly:  python test_voice_forwarding.py
+The forwarder is driven with an explicit clock; the room simulation pushes
+fifty speakers' packets through a bare TitanNetServer whose websockets
+only count what they would have been sent.
+"""
+
+import asyncio
+import os
+import struct
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from voice_forwarding import (VoiceForwarder, VOICE_FLAG_SPEECH,  # noqa: E402
+                              VOICE_FLAG_VAD, packet_speech)
+from routing import RoutingIndex, ClientRegistry  # noqa: E402
+from voice_mixer import VoiceMixer  # noqa: E402
+
+FRAME = 0.02   # one packet every 20 ms
+
+
+def talk(fwd, room, user, start, seconds, speech=None):
+    """Packets from ``user`` for ``seconds``; how many were relayed."""
+    relayed = 0
+    for i in range(int(seconds / FRAME)):
+        relayed += fwd.admit(room, user, speech, now=start + i * FRAME)
+    return relayed
+
+
+class Selection(unittest.TestCase):
+    def test_flags(self):
+        self.assertIsNone(packet_speech(0x01))
+        self.assertTrue(packet_speech(0x01 | VOICE_FLAG_VAD | VOICE_FLAG_SPEECH))
+        self.assertFalse(packet_speech(0x01 | VOICE_FLAG_VAD))
+
+    def test_slots_fill_then_newcomers_wait(self):
+        fwd = VoiceForwarder(max_speakers=2)
+        for user in (1, 2, 3):
+            talk(fwd, 9, user, 0.0, 0.2)
+        self.assertEqual(fwd.selected(9), {1, 2})
+        # Three similar speakers: hysteresis keeps the incumbents.
+        now = 0.2
+        for _ in range(100):
+            for user in (1, 2, 3):
+                fwd.admit(9, user, now=now)
+            now += FRAME
+        self.assertEqual(fwd.selected(9), {1, 2})
+
+    def test_a_lone_speaker_is_heard_from_the_first_packet(self):
+        """The score threshold used to cost every onset its first 60 ms."""
+        fwd = VoiceForwarder()
+        self.assertEqual([fwd.admit(9, 1, now=i * FRAME) for i in range(4)], [True] * 4)
+        self.assertTrue(fwd.admit(9, 2, True, now=0.1))
+        # A frame the sender's VAD called silence does not take a slot.
+        self.assertFalse(fwd.admit(9, 3, False, now=0.1))
+        self.assertEqual(fwd.selected(9), {1, 2})
+
+    def test_an_idle_speaker_gives_up_the_slot(self):
+        fwd = VoiceForwarder(max_speakers=1)
+        talk(fwd, 9, 1, 0.0, 1.0)
+        self.assertEqual(talk(fwd, 9, 2, 1.0, 0.1), 0)
+        self.assertEqual(fwd.selected(9), {1})
+        talk(fwd, 9, 2, 1.5, 0.2)   # speaker 1 silent since t=1.0
+        self.assertEqual(fwd.selected(9), {2})
+
+    def test_vad_silence_fades_an_open_mic_out(self):
+        fwd = VoiceForwarder(max_speakers=1, hold_ms=200)
+        talk(fwd, 9, 1, 0.0, 0.5, speech=True)
+        # 1 keeps sending, but its VAD now says silence; 2 starts talking.
+        now = 0.5
+        for _ in range(50):
+            fwd.admit(9, 1, False, now=now)
+            fwd.admit(9, 2, True, now=now)
+            now += FRAME
+        self.assertEqual(fwd.selected(9), {2})
+
+    def test_hold_stops_flapping(self):
+        fwd = VoiceForwarder(max_speakers=1, hold_ms=600)
+        talk(fwd, 9, 1, 0.0, 0.1)
+        fwd.admit(9, 1, False, now=0.1)
+        # Much more active, but 1 has held the slot only 0.1 s.
+        talk(fwd, 9, 2, 0.1, 0.3)
+        self.assertEqual(fwd.selected(9), {1})
+
+    def test_forgetting(self):
+        fwd = VoiceForwarder(max_speakers=1)
+        talk(fwd, 9, 1, 0.0, 0.2)
+        fwd.record(9, True, 100, 3)
+        fwd.forget_speaker(9, 1)
+        self.assertEqual(fwd.selected(9), set())
+        fwd.forget_room(9)
+        self.assertEqual(fwd.stats()['total']['forwarded_bytes'], 300)
+        self.assertEqual(fwd.stats()['rooms'], {})
+
+    def test_zero_relays_everyone(self):
+        fwd = VoiceForwarder(max_speakers=0)
+        self.assertEqual(talk(fwd, 9, 1, 0.0, 0.1) + talk(fwd, 9, 2, 0.0, 0.1), 10)
+
+
+try:
+    import server as S  # noqa: E402
+except Exception:  # missing third-party module in this environment
+    S = None
+
+
+class CountingSocket:
+    def __init__(self):
+        self.bytes = 0
+        self.frames = []
+
+
+def fake_broadcast(targets, payload):
+    for ws in targets:
+        ws.bytes += len(payload)
+        ws.frames.append(payload)
+
+
+@unittest.skipIf(S is None, "server.py could not be imported")
+class FiftySpeakerRoom(unittest.TestCase):
+    ROOM = 3
+    SPEAKERS = 50
+    PAYLOAD = b'\x00' * 60          # a 20 ms Opus frame, roughly
+
+    def setUp(self):
+        server = S.TitanNetServer.__new__(S.TitanNetServer)
+        server._routes = RoutingIndex()
+        server.clients = ClientRegistry(server._routes)
+        server._voice_forwarder = VoiceForwarder(max_speakers=4)
+        server._voice_mixer = VoiceMixer()
+        server.voice_channels = {self.ROOM: {}}
+        server._room_websockets = {self.ROOM: {}}
+        self.sockets = {}
+        for uid in range(1, self.SPEAKERS + 1):
+            ws = CountingSocket()
+            self.sockets[uid] = ws
+            server.clients[f"s{uid}"] = {'user_id': uid, 'username': f"u{uid}", 'websocket': ws}
+            server.voice_channels[self.ROOM][uid] = ws
+            server._room_websockets[self.ROOM][uid] = ws
+        self.server = server
+        patcher = mock.patch.object(S.websockets, 'broadcast', side_effect=fake_broadcast)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def packet(self, uid, seq, type_byte=0x01):
+        return struct.pack('>BIII', type_byte, self.ROOM, uid, seq) + self.PAYLOAD
+
+    def test_every_open_mic_costs_only_the_selected_few(self):
+        clock = [100.0]
+
+        async def second_of_chatter():
+            for seq in range(1, 51):
+                for uid in range(1, self.SPEAKERS + 1):
+                    # Four people talk; everyone else has an open mic the
+                    # client's VAD calls silence.
+                    talking = uid in (7, 19, 23, 42)
+                    flags = VOICE_FLAG_VAD | (VOICE_FLAG_SPEECH if talking else 0)
+                    await self.server.handle_voice_audio_binary(
+                        f"s{uid}", self.packet(uid, seq, 0x01 | flags))
+                clock[0] += FRAME
+
+        with mock.patch('voice_forwarding.time.monotonic', side_effect=lambda: clock[0]):
+            asyncio.run(second_of_chatter())
+
+        fwd = self.server._voice_forwarder
+        self.assertEqual(fwd.selected(self.ROOM), {7, 19, 23, 42})
+        total = fwd.stats()['total']
+        everything = self.SPEAKERS * 50 * len(self.packet(1, 1)) * (self.SPEAKERS - 1)
+        self.assertEqual(total['forwarded_bytes'] + total['suppressed_bytes'], everything)
+        self.assertLess(total['forwarded_bytes'], everything * 0.1)
+        self.assertEqual(sum(ws.bytes for ws in self.sockets.values()), total['forwarded_bytes'])
+        # Listeners get a plain 0x01 packet whatever flags the sender set.
+        self.assertEqual({f[0] for f in self.sockets[1].frames}, {0x01})
+        self.assertIn('saved', fwd.summary())
+
+    def test_leaving_voice_frees_the_slot(self):
+        self.server._voice_forwarder = VoiceForwarder(max_speakers=1)
+
+        async def speak(uid, seq):
+            await self.server.handle_voice_audio_binary(f"s{uid}", self.packet(uid, seq))
+        for seq in range(1, 6):
+            asyncio.run(speak(1, seq))
+        self.assertEqual(self.server._voice_forwarder.selected(self.ROOM), {1})
+        self.assertTrue(self.server._leave_voice_channel(self.ROOM, 1))
+        self.assertEqual(self.server._voice_forwarder.selected(self.ROOM), set())
+        self.assertFalse(self.server._leave_voice_channel(self.ROOM, 1))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
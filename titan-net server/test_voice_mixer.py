@@ -0,0 +1,177 @@
+"""
+Tests for server-side voice mixing (voice_mixer.py) and mixed rooms.
+
+Run directly:  python test_voice_mixer.py
+Senders use raw PCM frames and Opus is switched off, so the mixed output can
+be checked sample by sample whether or not opuslib is installed. The room
+test drives a bare TitanNetServer's mix loop with fake websockets.
+"""
+
+import asyncio
+import os
+import struct
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import voice_mixer  # noqa: E402
+from voice_forwarding import VoiceForwarder  # noqa: E402
+from routing import RoutingIndex, ClientRegistry  # noqa: E402
+
+np = voice_mixer.np
+
+
+def pcm(value):
+    return np.full(voice_mixer.FRAME_SAMPLES, value, dtype=np.int16).tobytes()
+
+
+def samples(payload):
+    return set(np.frombuffer(payload, dtype=np.int16).tolist())
+
+
+@unittest.skipUnless(voice_mixer.MIXING_AVAILABLE, "numpy is not installed")
+class Mixing(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(voice_mixer, 'OPUS_AVAILABLE', False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.mixer = voice_mixer.VoiceMixer()
+        self.assertTrue(self.mixer.enable(5))
+
+    def feed(self, frames):
+        for user_id, value in frames.items():
+            for _ in range(voice_mixer.JITTER_FRAMES):
+                self.mixer.push(5, user_id, pcm(value))
+
+    def test_every_listener_hears_everyone_but_themselves(self):
+        self.feed({1: 1000, 2: 2000, 3: 4000})
+        listeners = {uid: f"ws{uid}" for uid in range(1, 7)}
+        sends = self.mixer.tick(5, listeners)
+        heard = {}
+        for targets, packet in sends:
+            self.assertEqual(struct.unpack('>BIII', packet[:13])[:3], (0x01, 5, 0))
+            for ws in targets:
+                heard[ws] = samples(packet[13:])
+        self.assertEqual(heard, {'ws1': {6000}, 'ws2': {5000}, 'ws3': {3000},
+                                 'ws4': {7000}, 'ws5': {7000}, 'ws6': {7000}})
+        # Three speakers plus one shared group: four encodes for six listeners.
+        self.assertEqual(len(sends), 4)
+        self.assertEqual(self.mixer.room(5).stats['encodes'], 4)
+
+    def test_a_lone_speaker_gets_nothing_back(self):
+        self.feed({1: 1000})
+        sends = self.mixer.tick(5, {1: 'ws1', 2: 'ws2'})
+        self.assertEqual([targets for targets, _ in sends], [['ws2']])
+
+    def test_jitter_fill_and_clipping(self):
+        self.mixer.push(5, 1, pcm(30000))
+        self.assertEqual(self.mixer.tick(5, {9: 'ws9'}), [])   # still filling
+        self.mixer.push(5, 1, pcm(30000))
+        self.feed({2: 30000})
+        (targets, packet), = self.mixer.tick(5, {9: 'ws9'})
+        self.assertEqual(samples(packet[13:]), {32767})
+
+    def test_queues_stay_short(self):
+        for _ in range(voice_mixer.MAX_QUEUED_FRAMES + 3):
+            self.mixer.push(5, 1, pcm(1))
+        room = self.mixer.room(5)
+        self.assertEqual(len(room.speakers[1].frames), voice_mixer.MAX_QUEUED_FRAMES)
+        self.assertEqual(room.stats['frames_dropped'], 3)
+
+    def test_opus_without_opuslib_is_counted_not_mixed(self):
+        self.mixer.push(5, 1, b'\x78' * 60)
+        self.assertEqual(self.mixer.room(5).stats['undecodable'], 1)
+
+    def test_stats_and_disable(self):
+        self.feed({1: 1000})
+        self.mixer.tick(5, {2: 'ws2'})
+        room = self.mixer.stats()['rooms'][5]
+        self.assertEqual((room['ticks'], room['mixed_ticks'], room['speakers']), (1, 1, 1))
+        self.assertIn('cpu_percent', room)
+        self.mixer.disable(5)
+        self.assertFalse(self.mixer.is_mixed(5))
+        self.assertEqual(self.mixer.tick(5, {2: 'ws2'}), [])
+
+
+try:
+    import server as S  # noqa: E402
+except Exception:  # missing third-party module in this environment
+    S = None
+
+
+class Socket:
+    def __init__(self):
+        self.frames = []
+
+
+def fake_broadcast(targets, payload):
+    for ws in targets:
+        ws.frames.append(payload)
+
+
+@unittest.skipIf(S is None or not voice_mixer.MIXING_AVAILABLE,
+                 "server.py or numpy could not be imported")
+class MixedRoomOnTheServer(unittest.TestCase):
+    ROOM = 5
+
+    def setUp(self):
+        patcher = mock.patch.object(voice_mixer, 'OPUS_AVAILABLE', False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(S.websockets, 'broadcast', side_effect=fake_broadcast)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        server = S.TitanNetServer.__new__(S.TitanNetServer)
+        server._routes = RoutingIndex()
+        server.clients = ClientRegistry(server._routes)
+        server._voice_forwarder = VoiceForwarder()
+        server._voice_mixer = voice_mixer.VoiceMixer()
+        server._voice_mix_tasks = {}
+        server.voice_channels = {self.ROOM: {}}
+        server._room_websockets = {self.ROOM: {}}
+        self.sockets = {}
+        for uid in (1, 2, 3):
+            ws = self.sockets[uid] = Socket()
+            server.clients[f"s{uid}"] = {'user_id': uid, 'username': f"u{uid}", 'websocket': ws}
+            server.voice_channels[self.ROOM][uid] = ws
+            server._room_websockets[self.ROOM][uid] = ws
+        self.server = server
+
+    def test_mixed_room_sends_one_stream(self):
+        async def scenario():
+            with mock.patch.object(self.server, '_is_staff', return_value=True):
+                reply = await self.server.handle_set_voice_mixing(
+                    's1', {'room_id': self.ROOM, 'enabled': True})
+            self.assertTrue(reply['enabled'])
+            for seq in range(1, 6):
+                for uid, value in ((1, 100), (2, 200)):
+                    await self.server.handle_voice_audio_binary(
+                        f"s{uid}", struct.pack('>BIII', 1, self.ROOM, uid, seq) + pcm(value))
+                await asyncio.sleep(voice_mixer.FRAME_MS / 1000.0)
+            await asyncio.sleep(0.1)
+            with mock.patch.object(self.server, '_is_staff', return_value=True):
+                await self.server.handle_set_voice_mixing(
+                    's1', {'room_id': self.ROOM, 'enabled': False})
+            await asyncio.sleep(0.05)
+            self.assertEqual(self.server._voice_mix_tasks, {})
+        asyncio.run(scenario())
+
+        # Every packet anyone got came from the mix (user 0).
+        for ws in self.sockets.values():
+            self.assertTrue(ws.frames)
+            self.assertEqual({struct.unpack('>BIII', f[:13])[2] for f in ws.frames}, {0})
+        self.assertEqual(samples(self.sockets[3].frames[0][13:]), {300})
+        self.assertEqual(samples(self.sockets[1].frames[0][13:]), {200})
+
+    def test_only_staff_switch_mixing(self):
+        with mock.patch.object(self.server, '_is_staff', return_value=False):
+            reply = asyncio.run(self.server.handle_set_voice_mixing(
+                's1', {'room_id': self.ROOM, 'enabled': True}))
+        self.assertFalse(reply['success'])
+        self.assertFalse(self.server._voice_mixer.is_mixed(self.ROOM))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,225 @@
+"""
+Selective forwarding for voice rooms - who is worth relaying right now.
+
+``handle_voice_audio_binary`` used to relay every packet to every other
+member of the room. With one open mic that is N-1 sends per frame; with
+every mic open it is N * (N-1), about 33 times a second each. Fifty people
+in a room with their mics on in continuous mode meant 2450 sends per frame
+tick, almost all of it room noise nobody could make out anyway, since a
+listener cannot follow more than a few voices at once.
+
+``VoiceForwarder`` keeps, per room, an activity score for each speaker and
+a set of at most ``max_speakers`` selected speakers. Only the selected
+speakers' packets are relayed; the rest are suppressed and counted.
+
+Activity
+    Every packet adds 1 to its speaker's score and the score decays with a
+    half-life of ``half_life_ms``, so it is a recency-weighted packet rate:
+    a speaker sending a frame every 20 ms settles around 15, one who
+    stopped half a second ago is near 5. Clients that ran VAD on the frame
+    say so in the header (``VOICE_FLAG_VAD``) together with its result
+    (``VOICE_FLAG_SPEECH``); a frame the client's VAD called silence adds
+    nothing, so an open mic in a quiet room fades out of the selection
+    even though it keeps sending. Packets carry no level, so "loudest" is
+    approximated by "most active": there is no decoding on the relay.
+
+Selection
+    While a slot is free a speaker takes it with their first packet (unless
+    their VAD called it silence), so nobody loses the start of a sentence
+    in a quiet room. When the slots are full a speaker whose score reaches
+    ``active_score`` replaces the weakest selected speaker only if it is
+    ``hysteresis`` times more active and that speaker has held its slot for
+    ``hold_ms`` - otherwise two similar speakers would swap on every packet
+    and both would sound chopped. A selected speaker who has sent
+    nothing for ``idle_ms`` loses the slot straight away.
+
+Every listener gets the same selection minus its own voice. Counters keep
+the bytes relayed and the bytes that would have been relayed (packet size
+times listeners) per room and in total; the heartbeat logs them.
+
+Touched only from the asyncio loop, like ``voice_channels``; no lock.
+"""
+
+import time
+from typing import Any, Dict, Optional
+
+# Header flag bits in the packet type byte. The low six bits are the packet
+# type (0x01 room voice, 0x02 game voice); clients set the flags only when
+# the server announced ``voice_flags`` at login. The relay clears them
+# before forwarding so listeners on older clients see a plain 0x01 packet.
+VOICE_TYPE_MASK = 0x3F
+VOICE_FLAG_VAD = 0x80      # the sender ran VAD on this frame ...
+VOICE_FLAG_SPEECH = 0x40   # ... and it heard speech
+
+DEFAULT_MAX_SPEAKERS = 4
+DEFAULT_HYSTERESIS = 1.5
+DEFAULT_HOLD_MS = 600.0
+DEFAULT_IDLE_MS = 400.0
+DEFAULT_HALF_LIFE_MS = 300.0
+DEFAULT_ACTIVE_SCORE = 3.0
+
+
+def packet_speech(type_byte: int) -> Optional[bool]:
+    """The VAD verdict carried in a packet type byte, or None if none."""
+    if not type_byte & VOICE_FLAG_VAD:
+        return None
+    return bool(type_byte & VOICE_FLAG_SPEECH)
+
+
+class _Speaker:
+    __slots__ = ('score', 'last_at', 'selected_at')
+
+    def __init__(self, now: float):
+        self.score = 0.0
+        self.last_at = now
+        self.selected_at: Optional[float] = None
+
+    def decayed(self, now: float, half_life: float) -> float:
+        return self.score * 0.5 ** ((now - self.last_at) / half_life)
+
+
+class _RoomStats:
+    __slots__ = ('forwarded_packets', 'suppressed_packets',
+                 'forwarded_bytes', 'suppressed_bytes', 'switches')
+
+    def __init__(self):
+        self.forwarded_packets = 0
+        self.suppressed_packets = 0
+        self.forwarded_bytes = 0
+        self.suppressed_bytes = 0
+        self.switches = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class VoiceForwarder:
+    """Per-room speaker selection for the voice relay."""
+
+    def __init__(self, max_speakers: int = DEFAULT_MAX_SPEAKERS,
+                 hysteresis: float = DEFAULT_HYSTERESIS,
+                 hold_ms: float = DEFAULT_HOLD_MS,
+                 idle_ms: float = DEFAULT_IDLE_MS,
+                 half_life_ms: float = DEFAULT_HALF_LIFE_MS,
+                 active_score: float = DEFAULT_ACTIVE_SCORE):
+        # max_speakers 0 turns selection off: everything is relayed, and
+        # still counted.
+        self.max_speakers = max(0, int(max_speakers))
+        self.hysteresis = max(1.0, float(hysteresis))
+        self.hold = hold_ms / 1000.0
+        self.idle = idle_ms / 1000.0
+        self.half_life = max(1.0, half_life_ms) / 1000.0
+        self.active_score = float(active_score)
+        # {room_id: {user_id: _Speaker}} and {room_id: {user_id, ...}}
+        self._speakers: Dict[int, Dict[int, _Speaker]] = {}
+        self._selected: Dict[int, set] = {}
+        self._stats: Dict[int, _RoomStats] = {}
+        self._retired = _RoomStats()   # totals of rooms already forgotten
+
+    def admit(self, room_id: int, user_id: int, speech: Optional[bool] = None,
+              now: Optional[float] = None) -> bool:
+        """Score one packet; True if it should be relayed."""
+        if now is None:
+            now = time.monotonic()
+        speakers = self._speakers.setdefault(room_id, {})
+        speaker = speakers.get(user_id)
+        if speaker is None:
+            speaker = speakers[user_id] = _Speaker(now)
+        speaker.score = speaker.decayed(now, self.half_life) + (0.0 if speech is False else 1.0)
+        speaker.last_at = now
+
+        if not self.max_speakers:
+            return True
+        selected = self._selected.setdefault(room_id, set())
+        if user_id in selected:
+            return True
+        if speech is False:
+            return False
+
+        # Selected speakers who went quiet give their slot up first.
+        for other in [uid for uid in selected if now - speakers[uid].last_at >= self.idle]:
+            selected.discard(other)
+            speakers[other].selected_at = None
+        if len(selected) < self.max_speakers:
+            self._select(room_id, selected, user_id, speaker, now)
+            return True
+        if speaker.score < self.active_score:
+            return False
+
+        weakest_id = min(selected, key=lambda uid: speakers[uid].decayed(now, self.half_life))
+        weakest = speakers[weakest_id]
+        if (now - weakest.selected_at >= self.hold
+                and speaker.score >= weakest.decayed(now, self.half_life) * self.hysteresis):
+            selected.discard(weakest_id)
+            weakest.selected_at = None
+            self._select(room_id, selected, user_id, speaker, now)
+            return True
+        return False
+
+    def _select(self, room_id: int, selected: set, user_id: int, speaker: _Speaker, now: float):
+        selected.add(user_id)
+        speaker.selected_at = now
+        self._room_stats(room_id).switches += 1
+
+    def _room_stats(self, room_id: int) -> _RoomStats:
+        stats = self._stats.get(room_id)
+        if stats is None:
+            stats = self._stats[room_id] = _RoomStats()
+        return stats
+
+    def record(self, room_id: int, forwarded: bool, size: int, listeners: int):
+        """Count one packet: ``size`` bytes to (or kept from) ``listeners``."""
+        stats = self._room_stats(room_id)
+        if forwarded:
+            stats.forwarded_packets += 1
+            stats.forwarded_bytes += size * listeners
+        else:
+            stats.suppressed_packets += 1
+            stats.suppressed_bytes += size * listeners
+
+    def selected(self, room_id: int) -> set:
+        return set(self._selected.get(room_id, ()))
+
+    def forget_speaker(self, room_id: int, user_id: int):
+        """The user stopped voice or left the room."""
+        speakers = self._speakers.get(room_id)
+        if speakers is not None:
+            speakers.pop(user_id, None)
+            if not speakers:
+                self._speakers.pop(room_id, None)
+        selected = self._selected.get(room_id)
+        if selected is not None:
+            selected.discard(user_id)
+            if not selected:
+                self._selected.pop(room_id, None)
+
+    def forget_room(self, room_id: int):
+        self._speakers.pop(room_id, None)
+        self._selected.pop(room_id, None)
+        stats = self._stats.pop(room_id, None)
+        if stats is not None:
+            for name in _RoomStats.__slots__:
+                setattr(self._retired, name, getattr(self._retired, name) + getattr(stats, name))
+
+    def stats(self) -> Dict[str, Any]:
+        total = _RoomStats()
+        for stats in list(self._stats.values()) + [self._retired]:
+            for name in _RoomStats.__slots__:
+                setattr(total, name, getattr(total, name) + getattr(stats, name))
+        return {
+            'max_speakers': self.max_speakers,
+            'total': total.as_dict(),
+            'rooms': {room_id: dict(s.as_dict(), selected=sorted(self._selected.get(room_id, ())))
+                      for room_id, s in self._stats.items()},
+        }
+
+    def summary(self) -> str:
+        """One log line: bytes relayed and bytes saved."""
+        total = self.stats()['total']
+        sent, kept = total['forwarded_bytes'], total['suppressed_bytes']
+        if not sent and not kept:
+            return "no voice"
+        saved = 100.0 * kept / (sent + kept)
+        return (f"forwarded {sent} B ({total['forwarded_packets']} pkts), "
+                f"suppressed {kept} B ({total['suppressed_packets']} pkts, {saved:.0f}% saved), "
+                f"{total['switches']} speaker switches")
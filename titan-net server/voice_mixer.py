@@ -0,0 +1,274 @@
+"""
+Server-side voice mixing for rooms that opt in (MCU mode).
+
+Normally the relay forwards each selected speaker's packets to every
+listener (voice_forwarding.py) and every client decodes and mixes them in
+``titan_net_gui._voice_mixer_thread``. With four speakers that is four
+streams down each listener's link and four Opus decoders on a machine that
+may be an old laptop on hotel Wi-Fi. In a mixed room the server does that
+work instead: it decodes the speakers, sums them every 20 ms and sends each
+listener one stream.
+
+A listener must not hear themselves, so the mix is built per *mix group*:
+everyone who is not speaking shares one group (one encode, one packet for
+all of them), and each speaker in the mix gets their own group - the total
+minus their own voice. With the forwarder's four-speaker cap that is at
+most five encodes per tick whatever the size of the room.
+
+The mixed stream goes out as an ordinary 0x01 voice packet from user id 0,
+so clients need no change: it lands in its own jitter buffer and their
+mixer plays one stream instead of several.
+
+Codec: the same settings as the client's ``voice_codec.OpusVoiceCodec``
+(16 kHz mono, 20 ms frames, 24 kbit/s VoIP, in-band FEC). The server is
+deployed without the client tree, so the codec is set up here rather than
+imported. Frames shorter than ``OPUS_FRAME_MAX_BYTES`` are Opus, longer ones
+raw 16-bit PCM - the rule the client uses. ``numpy`` is required to mix
+and ``opuslib`` to decode Opus senders and encode the mix; without opuslib
+the mix is sent as PCM and Opus frames are counted as undecodable. Without
+numpy mixing cannot be enabled at all.
+
+Each mixed room keeps counters including the CPU time (thread time of the
+event loop thread) spent decoding, mixing and encoding, so the cost of a
+room can be weighed against the client bandwidth it saves.
+"""
+
+import collections
+import logging
+import struct
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger('TitanNetServer')
+
+try:
+    import numpy as np
+    MIXING_AVAILABLE = True
+except Exception:  # optional dependency
+    np = None  # type: ignore
+    MIXING_AVAILABLE = False
+
+try:
+    import opuslib  # type: ignore
+    OPUS_AVAILABLE = True
+except Exception:  # optional dependency
+    opuslib = None  # type: ignore
+    OPUS_AVAILABLE = False
+
+SAMPLE_RATE = 16000
+FRAME_MS = 20
+FRAME_SAMPLES = SAMPLE_RATE * FRAME_MS // 1000     # 320
+OPUS_BITRATE = 24000
+# Same size rule as the client: a 20 ms Opus frame at 24 kbit/s is about
+# 60 bytes, the raw PCM frame 640.
+OPUS_FRAME_MAX_BYTES = 500
+# A speaker joins the mix once this many frames are queued (absorbs
+# network jitter) and never queues more than MAX_QUEUED_FRAMES (older ones
+# are dropped so the mix does not drift behind).
+JITTER_FRAMES = 2
+MAX_QUEUED_FRAMES = 5
+# Packets from the mix carry this user id.
+MIX_USER_ID = 0
+
+
+def _opus_encoder():
+    encoder = opuslib.Encoder(SAMPLE_RATE, 1, opuslib.APPLICATION_VOIP)
+    encoder.bitrate = OPUS_BITRATE
+    encoder.complexity = 6
+    try:
+        opuslib.api.encoder.encoder_ctl(encoder._state, 4012, 1)    # in-band FEC
+        opuslib.api.encoder.encoder_ctl(encoder._state, 4014, 10)   # expected loss %
+    except Exception:
+        pass
+    return encoder
+
+
+class _Speaker:
+    __slots__ = ('frames', 'decoder', 'started')
+
+    def __init__(self):
+        self.frames: collections.deque = collections.deque()
+        self.decoder = None
+        self.started = False
+
+
+class MixedRoom:
+    """One room's speakers, mix groups and counters."""
+
+    def __init__(self, room_id: int):
+        self.room_id = room_id
+        self.speakers: Dict[int, _Speaker] = {}
+        # {group: (encoder or None, seq)}; group None is the shared mix.
+        self._groups: Dict[Optional[int], List[Any]] = {}
+        self.enabled_at = time.monotonic()
+        self.stats = {'ticks': 0, 'mixed_ticks': 0, 'frames_in': 0, 'frames_dropped': 0,
+                      'undecodable': 0, 'encodes': 0, 'packets_out': 0, 'bytes_out': 0,
+                      'cpu_ms': 0.0}
+
+    # ------------------------------------------------------------- input
+    def push(self, user_id: int, payload: bytes):
+        speaker = self.speakers.get(user_id)
+        if speaker is None:
+            speaker = self.speakers[user_id] = _Speaker()
+        started = time.thread_time()
+        pcm = self._decode(speaker, payload)
+        self.stats['cpu_ms'] += (time.thread_time() - started) * 1000.0
+        if pcm is None:
+            self.stats['undecodable'] += 1
+            return
+        self.stats['frames_in'] += 1
+        if len(speaker.frames) >= MAX_QUEUED_FRAMES:
+            speaker.frames.popleft()
+            self.stats['frames_dropped'] += 1
+        speaker.frames.append(pcm)
+
+    @staticmethod
+    def _decode(speaker: _Speaker, payload: bytes):
+        if len(payload) < OPUS_FRAME_MAX_BYTES:
+            if not OPUS_AVAILABLE:
+                return None
+            try:
+                if speaker.decoder is None:
+                    speaker.decoder = opuslib.Decoder(SAMPLE_RATE, 1)
+                payload = speaker.decoder.decode(payload, FRAME_SAMPLES)
+            except Exception:
+                return None
+        pcm = np.frombuffer(payload[:len(payload) - len(payload) % 2], dtype=np.int16)
+        if len(pcm) != FRAME_SAMPLES:
+            pcm = np.resize(pcm, FRAME_SAMPLES) if len(pcm) else np.zeros(FRAME_SAMPLES, np.int16)
+        return pcm
+
+    def forget(self, user_id: int):
+        self.speakers.pop(user_id, None)
+        self._groups.pop(user_id, None)
+
+    # -------------------------------------------------------------- tick
+    def tick(self, listeners: Iterable[int]) -> Dict[Optional[int], Tuple[List[int], bytes]]:
+        """Mix one frame. ``{group: (listener ids, payload)}``; empty if silent."""
+        started = time.thread_time()
+        self.stats['ticks'] += 1
+        own: Dict[int, Any] = {}
+        for user_id, speaker in self.speakers.items():
+            if not speaker.started:
+                if len(speaker.frames) < JITTER_FRAMES:
+                    continue
+                speaker.started = True
+            if speaker.frames:
+                own[user_id] = speaker.frames.popleft().astype(np.int32)
+            else:
+                speaker.started = False    # ran dry: refill before rejoining
+        out: Dict[Optional[int], Tuple[List[int], bytes]] = {}
+        if own:
+            self.stats['mixed_ticks'] += 1
+            total = np.sum(list(own.values()), axis=0)
+            members: Dict[Optional[int], List[int]] = {}
+            for listener in listeners:
+                members.setdefault(listener if listener in own else None, []).append(listener)
+            for group, ids in members.items():
+                mix = total if group is None else total - own[group]
+                if group is not None and len(own) == 1:
+                    continue   # the only speaker: nothing for them to hear
+                out[group] = (ids, self._encode(group, mix))
+        self.stats['cpu_ms'] += (time.thread_time() - started) * 1000.0
+        return out
+
+    def _encode(self, group: Optional[int], mix) -> bytes:
+        pcm = np.clip(mix, -32768, 32767).astype(np.int16).tobytes()
+        state = self._groups.get(group)
+        if state is None:
+            state = self._groups[group] = [_opus_encoder() if OPUS_AVAILABLE else None, 0]
+        self.stats['encodes'] += 1
+        if state[0] is not None:
+            try:
+                return state[0].encode(pcm, FRAME_SAMPLES)
+            except Exception as e:
+                logger.warning(f"[VOICE MIX] room {self.room_id}: encode failed, sending PCM: {e}")
+                state[0] = None
+        return pcm
+
+    def next_seq(self, group: Optional[int]) -> int:
+        state = self._groups[group]
+        state[1] = (state[1] + 1) & 0xFFFFFFFF
+        return state[1]
+
+    def as_dict(self) -> Dict[str, Any]:
+        audio_s = self.stats['ticks'] * FRAME_MS / 1000.0
+        return dict(self.stats,
+                    cpu_ms=round(self.stats['cpu_ms'], 3),
+                    # Share of one core the room costs while its loop runs.
+                    cpu_percent=round(self.stats['cpu_ms'] / (audio_s * 10.0), 2) if audio_s else 0.0,
+                    speakers=len(self.speakers),
+                    seconds=round(time.monotonic() - self.enabled_at, 1))
+
+
+class VoiceMixer:
+    """The set of mixed rooms. Touched only from the asyncio loop."""
+
+    def __init__(self):
+        self._rooms: Dict[int, MixedRoom] = {}
+        self._retired_cpu_ms = 0.0
+
+    def enable(self, room_id: int) -> bool:
+        """Mix this room from now on. False if numpy is not installed."""
+        if not MIXING_AVAILABLE:
+            return False
+        if room_id not in self._rooms:
+            self._rooms[room_id] = MixedRoom(room_id)
+            logger.info(f"[VOICE MIX] room {room_id}: server-side mixing on "
+                        f"({'Opus' if OPUS_AVAILABLE else 'PCM only'})")
+        return True
+
+    def disable(self, room_id: int):
+        room = self._rooms.pop(room_id, None)
+        if room is not None:
+            self._retired_cpu_ms += room.stats['cpu_ms']
+            logger.info(f"[VOICE MIX] room {room_id}: server-side mixing off "
+                        f"({room.as_dict()['cpu_percent']}% of a core while on)")
+
+    def is_mixed(self, room_id: int) -> bool:
+        return room_id in self._rooms
+
+    def room(self, room_id: int) -> Optional[MixedRoom]:
+        return self._rooms.get(room_id)
+
+    def push(self, room_id: int, user_id: int, payload: bytes):
+        room = self._rooms.get(room_id)
+        if room is not None:
+            room.push(user_id, payload)
+
+    def forget_speaker(self, room_id: int, user_id: int):
+        room = self._rooms.get(room_id)
+        if room is not None:
+            room.forget(user_id)
+
+    def tick(self, room_id: int, listeners: Dict[int, Any]) -> List[Tuple[List[Any], bytes]]:
+        """Mix one frame for ``listeners`` ({user_id: websocket}).
+
+        Returns ``[(websockets, packet), ...]``, one entry per mix group,
+        each packet a complete 0x01 voice packet from ``MIX_USER_ID``.
+        """
+        room = self._rooms.get(room_id)
+        if room is None or not listeners:
+            return []
+        sends = []
+        for group, (ids, payload) in room.tick(listeners.keys()).items():
+            packet = struct.pack('>BIII', 0x01, room_id, MIX_USER_ID, room.next_seq(group)) + payload
+            targets = [listeners[uid] for uid in ids]
+            room.stats['packets_out'] += len(targets)
+            room.stats['bytes_out'] += len(packet) * len(targets)
+            sends.append((targets, packet))
+        return sends
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'available': MIXING_AVAILABLE,
+            'opus': OPUS_AVAILABLE,
+            'rooms': {room_id: room.as_dict() for room_id, room in self._rooms.items()},
+            'retired_cpu_ms': round(self._retired_cpu_ms, 3),
+        }
+
+    def summary(self) -> str:
+        if not self._rooms:
+            return "no mixed rooms"
+        return ", ".join(f"room {room_id} {r['cpu_percent']}% cpu, {r['bytes_out']} B out"
+                         for room_id, r in self.stats()['rooms'].items())